@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 常驻服务模块
+常驻进程接收巡检任务，依赖只导入一次，设备清单缓存到文件变化为止，
+设备会话保留在连接池中供下一次任务复用；通过本地HTTP接口提交和查询任务。
+
+用法:
+    python ale_daemon.py serve
+    python ale_daemon.py submit 10.0.0.1 10.0.0.2 --wait
+    python ale_daemon.py status [任务ID]
+"""
+
+import os
+import sys
+import json
+import hmac
+import time
+import queue
+import argparse
+import importlib
+import itertools
+import threading
+from datetime import datetime
+
+from ale_inspection import ALEInspection, REQUIRED_MODULES
+from connection_pool import ConnectionPool
+from log_setup import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_daemon_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_ERROR = 'error'
+
+TOKEN_HEADER = 'X-Auth-Token'
+
+
+def get_default_config():
+    """获取默认服务配置"""
+    return {
+        'host': '127.0.0.1',
+        'port': 8750,
+        'token': '',
+        'keep_jobs': 100,
+        'pool_size': 50,
+        'pool_idle': 240,
+    }
+
+
+def load_config():
+    """读取服务配置"""
+    return get_daemon_config() if ENV_AVAILABLE else get_default_config()
+
+
+class DeviceInventory:
+    """缓存的设备清单
+
+    按IP保存设备记录，设备清单文件修改后在下一次使用时重新读取。
+    读取逻辑与 ALEInspection 相同。
+    """
+
+    load_excel = ALEInspection.load_excel
+    get_device_info = ALEInspection.get_device_info
+    get_cmd_info = ALEInspection.get_cmd_info
+
+    def __init__(self, device_file="template.xlsx"):
+        self.device_file = device_file
+        self.lock = threading.Lock()
+        self.devices = {}
+        self.mtime = None
+
+    def reload(self):
+        """重新读取设备清单
+
+        Returns:
+            int: 设备数
+        """
+        with self.lock:
+            return self._load()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            mtime = os.path.getmtime(self.device_file)
+        except OSError:
+            mtime = None
+        self.devices = {device.ip: device for device in self.get_device_info()}
+        self.mtime = mtime
+        logger.info(f"设备清单已加载: {len(self.devices)} 台设备, 耗时 {time.perf_counter() - start:.2f}秒")
+        return len(self.devices)
+
+    def current(self):
+        """获取设备记录，文件有变化时先重新读取"""
+        with self.lock:
+            try:
+                mtime = os.path.getmtime(self.device_file)
+            except OSError:
+                mtime = None
+            if mtime != self.mtime or not self.devices:
+                self._load()
+            return dict(self.devices)
+
+    def select(self, ips=None):
+        """按IP选择设备
+
+        Args:
+            ips: IP列表，None或空表示全部设备
+
+        Returns:
+            tuple: (设备记录列表, 清单中不存在的IP列表)
+        """
+        devices = self.current()
+        if not ips:
+            return list(devices.values()), []
+        selected = [devices[ip] for ip in ips if ip in devices]
+        unknown = [ip for ip in ips if ip not in devices]
+        return selected, unknown
+
+
+class Job:
+    """一次巡检任务"""
+
+    def __init__(self, job_id, devices, notify=False):
+        self.id = job_id
+        self.devices = devices
+        self.notify = notify
+        self.status = JOB_QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.logtime = None
+        self.success = []
+        self.failed = []
+        self.error = None
+
+    def to_dict(self):
+        """任务状态，用于API响应"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'devices': [device.ip for device in self.devices],
+            'notify': self.notify,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            # 提交到开始执行的等待时间
+            'queue_ms': round((self.started - self.submitted) * 1000, 1) if self.started else None,
+            'elapsed': round(self.finished - self.started, 2) if self.finished and self.started else None,
+            'logtime': self.logtime,
+            'success': self.success,
+            'failed': self.failed,
+            'error': self.error,
+        }
+
+
+class InspectionDaemon:
+    """常驻巡检服务
+
+    任务按提交顺序逐个执行（任务内的设备由调度器并发巡检）；
+    每个任务使用独立的 ALEInspection 实例，共用设备清单和连接池。
+    任务不能同时运行: 各实例会在同一端口启动指标接口，并读写同一份
+    LOG/.store/index.json、LOG/.download_state.json 和巡检历史，后写入的会覆盖先写入的。
+    """
+
+    def __init__(self, config=None):
+        self.config = config or load_config()
+        self.inventory = DeviceInventory()
+        self.pool = ConnectionPool(self.config['pool_size'], self.config['pool_idle'])
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.ids = itertools.count(1)
+        self.started = time.time()
+        self.server = None
+        # ALEInspection 的日志目录名精确到秒，同一秒开始的任务需要错开
+        self.logtime_lock = threading.Lock()
+        self.last_logtime = None
+
+    def warm_up(self):
+        """导入巡检依赖并加载设备清单，使第一个任务也不需要等待"""
+        start = time.perf_counter()
+        for name in REQUIRED_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.error(f"✗ 导入 {name} 失败: {e}")
+        logger.info(f"依赖导入耗时 {time.perf_counter() - start:.2f}秒")
+        self.inventory.reload()
+
+    def submit(self, devices, notify=False):
+        """提交任务
+
+        Returns:
+            Job
+        """
+        job = Job(next(self.ids), devices, notify)
+        with self.jobs_lock:
+            self.jobs[job.id] = job
+            self._prune_jobs()
+        self.queue.put(job)
+        logger.info(f"任务 {job.id} 已提交: {len(devices)} 台设备")
+        return job
+
+    def _prune_jobs(self):
+        """只保留最近 keep_jobs 个已完成的任务"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in (JOB_DONE, JOB_ERROR)]
+        for job_id in finished[:max(0, len(finished) - self.config['keep_jobs'])]:
+            del self.jobs[job_id]
+
+    def get_job(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.jobs_lock:
+            return [job.to_dict() for job in reversed(list(self.jobs.values()))]
+
+    def new_inspection(self):
+        """创建巡检实例，保证日志时间戳与上一个任务不同"""
+        with self.logtime_lock:
+            while datetime.now().strftime("%Y-%m-%d_%H-%M-%S") == self.last_logtime:
+                time.sleep(0.05)
+            inspector = ALEInspection(pool=self.pool)
+            self.last_logtime = inspector.logtime
+        return inspector
+
+    def run_job(self, job):
+        """执行一个任务"""
+        job.status = JOB_RUNNING
+        job.started = time.time()
+        logger.info(f"任务 {job.id} 开始, 排队 {(job.started - job.submitted) * 1000:.0f}毫秒")
+        try:
+            inspector = self.new_inspection()
+            job.logtime = inspector.logtime
+            inspector.run_inspection(job.devices, notify=job.notify)
+            job.success = inspector.success
+            job.failed = inspector.fail
+            job.status = JOB_DONE
+        except Exception as e:
+            logger.error(f"✗ 任务 {job.id} 失败: {e}")
+            job.error = str(e)
+            job.status = JOB_ERROR
+        finally:
+            job.finished = time.time()
+        logger.info(f"任务 {job.id} 完成: 成功 {len(job.success)}, 失败 {len(job.failed)}, "
+                    f"耗时 {job.finished - job.started:.1f}秒")
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            self.run_job(job)
+
+    def health(self):
+        """服务状态"""
+        with self.jobs_lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            'status': 'ok',
+            'uptime': round(time.time() - self.started, 1),
+            'devices': len(self.inventory.devices),
+            'queued': statuses.count(JOB_QUEUED),
+            'running': statuses.count(JOB_RUNNING),
+            'pool_idle': self.pool.idle_count(),
+            'pool': dict(self.pool.stats),
+        }
+
+    def make_server(self):
+        """创建HTTP接口"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        daemon = self
+        # 令牌按字符串比较，"0"、"off" 等也是有效令牌
+        token = str(self.config['token'] or '')
+
+        class DaemonHandler(BaseHTTPRequestHandler):
+            def send_json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def authorized(self):
+                if not token:
+                    return True
+                supplied = self.headers.get(TOKEN_HEADER, '')
+                if hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+                    return True
+                self.send_json(401, {'error': '令牌无效'})
+                return False
+
+            def read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if not length:
+                    return {}
+                return json.loads(self.rfile.read(length).decode('utf-8'))
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                path = self.path.split('?')[0].rstrip('/')
+                if path == '/health':
+                    self.send_json(200, daemon.health())
+                elif path == '/devices':
+                    devices = daemon.inventory.current()
+                    self.send_json(200, [{'ip': device.ip, 'device_type': device.device_type,
+                                          'protocol': device.protocol} for device in devices.values()])
+                elif path == '/jobs':
+                    self.send_json(200, daemon.list_jobs())
+                elif path.startswith('/jobs/'):
+                    job_id = path[len('/jobs/'):]
+                    job = daemon.get_job(int(job_id)) if job_id.isdigit() else None
+                    if job is None:
+                        self.send_json(404, {'error': f"任务不存在: {job_id}"})
+                    else:
+                        self.send_json(200, job.to_dict())
+                else:
+                    self.send_json(404, {'error': f"未知路径: {path}"})
+
+            def do_POST(self):
+                if not self.authorized():
+                    return
+                path = self.path.split('?')[0].rstrip('/')
+                try:
+                    data = self.read_json()
+                except ValueError as e:
+                    self.send_json(400, {'error': f"请求不是有效的JSON: {e}"})
+                    return
+                if not isinstance(data, dict):
+                    self.send_json(400, {'error': '请求内容应为JSON对象'})
+                    return
+                if path == '/jobs':
+                    ips = data.get('devices')
+                    if ips is not None and (not isinstance(ips, list)
+                                            or not all(isinstance(ip, str) for ip in ips)):
+                        self.send_json(400, {'error': 'devices 应为IP字符串列表'})
+                        return
+                    devices, unknown = daemon.inventory.select(ips)
+                    if unknown:
+                        self.send_json(400, {'error': '设备清单中没有这些设备', 'unknown': unknown})
+                        return
+                    if not devices:
+                        self.send_json(400, {'error': '没有可巡检的设备'})
+                        return
+                    job = daemon.submit(devices, notify=bool(data.get('notify', False)))
+                    self.send_json(202, job.to_dict())
+                elif path == '/reload':
+                    self.send_json(200, {'devices': daemon.inventory.reload()})
+                else:
+                    self.send_json(404, {'error': f"未知路径: {path}"})
+
+            def log_message(self, format, *args):
+                logger.debug(f"{self.address_string()} {format % args}")
+
+        server = ThreadingHTTPServer((self.config['host'], self.config['port']), DaemonHandler)
+        server.daemon_threads = True
+        return server
+
+    def serve(self):
+        """启动服务，直到 Ctrl+C"""
+        self.warm_up()
+        self.pool.start()
+        worker = threading.Thread(target=self._worker, name="job-worker", daemon=True)
+        worker.start()
+        self.server = self.make_server()
+        logger.info(f"✓ 常驻服务已启动: http://{self.config['host']}:{self.config['port']}")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("正在停止服务...")
+        finally:
+            self.server.server_close()
+            self.queue.put(None)
+            # 等待正在执行的任务结束
+            worker.join()
+            self.pool.close()
+
+
+def request(config, method, path, data=None):
+    """调用常驻服务的HTTP接口
+
+    Returns:
+        tuple: (HTTP状态码, 响应数据)
+    """
+    import urllib.request
+    import urllib.error
+
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    req = urllib.request.Request(f"http://{config['host']}:{config['port']}{path}", data=body, method=method)
+    req.add_header('Content-Type', 'application/json')
+    if config['token']:
+        req.add_header(TOKEN_HEADER, str(config['token']))
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8') or '{}')
+
+
+def print_job(job):
+    """打印任务状态"""
+    line = f"任务 {job['id']}: {job['status']}  设备 {len(job['devices'])}"
+    if job['queue_ms'] is not None:
+        line += f"  排队 {job['queue_ms']:.0f}毫秒"
+    if job['status'] in (JOB_DONE, JOB_ERROR):
+        line += f"  成功 {len(job['success'])}  失败 {len(job['failed'])}  耗时 {job['elapsed']}秒"
+    if job['error']:
+        line += f"  错误: {job['error']}"
+    print(line)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="ALE网络运维工具包 - 常驻服务")
+    parser.add_argument('command', choices=['serve', 'submit', 'status', 'devices', 'reload'],
+                        help="serve: 启动服务, submit: 提交巡检任务, status: 查询任务, "
+                             "devices: 设备清单, reload: 重新读取设备清单")
+    parser.add_argument('args', nargs='*', help="设备IP（submit，不指定表示全部设备）或任务ID（status）")
+    parser.add_argument('--notify', action='store_true', help="任务完成后发送邮件")
+    parser.add_argument('--wait', action='store_true', help="等待任务完成")
+    args = parser.parse_args()
+
+    config = load_config()
+    if args.command == 'serve':
+        setup_logging()
+        InspectionDaemon(config).serve()
+        return
+
+    try:
+        if args.command == 'submit':
+            status, job = request(config, 'POST', '/jobs', {'devices': args.args, 'notify': args.notify})
+            if status != 202:
+                print(f"✗ 提交失败: {job.get('error')} {', '.join(job.get('unknown', []))}")
+                sys.exit(1)
+            print_job(job)
+            while args.wait and job['status'] in (JOB_QUEUED, JOB_RUNNING):
+                time.sleep(1)
+                status, job = request(config, 'GET', f"/jobs/{job['id']}")
+            if args.wait:
+                print_job(job)
+        elif args.command == 'status':
+            if args.args:
+                status, job = request(config, 'GET', f"/jobs/{args.args[0]}")
+                if status != 200:
+                    print(f"✗ {job.get('error')}")
+                    sys.exit(1)
+                print_job(job)
+            else:
+                status, health = request(config, 'GET', '/health')
+                print(f"运行 {health['uptime']:.0f}秒  设备 {health['devices']}  排队 {health['queued']}  "
+                      f"执行中 {health['running']}  空闲连接 {health['pool_idle']}")
+                for job in request(config, 'GET', '/jobs')[1]:
+                    print_job(job)
+        elif args.command == 'devices':
+            for device in request(config, 'GET', '/devices')[1]:
+                print(f"{device['ip']:<18} {device['device_type']:<16} {device['protocol']}")
+        elif args.command == 'reload':
+            print(f"设备清单已重新加载: {request(config, 'POST', '/reload')[1]['devices']} 台设备")
+    except OSError as e:
+        print(f"✗ 无法连接常驻服务 {config['host']}:{config['port']}: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
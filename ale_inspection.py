@@ -8,11 +8,30 @@ ALE网络运维工具包 - 设备巡检模块
 import os
 import sys
 import ftplib
+import multiprocessing
 import time
 from datetime import datetime
-from netmiko import ConnectHandler
-from openpyxl.reader.excel import load_workbook
-from multiprocessing.pool import ThreadPool
+from log_store import LogStore
+from log_retention import RetentionManager
+from run_report import RunReport, load_history
+from metrics_exporter import MetricsExporter
+from result_registry import ResultRegistry
+from device_record import DeviceRecord, CommandListCache
+from device_registry import get_profile
+from scheduler import DeviceScheduler
+from session_watchdog import Watchdog, WatchdogTimeout, close_connection, shutdown_socket
+from download_strategy import DownloadStrategy, FileMissing, DownloadCancelled
+from partial_file import PartialFile
+from stream_receiver import StreamReceiver
+from ssh_transfer import get_transport, sftp_download, scp_download, is_missing_error
+from tech_support_analyzer import TechSupportAnalyzer, format_summary
+from command_parser import ColumnStore
+from fleet_analytics import FleetAnalytics
+from run_history import RunHistory
+from report_builder import ReportBuilder
+from log_setup import get_logger, setup_logging, device_context
+
+logger = get_logger(__name__)
 
 # 导入配置
 try:
@@ -20,32 +39,75 @@ try:
     CONFIG_AVAILABLE = True
 except ImportError:
     CONFIG_AVAILABLE = False
-    print("警告: ale_config.py不可用，使用默认配置")
 
 
 class ALEInspection:
     """ALE网络运维工具包 - 设备巡检类"""
     
-    def __init__(self):
+    def __init__(self, pool=None):
+        setup_logging()
+        if not CONFIG_AVAILABLE:
+            logger.warning("ale_config.py不可用，使用默认配置")
         self.device_file = "template.xlsx"  # 使用现有的xlsx文件
-        self.pool = ThreadPool(10)
-        self.success = []
-        self.fail = []
+        # 常驻模式下多次巡检共用的连接池，None表示每台设备巡检完即断开
+        self.pool = pool
+        self.scheduler = DeviceScheduler()
+        self.results = ResultRegistry()
+        self.watchdog = Watchdog(on_expire=self.on_timeout, on_abandon=self.on_abandon)
         self.log_dir = "LOG"
         self.logtime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.report = RunReport(self.logtime)
+        self.report.add_listener(self.results.observe)
+        # HTML报告的设备行在设备完成时渲染
+        self.html_report = ReportBuilder(self.logtime, self.results)
+        self.report.add_listener(self.html_report.observe)
+        self.metrics = MetricsExporter()
+        if self.metrics.enabled:
+            self.report.add_listener(self.metrics.observe)
         
         # 创建LOG目录
         if not os.path.exists(self.log_dir):
             os.makedirs(self.log_dir)
-            print(f"创建LOG目录: {self.log_dir}")
+            logger.info(f"创建LOG目录: {self.log_dir}")
+
+        # 每台设备的下载方式记录
+        self.downloads = DownloadStrategy(self.log_dir)
+        self.receiver = StreamReceiver(self.downloads.config['block_size'] * 1024,
+                                       zero_copy=self.downloads.config['zero_copy'])
+
+        # 下载完成的tech-support日志在后台分析
+        self.analyzer = TechSupportAnalyzer()
+
+        # 常规命令输出的解析结果，巡检结束后做全网统计
+        self.fleet = FleetAnalytics()
+        self.parsed = ColumnStore()
+
+        # 巡检历史，用于跨多次巡检的趋势查询
+        self.history = RunHistory()
+
+        # 内容寻址存储，用于去重和与上次巡检比较
+        self.log_store = LogStore(self.log_dir)
+        if not self.log_store.config['enabled']:
+            self.log_store = None
+
+    @property
+    def success(self):
+        """成功设备IP列表"""
+        return self.results.successful()
+
+    @property
+    def fail(self):
+        """失败设备IP列表"""
+        return self.results.failed()
     
     def load_excel(self):
         """加载Excel文件"""
+        from openpyxl.reader.excel import load_workbook
         try:
             wb = load_workbook(self.device_file)
             return wb
         except FileNotFoundError:
-            print(f"Excel文件不存在: {self.device_file}")
+            logger.error(f"Excel文件不存在: {self.device_file}")
             return None
     
     def get_device_info(self):
@@ -56,38 +118,29 @@ class ALEInspection:
                 return
 
             ws1 = wb[wb.sheetnames[0]]
-            for row in ws1.iter_rows(min_row=2, max_col=9):
+            # 同一设备类型的命令列表只读取一次，所有设备共享
+            cmd_lists = CommandListCache(wb, self.get_cmd_info)
+            for row in ws1.iter_rows(min_row=2, max_col=10):
                 if str(row[1].value).strip() == '#':
                     continue
 
-                device_type = str(row[8].value) if row[8].value else ""
+                device = DeviceRecord.from_row(row)
 
                 # 获取命令列表，如果工作表不存在则返回空列表
-                cmd_list = []
-                if device_type:
+                if device.device_type:
                     try:
-                        sheet_name = device_type.lower().strip()
-                        if sheet_name in wb.sheetnames:
-                            cmd_list = self.get_cmd_info(wb[sheet_name])
+                        cmd_list = cmd_lists.get(device.device_type)
+                        if cmd_list is not None:
+                            device.cmd_list = cmd_list
                         else:
-                            print(f"警告: 设备类型 '{device_type}' 对应的工作表不存在，将使用空命令列表")
+                            logger.warning(f"设备类型 '{device.device_type}' 对应的工作表不存在，将使用空命令列表")
                     except Exception as e:
-                        print(f"获取设备 {row[2].value} 的命令列表失败: {e}")
-
-                info_dict = {
-                    'ip': row[2].value,
-                    'protocol': row[3].value,
-                    'port': row[4].value,
-                    'username': row[5].value,
-                    'password': row[6].value,
-                    'secret': row[7].value,
-                    'device_type': device_type,
-                    'cmd_list': cmd_list
-                }
-                yield info_dict
+                        logger.error(f"获取设备 {device.ip} 的命令列表失败: {e}")
+
+                yield device
 
         except Exception as e:
-            print(f"读取设备信息错误: {e}")
+            logger.error(f"读取设备信息错误: {e}")
     
     def get_cmd_info(self, cmd_sheet):
         """获取命令信息"""
@@ -102,80 +155,41 @@ class ALEInspection:
                     if cmd:  # 确保命令不为空
                         cmd_list.append(cmd)
 
-            print(f"从工作表 '{cmd_sheet.title}' 读取到 {len(cmd_list)} 个命令")
+            logger.debug(f"从工作表 '{cmd_sheet.title}' 读取到 {len(cmd_list)} 个命令")
             return cmd_list
 
         except Exception as e:
-            print(f"读取命令信息错误: {e}")
+            logger.error(f"读取命令信息错误: {e}")
             return []
 
-    def get_vendor_name(self, device_type):
-        """根据设备类型获取厂商名称"""
-        device_type = device_type.lower()
-
-        vendor_mapping = {
-            'cisco_ios': 'Cisco',
-            'cisco_xe': 'Cisco',
-            'cisco_xr': 'Cisco',
-            'cisco_nxos': 'Cisco',
-            'huawei': '华为',
-            'huawei_vrp': '华为',
-            'hp_comware': 'H3C',
-            'h3c_comware': 'H3C',
-            'ruijie_os': '锐捷',
-            'juniper': 'Juniper',
-            'juniper_junos': 'Juniper',
-            'arista_eos': 'Arista',
-            'fortinet': 'Fortinet',
-            'paloalto_panos': 'Palo Alto',
-            'dell_force10': 'Dell',
-            'extreme': 'Extreme',
-            'alcatel_aos': 'ALE',
-            'alcatel_sros': 'Nokia'
-        }
-
-        return vendor_mapping.get(device_type, device_type.upper())
-    
     def connect_device(self, host):
         """连接设备"""
+        # netmiko 导入较慢（约0.2秒），在第一次连接时才导入
+        from netmiko import ConnectHandler
         try:
-            if host['protocol'].lower().strip() == 'ssh':
-                host['port'] = host['port'] if (host['port'] not in [22, None]) else 22
-            elif host['protocol'].lower().strip() == 'telnet':
-                host['port'] = host['port'] if (host['port'] not in [23, None]) else 23
-                host['device_type'] = host['device_type'] + '_telnet'
-            
-            # 移除不需要的参数
-            connect_params = {
-                'device_type': host['device_type'],
-                'host': host['ip'],
-                'username': host['username'],
-                'password': host['password'],
-                'port': host['port']
-            }
-            
-            if host['secret']:
-                connect_params['secret'] = host['secret']
-            
-            if 'huawei' in host['device_type']:
-                connect_params['conn_timeout'] = 15
-            
-            connect = ConnectHandler(**connect_params)
+            with self.report.span(host.ip, 'connect') as span:
+                if self.pool:
+                    connect, span['reused'] = self.pool.acquire(host, lambda: ConnectHandler(**host.connection_params()))
+                else:
+                    connect = ConnectHandler(**host.connection_params())
             return connect
             
         except Exception as e:
-            print(f"连接设备失败 {host['ip']}: {e}")
-            self.fail.append(host['ip'])
+            logger.error(f"连接设备失败 {host.ip}: {e}")
+            self.results.fail(host.ip, e, phase='connect')
             return None
     
     def execute_ale_tech_support(self, connection, device_ip, username=None, password=None):
         """执行ALE设备的tech-support命令并下载日志文件"""
         try:
-            print(f"开始执行ALE设备 {device_ip} 的tech-support命令...")
+            logger.debug(f"开始执行ALE设备 {device_ip} 的tech-support命令...")
 
             # 执行tech-support命令
-            output = connection.send_command("show tech-support", delay_factor=2)
-            print(f"tech-support命令执行完成: {device_ip}")
+            with self.report.span(device_ip, 'tech_support'):
+                with self.watchdog.guard(device_ip, 'tech_support') as guard:
+                    guard.add_cancel(lambda: close_connection(connection))
+                    output = connection.send_command("show tech-support", delay_factor=2)
+            logger.debug(f"tech-support命令执行完成: {device_ip}")
 
             # 获取配置信息
             if CONFIG_AVAILABLE:
@@ -185,71 +199,126 @@ class ALEInspection:
                 # 获取设备认证信息
                 download_username, download_password = get_device_credentials(device_ip, username, password)
             else:
-                wait_time = 10
+                wait_time = self.downloads.config['tech_support_wait']
                 log_files = ["tech_support_layer3.log", "tech_support_layer2.log", "tech_support.log"]
                 download_username, download_password = username, password
 
             # 等待文件生成
-            print(f"等待日志文件生成: {wait_time}秒")
-            time.sleep(wait_time)
+            logger.debug(f"等待日志文件生成: {wait_time}秒")
+            with self.report.span(device_ip, 'wait'):
+                time.sleep(wait_time)
 
-            print(f"使用认证信息下载文件: 用户={download_username}")
+            logger.debug(f"使用认证信息下载文件: 用户={download_username}")
 
             # 下载日志文件
             downloaded_files = []
             for log_file in log_files:
-                if self.download_file_via_tftp(device_ip, log_file, download_username, download_password):
+                if self.download_file_via_tftp(device_ip, log_file, download_username, download_password, connection):
                     downloaded_files.append(log_file)
             
             if downloaded_files:
-                print(f"成功下载 {device_ip} 的日志文件: {downloaded_files}")
+                logger.info(f"成功下载 {device_ip} 的日志文件: {downloaded_files}")
+                device_log_dir = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}")
+                self.analyzer.submit(device_ip, [os.path.join(device_log_dir, f"{device_ip}_{log_file}")
+                                                 for log_file in downloaded_files])
                 return True
             else:
-                print(f"未能下载 {device_ip} 的任何日志文件")
+                logger.warning(f"未能下载 {device_ip} 的任何日志文件")
                 return False
-                
+
+        except WatchdogTimeout:
+            # 会话已被关闭，由设备巡检记录超时失败
+            raise
         except Exception as e:
-            print(f"执行tech-support失败 {device_ip}: {e}")
+            logger.error(f"执行tech-support失败 {device_ip}: {e}")
             return False
     
-    def download_file_via_tftp(self, device_ip, filename, username=None, password=None):
-        """尝试多种方式下载文件"""
-        print(f"开始下载文件: {device_ip}:{filename}")
-
-        # 方式1: 尝试FTP下载（首选）
-        print("尝试方式1: FTP下载")
-        if self.download_file_via_ftp(device_ip, filename, username, password):
-            return True
-
-        # 方式2: 尝试TFTP下载（如果有TFTP客户端）
-        print("尝试方式2: TFTP下载")
-        try:
-            from tftp_downloader import TFTPClient
-            tftp_client = TFTPClient(device_ip)
+    def download_file_via_tftp(self, device_ip, filename, username=None, password=None, connection=None):
+        """下载文件，优先使用该设备上次成功的方式（SFTP/SCP/FTP/TFTP）"""
+        logger.debug(f"开始下载文件: {device_ip}:{filename}")
 
-            device_log_dir = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}")
-            if not os.path.exists(device_log_dir):
-                os.makedirs(device_log_dir)
+        device_log_dir = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}")
+        if not os.path.exists(device_log_dir):
+            os.makedirs(device_log_dir)
 
-            local_filename = f"{device_ip}_{filename}"
-            local_path = os.path.join(device_log_dir, local_filename)
+        # 本地文件名包含设备IP
+        local_path = os.path.join(device_log_dir, f"{device_ip}_{filename}")
 
-            if tftp_client.download_file(filename, local_path):
-                print(f"✓ TFTP下载成功: {local_path}")
-                return True
+        fetchers = {
+            'ftp': lambda path, token: self.download_file_via_ftp(device_ip, filename, username, password, path, token),
+            'tftp': lambda path, token: self.fetch_via_tftp(device_ip, filename, path, token),
+        }
 
-        except Exception as e:
-            print(f"✗ TFTP下载失败: {e}")
+        # SSH连接可用时，SFTP/SCP复用该连接，不需要重新认证
+        transport = get_transport(connection) if connection else None
+        if transport:
+            fetchers['sftp'] = lambda path, token: self.fetch_via_ssh('sftp', transport, device_ip, filename, path, token)
+            fetchers['scp'] = lambda path, token: self.fetch_via_ssh('scp', transport, device_ip, filename, path, token)
+
+        # 已超过巡检截止时间，只尝试首选方式
+        limit = None
+        if self.scheduler.past_deadline():
+            logger.warning(f"! 已超过巡检截止时间，只尝试首选下载方式: {filename}")
+            limit = 1
+
+        method = self.downloads.download(device_ip, local_path, fetchers, limit=limit)
+        if method:
+            logger.info(f"✓ {method.upper()}下载成功: {local_path}")
+            self.track_file(device_ip, local_path)
+            return True
 
         # 所有方式都失败，创建备用记录
-        print(f"所有下载方式都失败，创建备用记录: {filename}")
+        logger.error(f"所有下载方式都失败，创建备用记录: {filename}")
         self.create_backup_record(device_ip, filename, "所有下载方式(FTP/TFTP)都失败")
         return False
+
+    def fetch_via_ssh(self, protocol, transport, device_ip, filename, local_path, token):
+        """复用SSH连接通过SFTP或SCP下载文件，失败时抛出异常"""
+        with self.report.span(device_ip, protocol, file=filename) as span, \
+                self.watchdog.guard(device_ip, protocol) as guard:
+            def on_open(client):
+                # 只关闭文件传输通道，不影响巡检的SSH会话
+                guard.add_cancel(client.close)
+                token.add(client.close)
+
+            try:
+                if protocol == 'sftp':
+                    span['bytes'] = sftp_download(transport, filename, local_path, self.downloads.config,
+                                                  on_data=self.scheduler.throttle, on_open=on_open)
+                else:
+                    span['bytes'] = scp_download(transport, filename, local_path, self.downloads.config,
+                                                 on_data=self.scheduler.throttle, on_open=on_open,
+                                                 socket_timeout=self.watchdog.config['io'] or None)
+            except Exception as e:
+                if token.cancelled:
+                    raise DownloadCancelled(filename)
+                if is_missing_error(e):
+                    raise FileMissing(f"{protocol.upper()}: 文件不存在 {filename}")
+                raise
+
+    def fetch_via_tftp(self, device_ip, filename, local_path, token):
+        """通过TFTP下载文件到指定路径，失败时抛出异常"""
+        from tftp_downloader import TFTPClient
+        tftp_client = TFTPClient(device_ip, self.downloads.config['tftp_port'], throttle=self.scheduler.throttle)
+
+        with self.report.span(device_ip, 'tftp', file=filename) as span, \
+                self.watchdog.guard(device_ip, 'tftp') as guard:
+            cancel = lambda: shutdown_socket(tftp_client.socket)
+            guard.add_cancel(cancel)
+            token.add(cancel)
+            ok = tftp_client.download_file(filename, local_path)
+            if token.cancelled:
+                raise DownloadCancelled(filename)
+            if not ok:
+                if tftp_client.error_code == 1:
+                    raise FileMissing(f"TFTP: 文件不存在 {filename}")
+                raise ConnectionError(f"TFTP下载失败: {filename}")
+            span['bytes'] = os.path.getsize(local_path)
     
     def download_file_via_netmiko(self, connection, device_ip, filename):
         """通过netmiko连接下载文件（使用设备命令）"""
         try:
-            print(f"尝试通过设备命令获取文件内容: {device_ip}:{filename}")
+            logger.debug(f"尝试通过设备命令获取文件内容: {device_ip}:{filename}")
 
             # 创建设备专用目录
             device_log_dir = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}")
@@ -273,7 +342,7 @@ class ALEInspection:
 
             for cmd in file_commands:
                 try:
-                    print(f"  尝试命令: {cmd}")
+                    logger.debug(f"  尝试命令: {cmd}")
                     output = connection.send_command(cmd, delay_factor=2)
 
                     # 检查输出是否包含有效内容
@@ -283,7 +352,7 @@ class ALEInspection:
                         break
 
                 except Exception as e:
-                    print(f"  命令失败: {cmd} - {e}")
+                    logger.debug(f"  命令失败: {cmd} - {e}")
                     continue
 
             if file_content:
@@ -297,49 +366,99 @@ class ALEInspection:
                     f.write("# " + "=" * 50 + "\n\n")
                     f.write(file_content)
 
-                print(f"✓ 文件内容获取成功: {local_path}")
+                logger.info(f"✓ 文件内容获取成功: {local_path}")
                 return True
             else:
-                print(f"✗ 无法获取文件内容: {filename}")
+                logger.error(f"✗ 无法获取文件内容: {filename}")
                 return False
 
         except Exception as e:
-            print(f"✗ 文件获取失败 {device_ip}/{filename}: {e}")
+            logger.error(f"✗ 文件获取失败 {device_ip}/{filename}: {e}")
             return False
 
 
 
-    def download_file_via_ftp(self, device_ip, filename, username=None, password=None):
-        """通过FTP下载文件（首选方案）"""
+    def download_file_via_ftp(self, device_ip, filename, username=None, password=None, local_path=None, token=None):
+        """通过FTP下载文件到指定路径，失败时抛出异常"""
+        # 使用传入的认证信息
+        ftp_server = device_ip
+        ftp_user = username if username else "admin"
+        ftp_password = password if password else "password"
+
+        logger.debug(f"尝试FTP连接: {ftp_server} (用户: {ftp_user})")
+
+        with self.report.span(device_ip, 'ftp', file=filename) as span, \
+                self.watchdog.guard(device_ip, 'ftp') as guard:
+            try:
+                with ftplib.FTP(timeout=self.watchdog.config['io'] or None) as ftp:
+                    cancel = lambda: shutdown_socket(ftp.sock)
+                    guard.add_cancel(cancel)
+                    if token:
+                        token.add(cancel)
+                    ftp.connect(ftp_server, self.downloads.config['ftp_port'])
+                    ftp.login(ftp_user, ftp_password)
+                    ftp.voidcmd('TYPE I')
+                    remote_size, remote_mtime = self.ftp_file_info(ftp, filename)
+                    with PartialFile(local_path, remote_size, remote_mtime) as part:
+                        data_conn = self.ftp_open_transfer(ftp, filename, part)
+                        with data_conn:
+                            # 超时或取消时关闭数据连接，使阻塞的recv立即返回
+                            cancel_data = lambda: shutdown_socket(data_conn)
+                            guard.add_cancel(cancel_data)
+                            if token:
+                                token.add(cancel_data)
+                            self.receiver.receive(data_conn, part, on_data=self.scheduler.throttle)
+                        ftp.voidresp()
+                        part.commit()
+                        span['bytes'] = part.received
+            except Exception as e:
+                if token and token.cancelled:
+                    raise DownloadCancelled(filename)
+                if isinstance(e, ftplib.error_perm) and str(e).startswith('550'):
+                    raise FileMissing(f"FTP: {e}")
+                raise
+
+    def ftp_file_info(self, ftp, filename):
+        """获取远端文件大小和修改时间，用于断点续传；不支持时返回None"""
         try:
-            # 使用传入的认证信息
-            ftp_server = device_ip
-            ftp_user = username if username else "admin"
-            ftp_password = password if password else "password"
-
-            print(f"尝试FTP连接: {ftp_server} (用户: {ftp_user})")
-
-            # 创建设备专用目录
-            device_log_dir = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}")
-            if not os.path.exists(device_log_dir):
-                os.makedirs(device_log_dir)
-
-            # 本地文件名包含设备IP
-            local_filename = f"{device_ip}_{filename}"
-            local_path = os.path.join(device_log_dir, local_filename)
-
-            # 尝试FTP下载
-            with ftplib.FTP(ftp_server) as ftp:
-                ftp.login(ftp_user, ftp_password)
-                with open(local_path, 'wb') as local_file:
-                    ftp.retrbinary(f'RETR {filename}', local_file.write)
-
-            print(f"✓ FTP下载成功: {local_path}")
+            size = ftp.size(filename)
+        except ftplib.error_perm as e:
+            if str(e).startswith('550'):
+                raise
+            return None, None
+        try:
+            mtime = ftp.voidcmd(f'MDTM {filename}')[4:].strip()
+        except ftplib.error_perm:
+            mtime = None
+        return size, mtime
+
+    def ftp_open_transfer(self, ftp, filename, part):
+        """打开RETR数据连接，有已下载部分时使用REST从断点继续"""
+        if not part.offset:
+            return ftp.transfercmd(f'RETR {filename}')
+        try:
+            data_conn = ftp.transfercmd(f'RETR {filename}', rest=part.offset)
+            logger.info(f"FTP续传 {filename}: 从 {part.offset} 字节开始")
+            return data_conn
+        except ftplib.error_perm as e:
+            if str(e).startswith('550'):
+                raise
+            logger.warning(f"! 设备不支持FTP续传，重新下载: {filename}")
+            part.restart()
+            return ftp.transfercmd(f'RETR {filename}')
+
+    def track_file(self, device_ip, file_path):
+        """将下载的文件加入内容存储，并与上次巡检结果比较"""
+        if not self.log_store:
             return True
-
+        try:
+            changed = self.log_store.add_file(device_ip, file_path)
+            if not changed:
+                logger.debug(f"= 内容与上次相同: {os.path.basename(file_path)}")
+            return changed
         except Exception as e:
-            print(f"✗ FTP下载失败 {device_ip}/{filename}: {e}")
-            return False
+            logger.error(f"内容存储失败 {file_path}: {e}")
+            return True
 
     def create_backup_record(self, device_ip, filename, error_msg):
         """创建备用记录文件"""
@@ -364,11 +483,12 @@ class ALEInspection:
                 f.write("5. 检查网络连接和防火墙设置\n")
                 f.write("6. 确认FTP端口21是否开放\n")
 
-            print(f"创建备用记录: {backup_file}")
+            logger.info(f"创建备用记录: {backup_file}")
+            self.track_file(device_ip, backup_file)
             return True
 
         except Exception as e:
-            print(f"创建备用记录失败: {e}")
+            logger.error(f"创建备用记录失败: {e}")
             return False
     
     def execute_regular_commands(self, connection, device_ip, cmd_list, device_type):
@@ -378,9 +498,13 @@ class ALEInspection:
             if not os.path.exists(device_log_dir):
                 os.makedirs(device_log_dir)
 
-            print(f"开始执行 {len(cmd_list)} 个命令: {device_ip}")
+            logger.info(f"开始执行 {len(cmd_list)} 个命令: {device_ip}")
+            profile = get_profile(device_type)
+            vendor = profile.vendor
             successful_commands = 0
             failed_commands = 0
+            skipped_commands = 0
+            command_diffs = []
 
             # 创建统一的命令输出文件
             output_filename = f"{device_ip}_{device_type}_commands_output.txt"
@@ -395,9 +519,20 @@ class ALEInspection:
                 output_file.write("=" * 80 + "\n\n")
 
                 for i, cmd in enumerate(cmd_list, 1):
+                    # 已超过巡检截止时间，剩余命令不再执行
+                    if self.scheduler.past_deadline():
+                        skipped_commands = len(cmd_list) - i + 1
+                        logger.warning(f"! 已超过巡检截止时间，跳过剩余 {skipped_commands} 个命令: {device_ip}")
+                        output_file.write(f"已超过巡检截止时间，跳过剩余 {skipped_commands} 个命令\n")
+                        output_file.write("=" * 80 + "\n\n")
+                        break
+
                     try:
-                        print(f"  [{i}/{len(cmd_list)}] 执行命令: {cmd}")
-                        command_output = connection.send_command(cmd, delay_factor=2)
+                        logger.debug(f"  [{i}/{len(cmd_list)}] 执行命令: {cmd}")
+                        with self.report.span(device_ip, 'command', command=cmd), \
+                                self.watchdog.guard(device_ip, 'command') as guard:
+                            guard.add_cancel(lambda: close_connection(connection))
+                            command_output = connection.send_command(cmd, delay_factor=profile.delay_factor)
 
                         # 写入命令和输出到统一文件
                         output_file.write(f"[命令 {i}] {cmd}\n")
@@ -405,11 +540,23 @@ class ALEInspection:
                         output_file.write(command_output)
                         output_file.write("\n" + "=" * 80 + "\n\n")
 
-                        print(f"  ✓ 命令完成: {cmd}")
+                        if self.fleet.enabled:
+                            self.parsed.parse(device_ip, vendor, device_type, cmd, command_output)
+
+                        # 按命令记录内容摘要，变化的命令生成差异
+                        if self.log_store:
+                            key = f"{device_type}:{cmd}"
+                            if self.log_store.add_text(device_ip, key, command_output):
+                                command_diffs.append((cmd, key, command_output))
+
+                        logger.debug(f"  ✓ 命令完成: {cmd}")
                         successful_commands += 1
 
+                    except WatchdogTimeout:
+                        # 会话已被关闭，剩余命令无法执行
+                        raise
                     except Exception as e:
-                        print(f"  ✗ 命令失败: {cmd} - {e}")
+                        logger.warning(f"  ✗ 命令失败: {cmd} - {e}")
                         failed_commands += 1
 
                         # 写入错误信息到统一文件
@@ -422,89 +569,180 @@ class ALEInspection:
                 output_file.write(f"\n执行汇总:\n")
                 output_file.write(f"成功命令: {successful_commands}\n")
                 output_file.write(f"失败命令: {failed_commands}\n")
+                if skipped_commands:
+                    output_file.write(f"跳过命令: {skipped_commands}\n")
                 output_file.write(f"完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
-            print(f"命令执行汇总 {device_ip}: 成功 {successful_commands}, 失败 {failed_commands}")
-            print(f"所有命令输出已保存到: {output_filename}")
+            logger.info(f"命令执行汇总 {device_ip}: 成功 {successful_commands}, 失败 {failed_commands}"
+                        + (f", 跳过 {skipped_commands}" if skipped_commands else ""))
+            logger.info(f"所有命令输出已保存到: {output_filename}")
+
+            if self.log_store:
+                self.write_command_diffs(device_ip, device_type, output_file_path, command_diffs,
+                                         failed_commands + skipped_commands)
+
             return successful_commands > 0
 
+        except WatchdogTimeout:
+            raise
         except Exception as e:
-            print(f"执行命令列表失败 {device_ip}: {e}")
+            logger.error(f"执行命令列表失败 {device_ip}: {e}")
             return False
     
+    def write_command_diffs(self, device_ip, device_type, output_file_path, command_diffs, failed_commands):
+        """生成命令输出与上次巡检的差异文件"""
+        if not command_diffs and not failed_commands:
+            # 所有命令输出都未变化，不放入邮件附件
+            self.log_store.mark_unchanged(output_file_path)
+            logger.info(f"= {device_ip} 所有命令输出与上次相同")
+            return
+
+        if not self.log_store.config['diff_enabled']:
+            return
+
+        diff_parts = []
+        for cmd, key, command_output in command_diffs:
+            if self.log_store.previous_digest(device_ip, key):
+                diff_parts.append(self.log_store.diff_text(device_ip, key, command_output, label=cmd))
+            else:
+                diff_parts.append(f"+++ 新增命令: {cmd}\n")
+
+        if diff_parts:
+            diff_path = os.path.join(os.path.dirname(output_file_path), f"{device_ip}_{device_type}_commands.diff")
+            with open(diff_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(diff_parts))
+            logger.info(f"{device_ip} 有 {len(command_diffs)} 个命令输出发生变化: {os.path.basename(diff_path)}")
+
+    def skip_device(self, host):
+        """超过巡检截止时间后未开始的设备，记录为失败"""
+        logger.warning(f"! 已超过巡检截止时间，跳过设备: {host.ip}")
+        self.results.fail(host.ip, "超过巡检截止时间，未开始巡检", phase='deadline')
+        self.report.record(host.ip, 'device', 0.0, ok=False, error='DeadlineExceeded')
+
     def inspect_device(self, host):
+        """巡检单个设备，该线程的日志都带上设备IP"""
+        with device_context(host.ip):
+            self._inspect_device(host)
+
+    def _inspect_device(self, host):
         """巡检单个设备"""
-        device_ip = host['ip']
-        device_type = host['device_type'].lower()
-        
-        print(f"开始巡检设备: {device_ip} ({device_type})")
-        
-        # 连接设备
-        connection = self.connect_device(host)
-        if not connection:
-            return
+        device_ip = host.ip
+        device_type = host.device_type.lower()
         
+        logger.info(f"开始巡检设备: {device_ip} ({device_type})")
+        device_start = time.perf_counter()
+        self.metrics.device_started()
+        self.results.start(device_ip)
+
+        connection = None
+        device_ok = False
+        device_error = None
         try:
-            # 判断设备类型并执行相应操作
-            if 'alcatel' in device_type or 'ale' in device_type:
-                # ALE设备：只执行tech-support和下载日志
-                print(f"检测到ALE设备: {device_ip} - 执行tech-support流程")
+            with self.watchdog.guard(device_ip, 'device') as guard:
+                # 连接设备
+                self.results.set_phase(device_ip, 'connect')
+                connection = self.connect_device(host)
+                if not connection:
+                    device_error = 'ConnectError'
+                    return
+                guard.add_cancel(lambda: close_connection(connection))
+                self._run_device_tasks(host, connection, device_type)
 
-                tech_support_success = self.execute_ale_tech_support(
-                    connection, device_ip, host['username'], host['password']
-                )
+            # 记录成功
+            self.results.succeed(device_ip)
+            device_ok = True
+            logger.info(f"设备处理完成: {device_ip}")
+
+        except Exception as e:
+            logger.error(f"设备处理失败: {device_ip} - {e}")
+            self.results.fail(device_ip, e)
+            device_error = type(e).__name__
 
-                if tech_support_success:
-                    print(f"✓ ALE设备 {device_ip} tech-support流程完成")
+        finally:
+            if connection:
+                if self.pool:
+                    # 成功的会话放回连接池，失败或超时的直接关闭
+                    self.pool.release(host, connection, reusable=device_ok)
                 else:
-                    print(f"✗ ALE设备 {device_ip} tech-support流程失败")
+                    try:
+                        connection.disconnect()
+                    except Exception:
+                        pass
+            self.report.record(device_ip, 'device', time.perf_counter() - device_start, ok=device_ok, error=device_error)
+            self.metrics.device_finished(device_ok)
+
+    def _run_device_tasks(self, host, connection, device_type):
+        """按设备类型执行tech-support流程或命令列表"""
+        device_ip = host.ip
+        # 判断设备类型并执行相应操作
+        if get_profile(device_type).is_ale:
+            # ALE设备：只执行tech-support和下载日志
+            logger.debug(f"检测到ALE设备: {device_ip} - 执行tech-support流程")
+            self.results.set_phase(device_ip, 'tech_support')
+
+            tech_support_success = self.execute_ale_tech_support(
+                connection, device_ip, host.username, host.password
+            )
 
+            if tech_support_success:
+                logger.info(f"✓ ALE设备 {device_ip} tech-support流程完成")
             else:
-                # 其他厂商设备：执行对应命令列表
-                print(f"检测到{device_type}设备: {device_ip} - 执行命令列表")
-
-                if host['cmd_list']:
-                    regular_success = self.execute_regular_commands(connection, device_ip, host['cmd_list'], device_type)
-                    if regular_success:
-                        print(f"✓ 设备 {device_ip} 命令执行完成")
-                    else:
-                        print(f"✗ 设备 {device_ip} 命令执行失败")
+                logger.error(f"✗ ALE设备 {device_ip} tech-support流程失败")
+
+        else:
+            # 其他厂商设备：执行对应命令列表
+            logger.debug(f"检测到{device_type}设备: {device_ip} - 执行命令列表")
+            self.results.set_phase(device_ip, 'command')
+
+            if host.cmd_list:
+                regular_success = self.execute_regular_commands(connection, device_ip, host.cmd_list, device_type)
+                if regular_success:
+                    logger.info(f"✓ 设备 {device_ip} 命令执行完成")
                 else:
-                    print(f"! 设备 {device_ip} 没有配置命令列表")
+                    logger.error(f"✗ 设备 {device_ip} 命令执行失败")
+            else:
+                logger.warning(f"! 设备 {device_ip} 没有配置命令列表")
 
-            # 记录成功
-            self.success.append(device_ip)
-            print(f"设备处理完成: {device_ip}")
+    def on_timeout(self, guard):
+        """看门狗超时回调: 设备总时长超时立即记录失败，不等待线程返回"""
+        if guard.phase == 'device':
+            self.results.fail(guard.device_ip, guard.error())
 
-        except Exception as e:
-            print(f"设备处理失败: {device_ip} - {e}")
-            self.fail.append(device_ip)
-            
-        finally:
-            connection.disconnect()
+    def on_abandon(self, guard):
+        """看门狗回调: 会话关闭后线程仍未退出，释放它的工作线程名额"""
+        self.scheduler.abandon(guard.device_ip)
     
-    def run_inspection(self):
-        """运行完整运维流程"""
-        print("=" * 60)
-        print("开始网络设备运维")
-        print(f"时间: {self.logtime}")
-        print("=" * 60)
+    def run_inspection(self, devices=None, notify=True):
+        """运行完整运维流程
+
+        Args:
+            devices: 要巡检的设备记录，None表示读取设备清单中的全部设备
+            notify: 是否发送邮件
+        """
+        logger.info("=" * 60)
+        logger.info("开始网络设备运维")
+        logger.info(f"时间: {self.logtime}")
+        logger.info("=" * 60)
 
         start_time = datetime.now()
 
         # 获取设备列表并执行运维
-        devices = list(self.get_device_info())
+        if devices is None:
+            devices = list(self.get_device_info())
         if not devices:
-            print("没有找到设备配置")
+            logger.info("没有找到设备配置")
             return
 
+        # 巡检期间提供指标接口
+        self.metrics.start_http()
+
         # 统计设备类型
         ale_devices = []
         other_devices = []
 
         for device in devices:
-            device_type = device['device_type'].lower()
-            if 'alcatel' in device_type or 'ale' in device_type:
+            self.results.register(device.ip, device.device_type)
+            if get_profile(device.device_type).is_ale:
                 ale_devices.append(device)
             else:
                 other_devices.append(device)
@@ -512,92 +750,240 @@ class ALEInspection:
         # 统计各厂商设备数量
         vendor_count = {}
         for device in other_devices:
-            vendor = self.get_vendor_name(device['device_type'])
+            vendor = get_profile(device.device_type).vendor
             vendor_count[vendor] = vendor_count.get(vendor, 0) + 1
 
-        print(f"发现 {len(devices)} 个设备:")
-        print(f"  - ALE设备: {len(ale_devices)} 个 (执行tech-support流程)")
+        logger.info(f"发现 {len(devices)} 个设备:")
+        logger.info(f"  - ALE设备: {len(ale_devices)} 个 (执行tech-support流程)")
         for vendor, count in vendor_count.items():
-            print(f"  - {vendor}设备: {count} 个 (执行命令列表)")
-        print()
-
-        # 并发执行运维
+            logger.info(f"  - {vendor}设备: {count} 个 (执行命令列表)")
+        logger.info("")
+
+        # 按历史耗时从长到短安排巡检顺序，避免慢设备最后才开始
+        history = load_history(self.log_dir, self.scheduler.config['history_runs'])
+        if history:
+            self.scheduler.set_estimates(history)
+            logger.info(f"按历史耗时排序: {sum(1 for d in devices if d.ip in history)}/{len(devices)} 个设备有耗时记录")
+        if self.scheduler.config['deadline']:
+            logger.info(f"巡检截止时间: {self.scheduler.config['deadline']} 分钟")
+
+        # 按站点轮流分配工作线程并发执行运维
         for host in devices:
-            self.pool.apply_async(self.inspect_device, args=(host,))
+            self.scheduler.submit(host)
+
+        self.scheduler.run(self.inspect_device, on_skip=self.skip_device)
+
+        # 等待tech-support日志分析完成，健康摘要随设备输出一起压缩
+        self.collect_health()
+        self.run_fleet_analytics()
 
-        self.pool.close()
-        self.pool.join()
-        
         end_time = datetime.now()
         
         # 打印结果
-        print("\n" + "=" * 60)
-        print("运维任务完成")
-        print("=" * 60)
-        print(f"总设备数: {len(devices)}")
-        print(f"  - ALE设备: {len(ale_devices)} 个")
-        print(f"  - 其他设备: {len(other_devices)} 个")
-        print(f"成功设备: {len(self.success)}")
-        print(f"失败设备: {len(self.fail)}")
-        print(f"耗时: {(end_time - start_time).total_seconds():.2f}秒")
-
-        if self.success:
-            print("\n✓ 成功设备:")
-            for device in self.success:
+        logger.info("\n" + "=" * 60)
+        logger.info("运维任务完成")
+        logger.info("=" * 60)
+        logger.info(f"总设备数: {len(devices)}")
+        logger.info(f"  - ALE设备: {len(ale_devices)} 个")
+        logger.info(f"  - 其他设备: {len(other_devices)} 个")
+        success = self.success
+        fail = self.fail
+        logger.info(f"成功设备: {len(success)}")
+        logger.info(f"失败设备: {len(fail)}")
+        logger.info(f"耗时: {(end_time - start_time).total_seconds():.2f}秒")
+
+        if success:
+            logger.info("\n✓ 成功设备:")
+            for device in success:
                 # 判断设备类型
-                device_info = next((d for d in devices if d['ip'] == device), None)
-                if device_info:
-                    device_type = device_info['device_type'].lower()
-                    if 'alcatel' in device_type or 'ale' in device_type:
-                        print(f"  ✓ {device} (ALE - tech-support)")
-                    else:
-                        vendor_name = self.get_vendor_name(device_type)
-                        print(f"  ✓ {device} ({vendor_name} - 命令列表)")
+                device_type = self.results.device_type(device)
+                if not device_type:
+                    logger.info(f"  ✓ {device}")
+                elif get_profile(device_type).is_ale:
+                    logger.info(f"  ✓ {device} (ALE - tech-support)")
                 else:
-                    print(f"  ✓ {device}")
-
-        if self.fail:
-            print("\n✗ 失败设备:")
-            for device in self.fail:
-                print(f"  ✗ {device}")
+                    logger.info(f"  ✓ {device} ({get_profile(device_type).vendor} - 命令列表)")
+
+        if fail:
+            logger.info("\n✗ 失败设备:")
+            for device in fail:
+                entry = self.results.get(device)
+                reason = f" [{entry['phase']}] {entry['error']}" if entry and entry['error'] else ""
+                logger.info(f"  ✗ {device}{reason}")
+
+            logger.info("\n失败原因统计:")
+            for reason, count in sorted(self.results.failure_reasons().items(), key=lambda item: item[1], reverse=True):
+                logger.info(f"  ! {reason}: {count} 个设备")
+
+        # 保存各设备的下载方式，下次优先使用
+        self.downloads.save()
+
+        # 保存内容索引，作为下次比较的基准
+        if self.log_store:
+            try:
+                self.log_store.save(self.logtime)
+            except Exception as e:
+                logger.error(f"保存内容索引失败: {e}")
+
+        # 清理历史巡检目录和压缩包，不涉及本次巡检的文件
+        retention = RetentionManager(self.log_dir, self.log_store, current_logtime=self.logtime, report=self.report)
+        if retention.config['enabled']:
+            if retention.config['background']:
+                retention.start_background()
+            else:
+                retention.run()
 
         # 压缩LOG文件夹
-        self.compress_and_email(devices)
+        self.compress_and_email(devices, notify)
+
+        retention.wait()
+
+        # 输出各阶段耗时统计并保存报告
+        self.report.print_summary()
+        try:
+            self.report.write(self.log_dir)
+        except Exception as e:
+            logger.error(f"保存耗时报告失败: {e}")
+        try:
+            self.html_report.write(self.log_dir)
+        except Exception as e:
+            logger.error(f"保存HTML报告失败: {e}")
+        self.record_history()
+
+        # 导出本次巡检指标
+        self.metrics.finish_run()
+        self.metrics.write_textfile()
+        self.metrics.stop_http()
     
-    def compress_and_email(self, devices):
-        """为每个设备单独压缩并发送邮件"""
+    def record_history(self):
+        """把本次巡检追加到巡检历史数据库"""
+        if not self.history.config['enabled']:
+            return
+        try:
+            metrics = self.fleet.device_metrics() if self.fleet.frames else None
+            count = self.history.record_run(self.report.to_dict(), self.results.snapshot(), metrics)
+            pruned = self.history.prune()
+            logger.info(f"巡检历史: 记录 {count} 台设备" + (f"，清理 {pruned} 次过期巡检" if pruned else ""))
+        except Exception as e:
+            logger.error(f"记录巡检历史失败: {e}")
+        finally:
+            self.history.close()
+
+    def collect_health(self):
+        """收集tech-support日志分析结果，写入各设备目录和巡检报告"""
+        if not self.analyzer.enabled:
+            return
+        summaries = self.analyzer.collect()
+        if not summaries:
+            return
+
+        status_count = {}
+        for device_ip, summary in summaries.items():
+            status_count[summary['status']] = status_count.get(summary['status'], 0) + 1
+            self.report.record(device_ip, 'analyze', summary['duration'], ok=not summary['error'],
+                               error='AnalyzeError' if summary['error'] else None, bytes=summary['bytes'])
+
+            summary_path = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}", f"{device_ip}_health_summary.txt")
+            try:
+                with open(summary_path, 'w', encoding='utf-8') as f:
+                    f.write(format_summary(summary))
+                self.track_file(device_ip, summary_path)
+            except Exception as e:
+                logger.error(f"保存健康摘要失败 {device_ip}: {e}")
+
+        self.report.add_section('health', summaries)
+
+        logger.info(f"\n设备健康检查: 正常 {status_count.get('ok', 0)}, "
+                    f"警告 {status_count.get('warning', 0)}, 严重 {status_count.get('critical', 0)}")
+        for device_ip, summary in summaries.items():
+            if summary['issues']:
+                marker = '✗' if summary['status'] == 'critical' else '!'
+                logger.info(f"  {marker} {device_ip}: {'; '.join(summary['issues'])}")
+
+    def run_fleet_analytics(self):
+        """对解析出的常规命令输出做全网统计，结果写入巡检报告"""
+        if not self.fleet.enabled:
+            return
+        try:
+            with self.report.span(None, 'fleet'):
+                results = self.fleet.run(self.parsed)
+            if not results:
+                return
+            self.report.add_section('fleet', results)
+            paths = self.fleet.write_tables(self.log_dir, self.logtime)
+        except Exception as e:
+            logger.error(f"全网统计分析失败: {e}")
+            return
+
+        logger.info("\n全网统计:")
+        errors = results.get('interface_errors')
+        if errors:
+            logger.info(f"  接口: {errors['interfaces']} 个，错误率异常 {errors['outlier_count']} 个")
+            for item in errors['outliers'][:5]:
+                rate = f"{item['error_rate']:.4%}" if item['error_rate'] is not None else f"{item['errors']:.0f} 个错误"
+                logger.info(f"    ! {item['device']} {item['interface']}: {rate}")
+        compliance = results.get('version_compliance')
+        if compliance and compliance['devices']:
+            logger.info(f"  版本: {compliance['devices']} 台设备，不合规 {compliance['noncompliant_count']} 台")
+            for item in compliance['noncompliant'][:5]:
+                logger.info(f"    ! {item['device']} {item['model']}: {item['version']} (基准 {item['expected']})")
+        uptime = results.get('uptime')
+        if uptime and uptime['devices']:
+            logger.info(f"  运行时间(天): P10 {uptime['days_p10']}, P50 {uptime['days_p50']}, P90 {uptime['days_p90']}，"
+                        f"刚重启 {len(uptime['recently_rebooted'])} 台，长期未重启 {len(uptime['long_uptime'])} 台")
+        logger.debug(f"解析结果已保存: {', '.join(os.path.basename(path) for path in paths)}")
+
+    def compress_and_email(self, devices, notify=True):
+        """为每个设备单独压缩并发送邮件（notify为False时只压缩）"""
         try:
             import zipfile
 
-            print(f"\n开始为每个设备创建压缩包...")
+            logger.info(f"\n开始为每个设备创建压缩包...")
             zip_files = []
 
+            unchanged_devices = []
+
             # 为每个成功的设备创建单独的压缩包
             for device_ip in self.success:
                 device_dir = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}")
 
                 if os.path.exists(device_dir):
+                    # 未变化的输出不放入压缩包
+                    changed_files = []
+                    for root, _, files in os.walk(device_dir):
+                        for file in files:
+                            file_path = os.path.join(root, file)
+                            if self.log_store and self.log_store.is_unchanged(file_path):
+                                continue
+                            changed_files.append(file_path)
+
+                    if not changed_files:
+                        unchanged_devices.append(device_ip)
+                        logger.info(f"= {device_ip} 输出与上次相同，跳过压缩")
+                        continue
+
                     # 创建设备专用压缩包
                     zip_filename = os.path.join(self.log_dir, f"{device_ip}_{self.logtime}.zip")
 
                     try:
-                        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                            # 遍历设备目录中的所有文件
-                            for root, _, files in os.walk(device_dir):
-                                for file in files:
-                                    file_path = os.path.join(root, file)
+                        with self.report.span(device_ip, 'compress') as span:
+                            with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                                for file_path in changed_files:
                                     # 在压缩包中保持相对路径
                                     arcname = os.path.relpath(file_path, self.log_dir)
                                     zipf.write(file_path, arcname)
+                            span['bytes'] = sum(os.path.getsize(f) for f in changed_files)
+                            span['zip_bytes'] = os.path.getsize(zip_filename)
+                        self.html_report.add_attachment(zip_filename, span['zip_bytes'])
 
                         zip_files.append(zip_filename)
-                        file_size = os.path.getsize(zip_filename) / (1024 * 1024)
-                        print(f"✓ {device_ip} 压缩完成: {os.path.basename(zip_filename)} ({file_size:.2f}MB)")
+                        file_size = span['zip_bytes'] / (1024 * 1024)
+                        logger.info(f"✓ {device_ip} 压缩完成: {os.path.basename(zip_filename)} ({file_size:.2f}MB)")
 
                     except Exception as e:
-                        print(f"✗ {device_ip} 压缩失败: {e}")
+                        logger.error(f"✗ {device_ip} 压缩失败: {e}")
                 else:
-                    print(f"! {device_ip} 目录不存在，跳过压缩")
+                    logger.warning(f"! {device_ip} 目录不存在，跳过压缩")
 
             # 创建总体汇总压缩包（可选）
             if zip_files:
@@ -609,88 +995,118 @@ class ALEInspection:
                             zipf.write(zip_file, os.path.basename(zip_file))
 
                         # 如果有失败设备，创建失败设备列表文件
-                        if self.fail:
+                        fail = self.fail
+                        if fail:
                             failed_list_path = os.path.join(self.log_dir, "failed_devices.txt")
                             with open(failed_list_path, 'w', encoding='utf-8') as f:
                                 f.write(f"运维失败设备列表\n")
                                 f.write(f"时间: {self.logtime}\n")
                                 f.write("=" * 40 + "\n")
-                                for device in self.fail:
-                                    f.write(f"{device}\n")
+                                for device in fail:
+                                    entry = self.results.get(device)
+                                    reason = f"\t[{entry['phase']}] {entry['error']}" if entry and entry['error'] else ""
+                                    f.write(f"{device}{reason}\n")
                             zipf.write(failed_list_path, "failed_devices.txt")
 
                     zip_files.append(summary_zip)
-                    summary_size = os.path.getsize(summary_zip) / (1024 * 1024)
-                    print(f"✓ 汇总压缩包创建完成: {os.path.basename(summary_zip)} ({summary_size:.2f}MB)")
+                    self.html_report.add_attachment(summary_zip, os.path.getsize(summary_zip))
+                    summary_size = self.html_report.attachment_size(summary_zip) / (1024 * 1024)
+                    logger.info(f"✓ 汇总压缩包创建完成: {os.path.basename(summary_zip)} ({summary_size:.2f}MB)")
 
                 except Exception as e:
-                    print(f"✗ 汇总压缩包创建失败: {e}")
+                    logger.error(f"✗ 汇总压缩包创建失败: {e}")
 
             if zip_files:
-                print(f"\n总共创建了 {len(zip_files)} 个压缩包")
+                logger.info(f"\n总共创建了 {len(zip_files)} 个压缩包")
 
                 # 发送邮件
-                self.send_email_with_attachments(devices, zip_files)
+                if notify:
+                    self.send_email_with_attachments(devices, zip_files)
+            elif unchanged_devices:
+                if notify:
+                    logger.info("所有设备输出与上次相同，发送不含附件的报告")
+                    self.send_email_with_attachments(devices, [])
             else:
-                print("✗ 没有创建任何压缩包")
+                logger.error("✗ 没有创建任何压缩包")
 
         except Exception as e:
-            print(f"压缩和邮件发送过程出错: {e}")
+            logger.error(f"压缩和邮件发送过程出错: {e}")
 
     def send_email_with_attachments(self, devices, zip_files):
         """发送包含多个附件的邮件"""
         try:
             from send_email import send_email
-            print("准备发送邮件...")
-
-            # 准备设备信息用于邮件
-            success_devices_info = []
-            for device_ip in self.success:
-                device_info = next((d for d in devices if d['ip'] == device_ip), None)
-                if device_info:
-                    device_type = device_info['device_type'].lower()
-                    if 'alcatel' in device_type or 'ale' in device_type:
-                        success_devices_info.append(f"{device_ip} (ALE)")
-                    else:
-                        vendor_name = self.get_vendor_name(device_type)
-                        success_devices_info.append(f"{device_ip} ({vendor_name})")
-                else:
-                    success_devices_info.append(device_ip)
+            logger.info("准备发送邮件...")
 
-            # 检查附件大小
-            total_size = sum(os.path.getsize(f) for f in zip_files if os.path.exists(f)) / (1024 * 1024)
-            print(f"附件总大小: {total_size:.2f}MB")
+            # 检查附件大小（压缩时已记录）
+            total_size = sum(self.html_report.attachment_size(f) for f in zip_files) / (1024 * 1024)
+            logger.info(f"附件总大小: {total_size:.2f}MB")
 
             # 如果附件太大，只发送汇总包
             if total_size > 25:  # 25MB限制
-                print("附件过大，只发送汇总压缩包")
+                logger.warning("附件过大，只发送汇总压缩包")
                 summary_files = [f for f in zip_files if 'all_devices_' in f]
                 if summary_files:
                     zip_files = summary_files
                 else:
                     # 如果没有汇总包，发送最小的几个文件
-                    zip_files = sorted(zip_files, key=lambda x: os.path.getsize(x))[:3]
-                    print(f"发送最小的 {len(zip_files)} 个压缩包")
-
-            # 发送邮件，包含所有压缩包
-            success = send_email(
-                attachment_files=zip_files,
-                success_devices=success_devices_info,
-                failed_devices=self.fail,
-                total_time=f"{len(self.success + self.fail)} 个设备"
-            )
+                    zip_files = sorted(zip_files, key=self.html_report.attachment_size)[:3]
+                    logger.warning(f"发送最小的 {len(zip_files)} 个压缩包")
+
+            # 发送邮件，包含所有压缩包；正文由设备完成时已渲染的报告拼接
+            with self.report.span(None, 'email', attachments=len(zip_files)) as span:
+                success = send_email(
+                    body=self.html_report.render(zip_files),
+                    attachment_files=zip_files,
+                )
+                span['ok'] = success
 
             if success:
-                print("✓ 邮件发送成功!")
+                logger.info("✓ 邮件发送成功!")
             else:
-                print("✗ 邮件发送失败")
+                logger.error("✗ 邮件发送失败")
 
         except Exception as e:
-            print(f"邮件发送失败: {e}")
+            logger.error(f"邮件发送失败: {e}")
+
+
+# 按需导入的依赖，self_test 检查打包后是否齐全
+REQUIRED_MODULES = ['netmiko', 'paramiko', 'scp', 'openpyxl']
+OPTIONAL_MODULES = {'pandas': '全网统计分析'}
+
+
+def self_test():
+    """导入所有按需加载的依赖后退出，用于检查exe打包是否完整和测量启动耗时
+
+    Returns:
+        int: 进程退出码，缺少必需依赖时为1
+    """
+    import importlib
+    missing = 0
+    for name in REQUIRED_MODULES:
+        try:
+            importlib.import_module(name)
+            print(f"✓ {name}")
+        except ImportError as e:
+            print(f"✗ {name}: {e}")
+            missing += 1
+    for name, feature in OPTIONAL_MODULES.items():
+        try:
+            importlib.import_module(name)
+            print(f"✓ {name}")
+        except ImportError:
+            print(f"! {name} 未安装，{feature}将跳过")
+    return 1 if missing else 0
 
 
 def main():
     """主函数"""
+    # 打包为exe后，日志分析子进程需要
+    multiprocessing.freeze_support()
+
+    if '--self-test' in sys.argv:
+        sys.exit(self_test())
+
     print("ALE网络运维工具包")
     print("支持tech-support命令和日志文件下载")
     print("=" * 60)
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - OmniSwitch 设备模拟器
+在本机模拟任意数量的ALE OmniSwitch: 一个SSH服务（AOS命令行、SFTP、SCP）、
+一个FTP服务和一个TFTP服务同时代表所有设备，按客户端连接的本地地址区分设备。
+设备使用 127.1.x.y 地址（Linux 上整个 127.0.0.0/8 都指向本机），
+所以各服务监听 0.0.0.0，但只接受来自本机的连接。
+
+tech-support 日志按文件名生成一次，每台设备的文件在公共内容前加上
+该设备的 show system/health/temperature 等段落，内容随设备地址变化。
+
+用法:
+    python benchmarks/ale_simulator.py --devices 100 --inventory sim/template.xlsx
+"""
+
+import io
+import os
+import sys
+import stat
+import time
+import random
+import socket
+import logging
+import argparse
+import threading
+from functools import lru_cache
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ftp_server import FTPStandIn
+from tftp_server import TFTPStandIn
+
+
+LOG_FILES = ["tech_support_layer3.log", "tech_support_layer2.log", "tech_support.log"]
+
+DEVICE_TYPE = 'alcatel_aos'
+USERNAME = 'admin'
+PASSWORD = 'switch'
+
+# BackupConfig 等命令列表流程使用的命令
+COMMANDS = ['show system', 'show chassis', 'show microcode', 'show health', 'show interfaces status', 'show vlan']
+
+def device_addresses(count, base=(127, 1)):
+    """生成设备地址 127.1.0.1 ~ 127.1.x.y，每个 /24 使用 250 个地址"""
+    return [f"{base[0]}.{base[1] + index // 62500}.{index // 250 % 250}.{index % 250 + 1}" for index in range(count)]
+
+
+def is_local(address):
+    """是否本机地址"""
+    return address.startswith('127.') or address == '::1'
+
+
+@lru_cache(maxsize=8192)
+def device_profile(address):
+    """按设备地址生成固定的设备属性"""
+    rng = random.Random(address)
+    return {
+        'hostname': 'OS6860-' + address.replace('.', '-'),
+        'model': rng.choice(['OS6860E-48', 'OS6860E-P24', 'OS6900-X20', 'OS6450-48']),
+        'serial': f"T{rng.randrange(10 ** 9):09d}",
+        'version': rng.choice(['8.7.354.R01', '8.8.152.R01', '8.9.221.R03']),
+        'uptime_days': rng.randrange(0, 1500),
+        'cpu': rng.randrange(3, 95),
+        'memory': rng.randrange(20, 90),
+        'temperature': rng.randrange(30, 72),
+        'ports': rng.choice([24, 48]),
+        'topology_changes': rng.randrange(0, 80),
+        'crc_port': rng.randrange(1, 25),
+        'crc_errors': rng.choice([0, 0, 0, rng.randrange(1, 50000)]),
+        # 认证失败的设备（fail_ratio）
+        'fail_roll': rng.random(),
+    }
+
+
+def show_system(device):
+    profile = device_profile(device)
+    return (f"System:\r\n  Description:  Alcatel-Lucent Enterprise {profile['model']} {profile['version']}, "
+            f"Service Release\r\n  Name:         {profile['hostname']},\r\n"
+            f"  Up Time:      {profile['uptime_days']} days 3 hours 12 minutes and 5 seconds,\r\n"
+            f"  Location:     lab,\r\n  Date & Time:  {time.strftime('%a %b %d %Y %H:%M:%S')}\r\n")
+
+
+def show_chassis(device):
+    profile = device_profile(device)
+    return (f"Local Chassis ID 1 (Master)\r\n  Model Name:                    {profile['model']},\r\n"
+            f"  Serial Number:                 {profile['serial']},\r\n  Admin Status:                  POWER ON,\r\n"
+            f"  Operational Status:            UP,\r\n")
+
+
+def show_microcode(device):
+    profile = device_profile(device)
+    return ("   Package           Release                 Size     Description\r\n"
+            "-----------------+-------------------------+--------+-----------------------------------\r\n"
+            f"Uos.img            {profile['version']:<24} 245463840 Alcatel-Lucent OS\r\n")
+
+
+def show_health(device):
+    profile = device_profile(device)
+    return ("CMM                    Current   1 Min    1 Hr   1 Day\r\n"
+            "Resources                         Avg     Avg     Avg\r\n"
+            "----------------------+---------+-------+-------+-------\r\n"
+            f"CPU                         {profile['cpu']:>3}      {profile['cpu']:>3}     {profile['cpu']:>3}     "
+            f"{profile['cpu']:>3}\r\n"
+            f"Memory                      {profile['memory']:>3}      {profile['memory']:>3}     "
+            f"{profile['memory']:>3}     {profile['memory']:>3}\r\n")
+
+
+def show_temperature(device):
+    profile = device_profile(device)
+    state = 'OVER THRESHOLD' if profile['temperature'] >= 68 else 'UNDER THRESHOLD'
+    return ("Chassis/Device  Current  Range      Danger  Thresh  Status\r\n"
+            "--------------+--------+----------+-------+-------+----------------\r\n"
+            f"1/CMMA          {profile['temperature']:>3}      15 to 68   78      68      {state}\r\n")
+
+
+def show_interfaces_status(device):
+    profile = device_profile(device)
+    lines = [" Chas/Slot/   Admin  Auto   Detected    Trunk\r\n", "  Port        Status Neg   Speed(Mbps) Duplex\r\n",
+             "------------+------+------+-----------+------\r\n"]
+    for port in range(1, profile['ports'] + 1):
+        lines.append(f"  1/1/{port:<8} en     en      1000       Full\r\n")
+    return ''.join(lines)
+
+
+def show_vlan(device):
+    return ("vlan    type   admin   oper    ip    mtu          name\r\n"
+            "------+-------+-------+------+------+------+------------------\r\n"
+            "1      std       Ena     Ena   Dis    1500    VLAN 1\r\n"
+            "10     std       Ena     Ena   Ena    1500    users\r\n")
+
+
+def show_tech_support(device):
+    return ("Please wait...\r\nThe files tech_support_layer2.log, tech_support_layer3.log and tech_support.log "
+            "are being generated in /flash\r\n")
+
+
+SHOW_COMMANDS = {
+    'show system': show_system,
+    'show chassis': show_chassis,
+    'show microcode': show_microcode,
+    'show health': show_health,
+    'show temperature': show_temperature,
+    'show interfaces status': show_interfaces_status,
+    'show vlan': show_vlan,
+    'show tech-support': show_tech_support,
+}
+
+
+def device_header(device, name):
+    """设备相关的日志开头部分"""
+    profile = device_profile(device)
+    parts = [f"tech support {name} for {profile['hostname']} ({device})\n\n",
+             "show system\n", show_system(device), "\nshow health\n", show_health(device),
+             "\nshow temperature\n", show_temperature(device),
+             f"\nshow spantree\n  Number of topology changes : {profile['topology_changes']}\n"]
+    if profile['crc_errors']:
+        parts.append(f"\nshow interfaces counters errors\nslot/port : 1/1/{profile['crc_port']}\n"
+                     f"  IfInErrors = {profile['crc_errors']}, CRC Error Frames = {profile['crc_errors']}\n")
+    return ''.join(parts).replace('\r\n', '\n').encode('utf-8')
+
+
+def build_body(size, seed=0):
+    """生成约 size 字节的日志正文: 接口计数器和 swlog 记录"""
+    rng = random.Random(seed)
+    blocks = []
+    total = 0
+    index = 0
+    while total < size:
+        slot, port = index // 48 % 8 + 1, index % 48 + 1
+        block = (f"\nshow interfaces 1/{slot}/{port}\nslot/port : 1/{slot}/{port}\n"
+                 f"  Bytes Received  : {rng.randrange(10 ** 12)}, Unicast Frames : {rng.randrange(10 ** 9)}\n"
+                 f"  IfInErrors = 0, IfOutErrors = 0, CRC Error Frames = 0, Runt Frames = 0\n")
+        for _ in range(6):
+            block += (f"swlogd: {rng.choice(['ipv4', 'vlanMgr', 'stpCmm', 'linkAgg', 'ntp'])} "
+                      f"{rng.choice(['info', 'INFO', 'debug1'])}(5) Event {rng.randrange(10 ** 6)} handled\n")
+        data = block.encode('ascii')
+        blocks.append(data)
+        total += len(data)
+        index += 1
+    return b''.join(blocks)[:size]
+
+
+class LogFiles:
+    """模拟设备上的 tech-support 日志文件"""
+
+    def __init__(self, size, names=LOG_FILES):
+        self.bodies = {name: build_body(size, seed=name) for name in names}
+        self.mtime = time.time()
+
+    def get(self, device, name):
+        """获取设备上的文件内容，不存在时返回None"""
+        body = self.bodies.get(os.path.basename(name))
+        if body is None:
+            return None
+        return device_header(device, os.path.basename(name)) + body
+
+
+# ---------------------------------------------------------------- SSH
+
+def load_paramiko():
+    import paramiko
+    return paramiko
+
+
+def close_channel(channel):
+    """关闭通道，客户端已断开时忽略错误"""
+    try:
+        channel.close()
+    except (OSError, EOFError):
+        pass
+
+
+class SimulatedFleet:
+    """模拟设备集合
+
+    用法:
+        fleet = SimulatedFleet(log_size=1024 * 1024).start()
+        ... 设备清单端口使用 fleet.ssh_port，FTP/TFTP 端口使用 fleet.ftp_port/fleet.tftp_port
+        fleet.stop()
+    """
+
+    def __init__(self, host='0.0.0.0', ssh_port=0, ftp_port=0, tftp_port=0, log_size=1024 * 1024,
+                 login_delay=0.05, command_delay=0.05, tech_support_delay=2.0, fail_ratio=0.0, allow_remote=False):
+        """
+        Args:
+            host: 监听地址
+            ssh_port/ftp_port/tftp_port: 端口，0表示自动选择
+            log_size: 每个日志文件的大小(字节)
+            login_delay: 登录耗时(秒)
+            command_delay: 每条 show 命令的耗时(秒)
+            tech_support_delay: show tech-support 的耗时(秒)
+            fail_ratio: 拒绝登录的设备比例
+            allow_remote: 是否接受来自其他主机的连接
+        """
+        self.host = host
+        self.logs = LogFiles(log_size)
+        self.login_delay = login_delay
+        self.command_delay = command_delay
+        self.tech_support_delay = tech_support_delay
+        self.fail_ratio = fail_ratio
+        self.allow_remote = allow_remote
+        self.running = False
+        self.lock = threading.Lock()
+        self.stats = {'ssh_connections': 0, 'commands': 0, 'auth_failures': 0,
+                      'sftp_bytes': 0, 'scp_bytes': 0, 'ftp_bytes': 0, 'tftp_bytes': 0}
+        self.host_key = None
+
+        self.ssh_listener = self._listen(ssh_port)
+        self.ssh_port = self.ssh_listener.getsockname()[1]
+        self.ftp = FleetFTP(self, host, ftp_port)
+        self.ftp_port = self.ftp.port
+        self.tftp = FleetTFTP(self, host, tftp_port)
+        self.tftp_port = self.tftp.port
+
+    def _listen(self, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        return sock
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+    def accept_peer(self, address):
+        return self.allow_remote or is_local(address)
+
+    def start(self):
+        """启动所有服务"""
+        paramiko = load_paramiko()
+        # 客户端断开时 paramiko 服务端会记录连接重置错误，属于正常情况
+        logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.running = True
+        self.ssh_listener.listen(256)
+        threading.Thread(target=self._ssh_accept_loop, name="sim-ssh", daemon=True).start()
+        self.ftp.start()
+        self.tftp.start()
+        return self
+
+    def stop(self):
+        """停止所有服务"""
+        self.running = False
+        self.ftp.stop()
+        self.tftp.stop()
+        try:
+            self.ssh_listener.close()
+        except OSError:
+            pass
+
+    # SSH
+
+    def _ssh_accept_loop(self):
+        while self.running:
+            try:
+                conn, peer = self.ssh_listener.accept()
+            except OSError:
+                break
+            if not self.accept_peer(peer[0]):
+                conn.close()
+                continue
+            threading.Thread(target=self._ssh_session, args=(conn,), daemon=True).start()
+
+    def _ssh_session(self, conn):
+        """处理一个SSH连接"""
+        paramiko = load_paramiko()
+        device = conn.getsockname()[0]
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(self.host_key)
+        transport.set_subsystem_handler('sftp', paramiko.SFTPServer, make_sftp_interface(paramiko))
+        server = make_ssh_server(paramiko)(self, device)
+        try:
+            transport.start_server(server=server)
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+            return
+        self.count('ssh_connections')
+
+    def authenticate(self, device, username, password):
+        """校验登录，fail_ratio 比例的设备总是拒绝"""
+        time.sleep(self.login_delay)
+        if device_profile(device)['fail_roll'] < self.fail_ratio or password != PASSWORD:
+            self.count('auth_failures')
+            return False
+        return True
+
+    def run_shell(self, device, channel):
+        """AOS 命令行: 回显输入，按行执行 show 命令"""
+        prompt = f"{device_profile(device)['hostname']}-> "
+        try:
+            channel.sendall(f"\r\nWelcome to the Alcatel-Lucent Enterprise OmniSwitch\r\n{prompt}".encode())
+            line = ''
+            previous = ''
+            while True:
+                data = channel.recv(4096)
+                if not data:
+                    break
+                for char in data.decode('utf-8', errors='replace'):
+                    if char == '\n' and previous == '\r':
+                        previous = char
+                        continue
+                    previous = char
+                    if char not in '\r\n':
+                        line += char
+                        channel.sendall(char.encode())
+                        continue
+                    command, line = ' '.join(line.split()), ''
+                    if command in ('exit', 'logout', 'quit'):
+                        channel.sendall(b"\r\n")
+                        return
+                    channel.sendall(b"\r\n" + self.execute(device, command).encode() + prompt.encode())
+        except (OSError, EOFError):
+            pass
+        finally:
+            close_channel(channel)
+
+    def execute(self, device, command):
+        """执行一条命令，返回输出"""
+        if not command:
+            return ''
+        self.count('commands')
+        handler = SHOW_COMMANDS.get(command)
+        if handler is None:
+            time.sleep(self.command_delay / 5)
+            return f'ERROR: Invalid entry: "{command.split()[-1]}"\r\n'
+        time.sleep(self.tech_support_delay if command == 'show tech-support' else self.command_delay)
+        return handler(device)
+
+    def run_scp(self, device, channel, command):
+        """SCP 源端: scp -f <文件>"""
+        name = command.split(' -f ', 1)[-1].strip().strip('\'"')
+        data = self.logs.get(device, name)
+        try:
+            channel.recv(1)
+            if data is None:
+                channel.sendall(f"\x01scp: {name}: No such file or directory\n".encode())
+                return
+            channel.sendall(f"C0644 {len(data)} {os.path.basename(name)}\n".encode())
+            channel.recv(1)
+            view = memoryview(data)
+            for start in range(0, len(data), 256 * 1024):
+                channel.sendall(view[start:start + 256 * 1024])
+            channel.sendall(b"\x00")
+            channel.recv(1)
+            self.count('scp_bytes', len(data))
+        except (OSError, EOFError):
+            pass
+        finally:
+            try:
+                channel.send_exit_status(0)
+            except (OSError, EOFError):
+                pass
+            close_channel(channel)
+
+
+class FleetFTP(FTPStandIn):
+    """按客户端连接的本地地址返回对应设备的日志文件"""
+
+    def __init__(self, fleet, host, port):
+        super().__init__({}, host=host, port=port)
+        self.fleet = fleet
+
+    def accept_peer(self, address):
+        return self.fleet.accept_peer(address)
+
+    def get_file(self, name, address):
+        return self.fleet.logs.get(address, name)
+
+    def _send(self, data_conn, payload, offset):
+        super()._send(data_conn, payload, offset)
+        self.fleet.count('ftp_bytes', len(payload) - offset)
+
+
+class FleetTFTP(TFTPStandIn):
+    """按请求的目标地址返回对应设备的日志文件"""
+
+    def __init__(self, fleet, host, port):
+        super().__init__({}, host=host, port=port)
+        self.fleet = fleet
+
+    def accept_peer(self, address):
+        return self.fleet.accept_peer(address)
+
+    def get_file(self, name, address):
+        return self.fleet.logs.get(address, name)
+
+    def sent(self, address, size):
+        self.fleet.count('tftp_bytes', size)
+
+
+def make_ssh_server(paramiko):
+    """paramiko.ServerInterface 子类（paramiko 在启动后才导入）"""
+
+    class DeviceServer(paramiko.ServerInterface):
+        def __init__(self, fleet, device):
+            self.fleet = fleet
+            self.device = device
+
+        def get_allowed_auths(self, username):
+            return 'password'
+
+        def check_auth_password(self, username, password):
+            if self.fleet.authenticate(self.device, username, password):
+                return paramiko.AUTH_SUCCESSFUL
+            return paramiko.AUTH_FAILED
+
+        def check_channel_request(self, kind, chanid):
+            if kind == 'session':
+                return paramiko.OPEN_SUCCEEDED
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+        def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+            return True
+
+        def check_channel_shell_request(self, channel):
+            threading.Thread(target=self.fleet.run_shell, args=(self.device, channel), daemon=True).start()
+            return True
+
+        def check_channel_exec_request(self, channel, command):
+            command = command.decode('utf-8', errors='replace')
+            if not command.startswith('scp '):
+                return False
+            threading.Thread(target=self.fleet.run_scp, args=(self.device, channel, command), daemon=True).start()
+            return True
+
+    return DeviceServer
+
+
+def make_sftp_interface(paramiko):
+    """SFTP 子系统: 只读访问模拟的日志文件"""
+
+    class MemoryHandle(paramiko.SFTPHandle):
+        def __init__(self, data, mtime):
+            super().__init__()
+            self.readfile = io.BytesIO(data)
+            self.attributes = file_attributes(paramiko, len(data), mtime)
+
+        def stat(self):
+            return self.attributes
+
+    class DeviceSFTP(paramiko.SFTPServerInterface):
+        def __init__(self, server, *args, **kwargs):
+            super().__init__(server, *args, **kwargs)
+            self.fleet = server.fleet
+            self.device = server.device
+
+        def open(self, path, flags, attr):
+            if flags & (os.O_WRONLY | os.O_RDWR):
+                return paramiko.SFTP_PERMISSION_DENIED
+            data = self.fleet.logs.get(self.device, path)
+            if data is None:
+                return paramiko.SFTP_NO_SUCH_FILE
+            self.fleet.count('sftp_bytes', len(data))
+            return MemoryHandle(data, self.fleet.logs.mtime)
+
+        def stat(self, path):
+            data = self.fleet.logs.get(self.device, path)
+            if data is None:
+                return paramiko.SFTP_NO_SUCH_FILE
+            return file_attributes(paramiko, len(data), self.fleet.logs.mtime)
+
+        lstat = stat
+
+    return DeviceSFTP
+
+
+def file_attributes(paramiko, size, mtime):
+    attributes = paramiko.SFTPAttributes()
+    attributes.st_size = size
+    attributes.st_mode = stat.S_IFREG | 0o644
+    attributes.st_mtime = attributes.st_atime = int(mtime)
+    return attributes
+
+
+# ---------------------------------------------------------------- 设备清单
+
+def write_inventory(path, addresses, ssh_port, commands=COMMANDS, password=PASSWORD):
+    """生成模拟设备的设备清单（格式与 template.xlsx 相同）"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '设备信息'
+    sheet.append(['序号', '状态', '设备IP', '协议', '端口', '用户名', '密码', '特权密码', '设备类型'])
+    for index, address in enumerate(addresses, 1):
+        sheet.append([index, '启用', address, 'ssh', ssh_port, USERNAME, password, None, DEVICE_TYPE])
+    commands_sheet = workbook.create_sheet(DEVICE_TYPE)
+    commands_sheet.append(['状态', '命令'])
+    for command in commands:
+        commands_sheet.append(['启用', command])
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    workbook.save(path)
+    return path
+
+
+def env_overrides(fleet):
+    """巡检连接模拟设备需要的 .env 配置"""
+    return {
+        'DOWNLOAD_FTP_PORT': fleet.ftp_port,
+        'DOWNLOAD_TFTP_PORT': fleet.tftp_port,
+        'TECH_SUPPORT_WAIT': 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ALE OmniSwitch 设备模拟器")
+    parser.add_argument('--devices', type=int, default=10, help="模拟设备数")
+    parser.add_argument('--inventory', help="生成设备清单的路径，如 sim/template.xlsx")
+    parser.add_argument('--host', default='0.0.0.0', help="监听地址")
+    parser.add_argument('--ssh-port', type=int, default=2222)
+    parser.add_argument('--ftp-port', type=int, default=2121)
+    parser.add_argument('--tftp-port', type=int, default=6969)
+    parser.add_argument('--log-size', type=int, default=1024, help="每个日志文件的大小(KB)")
+    parser.add_argument('--login-delay', type=float, default=0.05, help="登录耗时(秒)")
+    parser.add_argument('--command-delay', type=float, default=0.05, help="每条show命令的耗时(秒)")
+    parser.add_argument('--tech-support-delay', type=float, default=2.0, help="show tech-support 的耗时(秒)")
+    parser.add_argument('--fail-ratio', type=float, default=0.0, help="拒绝登录的设备比例")
+    args = parser.parse_args()
+
+    fleet = SimulatedFleet(args.host, args.ssh_port, args.ftp_port, args.tftp_port, args.log_size * 1024,
+                           args.login_delay, args.command_delay, args.tech_support_delay, args.fail_ratio).start()
+    addresses = device_addresses(args.devices)
+    print(f"模拟 {args.devices} 台设备: {addresses[0]} ~ {addresses[-1]}")
+    print(f"SSH {fleet.ssh_port}, FTP {fleet.ftp_port}, TFTP {fleet.tftp_port}  用户名 {USERNAME} 密码 {PASSWORD}")
+    if args.inventory:
+        write_inventory(args.inventory, addresses, fleet.ssh_port)
+        print(f"设备清单: {args.inventory}")
+    print("巡检目录的 .env 中设置:")
+    for key, value in env_overrides(fleet).items():
+        print(f"  {key}={value}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.stop()
+        print(f"统计: {fleet.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 基准测试结果基线
+各基准测试的结果统一保存为 {测试项: {指标: 数值}} 的JSON文件（附带提交号、Python版本等信息），
+与之前保存的基线比较时按指标名后缀判断方向，变化超过阈值的标记为退化。
+
+指标名后缀:
+    _ms/_us/_s/_mb   越小越好（耗时、内存）
+    _mbps/_per_s      越大越好（吞吐量）
+其他指标只显示，不参与比较。
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 基线默认保存目录（不纳入版本库，每台测试机各自保存）
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', 'baselines')
+
+LOWER_IS_BETTER = ('_ms', '_us', '_s', '_mb')
+HIGHER_IS_BETTER = ('_mbps', '_per_s')
+
+# 变化量小于该值时不视为退化（峰值内存受解释器和分配器影响，有几MB的波动）
+NOISE_FLOOR = {'_mb': 2.0}
+
+
+def default_path(name):
+    """基准测试的默认基线文件"""
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def metric_direction(metric):
+    """指标方向: 1表示越大越好，-1表示越小越好，0表示不比较"""
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def peak_rss_mb():
+    """本进程的峰值内存(MB)，不支持时为None
+
+    Linux 上读取 /proc/self/status 的 VmHWM: ru_maxrss 在 fork/exec 后保留父进程的值，
+    子进程的结果会包含启动它的基准测试进程的内存。
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # macOS 上单位为字节，其他系统为KB
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+def git_revision():
+    """当前提交号，不在git仓库中时返回None"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def save(path, results):
+    """保存基线"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"基线已保存: {path}")
+
+
+def load(path):
+    """读取基线
+
+    Returns:
+        tuple: (结果, 附带信息)，文件不存在时返回 ({}, {})
+    """
+    if not os.path.exists(path):
+        return {}, {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    # 早期的 bench_startup 结果直接保存为 {模块: {指标: 数值}}
+    if 'results' not in data:
+        return data, {}
+    return data['results'], data.get('meta', {})
+
+
+def compare(results, baseline, threshold=0.2):
+    """与基线比较
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        threshold: 变差超过该比例视为退化
+
+    Returns:
+        list: [{'case', 'metric', 'before', 'after', 'change', 'regression'}]，change 为正表示变好
+    """
+    rows = []
+    for case, metrics in results.items():
+        before_metrics = baseline.get(case, {})
+        for metric, after in metrics.items():
+            direction = metric_direction(metric)
+            before = before_metrics.get(metric)
+            if not direction or not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+                continue
+            if before == 0:
+                continue
+            floor = next((value for suffix, value in NOISE_FLOOR.items() if metric.endswith(suffix)), 0)
+            if abs(after - before) < floor:
+                continue
+            change = (after - before) / before * direction
+            rows.append({'case': case, 'metric': metric, 'before': before, 'after': after,
+                         'change': change, 'regression': change < -threshold})
+    return rows
+
+
+def report(rows, meta=None, threshold=0.2):
+    """打印比较结果
+
+    Returns:
+        int: 退化的指标数
+    """
+    if meta:
+        print(f"\n与基线比较（提交 {meta.get('revision') or '-'}, {meta.get('time') or '-'}），阈值 {threshold:.0%}:")
+    else:
+        print(f"\n与基线比较，阈值 {threshold:.0%}:")
+    if not rows:
+        print("  没有可比较的指标")
+        return 0
+    for row in rows:
+        mark = '✗' if row['regression'] else ('✓' if row['change'] > threshold else ' ')
+        print(f"  {mark} {row['case']:<28}{row['metric']:<16}{row['before']:>12.2f} → {row['after']:<12.2f}"
+              f"{row['change']:+.0%}")
+    regressions = sum(1 for row in rows if row['regression'])
+    if regressions:
+        print(f"✗ {regressions} 项指标退化")
+    else:
+        print("✓ 没有退化")
+    return regressions
+
+
+def check(results, path, threshold=0.2):
+    """与基线文件比较并打印，返回退化的指标数；基线不存在时返回0"""
+    baseline, meta = load(path)
+    if not baseline:
+        print(f"! 基线不存在: {path}")
+        return 0
+    return report(compare(results, baseline, threshold), meta, threshold)
+
+
+if __name__ == '__main__':
+    # 比较两个已保存的结果: python benchmarks/baseline.py before.json after.json
+    if len(sys.argv) != 3:
+        print("用法: python benchmarks/baseline.py <基线.json> <结果.json>")
+        sys.exit(2)
+    base, base_meta = load(sys.argv[1])
+    after, _ = load(sys.argv[2])
+    sys.exit(1 if report(compare(after, base), base_meta) else 0)
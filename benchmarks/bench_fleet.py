@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 全流程基准测试
+启动 ale_simulator 模拟设备，在临时目录中生成设备清单和 .env，
+用子进程运行 ALEInspection.run_inspection（不发邮件）或 BackupConfig.connect，
+统计吞吐量（台/秒）、单台设备耗时分位数和峰值内存。
+
+用法:
+    python benchmarks/bench_fleet.py --devices 10 100 1000 --target inspection backup
+    python benchmarks/bench_fleet.py --devices 100 --save       # 保存到 benchmarks/baselines/fleet.json
+    python benchmarks/bench_fleet.py --devices 100 --compare    # 与基线比较，退化时退出码为1
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import baseline
+from ale_simulator import SimulatedFleet, device_addresses, write_inventory, env_overrides
+
+
+TARGETS = ['inspection', 'backup']
+RESULT_MARKER = 'BENCH_RESULT '
+
+
+def percentile(values, p):
+    """最近秩分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_child(target):
+    """子进程: 在当前目录（临时巡检目录）运行一次巡检，输出结果JSON"""
+    sys.path.insert(0, ROOT)
+    start = time.perf_counter()
+    if target == 'inspection':
+        from ale_inspection import ALEInspection
+        runner = ALEInspection()
+        runner.run_inspection(notify=False)
+    else:
+        from connect import BackupConfig
+        runner = BackupConfig()
+        runner.connect()
+    elapsed = time.perf_counter() - start
+
+    entries = runner.results.snapshot()
+    latencies = [entry['finished'] - entry['started'] for entry in entries
+                 if entry['started'] is not None and entry['finished'] is not None]
+    result = {
+        'devices': len(entries),
+        'success': len(runner.success),
+        'failed': len(runner.fail),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(len(entries) / elapsed, 2) if elapsed else None,
+        'p50_s': percentile(latencies, 50),
+        'p90_s': percentile(latencies, 90),
+        'p99_s': percentile(latencies, 99),
+        'max_s': max(latencies) if latencies else None,
+        'peak_rss_mb': baseline.peak_rss_mb(),
+    }
+    print(RESULT_MARKER + json.dumps(result), flush=True)
+
+
+def prepare_workdir(fleet, count, args):
+    """生成临时巡检目录: 设备清单和 .env"""
+    workdir = tempfile.mkdtemp(prefix='ale_bench_')
+    write_inventory(os.path.join(workdir, 'template.xlsx'), device_addresses(count), fleet.ssh_port)
+    overrides = env_overrides(fleet)
+    overrides.update({
+        'SCHED_WORKERS': args.workers,
+        'DOWNLOAD_METHODS': args.methods,
+        'LOG_CONSOLE_LEVEL': 'WARNING',
+        'METRICS_HTTP_PORT': 0,
+    })
+    with open(os.path.join(ROOT, '.env'), 'r', encoding='utf-8') as f:
+        env_text = f.read()
+    with open(os.path.join(workdir, '.env'), 'w', encoding='utf-8') as f:
+        f.write(env_text)
+        f.write('\n# 基准测试\n')
+        for key, value in overrides.items():
+            f.write(f"{key}={value}\n")
+    return workdir
+
+
+def run_case(fleet, target, count, args):
+    """运行一次基准测试
+
+    Returns:
+        dict: 子进程输出的结果
+    """
+    workdir = prepare_workdir(fleet, count, args)
+    try:
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', target], cwd=workdir,
+                                capture_output=True, text=True, encoding='utf-8', errors='replace',
+                                timeout=args.timeout)
+        for line in reversed(result.stdout.splitlines()):
+            if line.startswith(RESULT_MARKER):
+                return json.loads(line[len(RESULT_MARKER):])
+        raise RuntimeError(f"{target} {count} 台设备运行失败:\n{(result.stdout + result.stderr)[-2000:]}")
+    finally:
+        if args.keep:
+            print(f"  巡检目录: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def format_value(value, digits=2):
+    return f"{value:.{digits}f}" if isinstance(value, (int, float)) else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟设备上的全流程基准测试")
+    parser.add_argument('--child', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--devices', type=int, nargs='+', default=[10, 100], help="模拟设备数，可指定多个")
+    parser.add_argument('--target', nargs='+', choices=TARGETS, default=TARGETS, help="测试对象")
+    parser.add_argument('--workers', type=int, default=10, help="SCHED_WORKERS 工作线程数")
+    parser.add_argument('--methods', default='sftp,scp,ftp,tftp', help="DOWNLOAD_METHODS 下载方式")
+    parser.add_argument('--log-size', type=int, default=1024, help="每个日志文件的大小(KB)")
+    parser.add_argument('--login-delay', type=float, default=0.05, help="模拟登录耗时(秒)")
+    parser.add_argument('--command-delay', type=float, default=0.05, help="模拟每条show命令耗时(秒)")
+    parser.add_argument('--tech-support-delay', type=float, default=2.0, help="模拟 show tech-support 耗时(秒)")
+    parser.add_argument('--fail-ratio', type=float, default=0.0, help="拒绝登录的设备比例")
+    parser.add_argument('--timeout', type=int, default=3600, help="单次运行的超时(秒)")
+    parser.add_argument('--keep', action='store_true', help="保留临时巡检目录")
+    parser.add_argument('--save', nargs='?', const=baseline.default_path('fleet'), help="保存为基线")
+    parser.add_argument('--compare', nargs='?', const=baseline.default_path('fleet'), help="与基线比较")
+    parser.add_argument('--threshold', type=float, default=0.2, help="退化阈值（比例）")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    fleet = SimulatedFleet(log_size=args.log_size * 1024, login_delay=args.login_delay,
+                           command_delay=args.command_delay, tech_support_delay=args.tech_support_delay,
+                           fail_ratio=args.fail_ratio).start()
+    results = {}
+    print(f"{'测试':<18}{'成功/失败':>10}{'耗时 s':>9}{'台/秒':>8}{'p50 s':>8}{'p90 s':>8}{'p99 s':>8}"
+          f"{'峰值MB':>8}")
+    try:
+        for target in args.target:
+            for count in args.devices:
+                name = f"{target}/{count}"
+                results[name] = result = run_case(fleet, target, count, args)
+                print(f"{name:<18}{result['success']:>5}/{result['failed']:<4}"
+                      f"{format_value(result['elapsed_s'], 1):>9}{format_value(result['throughput_per_s']):>8}"
+                      f"{format_value(result['p50_s']):>8}{format_value(result['p90_s']):>8}"
+                      f"{format_value(result['p99_s']):>8}{format_value(result['peak_rss_mb'], 0):>8}")
+    finally:
+        fleet.stop()
+    print(f"模拟器: {fleet.stats}")
+
+    regressions = 0
+    if args.compare:
+        regressions = baseline.check(results, args.compare, args.threshold)
+    if args.save:
+        baseline.save(args.save, results)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
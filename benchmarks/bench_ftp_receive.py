@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - FTP接收基准测试
+从本地FTP替身服务器下载同一个文件，比较各种接收方式的吞吐量（以 recv-8k 为基准）:
+  retrbinary-8k  ftplib.retrbinary，8KB块，每块回调 file.write（最初的实现，不计算摘要）
+  recv-8k        recv(8192) 后写入 PartialFile（改进前的实现）
+  recv_into      复用缓冲区 recv_into 后写入 PartialFile，块大小可配置
+  splice         os.splice 直接写入文件，不计算摘要（仅Linux）
+
+用法:
+    python benchmarks/bench_ftp_receive.py --size 256 --repeat 5 --block-size 256
+"""
+
+import os
+import sys
+import time
+import ftplib
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ftp_server import FTPStandIn
+from partial_file import PartialFile
+from stream_receiver import StreamReceiver, SPLICE_AVAILABLE
+
+
+REMOTE_NAME = "tech_support.log"
+
+
+def connect(port):
+    """登录替身服务器"""
+    ftp = ftplib.FTP()
+    ftp.connect('127.0.0.1', port)
+    ftp.login('admin', 'password')
+    ftp.voidcmd('TYPE I')
+    return ftp
+
+
+def fetch_retrbinary(port, path, block_size):
+    """ftplib.retrbinary，8KB块"""
+    with connect(port) as ftp, open(path, 'wb') as local_file:
+        ftp.retrbinary(f'RETR {REMOTE_NAME}', local_file.write, blocksize=8192)
+
+
+def fetch_recv(port, path, block_size):
+    """recv(8192) 写入 PartialFile"""
+    with connect(port) as ftp:
+        size = ftp.size(REMOTE_NAME)
+        with PartialFile(path, size) as part:
+            with ftp.transfercmd(f'RETR {REMOTE_NAME}') as data_conn:
+                while True:
+                    data = data_conn.recv(8192)
+                    if not data:
+                        break
+                    part.write(data)
+            ftp.voidresp()
+            part.commit()
+
+
+def make_receiver_fetch(zero_copy):
+    """StreamReceiver 写入 PartialFile"""
+    def fetch(port, path, block_size):
+        receiver = StreamReceiver(block_size, zero_copy=zero_copy)
+        with connect(port) as ftp:
+            size = ftp.size(REMOTE_NAME)
+            with PartialFile(path, size) as part:
+                with ftp.transfercmd(f'RETR {REMOTE_NAME}') as data_conn:
+                    receiver.receive(data_conn, part)
+                ftp.voidresp()
+                part.commit()
+    return fetch
+
+
+def measure(fetch, port, path, size, repeat, block_size):
+    """多次下载，返回每次的吞吐量(MB/s)"""
+    rates = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fetch(port, path, block_size)
+        elapsed = time.perf_counter() - start
+        if os.path.getsize(path) != size:
+            raise RuntimeError(f"下载大小不正确: {os.path.getsize(path)}/{size}")
+        os.remove(path)
+        rates.append(size / elapsed / 1024 / 1024)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTP接收方式吞吐量比较")
+    parser.add_argument('--size', type=int, default=256, help="测试文件大小(MB)")
+    parser.add_argument('--repeat', type=int, default=5, help="每种方式的下载次数")
+    parser.add_argument('--block-size', type=int, default=256, help="recv_into/splice 的块大小(KB)")
+    args = parser.parse_args()
+
+    size = args.size * 1024 * 1024
+    block_size = args.block_size * 1024
+    server = FTPStandIn({REMOTE_NAME: os.urandom(size)}).start()
+
+    variants = [
+        ('retrbinary-8k', fetch_retrbinary),
+        ('recv-8k', fetch_recv),
+        (f'recv_into-{args.block_size}k', make_receiver_fetch(False)),
+    ]
+    if SPLICE_AVAILABLE:
+        variants.append((f'splice-{args.block_size}k', make_receiver_fetch(True)))
+
+    print(f"文件大小: {args.size} MB, 每种方式 {args.repeat} 次")
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, REMOTE_NAME)
+            for name, fetch in variants:
+                results.append((name, measure(fetch, server.port, path, size, args.repeat, block_size)))
+    finally:
+        server.stop()
+
+    baseline = statistics.median(dict(results)['recv-8k'])
+    print(f"{'方式':<20}{'中位数 MB/s':>14}{'最高 MB/s':>14}")
+    for name, rates in results:
+        median = statistics.median(rates)
+        print(f"{name:<20}{median:>14.1f}{max(rates):>14.1f}  x{median / baseline:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - I/O热点微基准测试
+每个测试项在独立子进程中运行（临时目录，复制 .env），取多次运行的中位数，并记录峰值内存:
+  env_loader        EnvLoader 初始化（读取 .env）
+  device_info/<N>   get_device_info 读取N台设备的设备清单
+  tftp/<KB>         TFTPClient.download_file 从本地TFTP替身服务器下载
+  ftp/<MB>          ALEInspection.download_file_via_ftp 从本地FTP替身服务器下载
+  compress/<N>      compress_and_email 压缩N台设备的日志（不发邮件）
+  pack/<MB>         LogStore 对一个日志文件切块（chunk_mbps）和打包旧巡检目录（pack_mbps）
+  mime/<MB>         send_email.build_message 生成带附件的邮件并序列化
+
+结果保存为JSON基线，之后的运行与基线比较，退化超过阈值时退出码为1。
+
+用法:
+    python benchmarks/bench_micro.py --save                 # 保存到 benchmarks/baselines/micro.json
+    python benchmarks/bench_micro.py --compare              # 与上次保存的基线比较
+    python benchmarks/bench_micro.py tftp ftp --repeat 5    # 只运行部分测试项
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import baseline
+from ftp_server import FTPStandIn
+from tftp_server import TFTPStandIn
+
+
+RESULT_MARKER = 'BENCH_RESULT '
+MB = 1024 * 1024
+
+
+def timed(repeat, run, setup=None):
+    """多次运行，返回耗时中位数(秒)和最后一次的返回值"""
+    times = []
+    value = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        value = run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), value
+
+
+# ---------------------------------------------------------------- 测试项（在子进程中运行）
+
+def case_env_loader(param, args):
+    from env_loader import EnvLoader
+    count = 200
+
+    def run():
+        # EnvLoader 每次加载都会打印提示
+        with redirect_stdout(io.StringIO()):
+            for _ in range(count):
+                EnvLoader('.env')
+
+    elapsed, _ = timed(args.repeat, run)
+    return {'init_us': round(elapsed / count * 1e6, 1)}
+
+
+def case_device_info(count, args):
+    from ale_simulator import device_addresses, write_inventory
+    from ale_daemon import DeviceInventory
+    write_inventory('template.xlsx', device_addresses(count), 22)
+    inventory = DeviceInventory('template.xlsx')
+    elapsed, devices = timed(args.repeat, lambda: list(inventory.get_device_info()))
+    if len(devices) != count:
+        raise RuntimeError(f"读取到 {len(devices)}/{count} 台设备")
+    return {'parse_ms': round(elapsed * 1000, 1), 'per_device_us': round(elapsed / count * 1e6, 1)}
+
+
+def case_tftp(size_kb, args):
+    from tftp_downloader import TFTPClient
+    size = size_kb * 1024
+
+    def run():
+        if not TFTPClient('127.0.0.1', args.tftp_port).download_file(f"file_{size_kb}k.bin", 'download.bin'):
+            raise RuntimeError("TFTP下载失败")
+
+    elapsed, _ = timed(args.repeat, run)
+    if os.path.getsize('download.bin') != size:
+        raise RuntimeError("TFTP下载大小不正确")
+    return {'elapsed_s': round(elapsed, 3), 'throughput_mbps': round(size / elapsed / MB, 2)}
+
+
+def case_ftp(size_mb, args):
+    from ale_inspection import ALEInspection
+    inspector = ALEInspection()
+    inspector.downloads.config['ftp_port'] = args.ftp_port
+    local_path = os.path.abspath('download.bin')
+
+    def setup():
+        if os.path.exists(local_path):
+            os.remove(local_path)
+
+    elapsed, _ = timed(args.repeat, lambda: inspector.download_file_via_ftp(
+        '127.0.0.1', f"file_{size_mb}m.bin", 'admin', 'password', local_path), setup)
+    if os.path.getsize(local_path) != size_mb * MB:
+        raise RuntimeError("FTP下载大小不正确")
+    return {'elapsed_s': round(elapsed, 3), 'throughput_mbps': round(size_mb * MB / elapsed / MB, 1)}
+
+
+def case_compress(count, args):
+    from ale_inspection import ALEInspection
+    from ale_simulator import LOG_FILES, LogFiles, device_addresses
+
+    inspector = ALEInspection()
+    # 只测压缩，不与上次巡检比较
+    inspector.log_store = None
+    logs = LogFiles(args.log_size * 1024)
+    total = 0
+    for device_ip in device_addresses(count):
+        device_dir = os.path.join(inspector.log_dir, f"{device_ip}_{inspector.logtime}")
+        os.makedirs(device_dir, exist_ok=True)
+        for name in LOG_FILES:
+            data = logs.get(device_ip, name)
+            with open(os.path.join(device_dir, f"{device_ip}_{name}"), 'wb') as f:
+                f.write(data)
+            total += len(data)
+        inspector.results.register(device_ip)
+        inspector.results.succeed(device_ip)
+    del logs
+
+    elapsed, _ = timed(args.repeat, lambda: inspector.compress_and_email([], notify=False))
+    zipped = sum(os.path.getsize(os.path.join(inspector.log_dir, name)) for name in os.listdir(inspector.log_dir)
+                 if name.endswith('.zip') and not name.startswith('all_devices_'))
+    return {'elapsed_s': round(elapsed, 3), 'throughput_mbps': round(total / elapsed / MB, 1),
+            'ratio': round(zipped / total, 3)}
+
+
+def case_pack(size_mb, args):
+    import log_store
+    from ale_simulator import build_body
+
+    # 分段生成日志，子进程的峰值内存只反映打包本身
+    source = os.path.abspath('source.log')
+    with open(source, 'wb') as f:
+        for seed in range(0, size_mb, 4):
+            f.write(build_body(min(4, size_mb - seed) * MB, seed=seed))
+    run_dir = os.path.join('LOG', '10.0.0.1_2026-01-01_00-00-00')
+
+    def scan():
+        with open(source, 'rb') as f:
+            return sum(len(chunk) for chunk in log_store.iter_chunks(f))
+
+    def setup():
+        shutil.rmtree('LOG', ignore_errors=True)
+        os.makedirs(run_dir)
+        shutil.copyfile(source, os.path.join(run_dir, 'tech_support.log'))
+
+    scan_elapsed, _ = timed(args.repeat, scan)
+    pack_elapsed, _ = timed(args.repeat, lambda: log_store.LogStore('LOG', log_store.get_default_config())
+                            .pack_run(run_dir), setup)
+    chunks_dir = os.path.join('LOG', '.store', 'chunks')
+    stored = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(chunks_dir)
+                 for name in names)
+    return {'chunk_mbps': round(size_mb / scan_elapsed, 1), 'pack_mbps': round(size_mb / pack_elapsed, 1),
+            'ratio': round(stored / (size_mb * MB), 3)}
+
+
+def case_mime(size_mb, args):
+    import send_email
+    # 每台设备一个压缩包，压缩后的内容接近随机数据
+    files = []
+    remaining = size_mb * MB
+    while remaining > 0:
+        chunk = min(remaining, 2 * MB)
+        path = os.path.abspath(f"device_{len(files) + 1}.zip")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(chunk))
+        files.append(path)
+        remaining -= chunk
+
+    config = send_email.get_default_config()
+    config.update({'sender_email': 'bench@example.com', 'receiver_email': 'ops@example.com',
+                   'max_attachment_size': size_mb + 1})
+    body = '<html><body>' + '<p>设备明细</p>' * 2000 + '</body></html>'
+    elapsed, text = timed(args.repeat, lambda: send_email.build_message(config, 'bench', body, files).as_string())
+    return {'build_ms': round(elapsed * 1000, 1), 'message_size': round(len(text) / MB, 1)}
+
+
+CASES = {
+    'env_loader': case_env_loader,
+    'device_info': case_device_info,
+    'tftp': case_tftp,
+    'ftp': case_ftp,
+    'compress': case_compress,
+    'pack': case_pack,
+    'mime': case_mime,
+}
+
+
+def run_child(name, args):
+    """子进程: 运行一个测试项，输出结果JSON"""
+    sys.path.insert(0, ROOT)
+    group, _, param = name.partition('/')
+    result = CASES[group](int(param.rstrip('kmKMB')) if param else None, args)
+    result['peak_rss_mb'] = baseline.peak_rss_mb()
+    print(RESULT_MARKER + json.dumps(result), flush=True)
+
+
+# ---------------------------------------------------------------- 主进程
+
+def case_names(args):
+    """按参数生成全部测试项名称"""
+    names = ['env_loader']
+    names += [f"device_info/{count}" for count in args.inventory_sizes]
+    names += [f"tftp/{size}k" for size in args.tftp_sizes]
+    names += [f"ftp/{size}m" for size in args.ftp_sizes]
+    names += [f"compress/{count}" for count in args.compress_devices]
+    names += [f"pack/{size}m" for size in args.pack_sizes]
+    names += [f"mime/{size}m" for size in args.mime_sizes]
+    if args.cases:
+        names = [name for name in names if name.split('/')[0] in args.cases or name in args.cases]
+    return names
+
+
+def start_servers(names):
+    """启动传输测试使用的FTP/TFTP替身服务器（在主进程中，不计入子进程内存）"""
+    tftp_files = {}
+    ftp_files = {}
+    for name in names:
+        group, _, param = name.partition('/')
+        if group == 'tftp':
+            tftp_files[f"file_{param}.bin"] = os.urandom(int(param[:-1]) * 1024)
+        elif group == 'ftp':
+            ftp_files[f"file_{param}.bin"] = os.urandom(int(param[:-1]) * MB)
+    return FTPStandIn(ftp_files).start(), TFTPStandIn(tftp_files).start()
+
+
+def run_case(name, args, ftp_port, tftp_port):
+    """在临时目录中用子进程运行一个测试项"""
+    workdir = tempfile.mkdtemp(prefix='ale_micro_')
+    try:
+        with open(os.path.join(ROOT, '.env'), 'r', encoding='utf-8') as f:
+            env_text = f.read()
+        with open(os.path.join(workdir, '.env'), 'w', encoding='utf-8') as f:
+            f.write(env_text + '\n# 基准测试\nLOG_CONSOLE_LEVEL=WARNING\nMETRICS_HTTP_PORT=0\n')
+        command = [sys.executable, os.path.abspath(__file__), '--child', name, '--repeat', str(args.repeat),
+                   '--ftp-port', str(ftp_port), '--tftp-port', str(tftp_port), '--log-size', str(args.log_size)]
+        result = subprocess.run(command, cwd=workdir, capture_output=True, text=True, encoding='utf-8',
+                                errors='replace', timeout=args.timeout)
+        for line in reversed(result.stdout.splitlines()):
+            if line.startswith(RESULT_MARKER):
+                return json.loads(line[len(RESULT_MARKER):])
+        raise RuntimeError(f"{name} 运行失败:\n{(result.stdout + result.stderr)[-2000:]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="I/O热点微基准测试")
+    parser.add_argument('cases', nargs='*', help="只运行这些测试项，如 tftp ftp/16m")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--ftp-port', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--tftp-port', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--repeat', type=int, default=3, help="每个测试项的运行次数（取中位数）")
+    parser.add_argument('--inventory-sizes', type=int, nargs='+', default=[100, 1000, 5000], help="设备清单台数")
+    parser.add_argument('--tftp-sizes', type=int, nargs='+', default=[64, 1024, 4096], help="TFTP文件大小(KB)")
+    parser.add_argument('--ftp-sizes', type=int, nargs='+', default=[1, 16, 64], help="FTP文件大小(MB)")
+    parser.add_argument('--compress-devices', type=int, nargs='+', default=[10, 50], help="压缩的设备数")
+    parser.add_argument('--log-size', type=int, default=1024, help="压缩测试每个日志文件的大小(KB)")
+    parser.add_argument('--pack-sizes', type=int, nargs='+', default=[16, 64], help="打包测试的日志大小(MB)")
+    parser.add_argument('--mime-sizes', type=int, nargs='+', default=[1, 10, 25], help="邮件附件总大小(MB)")
+    parser.add_argument('--timeout', type=int, default=1800, help="单个测试项的超时(秒)")
+    parser.add_argument('--save', nargs='?', const=baseline.default_path('micro'), help="保存为基线")
+    parser.add_argument('--compare', nargs='?', const=baseline.default_path('micro'), help="与基线比较")
+    parser.add_argument('--threshold', type=float, default=0.2, help="退化阈值（比例）")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args)
+        return
+
+    names = case_names(args)
+    ftp_server, tftp_server = start_servers(names)
+    results = {}
+    try:
+        for name in names:
+            results[name] = result = run_case(name, args, ftp_server.port, tftp_server.port)
+            print(f"{name:<20}" + '  '.join(f"{metric}={value}" for metric, value in result.items()))
+    finally:
+        ftp_server.stop()
+        tftp_server.stop()
+
+    regressions = 0
+    if args.compare:
+        regressions = baseline.check(results, args.compare, args.threshold)
+    if args.save:
+        baseline.save(args.save, results)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 启动耗时基准测试
+用 python -X importtime 测量各入口模块的导入耗时（中位数），并列出最重的依赖。
+可保存为JSON基线，之后与修改后的结果比较，退化超过阈值时退出码为1。
+
+用法:
+    python benchmarks/bench_startup.py --repeat 5 --save       # 保存到 benchmarks/baselines/startup.json
+    python benchmarks/bench_startup.py --repeat 5 --compare
+"""
+
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各工具的入口模块
+ENTRY_MODULES = ['ale_inspection', 'connect', 'send_email', 'tftp_downloader', 'ssh_transfer', 'log_retention']
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+
+def import_once(module):
+    """在新进程中导入模块一次
+
+    Returns:
+        tuple: (总耗时微秒, {直接依赖模块: 累计耗时微秒})
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败: {result.stderr.strip().splitlines()[-1:]}")
+    total = 0
+    children = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if depth == 1 and name == module:
+            total = cumulative
+        elif depth == 3:
+            # 入口模块直接导入的模块（缩进比入口模块多一级）
+            children[name] = children.get(name, 0) + cumulative
+    return total, children
+
+
+def measure(module, repeat):
+    """多次导入，返回总耗时中位数和最重的直接依赖(毫秒)"""
+    totals = []
+    children = {}
+    for _ in range(repeat):
+        total, once = import_once(module)
+        totals.append(total)
+        for name, value in once.items():
+            children.setdefault(name, []).append(value)
+    heaviest = sorted(((name, statistics.median(values) / 1000) for name, values in children.items()),
+                      key=lambda item: item[1], reverse=True)
+    return {
+        'median_ms': round(statistics.median(totals) / 1000, 1),
+        'min_ms': round(min(totals) / 1000, 1),
+        'heaviest': [[name, round(value, 1)] for name, value in heaviest[:5]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入口模块导入耗时比较")
+    parser.add_argument('modules', nargs='*', default=ENTRY_MODULES, help="要测量的模块")
+    parser.add_argument('--repeat', type=int, default=5, help="每个模块的测量次数")
+    parser.add_argument('--save', nargs='?', const=baseline.default_path('startup'), help="保存为基线")
+    parser.add_argument('--compare', nargs='?', const=baseline.default_path('startup'), help="与基线比较")
+    parser.add_argument('--threshold', type=float, default=0.2, help="退化阈值（比例）")
+    args = parser.parse_args()
+
+    before_results = baseline.load(args.compare)[0] if args.compare else {}
+
+    results = {}
+    print(f"{'模块':<18}{'中位数 ms':>12}{'最小 ms':>10}{'之前 ms':>10}  最重的直接依赖")
+    for module in args.modules:
+        results[module] = result = measure(module, args.repeat)
+        before = before_results.get(module, {}).get('median_ms')
+        change = f"{before:>10.1f}" if before is not None else f"{'-':>10}"
+        heaviest = ', '.join(f"{name} {value:.0f}" for name, value in result['heaviest'][:3])
+        print(f"{module:<18}{result['median_ms']:>12.1f}{result['min_ms']:>10.1f}{change}  {heaviest}")
+
+    regressions = 0
+    if args.compare:
+        # heaviest 不是数值，比较时自动跳过
+        regressions = baseline.check(results, args.compare, args.threshold)
+    if args.save:
+        baseline.save(args.save, results)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 基准测试用FTP服务器
+只用标准库实现的最小FTP服务器，从内存提供文件，
+支持 USER/PASS/TYPE/SIZE/MDTM/REST/PASV/EPSV/RETR/QUIT
+"""
+
+import socket
+import threading
+import time
+
+
+class FTPStandIn:
+    """本地FTP替身服务器
+
+    用法:
+        server = FTPStandIn({'tech_support.log': data})
+        server.start()
+        ftp.connect('127.0.0.1', server.port)
+        ...
+        server.stop()
+    """
+
+    def __init__(self, files, host='127.0.0.1', port=0, chunk=1024 * 1024):
+        self.files = files
+        self.host = host
+        self.chunk = chunk
+        self.mtime = time.strftime("%Y%m%d%H%M%S", time.gmtime())
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.port = self.listener.getsockname()[1]
+        self.running = False
+
+    def start(self):
+        """在后台线程中开始监听"""
+        self.listener.listen(16)
+        self.running = True
+        threading.Thread(target=self._accept_loop, name="ftp-standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        """停止监听"""
+        self.running = False
+        try:
+            self.listener.close()
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, peer = self.listener.accept()
+            except OSError:
+                break
+            if not self.accept_peer(peer[0]):
+                conn.close()
+                continue
+            threading.Thread(target=self._session, args=(conn,), daemon=True).start()
+
+    def accept_peer(self, address):
+        """是否接受该客户端地址的连接"""
+        return True
+
+    def get_file(self, name, address):
+        """获取文件内容，不存在时返回None
+
+        Args:
+            name: 文件名
+            address: 客户端连接的本地地址，子类可按地址返回不同设备的文件
+        """
+        return self.files.get(name)
+
+    def _session(self, conn):
+        """处理一个控制连接"""
+        reader = conn.makefile('rb')
+        address = conn.getsockname()[0]
+
+        def reply(text):
+            conn.sendall((text + '\r\n').encode())
+
+        data_listener = None
+        rest = 0
+        try:
+            reply('220 FTP stand-in ready')
+            for line in reader:
+                command = line.decode('utf-8', errors='replace').strip()
+                verb, _, arg = command.partition(' ')
+                verb = verb.upper()
+                if verb == 'USER':
+                    reply('331 Password required')
+                elif verb == 'PASS':
+                    reply('230 Logged in')
+                elif verb == 'TYPE':
+                    reply('200 Type set')
+                elif verb == 'SIZE':
+                    payload = self.get_file(arg, address)
+                    if payload is not None:
+                        reply(f'213 {len(payload)}')
+                    else:
+                        reply('550 No such file')
+                elif verb == 'MDTM':
+                    if self.get_file(arg, address) is not None:
+                        reply(f'213 {self.mtime}')
+                    else:
+                        reply('550 No such file')
+                elif verb == 'REST':
+                    rest = int(arg)
+                    reply(f'350 Restarting at {rest}')
+                elif verb in ('PASV', 'EPSV'):
+                    if data_listener:
+                        data_listener.close()
+                    data_listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    data_listener.bind((address, 0))
+                    data_listener.listen(1)
+                    port = data_listener.getsockname()[1]
+                    if verb == 'EPSV':
+                        reply(f'229 Entering Extended Passive Mode (|||{port}|)')
+                    else:
+                        reply(f"227 Entering Passive Mode ({address.replace('.', ',')},{port >> 8},{port & 255})")
+                elif verb == 'RETR':
+                    payload = self.get_file(arg, address)
+                    if payload is None or data_listener is None:
+                        reply('550 No such file')
+                        continue
+                    reply('150 Opening BINARY mode data connection')
+                    data_conn, _ = data_listener.accept()
+                    self._send(data_conn, payload, rest)
+                    data_listener.close()
+                    data_listener = None
+                    rest = 0
+                    reply('226 Transfer complete')
+                elif verb == 'QUIT':
+                    reply('221 Goodbye')
+                    break
+                else:
+                    reply('502 Command not implemented')
+        except OSError:
+            pass
+        finally:
+            if data_listener:
+                data_listener.close()
+            conn.close()
+
+    def _send(self, data_conn, payload, offset):
+        """从offset开始发送文件内容"""
+        view = memoryview(payload)
+        try:
+            for start in range(offset, len(payload), self.chunk):
+                data_conn.sendall(view[start:start + self.chunk])
+        except OSError:
+            pass
+        finally:
+            data_conn.close()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 基准测试用TFTP服务器
+只用标准库实现的最小TFTP服务器（RFC 1350 读请求，octet 模式），从内存提供文件；
+每个传输使用新的UDP端口，逐块等待ACK，超时重发
+"""
+
+import sys
+import socket
+import struct
+import threading
+
+# Linux 上 IP_PKTINFO 的取值，Python 未导出该常量
+IP_PKTINFO = getattr(socket, 'IP_PKTINFO', 8 if sys.platform.startswith('linux') else None)
+
+BLOCK_SIZE = 512
+
+
+class TFTPStandIn:
+    """本地TFTP替身服务器
+
+    用法:
+        server = TFTPStandIn({'tech_support.log': data})
+        server.start()
+        TFTPClient('127.0.0.1', server.port).download_file('tech_support.log', path)
+        ...
+        server.stop()
+    """
+
+    def __init__(self, files, host='127.0.0.1', port=0, timeout=2, retries=5):
+        self.files = files
+        self.host = host
+        self.timeout = timeout
+        self.retries = retries
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.port = self.socket.getsockname()[1]
+        # 监听 0.0.0.0 时通过 IP_PKTINFO 取得请求的目标地址，从该地址回复
+        self.pktinfo = host == '0.0.0.0' and IP_PKTINFO is not None
+        if self.pktinfo:
+            self.socket.setsockopt(socket.IPPROTO_IP, IP_PKTINFO, 1)
+        self.running = False
+
+    def start(self):
+        """在后台线程中开始监听"""
+        self.running = True
+        threading.Thread(target=self._request_loop, name="tftp-standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        """停止监听"""
+        self.running = False
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+
+    def accept_peer(self, address):
+        """是否接受该客户端地址的请求"""
+        return True
+
+    def get_file(self, name, address):
+        """获取文件内容，不存在时返回None
+
+        Args:
+            name: 文件名
+            address: 请求的目标地址，子类可按地址返回不同设备的文件
+        """
+        return self.files.get(name)
+
+    def sent(self, address, size):
+        """一个文件发送完成，子类可用于统计"""
+
+    def _request_loop(self):
+        while self.running:
+            try:
+                if self.pktinfo:
+                    packet, ancillary, _, peer = self.socket.recvmsg(1024, socket.CMSG_SPACE(12))
+                else:
+                    packet, peer = self.socket.recvfrom(1024)
+                    ancillary = []
+            except OSError:
+                break
+            # 只处理读请求(RRQ)
+            if len(packet) < 4 or struct.unpack('!H', packet[:2])[0] != 1 or not self.accept_peer(peer[0]):
+                continue
+            address = self.host if self.host != '0.0.0.0' else '127.0.0.1'
+            for level, kind, value in ancillary:
+                if level == socket.IPPROTO_IP and kind == IP_PKTINFO:
+                    # struct in_pktinfo { ifindex; spec_dst; addr }，addr 为客户端发送的目标地址
+                    address = socket.inet_ntoa(value[8:12])
+            name = packet[2:].split(b'\x00', 1)[0].decode('ascii', errors='replace')
+            threading.Thread(target=self._send, args=(address, peer, name), daemon=True).start()
+
+    def _send(self, address, peer, name):
+        """从新端口发送文件，等待每个块的ACK"""
+        data = self.get_file(name, address)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind((address, 0))
+            sock.settimeout(self.timeout)
+            if data is None:
+                sock.sendto(struct.pack('!HH', 5, 1) + b'File not found\x00', peer)
+                return
+            view = memoryview(data)
+            block = 1
+            # 文件长度正好是512的整数倍时，最后发送一个空块
+            for start in range(0, len(data) + 1, BLOCK_SIZE):
+                packet = struct.pack('!HH', 3, block & 0xFFFF) + view[start:start + BLOCK_SIZE]
+                for _ in range(self.retries):
+                    sock.sendto(packet, peer)
+                    try:
+                        ack, _ = sock.recvfrom(4)
+                    except socket.timeout:
+                        continue
+                    if ack[:2] == b'\x00\x04' and struct.unpack('!H', ack[2:4])[0] == block & 0xFFFF:
+                        break
+                else:
+                    return
+                block += 1
+            self.sent(address, len(data))
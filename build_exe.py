@@ -5,8 +5,10 @@
 """
 
 import os
-import subprocess
 import sys
+import time
+import argparse
+import subprocess
 
 def install_requirements():
     """安装打包所需的依赖"""
@@ -23,11 +25,39 @@ def install_requirements():
         except subprocess.CalledProcessError:
             print(f"✗ {req} 安装失败")
 
-def create_spec_file():
-    """创建PyInstaller配置文件"""
-
-    # 控制台版本spec文件
-    console_spec = '''
+APP_NAME = 'ALE网络运维工具包-控制台版'
+
+# 运行时用不到的模块，排除后减小体积和启动时需要加载的文件
+# （unittest 不能排除: netmiko 依赖的 invoke 导入了 unittest.mock）
+EXCLUDED_MODULES = ['tkinter', 'test', 'pydoc_data', 'lib2to3', 'xmlrpc',
+                    'IPython', 'matplotlib', 'PIL', 'pytest']
+
+
+def create_spec_file(with_pandas=False, onefile=False, runtime_tmpdir=None):
+    """创建PyInstaller配置文件
+
+    默认生成 onedir 目录版: 启动时不需要解压，适合计划任务频繁运行；
+    onefile 单文件版每次启动都要把全部依赖解压到临时目录。
+
+    Args:
+        with_pandas: 是否打包pandas（全网统计分析需要，exe体积和启动时间明显增加）
+        onefile: 是否生成单文件版
+        runtime_tmpdir: 单文件版的解压目录，None表示系统临时目录
+    """
+    hiddenimports = ['openpyxl', 'netmiko', 'paramiko', 'scp', 'email', 'smtplib', 'ftplib', 'zipfile']
+    excludes = list(EXCLUDED_MODULES)
+    # numpy 只在打包旧巡检目录时导入（日志切块快约20倍），不影响启动时间
+    hiddenimports.append('numpy')
+    if with_pandas:
+        hiddenimports.append('pandas')
+    else:
+        # 没有pandas时全网统计分析自动跳过
+        excludes.append('pandas')
+    # Windows上没有strip工具
+    strip = os.name != 'nt'
+
+    # optimize=1 去掉assert；不用2，部分依赖运行时读取docstring
+    analysis = f'''
 # -*- mode: python ; coding: utf-8 -*-
 
 block_cipher = None
@@ -42,28 +72,24 @@ a = Analysis(
         ('README.md', '.'),
         ('README_CN.md', '.'),
     ],
-    hiddenimports=[
-        'openpyxl',
-        'pandas',
-        'netmiko',
-        'paramiko',
-        'email',
-        'smtplib',
-        'ftplib',
-        'zipfile'
-    ],
+    hiddenimports={hiddenimports!r},
     hookspath=[],
-    hooksconfig={},
+    hooksconfig={{}},
     runtime_hooks=[],
-    excludes=[],
+    excludes={excludes!r},
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
     noarchive=False,
+    optimize=1,
 )
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+'''
 
+    if onefile:
+        # 单文件版，每次启动解压到 runtime_tmpdir
+        bundle = f'''
 exe = EXE(
     pyz,
     a.scripts,
@@ -71,13 +97,13 @@ exe = EXE(
     a.zipfiles,
     a.datas,
     [],
-    name='ALE网络运维工具包-控制台版',
+    name={APP_NAME!r},
     debug=False,
     bootloader_ignore_signals=False,
-    strip=False,
+    strip={strip},
     upx=True,
     upx_exclude=[],
-    runtime_tmpdir=None,
+    runtime_tmpdir={runtime_tmpdir!r},
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -86,32 +112,107 @@ exe = EXE(
     entitlements_file=None,
 )
 '''
+    else:
+        # 目录版，依赖直接放在exe旁边；不用UPX，压缩过的DLL每次加载都要解压
+        bundle = f'''
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name={APP_NAME!r},
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip={strip},
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
 
-
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    strip={strip},
+    upx=False,
+    upx_exclude=[],
+    name={APP_NAME!r},
+)
+'''
+    console_spec = analysis + bundle
 
     with open('ale_console.spec', 'w', encoding='utf-8') as f:
         f.write(console_spec)
 
     print("✓ 配置文件创建完成:")
-    print("  - ale_console.spec (控制台版)")
+    print(f"  - ale_console.spec (控制台{'单文件' if onefile else '目录'}版)")
+
+def exe_path(onefile=False):
+    """打包生成的可执行文件路径"""
+    filename = APP_NAME + ('.exe' if os.name == 'nt' else '')
+    if onefile:
+        return os.path.join('dist', filename)
+    return os.path.join('dist', APP_NAME, filename)
+
 
-def build_exe():
+def build_exe(onefile=False):
     """执行打包"""
-    print("开始打包控制台版本...")
-    build_console()
+    print(f"开始打包控制台{'单文件' if onefile else '目录'}版本...")
+    return build_console(onefile)
 
-def build_console():
+def build_console(onefile=False):
     """打包控制台版本"""
     print("打包控制台版本...")
     try:
-        subprocess.check_call(["pyinstaller", "ale_console.spec"])
+        subprocess.check_call(["pyinstaller", "--noconfirm", "ale_console.spec"])
         print("✓ 控制台版打包成功！")
-        print("可执行文件: dist/ALE网络运维工具包-控制台版.exe")
+        print(f"可执行文件: {exe_path(onefile)}")
+        return True
     except subprocess.CalledProcessError:
         print("✗ 控制台版打包失败")
+        return False
+
+def measure_launch(path, runs=5):
+    """测量exe启动耗时
+
+    用 --self-test 启动（导入全部按需加载的依赖后退出），第一次为冷启动。
+
+    Returns:
+        list: 每次启动的秒数，启动失败时返回空列表
+    """
+    times = []
+    for index in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([path, '--self-test'], capture_output=True, text=True,
+                                encoding='utf-8', errors='replace')
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"✗ 启动检查失败:\n{result.stdout}{result.stderr}")
+            return []
+        times.append(elapsed)
+        print(f"  第{index + 1}次启动: {elapsed:.2f}秒{' (冷启动)' if index == 0 else ''}")
+    warm = sorted(times[1:])
+    if warm:
+        print(f"✓ 启动耗时: 冷启动 {times[0]:.2f}秒, 之后中位数 {warm[len(warm) // 2]:.2f}秒")
+    return times
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="ALE网络运维工具包 - 打包脚本")
+    parser.add_argument('--onefile', action='store_true',
+                        help="生成单文件exe（每次启动都要解压，启动较慢）")
+    parser.add_argument('--runtime-tmpdir', default=None,
+                        help="单文件版的解压目录，如本地磁盘上的固定目录")
+    parser.add_argument('--with-pandas', action='store_true', help="打包pandas，启用全网统计分析")
+    parser.add_argument('--launch-runs', type=int, default=5, help="打包后测量启动耗时的次数，0表示不测量")
+    parser.add_argument('--skip-install', action='store_true', help="不安装打包依赖")
+    args = parser.parse_args()
+
     print("ALE网络运维工具包 - 打包脚本")
     print("=" * 50)
     
@@ -126,17 +227,27 @@ def main():
         return
     
     # 安装依赖
-    install_requirements()
+    if not args.skip_install:
+        install_requirements()
     
     # 创建配置文件
-    create_spec_file()
+    create_spec_file(with_pandas=args.with_pandas, onefile=args.onefile, runtime_tmpdir=args.runtime_tmpdir)
     
     # 执行打包
-    build_exe()
+    if not build_exe(args.onefile):
+        return
+
+    # 测量启动耗时
+    if args.launch_runs:
+        print("\n测量启动耗时...")
+        measure_launch(exe_path(args.onefile), args.launch_runs)
     
     print("\n打包完成！")
     print("使用说明:")
-    print("1. 将生成的exe文件复制到目标机器")
+    if args.onefile:
+        print("1. 将生成的exe文件复制到目标机器")
+    else:
+        print(f"1. 将 dist/{APP_NAME} 整个目录复制到目标机器")
     print("2. 确保template.xlsx和.env文件在同一目录")
     print("3. 双击运行exe文件或在命令行中执行")
 
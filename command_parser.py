@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 命令输出解析模块
+按厂商用正则模板解析常规命令的回显（类似TextFSM模板），
+解析结果按列保存，供全网统计分析使用
+"""
+
+import re
+import threading
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+# 各表的列，解析不到的字段为None
+TABLE_COLUMNS = {
+    'version': ['device', 'vendor', 'device_type', 'model', 'version', 'serial', 'uptime'],
+    'interface': ['device', 'vendor', 'device_type', 'interface', 'status',
+                  'in_packets', 'out_packets', 'in_errors', 'out_errors', 'crc'],
+}
+
+INT_FIELDS = {'in_packets', 'out_packets', 'in_errors', 'out_errors', 'crc'}
+
+UPTIME_UNITS = {
+    'year': 365 * 86400,
+    'week': 7 * 86400,
+    'day': 86400,
+    'hour': 3600,
+    'minute': 60,
+    'second': 1,
+}
+UPTIME_PART = re.compile(r'(\d+)\s*(year|week|day|hour|minute|second)', re.IGNORECASE)
+
+
+def parse_uptime(text):
+    """把 '1 year, 2 weeks, 3 days, 4 hours, 5 minutes' 转换为秒数"""
+    parts = UPTIME_PART.findall(text or '')
+    if not parts:
+        return None
+    return sum(int(value) * UPTIME_UNITS[unit.lower()] for value, unit in parts)
+
+
+def convert(field, value):
+    """按字段类型转换解析出的文本"""
+    if value is None:
+        return None
+    value = value.strip()
+    if field in INT_FIELDS:
+        return int(value)
+    if field == 'uptime':
+        return parse_uptime(value)
+    return value
+
+
+class CommandTemplate:
+    """一个命令的解析模板
+
+    三种形式:
+      fields: 整个回显只产生一条记录，每个字段一个正则（取第一个分组）
+      row:    表格每行一条记录，正则的命名分组即字段
+      block:  按 block 正则切分为多段（如每个接口一段），每段用 fields 提取
+    """
+
+    def __init__(self, table, command, fields=None, row=None, block=None):
+        self.table = table
+        self.command = re.compile(command, re.IGNORECASE)
+        self.fields = {name: re.compile(pattern, re.MULTILINE) for name, pattern in (fields or {}).items()}
+        self.row = re.compile(row, re.MULTILINE) if row else None
+        self.block = re.compile(block, re.MULTILINE) if block else None
+
+    def _extract(self, text):
+        """提取 fields 中的字段"""
+        record = {}
+        for name, pattern in self.fields.items():
+            match = pattern.search(text)
+            record[name] = convert(name, match.group(1)) if match else None
+        return record
+
+    def parse(self, output):
+        """解析命令回显
+
+        Returns:
+            list: 记录列表
+        """
+        if self.row:
+            return [{name: convert(name, value) for name, value in match.groupdict().items()}
+                    for match in self.row.finditer(output)]
+
+        if self.block:
+            starts = list(self.block.finditer(output))
+            records = []
+            for index, match in enumerate(starts):
+                end = starts[index + 1].start() if index + 1 < len(starts) else len(output)
+                record = {name: convert(name, value) for name, value in match.groupdict().items()}
+                record.update(self._extract(output[match.end():end]))
+                records.append(record)
+            return records
+
+        record = self._extract(output)
+        return [record] if any(value is not None for value in record.values()) else []
+
+
+CISCO_TEMPLATES = [
+    CommandTemplate(
+        'version', r'^sh(ow)?\s+ver(sion)?$',
+        fields={
+            'version': r'\bVersion\s+([^\s,]+)',
+            'model': r'^[Cc]isco\s+(\S+)\s+\(.*\)\s+processor',
+            'serial': r'^Processor board ID\s+(\S+)',
+            'uptime': r'\buptime is\s+(.+)$',
+        },
+    ),
+    CommandTemplate(
+        'interface', r'^sh(ow)?\s+int(erfaces?)?$',
+        block=r'^(?P<interface>\S+) is (?:administratively )?(?P<status>up|down)\b',
+        fields={
+            'in_packets': r'(\d+) packets input',
+            'in_errors': r'(\d+) input errors',
+            'crc': r'(\d+) CRC',
+            'out_packets': r'(\d+) packets output',
+            'out_errors': r'(\d+) output errors',
+        },
+    ),
+    CommandTemplate(
+        'interface', r'^sh(ow)?\s+int(erfaces?)?\s+status$',
+        row=r'^(?P<interface>[A-Za-z][\w\-]*\d[\d/.:]*)\s+.*?\s'
+            r'(?P<status>connected|notconnect|disabled|err-disabled|sfpAbsent|monitoring)\s',
+    ),
+]
+
+HUAWEI_TEMPLATES = [
+    CommandTemplate(
+        'version', r'^dis(play)?\s+ver(sion)?$',
+        fields={
+            'version': r'\b(V\d{3}R\d{3}\w*)',
+            'model': r'^(?:HUAWEI|Huawei)\s+(\S+)\s+(?:Routing Switch\s+)?uptime is',
+            'uptime': r'\buptime is\s+(.+)$',
+        },
+    ),
+    CommandTemplate(
+        'interface', r'^dis(play)?\s+int(erface)?\s+br(ief)?$',
+        # Interface  PHY  Protocol  InUti  OutUti  inErrors  outErrors
+        row=r'^(?P<interface>[A-Za-z][\w\-/.:]*\d)\s+(?P<status>\*?(?:up|down)\S*)\s+\S+\s+\S+\s+\S+'
+            r'\s+(?P<in_errors>\d+)\s+(?P<out_errors>\d+)\s*$',
+    ),
+    CommandTemplate(
+        'interface', r'^dis(play)?\s+int(erface)?$',
+        block=r'^(?P<interface>\S+) current state\s*:\s*(?P<status>\S+)',
+        fields={
+            'in_packets': r'Input\s*:\s*(\d+) packets',
+            'out_packets': r'Output\s*:\s*(\d+) packets',
+            'in_errors': r'(?:Input errors?|Total Error)\s*:\s*(\d+)',
+            'out_errors': r'Output errors?\s*:\s*(\d+)',
+            'crc': r'CRC\s*:\s*(\d+)',
+        },
+    ),
+]
+
+H3C_TEMPLATES = [
+    CommandTemplate(
+        'version', r'^dis(play)?\s+ver(sion)?$',
+        fields={
+            'version': r'\bRelease\s+(\w+)',
+            'model': r'^H3C\s+(\S+)\s+uptime is',
+            'uptime': r'\buptime is\s+(.+)$',
+        },
+    ),
+    HUAWEI_TEMPLATES[2],
+]
+
+# 厂商名称与 device_registry 中的厂商名称一致
+VENDOR_TEMPLATES = {
+    'Cisco': CISCO_TEMPLATES,
+    'Arista': CISCO_TEMPLATES,
+    '华为': HUAWEI_TEMPLATES,
+    'H3C': H3C_TEMPLATES,
+}
+
+
+def normalize_command(command):
+    """统一命令的大小写和空格"""
+    return ' '.join(command.lower().split())
+
+
+def parse_output(vendor, command, output):
+    """用厂商模板解析一条命令的回显
+
+    Returns:
+        tuple: (表名, 记录列表)，没有匹配的模板时返回 (None, [])
+    """
+    command = normalize_command(command)
+    for template in VENDOR_TEMPLATES.get(vendor, ()):
+        if template.command.match(command):
+            return template.table, template.parse(output)
+    return None, []
+
+
+class ColumnStore:
+    """按列保存解析结果，多线程安全
+
+    每张表是 {列名: 值列表}，可以直接生成 pandas DataFrame。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {table: {column: [] for column in columns} for table, columns in TABLE_COLUMNS.items()}
+
+    def add(self, table, device_ip, vendor, device_type, records):
+        """追加一台设备的记录"""
+        if not records:
+            return
+        columns = TABLE_COLUMNS[table]
+        with self.lock:
+            data = self.tables[table]
+            for record in records:
+                record = dict(record, device=device_ip, vendor=vendor, device_type=device_type)
+                for column in columns:
+                    data[column].append(record.get(column))
+
+    def parse(self, device_ip, vendor, device_type, command, output):
+        """解析命令回显并保存，返回记录数"""
+        try:
+            table, records = parse_output(vendor, command, output)
+        except Exception as e:
+            logger.debug(f"解析命令输出失败 {device_ip}/{command}: {e}")
+            return 0
+        if table:
+            self.add(table, device_ip, vendor, device_type, records)
+        return len(records)
+
+    def row_count(self, table):
+        """表中的记录数"""
+        with self.lock:
+            return len(self.tables[table]['device'])
+
+    def columns(self):
+        """获取所有非空表的列数据副本"""
+        with self.lock:
+            return {table: {column: list(values) for column, values in data.items()}
+                    for table, data in self.tables.items() if data['device']}
@@ -1,11 +1,11 @@
 from datetime import datetime
-from multiprocessing import pool
-from multiprocessing.pool import ThreadPool
 
-import pandas as pd
-from netmiko import ConnectHandler, NetmikoTimeoutException
-from openpyxl.reader.excel import load_workbook
-from paramiko.ssh_exception import AuthenticationException, SSHException
+from log_setup import get_logger, setup_logging, device_context
+from result_registry import ResultRegistry
+from device_record import DeviceRecord, CommandListCache
+from scheduler import DeviceScheduler
+
+logger = get_logger(__name__)
 
 
 # Press Shift+F10 to execute it or replace it with your code.
@@ -15,39 +15,46 @@ class BackupConfig(object):
 
 
     def __init__(self):
+        setup_logging()
         self.device_file = "template.xlsx"
-        self.pool = ThreadPool(10)
-        self.success = []
-        self.fail = []
+        self.scheduler = DeviceScheduler()
+        self.results = ResultRegistry()
+
+    @property
+    def success(self):
+        return self.results.successful()
+
+    @property
+    def fail(self):
+        return self.results.failed()
+
     def load_excel(self):
+        from openpyxl.reader.excel import load_workbook
         try:
             wb=load_workbook(self.device_file)
             return wb
         except FileNotFoundError:
-            print("{}File Not Found".format(self.device_file))
+            logger.error("{}File Not Found".format(self.device_file))
 
     def get_device_info(self):
 
          try:
              wb = self.load_excel()
              ws1 = wb[wb.sheetnames[0]]
-             for row in ws1.iter_rows(min_row=2,max_col=9):
+             cmd_lists = CommandListCache(wb, self.get_cmd_info)
+             for row in ws1.iter_rows(min_row=2,max_col=10):
                  if str(row[1].value).strip() == '#':
                      continue
-                 info_dict = {'ip': row[2].value,
-                              'protocol': row[3].value,
-                              'port': row[4].value,
-                              'username': row[5].value,
-                              'password': row[6].value,
-                              'secret': row[7].value,
-                              'device_type': row[8].value,
-                              'cmd_list': self.get_cmd_info(wb[row[8].value.lower().strip()])
-
-                 }
-                 yield info_dict
+                 device = DeviceRecord.from_row(row)
+                 cmd_list = cmd_lists.get(device.device_type)
+                 if cmd_list is None:
+                     logger.error("Sheet Not Found: {}".format(device.device_type))
+                 else:
+                     device.cmd_list = cmd_list
+                 yield device
 
          except Exception as e:
-             print("ERROR:",e)
+             logger.error("ERROR: {}".format(e))
 
          finally:
              pass
@@ -63,66 +70,56 @@ class BackupConfig(object):
             return cmd_list
 
         except Exception as e:
-            print("get_cmd_info Error:",e)
+            logger.error("get_cmd_info Error: {}".format(e))
 
 
     def connectHandler(self,host):
+        # netmiko/paramiko 在第一次连接时才导入
+        from netmiko import ConnectHandler, NetmikoTimeoutException
+        from paramiko.ssh_exception import AuthenticationException, SSHException
         try:
-            connect = ''
-            if host['protocol'].lower().strip() == 'ssh':
-                host['port'] = host['port'] if (host['port'] not in [22,None]) else 22
-                host.pop('protocol'),host.pop('cmd_list')
-
-                if 'huawei' in host['device_type']:
-                    connect = ConnectHandler(**host,conn_timeout=15)
-                else:
-                    connect = ConnectHandler(**host)
-
-            elif host['protocol'].lower().strip() == 'telnet':
-                host['port'] = host['port'] if (host['port'] not in [23, None]) else 23
-                host.pop('protocol'), host.pop('cmd_list')
-                host['device_type'] = host['device_type'] + '_telnet'
-
-                connect = ConnectHandler(**host,fast_cli=False)
-
-            else:
-                res = "{}_Not_Support_Protocol".format(host['ip'],host['protocol'])
-                raise ValueError(res)
+            # telnet 关闭 fast_cli 等连接参数由设备类型注册表提供
+            connect = ConnectHandler(**host.connection_params())
 
             return connect
 
         except NetmikoTimeoutException as e:
-            res = "Failed connect: {}".format(host['ip'])
-            print(res)
-            self.fail.append(host['ip'])
+            res = "Failed connect: {}".format(host.ip)
+            logger.error(res)
+            self.results.fail(host.ip, e, phase='connect')
             return None
 
         except AuthenticationException as e:
-            res = "Failed Auth: {}".format(host['ip'])
-            print(res)
-            self.fail.append(host['ip'])
+            res = "Failed Auth: {}".format(host.ip)
+            logger.error(res)
+            self.results.fail(host.ip, e, phase='connect')
             return None
 
         except SSHException as e:
-            res = "Failed SSH: {}".format(host['ip'])
-            print(res)
-            self.fail.append(host['ip'])
+            res = "Failed SSH: {}".format(host.ip)
+            logger.error(res)
+            self.results.fail(host.ip, e, phase='connect')
             return None
 
         except Exception as e:
-            print("connectionHandler Failed: {} - {}".format(host['ip'], e))
-            self.fail.append(host['ip'])
+            logger.error("connectionHandler Failed: {} - {}".format(host.ip, e))
+            self.results.fail(host.ip, e, phase='connect')
             return None
 
     def run_cmd(self,host,cmds,enable=False):
-        enable = True if host['secret'] else False
+        enable = True if host.secret else False
+
+        with device_context(host.ip):
+            self._run_cmd(host,cmds,enable)
 
+    def _run_cmd(self,host,cmds,enable):
+        self.results.start(host.ip)
         try:
             conn = self.connectHandler(host)
 
             if conn:
                 hostname = conn.find_prompt()
-                print(f"成功连接到设备: {host['ip']} ({hostname})")
+                logger.info(f"成功连接到设备: {host.ip} ({hostname})")
 
                 if cmds:
                     output = ''
@@ -136,23 +133,20 @@ class BackupConfig(object):
                                 result = conn.send_command(cmd, strip_command=False, strip_prompt=False)
                                 output += f"\n命令: {cmd}\n{result}\n"
                         except Exception as cmd_e:
-                            print(f"命令执行失败 {cmd}: {cmd_e}")
+                            logger.warning(f"命令执行失败 {cmd}: {cmd_e}")
                             output += f"\n命令: {cmd}\n错误: {cmd_e}\n"
 
-                    print(f"设备 {host['ip']} 命令执行完成")
-                    if host['ip'] not in self.success:
-                        self.success.append(host['ip'])
+                    logger.info(f"设备 {host.ip} 命令执行完成")
+                    self.results.succeed(host.ip)
                 else:
-                    print(f"设备 {host['ip']} 无命令需要执行")
-                    if host['ip'] not in self.success:
-                        self.success.append(host['ip'])
+                    logger.info(f"设备 {host.ip} 无命令需要执行")
+                    self.results.succeed(host.ip)
 
                 conn.disconnect()
 
         except Exception as e:
-            print(f"run_cmd Failed: {host['ip']} - {e}")
-            if host['ip'] not in self.fail:
-                self.fail.append(host['ip'])
+            logger.error(f"run_cmd Failed: {host.ip} - {e}")
+            self.results.fail(host.ip, e)
 
     def connect_t(self):
         """连接测试方法"""
@@ -163,7 +157,7 @@ class BackupConfig(object):
             self.test_connection(host)
 
         end_time = datetime.now()
-        print("连接测试完成,耗时:{:0.2f}s".format((end_time-start_time).total_seconds()))
+        logger.info("连接测试完成,耗时:{:0.2f}s".format((end_time-start_time).total_seconds()))
 
     def test_connection(self, host):
         """测试单个设备连接"""
@@ -171,18 +165,15 @@ class BackupConfig(object):
             conn = self.connectHandler(host)
             if conn:
                 hostname = conn.find_prompt()
-                print(f"连接测试成功: {host['ip']} - {hostname}")
-                if host['ip'] not in self.success:
-                    self.success.append(host['ip'])
+                logger.info(f"连接测试成功: {host.ip} - {hostname}")
+                self.results.succeed(host.ip)
                 conn.disconnect()
             else:
-                print(f"连接测试失败: {host['ip']}")
-                if host['ip'] not in self.fail:
-                    self.fail.append(host['ip'])
+                logger.warning(f"连接测试失败: {host.ip}")
+                self.results.fail(host.ip, phase='connect')
         except Exception as e:
-            print(f"连接测试异常: {host['ip']} - {e}")
-            if host['ip'] not in self.fail:
-                self.fail.append(host['ip'])
+            logger.error(f"连接测试异常: {host.ip} - {e}")
+            self.results.fail(host.ip, e)
 
     def connect_test(self):
         pass
@@ -193,13 +184,15 @@ class BackupConfig(object):
 
         hosts = self.get_device_info()
         for host in hosts:
-            #self.run_cmd(host,host['cmd_list'])
-            self.pool.apply_async(self.run_cmd, args=(host,host['cmd_list']))
-        self.pool.close()
-        self.pool.join()
+            self.results.register(host.ip, host.device_type)
+            self.scheduler.submit(host)
+        self.scheduler.run(lambda host: self.run_cmd(host,host.cmd_list))
 
         end_time = datetime.now()
-        print("complete,time:{:0.2f}s".format((end_time-start_time).total_seconds()))
+        logger.info("complete,time:{:0.2f}s".format((end_time-start_time).total_seconds()))
+        logger.info("success: {}, fail: {}".format(len(self.success), len(self.fail)))
+        for reason, count in self.results.failure_reasons().items():
+            logger.info("  {}: {}".format(reason, count))
 
 if __name__ == '__main__':
     BackupConfig().connect()
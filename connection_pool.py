@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 连接池模块
+常驻模式下保留巡检结束后的netmiko会话，同一设备的下一次巡检直接复用，
+省去SSH握手和认证；空闲超时的会话由后台线程关闭
+"""
+
+import time
+import threading
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+def pool_key(host):
+    """连接参数相同的会话才能复用"""
+    return (host.ip, host.protocol, host.connect_port, host.username, host.device_type)
+
+
+def close_quietly(connection):
+    """断开会话，忽略错误"""
+    try:
+        connection.disconnect()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """netmiko 会话池
+
+    会话在使用期间从池中取出，由一个巡检线程独占，用完后放回；
+    放回前会话出错（失败、超时被关闭）的直接断开，不再复用。
+    """
+
+    def __init__(self, max_idle=50, idle_timeout=240):
+        """
+        Args:
+            max_idle: 最多保留的空闲会话数
+            idle_timeout: 空闲超过该秒数的会话被关闭，应小于设备的会话超时时间
+        """
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.stats = {'created': 0, 'reused': 0, 'stale': 0, 'expired': 0}
+        self.stopped = threading.Event()
+        self.reaper = None
+
+    def start(self):
+        """启动空闲会话清理线程"""
+        if self.reaper is None:
+            self.reaper = threading.Thread(target=self._reap_loop, name="pool-reaper", daemon=True)
+            self.reaper.start()
+        return self
+
+    def idle_count(self):
+        """空闲会话数"""
+        with self.lock:
+            return sum(len(sessions) for sessions in self.idle.values())
+
+    def acquire(self, host, connect):
+        """取出设备的空闲会话，没有可用会话时新建
+
+        Args:
+            host: DeviceRecord
+            connect: 新建会话的函数
+
+        Returns:
+            tuple: (会话, 是否复用)
+        """
+        key = pool_key(host)
+        while True:
+            with self.lock:
+                sessions = self.idle.get(key)
+                if not sessions:
+                    break
+                connection, _ = sessions.pop()
+                if not sessions:
+                    del self.idle[key]
+            # 设备可能已经关闭了空闲会话
+            try:
+                alive = connection.is_alive()
+            except Exception:
+                alive = False
+            if alive:
+                with self.lock:
+                    self.stats['reused'] += 1
+                logger.debug(f"复用连接: {host.ip}")
+                return connection, True
+            with self.lock:
+                self.stats['stale'] += 1
+            close_quietly(connection)
+
+        connection = connect()
+        with self.lock:
+            self.stats['created'] += 1
+        return connection, False
+
+    def release(self, host, connection, reusable=True):
+        """放回会话，不可复用或池已满时断开"""
+        if reusable and not self.stopped.is_set():
+            with self.lock:
+                if sum(len(sessions) for sessions in self.idle.values()) < self.max_idle:
+                    self.idle.setdefault(pool_key(host), []).append((connection, time.monotonic()))
+                    return
+        close_quietly(connection)
+
+    def reap(self):
+        """关闭空闲超时的会话
+
+        Returns:
+            int: 关闭的会话数
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self.lock:
+            for key in list(self.idle):
+                keep = [(connection, since) for connection, since in self.idle[key] if since >= cutoff]
+                expired.extend(connection for connection, since in self.idle[key] if since < cutoff)
+                if keep:
+                    self.idle[key] = keep
+                else:
+                    del self.idle[key]
+            self.stats['expired'] += len(expired)
+        for connection in expired:
+            close_quietly(connection)
+        return len(expired)
+
+    def _reap_loop(self):
+        """定期清理空闲会话"""
+        interval = max(1.0, min(30.0, self.idle_timeout / 4))
+        while not self.stopped.wait(interval):
+            count = self.reap()
+            if count:
+                logger.debug(f"关闭 {count} 个空闲连接")
+
+    def close(self):
+        """关闭所有空闲会话并停止清理线程"""
+        self.stopped.set()
+        with self.lock:
+            sessions = [connection for items in self.idle.values() for connection, _ in items]
+            self.idle.clear()
+        for connection in sessions:
+            close_quietly(connection)
+        logger.info(f"连接池已关闭: 新建 {self.stats['created']}, 复用 {self.stats['reused']}, "
+                    f"失效 {self.stats['stale']}, 超时关闭 {self.stats['expired']}")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 设备记录模块
+使用 __slots__ 的紧凑设备记录，同一工作表的命令列表在所有设备间共享，
+连接参数在连接时才生成，不修改设备记录本身
+"""
+
+import sys
+
+from device_registry import get_profile
+
+
+DEFAULT_PORTS = {
+    'ssh': 22,
+    'telnet': 23,
+}
+
+
+def intern_text(value):
+    """规范化并驻留字符串，大量设备共用同一个对象"""
+    if value is None:
+        return ''
+    return sys.intern(str(value).strip())
+
+
+class CommandListCache:
+    """按工作表缓存命令列表
+
+    同一设备类型的所有设备共享同一个元组，工作表只读取一次。
+    """
+
+    def __init__(self, workbook, reader):
+        self.workbook = workbook
+        self.reader = reader
+        self.cache = {}
+
+    def get(self, device_type):
+        """获取设备类型对应的命令列表，工作表不存在时返回None"""
+        sheet_name = device_type.lower().strip()
+        if sheet_name not in self.cache:
+            if sheet_name in self.workbook.sheetnames:
+                self.cache[sheet_name] = tuple(self.reader(self.workbook[sheet_name]) or ())
+            else:
+                self.cache[sheet_name] = None
+        return self.cache[sheet_name]
+
+
+class DeviceRecord:
+    """设备清单中的一行
+
+    属性只在读取Excel时赋值，连接所需的参数由 connection_params() 生成，
+    telnet 后缀和默认端口都不会写回记录。
+    """
+
+    __slots__ = ('ip', 'protocol', 'port', 'username', 'password', 'secret', 'device_type', 'cmd_list', 'site')
+
+    def __init__(self, ip, protocol, port, username, password, secret, device_type, cmd_list=(), site=None):
+        self.ip = str(ip).strip() if ip is not None else ''
+        self.protocol = intern_text(protocol).lower()
+        self.port = port
+        self.username = username
+        self.password = password
+        self.secret = secret
+        self.device_type = intern_text(device_type)
+        self.cmd_list = cmd_list
+        self.site = intern_text(site)
+
+    @classmethod
+    def from_row(cls, row, cmd_list=()):
+        """从设备清单工作表的一行创建记录
+
+        列顺序: 序号, 状态, 设备IP, 协议, 端口, 用户名, 密码, 特权密码, 设备类型, 站点(可选)
+        """
+        return cls(
+            ip=row[2].value,
+            protocol=row[3].value,
+            port=row[4].value,
+            username=row[5].value,
+            password=row[6].value,
+            secret=row[7].value,
+            device_type=row[8].value,
+            cmd_list=cmd_list,
+            site=row[9].value if len(row) > 9 else None,
+        )
+
+    @property
+    def netmiko_device_type(self):
+        """netmiko使用的设备类型，telnet连接需要加 _telnet 后缀"""
+        if self.protocol == 'telnet' and not self.device_type.endswith('_telnet'):
+            return self.device_type + '_telnet'
+        return self.device_type
+
+    @property
+    def connect_port(self):
+        """连接端口，未填写时使用协议默认端口"""
+        return self.port if self.port else DEFAULT_PORTS.get(self.protocol)
+
+    def connection_params(self, **extra):
+        """生成 netmiko ConnectHandler 的参数
+
+        Args:
+            **extra: 附加参数，覆盖设备类型的默认值
+
+        Raises:
+            ValueError: 协议不是 ssh 或 telnet
+        """
+        if self.protocol not in DEFAULT_PORTS:
+            raise ValueError(f"{self.ip}_Not_Support_Protocol: {self.protocol or '未填写'}")
+
+        params = {
+            'device_type': self.netmiko_device_type,
+            'host': self.ip,
+            'username': self.username,
+            'password': self.password,
+            'port': self.connect_port,
+        }
+        if self.secret:
+            params['secret'] = self.secret
+        # 连接超时、telnet的fast_cli等按设备类型设置
+        params.update(get_profile(self.device_type).connection_params(self.protocol))
+        params.update(extra)
+        return params
+
+    def __repr__(self):
+        # 不输出密码
+        return f"DeviceRecord(ip={self.ip!r}, protocol={self.protocol!r}, device_type={self.device_type!r})"
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 设备类型注册表模块
+netmiko 设备类型到厂商、巡检流程、连接参数和命令等待时间的对应表，
+启动时建立一次，之后按设备类型直接查表
+"""
+
+import sys
+
+
+# 巡检流程
+WORKFLOW_TECH_SUPPORT = 'tech_support'
+WORKFLOW_COMMANDS = 'commands'
+
+# netmiko 设备类型的连接方式后缀
+TRANSPORT_SUFFIXES = ('_telnet', '_ssh', '_serial')
+
+
+class DeviceProfile:
+    """一种设备类型的处理方式
+
+    Attributes:
+        device_type: 规范化后的设备类型（小写，不含 _telnet 等后缀）
+        vendor: 厂商名称，用于日志、邮件和命令输出解析模板
+        workflow: WORKFLOW_TECH_SUPPORT 或 WORKFLOW_COMMANDS
+        conn_timeout: 连接超时(秒)，None表示使用netmiko默认值
+        delay_factor: send_command 的 delay_factor
+    """
+
+    __slots__ = ('device_type', 'vendor', 'workflow', 'conn_timeout', 'delay_factor')
+
+    def __init__(self, device_type, vendor, workflow=WORKFLOW_COMMANDS, conn_timeout=None, delay_factor=2):
+        self.device_type = sys.intern(device_type)
+        self.vendor = vendor
+        self.workflow = workflow
+        self.conn_timeout = conn_timeout
+        self.delay_factor = delay_factor
+
+    @property
+    def is_ale(self):
+        """是否执行ALE tech-support流程"""
+        return self.workflow == WORKFLOW_TECH_SUPPORT
+
+    @property
+    def label(self):
+        """日志和邮件中显示的厂商名称"""
+        return 'ALE' if self.is_ale else self.vendor
+
+    def connection_params(self, protocol):
+        """该设备类型的 netmiko 连接默认参数"""
+        params = {}
+        if self.conn_timeout:
+            params['conn_timeout'] = self.conn_timeout
+        if protocol == 'telnet':
+            # telnet 回显较慢，关闭 fast_cli 避免读取不完整
+            params['fast_cli'] = False
+        return params
+
+    def __repr__(self):
+        return f"DeviceProfile({self.device_type!r}, vendor={self.vendor!r}, workflow={self.workflow!r})"
+
+
+PROFILES = [
+    DeviceProfile('alcatel_aos', 'ALE', WORKFLOW_TECH_SUPPORT),
+    DeviceProfile('alcatel_sros', 'Nokia'),
+    DeviceProfile('cisco_ios', 'Cisco'),
+    DeviceProfile('cisco_xe', 'Cisco'),
+    DeviceProfile('cisco_xr', 'Cisco'),
+    DeviceProfile('cisco_nxos', 'Cisco'),
+    DeviceProfile('huawei', '华为', conn_timeout=15),
+    DeviceProfile('huawei_vrp', '华为', conn_timeout=15),
+    DeviceProfile('hp_comware', 'H3C'),
+    DeviceProfile('h3c_comware', 'H3C'),
+    DeviceProfile('ruijie_os', '锐捷'),
+    DeviceProfile('juniper', 'Juniper'),
+    DeviceProfile('juniper_junos', 'Juniper'),
+    DeviceProfile('arista_eos', 'Arista'),
+    DeviceProfile('fortinet', 'Fortinet'),
+    DeviceProfile('paloalto_panos', 'Palo Alto'),
+    DeviceProfile('dell_force10', 'Dell'),
+    DeviceProfile('extreme', 'Extreme'),
+]
+
+# 设备清单中常见的ALE写法，按完整名称或第一段匹配（不按子串，避免 allied_telesis 等被误判）
+ALE_ALIASES = {'ale', 'alcatel', 'alcatel_aos', 'omniswitch', 'aos'}
+
+
+def normalize_type(device_type):
+    """设备类型转换为小写，并去掉 _telnet/_ssh 等连接方式后缀"""
+    device_type = str(device_type or '').strip().lower()
+    for suffix in TRANSPORT_SUFFIXES:
+        if device_type.endswith(suffix):
+            return device_type[:-len(suffix)]
+    return device_type
+
+
+class DeviceRegistry:
+    """设备类型注册表
+
+    lookup() 的结果按原始设备类型字符串缓存，同一类型只判断一次；
+    表中没有的类型按命令列表流程处理，厂商名称为设备类型的大写。
+    """
+
+    def __init__(self, profiles=PROFILES):
+        self.profiles = {profile.device_type: profile for profile in profiles}
+        self.cache = {}
+
+    def _resolve(self, device_type):
+        """查找或生成设备类型对应的配置"""
+        name = normalize_type(device_type)
+        profile = self.profiles.get(name)
+        if profile is not None:
+            return profile
+        if name in ALE_ALIASES or name.split('_', 1)[0] in ALE_ALIASES:
+            return DeviceProfile(name, 'ALE', WORKFLOW_TECH_SUPPORT)
+        return DeviceProfile(name, name.upper())
+
+    def lookup(self, device_type):
+        """获取设备类型的配置
+
+        Args:
+            device_type: 设备清单中填写的设备类型，不区分大小写
+
+        Returns:
+            DeviceProfile
+        """
+        profile = self.cache.get(device_type)
+        if profile is None:
+            # 并发时可能重复生成，结果相同，不需要加锁
+            profile = self.cache.setdefault(device_type, self._resolve(device_type))
+        return profile
+
+
+# 全局注册表，ALEInspection 和 BackupConfig 共用
+registry = DeviceRegistry()
+
+
+def get_profile(device_type):
+    """在全局注册表中查找设备类型"""
+    return registry.lookup(device_type)
+
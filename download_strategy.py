@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 下载方式选择模块
+记录每台设备上次成功的下载方式并优先使用；首选方式上次失败时
+同时尝试所有方式，先完成的保留，其余取消；本次巡检中连接失败的方式不再重试；
+传输中断但已有进展时，从断点续传
+"""
+
+import os
+import json
+import time
+import threading
+
+from partial_file import partial_size, discard_partial
+from session_watchdog import WatchdogTimeout
+from log_setup import get_logger, device_context, current_device
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_download_strategy_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+STATE_FILE = ".download_state.json"
+
+
+def get_default_config():
+    """获取默认下载方式配置"""
+    return {
+        'methods': ['sftp', 'scp', 'ftp', 'tftp'],
+        'race': True,
+        'race_wait': 5,
+        'sftp_window': 32,
+        'sftp_requests': 64,
+        'block_size': 256,
+        'resume_retries': 3,
+        'zero_copy': False,
+        'ftp_port': 21,
+        'tftp_port': 69,
+        'tech_support_wait': 10,
+    }
+
+
+class FileMissing(Exception):
+    """设备上没有该文件，与下载方式是否可用无关"""
+
+
+class DownloadCancelled(Exception):
+    """下载被取消（另一种方式已先完成）"""
+
+
+class CancelToken:
+    """取消标记，下载方法通过 add() 注册关闭连接的操作"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.cancelled = False
+
+    def add(self, callback):
+        """注册取消时执行的操作，已取消时立即执行"""
+        with self.lock:
+            if not self.cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        """取消下载"""
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks = list(self.callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+
+def remove_file(path):
+    """删除文件，不存在时忽略"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class DownloadStrategy:
+    """按设备选择下载方式
+
+    下载方法的形式为 fetch(local_path, token)，成功返回，失败抛出异常；
+    设备上没有文件时应抛出 FileMissing，被取消时应抛出 DownloadCancelled。
+    支持续传的方法先写入 local_path 的 .part 临时文件（见 partial_file），
+    依次尝试的各方法共用同一个临时文件，FTP中断后换SFTP（或反之）也能从断点继续；
+    竞速时各方法写入各自的临时文件。临时文件只保留到本次下载结束:
+    成功时改名为正式文件，全部失败或被取消时删除。
+    """
+
+    def __init__(self, log_dir="LOG", config=None):
+        if config is None:
+            config = get_download_strategy_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.state_path = os.path.join(log_dir, STATE_FILE)
+        self.lock = threading.Lock()
+        self.state = self._load()
+        # 本次巡检中不可用的方式 {设备IP: {方式}}
+        self.dead = {}
+
+    def _load(self):
+        """读取各设备上次使用的下载方式"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"! 读取下载方式记录失败: {e}")
+            return {}
+
+    def save(self):
+        """保存各设备的下载方式记录"""
+        with self.lock:
+            data = json.dumps(self.state, ensure_ascii=False, indent=1)
+        try:
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.error(f"保存下载方式记录失败: {e}")
+
+    def candidates(self, device_ip, methods):
+        """按优先级排列可用的下载方式"""
+        with self.lock:
+            dead = self.dead.get(device_ip, set())
+            preferred = self.state.get(device_ip, {}).get('preferred')
+        ordered = [method for method in methods if method not in dead]
+        if preferred in ordered:
+            ordered.remove(preferred)
+            ordered.insert(0, preferred)
+        return ordered
+
+    def healthy(self, device_ip, method):
+        """首选方式上次是否成功（没有记录的设备视为正常）"""
+        with self.lock:
+            entry = self.state.get(device_ip)
+        if not entry or entry.get('preferred') != method:
+            return True
+        return not entry.get('failures', 0)
+
+    def record(self, device_ip, method, ok, error=None):
+        """记录一次下载结果"""
+        with self.lock:
+            entry = self.state.setdefault(device_ip, {})
+            if ok:
+                entry['preferred'] = method
+                entry['failures'] = 0
+                entry['updated'] = time.strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                if entry.get('preferred') == method:
+                    entry['failures'] = entry.get('failures', 0) + 1
+                # 连接或认证失败，本次巡检该设备不再尝试这种方式
+                if not isinstance(error, (FileMissing, DownloadCancelled)):
+                    self.dead.setdefault(device_ip, set()).add(method)
+
+    def download(self, device_ip, local_path, fetchers, limit=None):
+        """下载一个文件
+
+        Args:
+            device_ip: 设备IP
+            local_path: 最终保存路径
+            fetchers: {方式名: fetch(local_path, token)}
+            limit: 最多尝试的方式数，例如超过截止时间后只尝试首选方式
+
+        Returns:
+            str: 成功的下载方式，全部失败时返回None
+        """
+        methods = self.candidates(device_ip, [m for m in self.config['methods'] if m in fetchers])
+        if limit:
+            methods = methods[:limit]
+        if not methods:
+            logger.warning(f"! {device_ip} 没有可用的下载方式")
+            return None
+
+        try:
+            if self.config['race'] and len(methods) > 1 and not self.healthy(device_ip, methods[0]):
+                logger.info(f"{device_ip} 上次 {methods[0]} 下载失败，同时尝试: {', '.join(methods)}")
+                return self._race(device_ip, local_path, fetchers, methods)
+
+            for method in methods:
+                error = self._attempt(device_ip, method, fetchers[method], local_path, CancelToken())
+                if error is None:
+                    return method
+                # 设备上没有该文件，换其他方式也无法下载
+                if isinstance(error, FileMissing):
+                    return None
+            return None
+        finally:
+            discard_partial(local_path)
+
+    def _attempt(self, device_ip, method, fetch, path, token):
+        """执行一种下载方式并记录结果
+
+        传输中断且临时文件比上次更大时，用同一方式从断点续传，
+        最多 resume_retries 次；没有进展的失败直接换下一种方式。
+
+        Returns:
+            Exception: 失败原因，成功时返回None
+        """
+        retries = self.config['resume_retries']
+        while True:
+            before = partial_size(path)
+            try:
+                fetch(path, token)
+                if token.cancelled:
+                    # 竞速中已被取消但仍完成的下载作废，不覆盖先完成的方式
+                    raise DownloadCancelled(os.path.basename(path))
+                self.record(device_ip, method, True)
+                return None
+            except Exception as e:
+                if retries > 0 and self._resumable(e, token) and partial_size(path) > before:
+                    retries -= 1
+                    logger.warning(f"! {method.upper()}下载中断 {device_ip}/{os.path.basename(path)}: {e}，"
+                                   f"已接收 {partial_size(path)} 字节，续传")
+                    continue
+                self.record(device_ip, method, False, e)
+                if not isinstance(e, DownloadCancelled):
+                    logger.warning(f"✗ {method.upper()}下载失败 {device_ip}/{os.path.basename(path)}: {e}")
+                remove_file(path)
+                # 被取消的竞速方式可能在清理之后才退出，自己删除留下的临时文件
+                if isinstance(e, FileMissing) or token.cancelled:
+                    discard_partial(path)
+                return e
+
+    @staticmethod
+    def _resumable(error, token):
+        """失败后是否可以续传（被取消、文件不存在或超过下载时限的不续传）"""
+        if token.cancelled:
+            return False
+        return not isinstance(error, (FileMissing, DownloadCancelled, WatchdogTimeout))
+
+    def _race(self, device_ip, local_path, fetchers, methods):
+        """同时使用多种方式下载，保留先完成的，取消其余的"""
+        winner = []
+        done = threading.Condition()
+        tokens = {method: CancelToken() for method in methods}
+        parts = {method: f"{local_path}.{method}" for method in methods}
+        finished = set()
+        device = current_device.get()
+
+        def run(method):
+            with device_context(device):
+                ok = self._attempt(device_ip, method, fetchers[method], parts[method], tokens[method]) is None
+            with done:
+                finished.add(method)
+                if ok and not winner:
+                    winner.append(method)
+                done.notify_all()
+
+        threads = [threading.Thread(target=run, args=(method,), name=f"download-{method}", daemon=True)
+                   for method in methods]
+        for thread in threads:
+            thread.start()
+
+        with done:
+            while not winner and len(finished) < len(methods):
+                done.wait()
+
+        if winner:
+            method = winner[0]
+            for other, token in tokens.items():
+                if other != method:
+                    token.cancel()
+            os.replace(parts[method], local_path)
+
+        # 等待被取消的下载结束，清理临时文件
+        for thread in threads:
+            thread.join(self.config['race_wait'])
+        for other, path in parts.items():
+            if not winner or other != winner[0]:
+                remove_file(path)
+            discard_partial(path)
+        if winner:
+            # 被取消的方式可能几乎同时完成，以先完成的为首选
+            self.record(device_ip, winner[0], True)
+        return winner[0] if winner else None
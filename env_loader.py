@@ -70,6 +70,13 @@ class EnvLoader:
         
         return default
     
+    def get_str(self, key: str, default: str = '') -> str:
+        """获取原始字符串值（不转换为数字或布尔值，用于密码、令牌等）"""
+        value = os.environ.get(key)
+        if value is None:
+            value = self.env_vars.get(key)
+        return default if value is None else value
+    
     def get_bool(self, key: str, default: bool = False) -> bool:
         """获取布尔值"""
         value = self.get(key, default)
@@ -192,6 +199,201 @@ def get_email_config() -> Dict[str, Any]:
     }
 
 
+def get_retention_days(key: str) -> int:
+    """获取保留天数，未单独设置时与 LOG_RETENTION_DAYS 相同"""
+    return env.get_int(key, env.get_int('LOG_RETENTION_DAYS', 180))
+
+
+def get_log_store_config() -> Dict[str, Any]:
+    """获取日志内容存储配置"""
+    return {
+        # 按内容去重保存巡检输出
+        'enabled': env.get_bool('LOG_DEDUP_ENABLED', True),
+        # 生成与上一次巡检的差异文件
+        'diff_enabled': env.get_bool('LOG_DIFF_ENABLED', True),
+        # 超过该大小(MB)的文件不做差异比较
+        'diff_max_size': env.get_int('LOG_DIFF_MAX_SIZE', 5),
+        # 每台设备保留为普通文件的最近巡检次数，更早的巡检切块打包
+        'plain_runs': env.get_int('LOG_STORE_PLAIN_RUNS', 3),
+        # 已打包巡检的保留天数，0表示永久保留，未设置时与 LOG_RETENTION_DAYS 相同
+        'retention_days': get_retention_days('LOG_STORE_RETENTION_DAYS'),
+    }
+
+
+def get_retention_config() -> Dict[str, Any]:
+    """获取LOG目录保留策略配置"""
+    return {
+        # 每次巡检结束后自动执行清理（默认关闭，启用前可用 --dry-run 预览）
+        'enabled': env.get_bool('LOG_RETENTION_ENABLED', False),
+        # 与压缩、发送邮件并行在后台执行
+        'background': env.get_bool('LOG_RETENTION_BACKGROUND', True),
+        # 巡检目录和压缩包的保留天数，0表示不按时间清理
+        'max_age_days': env.get_int('LOG_RETENTION_DAYS', 180),
+        # 每台设备保留的最近巡检次数，0表示不限制
+        'max_runs': env.get_int('LOG_RETENTION_MAX_RUNS', 30),
+        # 巡检目录和压缩包的总大小上限(MB，硬链接只计一次，不含.store和archive)，0表示不限制
+        'max_size': env.get_int('LOG_RETENTION_MAX_SIZE', 0),
+        # 超过该天数的压缩包按月合并归档，0表示不归档
+        'archive_after_days': env.get_int('LOG_ARCHIVE_AFTER_DAYS', 7),
+    }
+
+
+def get_metrics_config() -> Dict[str, Any]:
+    """获取Prometheus指标导出配置"""
+    return {
+        # textfile collector输出文件路径，留空表示不输出
+        'textfile': env.get('METRICS_TEXTFILE', ''),
+        # 巡检期间的HTTP /metrics 端口，0表示不启动
+        'http_port': env.get_int('METRICS_HTTP_PORT', 0),
+        'http_addr': env.get('METRICS_HTTP_ADDR', '127.0.0.1'),
+    }
+
+
+def get_logging_config() -> Dict[str, Any]:
+    """获取日志配置"""
+    return {
+        # 控制台日志级别: DEBUG/INFO/WARNING/ERROR，大规模巡检可设为WARNING
+        'console_level': env.get('LOG_CONSOLE_LEVEL', 'INFO'),
+        # JSON Lines日志文件级别和路径，路径留空表示不写文件
+        'file_level': env.get('LOG_FILE_LEVEL', 'DEBUG'),
+        'json_file': env.get('LOG_JSON_FILE', os.path.join('LOG', 'ale_inspection.jsonl')),
+        # 单个日志文件大小上限(MB)和保留的历史文件数
+        'max_size': env.get_int('LOG_FILE_MAX_SIZE', 20),
+        'backup_count': env.get_int('LOG_FILE_BACKUP_COUNT', 5),
+    }
+
+
+def get_scheduler_config() -> Dict[str, Any]:
+    """获取巡检调度配置"""
+    return {
+        # 工作线程数（全局并发上限）
+        'workers': env.get_int('SCHED_WORKERS', 10),
+        # 设备清单未填写站点时的分组方式: subnet/device_type/none
+        'group_by': env.get('SCHED_GROUP_BY', 'subnet'),
+        # 按网段分组时的前缀长度
+        'subnet_prefix': env.get_int('SCHED_SUBNET_PREFIX', 24),
+        # 每个分组同时巡检的设备数，0表示不限制
+        'group_limit': env.get_int('SCHED_GROUP_LIMIT', 0),
+        # 额外的并发限制规则，例如: 10.20.0.0/16=2,branch-a=1,huawei=3
+        'limits': env.get_list('SCHED_LIMITS'),
+        # FTP/TFTP下载总带宽(KB/s)，0表示不限制
+        'bandwidth': env.get_int('DOWNLOAD_BANDWIDTH_LIMIT', 0),
+        # 按最近几次巡检的设备耗时从长到短排序，0表示按表格顺序
+        'history_runs': env.get_int('SCHED_HISTORY_RUNS', 3),
+        # 巡检截止时间(分钟)，超时后跳过可选步骤和未开始的设备，0表示不限制
+        'deadline': env.get_int('RUN_DEADLINE', 0),
+    }
+
+
+def get_watchdog_config() -> Dict[str, Any]:
+    """获取超时看门狗配置（秒，0表示不限制）"""
+    return {
+        # 单台设备巡检的总时长上限
+        'device': env.get_int('DEVICE_TIMEOUT', 3600),
+        # show tech-support 命令
+        'tech_support': env.get_int('TECH_SUPPORT_TIMEOUT', 900),
+        # 单条常规命令
+        'command': env.get_int('COMMAND_TIMEOUT', 300),
+        # 单个文件的FTP/TFTP下载
+        'download': env.get_int('DOWNLOAD_TIMEOUT', 1800),
+        # FTP等套接字单次读写的超时
+        'io': env.get_int('SOCKET_TIMEOUT', 60),
+        # 超时关闭会话后等待线程退出的时间，超过后释放该工作线程名额
+        'grace': env.get_int('WATCHDOG_GRACE', 30),
+    }
+
+
+def get_download_strategy_config() -> Dict[str, Any]:
+    """获取日志文件下载方式配置"""
+    return {
+        # 可用的下载方式，按默认优先级排列
+        'methods': env.get_list('DOWNLOAD_METHODS', default=['sftp', 'scp', 'ftp', 'tftp']),
+        # 首选方式上次失败时同时尝试所有方式
+        'race': env.get_bool('DOWNLOAD_RACE', True),
+        # 取消较慢的方式后等待其退出的秒数
+        'race_wait': env.get_int('DOWNLOAD_RACE_WAIT', 5),
+        # SFTP窗口大小(MB)和同时在途的读请求数
+        'sftp_window': env.get_int('SFTP_WINDOW_SIZE', 32),
+        'sftp_requests': env.get_int('SFTP_MAX_REQUESTS', 64),
+        # 每次读取/接收的块大小(KB)
+        'block_size': env.get_int('DOWNLOAD_BLOCK_SIZE', 256),
+        # 传输中断后从断点续传的最多次数（仅FTP/SFTP）
+        'resume_retries': env.get_int('DOWNLOAD_RESUME_RETRIES', 3),
+        # FTP数据连接使用 os.splice 直接写入文件（仅Linux）
+        'zero_copy': env.get_bool('DOWNLOAD_ZERO_COPY', False),
+        # 设备FTP/TFTP服务端口
+        'ftp_port': env.get_int('DOWNLOAD_FTP_PORT', 21),
+        'tftp_port': env.get_int('DOWNLOAD_TFTP_PORT', 69),
+        # 未配置 ale_config.py 时，show tech-support 后等待日志文件生成的秒数
+        'tech_support_wait': env.get_int('TECH_SUPPORT_WAIT', 10),
+    }
+
+
+def get_analyzer_config() -> Dict[str, Any]:
+    """获取tech-support日志分析配置"""
+    return {
+        # 下载完成后分析tech-support日志，生成设备健康摘要
+        'enabled': env.get_bool('ANALYZER_ENABLED', True),
+        # 并行分析的进程数，0表示按CPU核数（最多4个）
+        'workers': env.get_int('ANALYZER_WORKERS', 0),
+        # CPU/内存利用率告警阈值(%)
+        'cpu_threshold': env.get_int('HEALTH_CPU_THRESHOLD', 80),
+        'memory_threshold': env.get_int('HEALTH_MEMORY_THRESHOLD', 85),
+        # 生成树拓扑变化次数告警阈值
+        'stp_threshold': env.get_int('HEALTH_STP_THRESHOLD', 50),
+        # 每类问题在摘要中保留的日志行数
+        'max_samples': env.get_int('ANALYZER_MAX_SAMPLES', 20),
+    }
+
+
+def get_fleet_config() -> Dict[str, Any]:
+    """获取全网统计分析配置"""
+    return {
+        # 解析常规命令输出并做全网统计分析
+        'enabled': env.get_bool('FLEET_ANALYTICS_ENABLED', True),
+        # 目标软件版本，<厂商或型号>=<版本>，例如: Cisco=15.2(7)E4,S5720-28X-SI-AC=V200R011C10SPC600
+        # 未配置的按同厂商同型号中最多设备使用的版本检查
+        'target_versions': env.get_list('FLEET_TARGET_VERSIONS'),
+        # 接口错误率异常判断: 稳健z分数阈值，以及错误率/错误数下限
+        'outlier_z': env.get_float('FLEET_OUTLIER_Z', 3.5),
+        'min_error_rate': env.get_float('FLEET_MIN_ERROR_RATE', 0.001),
+        'min_error_count': env.get_int('FLEET_MIN_ERROR_COUNT', 1000),
+        # 运行时间少于该小时数视为刚重启，超过该天数视为长期未重启（0表示不检查）
+        'min_uptime_hours': env.get_int('FLEET_MIN_UPTIME_HOURS', 24),
+        'max_uptime_days': env.get_int('FLEET_MAX_UPTIME_DAYS', 1095),
+        # 每项结果在报告中保留的条数
+        'max_items': env.get_int('FLEET_MAX_ITEMS', 50),
+    }
+
+
+def get_history_config() -> Dict[str, Any]:
+    """获取巡检历史配置"""
+    return {
+        # 每次巡检结束后把设备结果、阶段耗时和指标追加到历史数据库
+        'enabled': env.get_bool('HISTORY_ENABLED', True),
+        # SQLite数据库路径
+        'db_path': env.get('HISTORY_DB', os.path.join('LOG', 'history.sqlite')),
+        # 历史记录保留天数，0表示永久保留，未设置时与 LOG_RETENTION_DAYS 相同
+        'retention_days': get_retention_days('HISTORY_RETENTION_DAYS'),
+    }
+
+
+def get_daemon_config() -> Dict[str, Any]:
+    """获取常驻服务配置"""
+    return {
+        # HTTP接口监听地址和端口，默认只允许本机访问
+        'host': env.get('DAEMON_HOST', '127.0.0.1'),
+        'port': env.get_int('DAEMON_PORT', 8750),
+        # 接口令牌（请求头 X-Auth-Token），留空表示不校验
+        'token': env.get_str('DAEMON_TOKEN', ''),
+        # 保留的已完成任务数
+        'keep_jobs': env.get_int('DAEMON_KEEP_JOBS', 100),
+        # 连接池最多保留的空闲会话数，以及空闲会话的关闭时间(秒)
+        'pool_size': env.get_int('DAEMON_POOL_SIZE', 50),
+        'pool_idle': env.get_int('DAEMON_POOL_IDLE', 240),
+    }
+
+
 def validate_email_config() -> tuple[bool, list]:
     """验证邮件配置"""
     config = get_email_config()
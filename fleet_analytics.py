@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 全网统计分析模块
+把各设备解析出的命令输出（见 command_parser）载入pandas，
+用向量化运算检查接口错误率异常、软件版本合规和运行时间分布
+"""
+
+import os
+
+from command_parser import INT_FIELDS
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_fleet_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+NUMERIC_FIELDS = INT_FIELDS | {'uptime'}
+
+
+def get_default_config():
+    """获取默认全网分析配置"""
+    return {
+        'enabled': True,
+        'target_versions': [],
+        'outlier_z': 3.5,
+        'min_error_rate': 0.001,
+        'min_error_count': 1000,
+        'min_uptime_hours': 24,
+        'max_uptime_days': 1095,
+        'max_items': 50,
+    }
+
+
+def parse_targets(items):
+    """解析目标版本规则 <厂商或型号>=<版本>，返回 {小写键: 版本}"""
+    targets = {}
+    for item in items:
+        key, _, version = item.partition('=')
+        if key.strip() and version.strip():
+            targets[key.strip().lower()] = version.strip()
+    return targets
+
+
+def robust_outliers(values, z, floor):
+    """用中位数和MAD判断异常值（向量化）
+
+    Args:
+        values: pandas Series，NaN不参与统计
+        z: 稳健z分数阈值
+        floor: 低于该值的不算异常
+
+    Returns:
+        tuple: (布尔Series, 阈值)
+    """
+    valid = values.dropna()
+    if valid.empty:
+        return values.notna() & False, floor
+    median = valid.median()
+    mad = (valid - median).abs().median() * 1.4826
+    threshold = max(floor, median + z * mad)
+    return values > threshold, float(threshold)
+
+
+def records(frame, columns, limit):
+    """把DataFrame的前若干行转换为可JSON序列化的字典列表"""
+    subset = frame[columns].head(limit).astype(object)
+    return subset.where(subset.notna(), None).to_dict('records')
+
+
+class FleetAnalytics:
+    """全网统计分析
+
+    pandas 在 run() 时才导入，未安装时跳过分析。
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = get_fleet_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.enabled = config['enabled']
+        self.targets = parse_targets(config['target_versions'])
+        self.frames = {}
+
+    def load(self, store):
+        """把 ColumnStore 的各表载入 DataFrame
+
+        数值列先转换为float数组（None为NaN），比由pandas逐个推断类型快得多。
+        """
+        import numpy as np
+        import pandas as pd
+        self.frames = {}
+        for table, columns in store.columns().items():
+            data = {name: np.array(values, dtype=float) if name in NUMERIC_FIELDS else values
+                    for name, values in columns.items()}
+            self.frames[table] = pd.DataFrame(data)
+        return self.frames
+
+    def run(self, store):
+        """执行全部检查
+
+        Returns:
+            dict: 检查结果，没有可分析的数据或pandas不可用时返回None
+        """
+        try:
+            self.load(store)
+        except ImportError:
+            logger.warning("! pandas不可用，跳过全网统计分析")
+            return None
+        if not self.frames:
+            return None
+
+        results = {}
+        if 'interface' in self.frames:
+            results['interface_errors'] = self.interface_errors(self.frames['interface'])
+        if 'version' in self.frames:
+            results['version_compliance'] = self.version_compliance(self.frames['version'])
+            results['uptime'] = self.uptime_distribution(self.frames['version'])
+        return results
+
+    def interface_errors(self, frame):
+        """接口错误率异常
+
+        有收发包数的接口按错误率判断，只有错误计数的接口（如 display interface brief）
+        按错误数判断，阈值都取全网中位数加若干倍MAD与下限中的较大值。
+        """
+        import numpy as np
+
+        # 没有输入错误数时用CRC错误数代替
+        errors = frame['in_errors'].fillna(frame['crc']).fillna(0) + frame['out_errors'].fillna(0)
+        packets = frame['in_packets'].fillna(0) + frame['out_packets'].fillna(0)
+        frame = frame.assign(
+            errors=errors,
+            error_rate=np.where(packets > 0, errors / packets.where(packets > 0, 1), np.nan),
+        )
+
+        rate_outliers, rate_threshold = robust_outliers(frame['error_rate'], self.config['outlier_z'],
+                                                        self.config['min_error_rate'])
+        count_outliers, count_threshold = robust_outliers(frame['errors'].where(frame['error_rate'].isna()),
+                                                          self.config['outlier_z'], self.config['min_error_count'])
+        outliers = frame[rate_outliers | count_outliers].sort_values(['error_rate', 'errors'], ascending=False)
+        return {
+            'interfaces': int(len(frame)),
+            'devices': int(frame['device'].nunique()),
+            'rate_threshold': rate_threshold,
+            'count_threshold': count_threshold,
+            'outlier_count': int(len(outliers)),
+            'outliers': records(outliers, ['device', 'vendor', 'interface', 'errors', 'error_rate'],
+                                self.config['max_items']),
+        }
+
+    def version_compliance(self, frame):
+        """软件版本合规
+
+        目标版本按型号、厂商的顺序匹配 FLEET_TARGET_VERSIONS，
+        没有配置的按同厂商同型号中最多设备使用的版本作为基准。
+        """
+        frame = frame.dropna(subset=['version']).drop_duplicates('device', keep='last')
+        if frame.empty:
+            return {'devices': 0, 'noncompliant_count': 0, 'noncompliant': [], 'baselines': []}
+
+        frame = frame.assign(model=frame['model'].fillna(''))
+        expected = frame['model'].str.lower().map(self.targets)
+        expected = expected.fillna(frame['vendor'].str.lower().map(self.targets))
+
+        # 每个厂商+型号中设备最多的版本
+        counts = frame.groupby(['vendor', 'model', 'version']).size().reset_index(name='count')
+        majority = counts.sort_values('count', ascending=False).drop_duplicates(['vendor', 'model'])
+        merged = frame.merge(majority[['vendor', 'model', 'version']].rename(columns={'version': 'majority'}),
+                             on=['vendor', 'model'], how='left')
+        merged['expected'] = expected.to_numpy()
+        merged['expected'] = merged['expected'].fillna(merged['majority'])
+
+        noncompliant = merged[merged['version'] != merged['expected']].sort_values(['vendor', 'model', 'device'])
+        return {
+            'devices': int(len(merged)),
+            'noncompliant_count': int(len(noncompliant)),
+            'noncompliant': records(noncompliant, ['device', 'vendor', 'model', 'version', 'expected'],
+                                    self.config['max_items']),
+            'baselines': records(majority.sort_values(['vendor', 'model']),
+                                 ['vendor', 'model', 'version', 'count'], self.config['max_items']),
+        }
+
+    def uptime_distribution(self, frame):
+        """运行时间分布，以及刚重启和长期未重启的设备"""
+        import numpy as np
+
+        frame = frame.dropna(subset=['uptime']).drop_duplicates('device', keep='last')
+        if frame.empty:
+            return {'devices': 0}
+
+        days = frame['uptime'].to_numpy() / 86400
+        p10, p50, p90 = np.percentile(days, [10, 50, 90])
+        rebooted = frame[days < self.config['min_uptime_hours'] / 24]
+        stale = frame[days > self.config['max_uptime_days']] if self.config['max_uptime_days'] else frame.iloc[0:0]
+        return {
+            'devices': int(len(frame)),
+            'days_min': round(float(days.min()), 2),
+            'days_p10': round(float(p10), 2),
+            'days_p50': round(float(p50), 2),
+            'days_p90': round(float(p90), 2),
+            'days_max': round(float(days.max()), 2),
+            'recently_rebooted': records(rebooted.sort_values('uptime'), ['device', 'vendor', 'uptime'],
+                                         self.config['max_items']),
+            'long_uptime': records(stale.sort_values('uptime', ascending=False), ['device', 'vendor', 'uptime'],
+                                   self.config['max_items']),
+        }
+
+    def device_metrics(self):
+        """每台设备的数值指标，供巡检历史记录趋势
+
+        Returns:
+            list: [(设备IP, 指标名, 值)]
+        """
+        rows = []
+        frame = self.frames.get('interface')
+        if frame is not None:
+            errors = frame['in_errors'].fillna(frame['crc']).fillna(0) + frame['out_errors'].fillna(0)
+            per_device = frame.assign(errors=errors).groupby('device').agg(
+                interfaces=('interface', 'size'), interface_errors=('errors', 'sum'))
+            for name in ('interfaces', 'interface_errors'):
+                rows.extend((device_ip, name, float(value)) for device_ip, value in per_device[name].items())
+        frame = self.frames.get('version')
+        if frame is not None:
+            uptime = frame.dropna(subset=['uptime']).drop_duplicates('device', keep='last')
+            rows.extend((device_ip, 'uptime_days', float(value) / 86400)
+                        for device_ip, value in zip(uptime['device'], uptime['uptime']))
+        return rows
+
+    def write_tables(self, log_dir, logtime):
+        """把解析出的各表保存为CSV
+
+        Returns:
+            list: CSV文件路径
+        """
+        report_dir = os.path.join(log_dir, "reports")
+        os.makedirs(report_dir, exist_ok=True)
+        paths = []
+        for table, frame in self.frames.items():
+            path = os.path.join(report_dir, f"fleet_{table}_{logtime}.csv")
+            # utf-8-sig 便于Excel直接打开中文厂商名
+            frame.to_csv(path, index=False, encoding='utf-8-sig')
+            paths.append(path)
+        return paths
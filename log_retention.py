@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - LOG目录保留策略模块
+按时间、数量和总大小清理巡检目录和压缩包，
+较早的压缩包按月归档，使LOG目录的文件数和占用空间保持稳定
+"""
+
+import os
+import sys
+import json
+import zipfile
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from log_store import LogStore, parse_run_dir, remove_tree
+from log_setup import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_retention_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+LOGTIME_FORMAT = "%Y-%m-%d_%H-%M-%S"
+ARCHIVE_DIR = "archive"
+# 记录上次执行时间，不存在时为首次执行
+STATE_FILE = ".retention.json"
+
+
+def get_default_config():
+    """获取默认保留策略配置"""
+    return {
+        'enabled': False,
+        'background': True,
+        'max_age_days': 180,
+        'max_runs': 30,
+        'max_size': 0,
+        'archive_after_days': 7,
+    }
+
+
+def get_path_size(path, seen=None):
+    """获取文件或目录占用的字节数
+
+    Args:
+        path: 文件或目录
+        seen: 已统计过的文件 {(设备号, inode)}；同一文件的多个硬链接只统计一次
+    """
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = (os.path.join(root, file) for root, _, files in os.walk(path) for file in files)
+    if seen is None:
+        seen = set()
+    total = 0
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        key = (stat.st_dev, stat.st_ino)
+        if stat.st_nlink > 1:
+            if key in seen:
+                continue
+            seen.add(key)
+        total += stat.st_size
+    return total
+
+
+class RetentionManager:
+    """LOG目录保留策略管理
+
+    管理的对象:
+      - 巡检目录 LOG/<设备IP>_<巡检时间>
+      - 设备压缩包 LOG/<设备IP>_<巡检时间>.zip
+      - 汇总压缩包 LOG/all_devices_<巡检时间>.zip
+      - 月度归档 LOG/archive/<年-月>.zip
+    """
+
+    def __init__(self, log_dir="LOG", log_store=None, config=None, current_logtime=None, report=None):
+        if config is None:
+            config = get_retention_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.log_dir = log_dir
+        self.log_store = log_store
+        self.current_logtime = current_logtime
+        self.report = report
+        self.state_path = os.path.join(log_dir, STATE_FILE)
+        self.thread = None
+
+    def scan(self):
+        """扫描LOG目录，返回可管理的巡检目录和压缩包列表"""
+        artifacts = []
+        if not os.path.isdir(self.log_dir):
+            return artifacts
+
+        with os.scandir(self.log_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    kind = 'run'
+                    parsed = parse_run_dir(entry.name)
+                elif entry.name.endswith('.zip'):
+                    kind = 'zip'
+                    parsed = parse_run_dir(entry.name[:-len('.zip')])
+                else:
+                    continue
+
+                if not parsed:
+                    continue
+                group, logtime = parsed
+                # 本次巡检的文件永远不清理
+                if logtime == self.current_logtime:
+                    continue
+                artifacts.append({
+                    'path': entry.path,
+                    'kind': kind,
+                    'group': group,
+                    'logtime': logtime,
+                })
+
+        artifacts.sort(key=lambda item: item['logtime'])
+        return artifacts
+
+    def _remove(self, artifact, dry_run=False):
+        """删除巡检目录或压缩包"""
+        if dry_run:
+            logger.info(f"[预览] 删除: {artifact['path']}")
+            return
+        logger.info(f"删除: {artifact['path']}")
+        if artifact['kind'] == 'run':
+            remove_tree(artifact['path'])
+        elif os.path.exists(artifact['path']):
+            os.remove(artifact['path'])
+
+    def archive_old_zips(self, dry_run=False):
+        """将较早的压缩包按月合并到LOG/archive/<年-月>.zip"""
+        days = self.config['archive_after_days']
+        if not days:
+            return 0
+
+        cutoff = (datetime.now() - timedelta(days=days)).strftime(LOGTIME_FORMAT)
+        by_month = {}
+        for artifact in self.scan():
+            if artifact['kind'] == 'zip' and artifact['logtime'] < cutoff:
+                by_month.setdefault(artifact['logtime'][:7], []).append(artifact)
+
+        archived = 0
+        archive_dir = os.path.join(self.log_dir, ARCHIVE_DIR)
+        for month, artifacts in sorted(by_month.items()):
+            archive_path = os.path.join(archive_dir, f"{month}.zip")
+            if dry_run:
+                logger.info(f"[预览] 归档 {len(artifacts)} 个压缩包到: {archive_path}")
+                archived += len(artifacts)
+                continue
+
+            os.makedirs(archive_dir, exist_ok=True)
+            # 压缩包本身已压缩，归档时直接存储
+            with zipfile.ZipFile(archive_path, 'a', zipfile.ZIP_STORED) as archive:
+                existing = set(archive.namelist())
+                for artifact in artifacts:
+                    arcname = os.path.basename(artifact['path'])
+                    if arcname not in existing:
+                        archive.write(artifact['path'], arcname)
+            for artifact in artifacts:
+                os.remove(artifact['path'])
+            archived += len(artifacts)
+
+        return archived
+
+    def expire_archives(self, dry_run=False):
+        """删除超过保留天数的月度归档"""
+        days = self.config['max_age_days']
+        archive_dir = os.path.join(self.log_dir, ARCHIVE_DIR)
+        if not days or not os.path.isdir(archive_dir):
+            return 0
+
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m")
+        removed = 0
+        for name in sorted(os.listdir(archive_dir)):
+            # 整个月份都超过保留期才删除
+            if name.endswith('.zip') and name[:-len('.zip')] < cutoff:
+                path = os.path.join(archive_dir, name)
+                if dry_run:
+                    logger.info(f"[预览] 删除: {path}")
+                else:
+                    logger.info(f"删除: {path}")
+                    os.remove(path)
+                removed += 1
+        return removed
+
+    def select_expired(self):
+        """按时间、数量、总大小策略选出需要删除的巡检目录和压缩包（从早到晚）"""
+        artifacts = self.scan()
+        expired = []
+
+        # 时间策略
+        days = self.config['max_age_days']
+        if days:
+            cutoff = (datetime.now() - timedelta(days=days)).strftime(LOGTIME_FORMAT)
+            expired.extend(item for item in artifacts if item['logtime'] < cutoff)
+
+        # 数量策略: 每台设备(及汇总包)只保留最近的若干次巡检
+        max_runs = self.config['max_runs']
+        if max_runs:
+            logtimes = {}
+            for item in artifacts:
+                logtimes.setdefault(item['group'], set()).add(item['logtime'])
+            keep = {group: set(sorted(times)[-max_runs:]) for group, times in logtimes.items()}
+            expired.extend(item for item in artifacts if item['logtime'] not in keep[item['group']])
+
+        expired_paths = {item['path'] for item in expired}
+        remaining = [item for item in artifacts if item['path'] not in expired_paths]
+
+        # 总大小策略: 超出上限时从最早的开始删除
+        # 只统计管理的巡检目录和压缩包（.store 由 LogStore.gc 回收，archive 按时间清理）；
+        # 多次巡检共用的硬链接文件计入最近的一次，删除较早的巡检不会减少这部分
+        max_size = self.config['max_size'] * 1024 * 1024
+        if max_size:
+            counted = set()
+            sizes = {item['path']: get_path_size(item['path'], counted) for item in reversed(remaining)}
+            total = sum(sizes.values())
+            for item in remaining:
+                if total <= max_size:
+                    break
+                expired.append(item)
+                expired_paths.add(item['path'])
+                total -= sizes[item['path']]
+
+        return [item for item in artifacts if item['path'] in expired_paths]
+
+    def apply_policies(self, dry_run=False):
+        """按时间、数量、总大小策略删除巡检目录和压缩包"""
+        expired = self.select_expired()
+        for item in expired:
+            self._remove(item, dry_run)
+        return len(expired)
+
+    def _warn_first_run(self):
+        """首次执行时说明将要删除的内容（之前的版本从不删除LOG目录中的文件）"""
+        expired = self.select_expired()
+        logger.warning(f"! 首次执行LOG保留策略: 保留 {self.config['max_age_days'] or '不限'} 天, "
+                       f"每台设备 {self.config['max_runs'] or '不限'} 次, "
+                       f"总大小上限 {self.config['max_size'] or '不限'} MB")
+        if expired:
+            logger.warning(f"! 将删除 {len(expired)} 个巡检目录和压缩包（{expired[0]['logtime']} 至 "
+                           f"{expired[-1]['logtime']}），逐项见下方“删除”日志；"
+                           f"不需要清理时请设置 LOG_RETENTION_ENABLED=False")
+
+    def _save_state(self):
+        """记录本次执行时间"""
+        try:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump({'last_run': datetime.now().strftime(LOGTIME_FORMAT)}, f)
+        except OSError as e:
+            logger.debug(f"保存保留策略状态失败: {e}")
+
+    def run(self, dry_run=False):
+        """执行一次完整的保留策略清理
+
+        Returns:
+            dict: 各步骤处理的数量
+        """
+        start_time = datetime.now()
+        result = {'packed': 0, 'archived': 0, 'removed': 0}
+        try:
+            if not dry_run and not os.path.exists(self.state_path):
+                self._warn_first_run()
+
+            # 先删除超出策略的目录，避免打包或归档即将删除的文件
+            result['removed'] = self.apply_policies(dry_run) + self.expire_archives(dry_run)
+
+            # 打包较早的巡检目录，并回收被删除目录引用的数据块
+            if self.log_store and not dry_run:
+                result['packed'], _, _ = self.log_store.compact()
+
+            result['archived'] = self.archive_old_zips(dry_run)
+            if not dry_run:
+                self._save_state()
+
+            elapsed = (datetime.now() - start_time).total_seconds()
+            if self.report:
+                self.report.record(None, 'retention', elapsed, **result)
+            logger.info(f"LOG保留策略执行完成: 打包 {result['packed']}, 归档 {result['archived']}, "
+                        f"删除 {result['removed']}, 耗时 {elapsed:.2f}秒")
+        except Exception as e:
+            logger.error(f"LOG保留策略执行失败: {e}")
+        return result
+
+    def start_background(self):
+        """在后台线程中执行清理"""
+        self.thread = threading.Thread(target=self.run, name="log-retention", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def wait(self, timeout=None):
+        """等待后台清理完成"""
+        if self.thread:
+            self.thread.join(timeout)
+
+    def status(self):
+        """打印LOG目录占用情况"""
+        artifacts = self.scan()
+        runs = [item for item in artifacts if item['kind'] == 'run']
+        zips = [item for item in artifacts if item['kind'] == 'zip']
+        packed = sum(1 for item in runs if os.path.exists(os.path.join(item['path'], '.manifest.json')))
+
+        print(f"LOG目录: {os.path.abspath(self.log_dir)}")
+        print(f"  巡检目录: {len(runs)} 个 (已打包 {packed} 个)")
+        print(f"  压缩包: {len(zips)} 个")
+        archive_dir = os.path.join(self.log_dir, ARCHIVE_DIR)
+        if os.path.isdir(archive_dir):
+            print(f"  月度归档: {len(os.listdir(archive_dir))} 个")
+        print(f"  总大小: {get_path_size(self.log_dir, set()) / (1024 * 1024):.2f}MB")
+        if artifacts:
+            print(f"  最早: {artifacts[0]['logtime']}  最近: {artifacts[-1]['logtime']}")
+
+
+def main():
+    """命令行入口"""
+    setup_logging()
+    parser = argparse.ArgumentParser(description="ALE网络运维工具包 - LOG目录清理")
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'status'],
+                        help="run: 执行清理, status: 查看占用情况")
+    parser.add_argument('--log-dir', default="LOG", help="LOG目录路径")
+    parser.add_argument('--dry-run', action='store_true', help="只显示将要执行的操作")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.log_dir):
+        print(f"目录不存在: {args.log_dir}")
+        sys.exit(1)
+
+    log_store = LogStore(args.log_dir)
+    manager = RetentionManager(args.log_dir, log_store if log_store.config['enabled'] else None)
+    if args.command == 'status':
+        manager.status()
+    else:
+        manager.run(dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 日志模块
+各线程只把日志记录放入队列，由单独的线程写控制台和JSON Lines文件，
+避免多线程输出交错；每条日志自动带上当前处理的设备IP
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 导入环境配置
+try:
+    from env_loader import get_logging_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+ROOT_LOGGER = "ale"
+
+# 当前线程正在处理的设备
+current_device = contextvars.ContextVar('current_device', default='')
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def get_default_config():
+    """获取默认日志配置"""
+    return {
+        'console_level': 'INFO',
+        'file_level': 'DEBUG',
+        'json_file': os.path.join('LOG', 'ale_inspection.jsonl'),
+        'max_size': 20,
+        'backup_count': 5,
+    }
+
+
+class DeviceContextFilter(logging.Filter):
+    """为日志记录添加当前设备IP"""
+
+    def filter(self, record):
+        if not hasattr(record, 'device'):
+            record.device = current_device.get()
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'device'}
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'device': getattr(record, 'device', ''),
+            'msg': record.getMessage(),
+        }
+        # extra={...} 传入的字段原样输出
+        for key, value in record.__dict__.items():
+            if key not in self.RESERVED and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+@contextmanager
+def device_context(device_ip):
+    """在代码块内为本线程的日志设置设备IP"""
+    token = current_device.set(str(device_ip))
+    try:
+        yield
+    finally:
+        current_device.reset(token)
+
+
+def get_logger(name):
+    """获取模块日志记录器"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def setup_logging(config=None):
+    """初始化日志（重复调用只生效一次）
+
+    控制台按 LOG_CONSOLE_LEVEL 输出简洁信息，JSON Lines文件按
+    LOG_FILE_LEVEL 保留完整细节，大规模巡检时可将控制台调为WARNING。
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        if config is None:
+            config = get_logging_config() if ENV_AVAILABLE else get_default_config()
+
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(config['console_level'].upper())
+        console_handler.setFormatter(logging.Formatter('%(message)s'))
+        handlers = [console_handler]
+
+        levels = [console_handler.level]
+        if config['json_file']:
+            try:
+                directory = os.path.dirname(config['json_file'])
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                file_handler = RotatingFileHandler(
+                    config['json_file'],
+                    maxBytes=config['max_size'] * 1024 * 1024,
+                    backupCount=config['backup_count'],
+                    encoding='utf-8',
+                )
+                file_handler.setLevel(config['file_level'].upper())
+                file_handler.setFormatter(JsonLinesFormatter())
+                handlers.append(file_handler)
+                levels.append(file_handler.level)
+            except Exception as e:
+                print(f"日志文件初始化失败，仅输出到控制台: {e}")
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(DeviceContextFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(min(levels))
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """停止日志线程，确保队列中的日志全部写出"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            root = logging.getLogger(ROOT_LOGGER)
+            for handler in list(root.handlers):
+                if isinstance(handler, QueueHandler):
+                    root.removeHandler(handler)
@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 日志内容存储模块
+按设备、按命令对输出内容做哈希，重复内容在磁盘上只保存一份，
+并生成与上一次巡检结果的差异。
+较早的巡检目录按滚动哈希切分为数据块后压缩保存，可随时还原。
+"""
+
+import io
+import os
+import re
+import json
+import stat
+import zlib
+import shutil
+import difflib
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_log_store_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+def get_default_config():
+    """获取默认存储配置"""
+    return {
+        'enabled': True,
+        'diff_enabled': True,
+        'diff_max_size': 5,
+        'plain_runs': 3,
+        'retention_days': 180,
+    }
+
+
+# 巡检目录名: <设备IP>_<巡检时间>
+RUN_DIR_PATTERN = re.compile(r'^(?P<ip>.+)_(?P<logtime>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})$')
+RUN_MANIFEST = ".manifest.json"
+
+# 基于Gear滚动哈希的内容定义分块参数
+CHUNK_MIN_SIZE = 16 * 1024
+CHUNK_MAX_SIZE = 256 * 1024
+CHUNK_MASK = ((1 << 16) - 1) << 48  # 平均块大小约64KB
+# 打包时每次读取的数据量，以及numpy计算边界时每段的长度
+CHUNK_WINDOW = 4 * 1024 * 1024
+GEAR_BLOCK = 64 * 1024
+GEAR_TABLE = tuple(int.from_bytes(hashlib.sha256(b'gear%d' % i).digest()[:8], 'big') for i in range(256))
+
+# 对象文件只读: 巡检目录中的文件是对象的硬链接，原地修改会同时改变存储的内容
+# 和所有共用该对象的巡检
+OBJECT_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def file_digest(file_path, block_size=1024 * 1024):
+    """计算文件的SHA256摘要"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def gear_hits(data):
+    """用numpy计算所有满足块边界条件的位置
+
+    Gear指纹每字节左移一位，64字节之前的内容已被移出，位置i的完整指纹为
+    sum(GEAR[data[i-k]] << k, k=0..63)，按窗口倍增只需6次向量运算；
+    按64K字节分段计算（前后重叠63字节），中间数组可以留在CPU缓存中。
+
+    Returns:
+        numpy数组: 完整指纹满足边界条件的位置（已排序），numpy不可用时返回None
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    gear = np.array(GEAR_TABLE, dtype=np.uint64)
+    # CHUNK_MASK 为高16位，边界条件即指纹小于2^48
+    limit = np.uint64(1 << 48)
+    values = np.frombuffer(data, dtype=np.uint8)
+    fingerprints = np.empty(GEAR_BLOCK + 63, dtype=np.uint64)
+    shifted = np.empty(GEAR_BLOCK + 63, dtype=np.uint64)
+    hits = []
+    for start in range(0, len(values), GEAR_BLOCK):
+        low = max(0, start - 63)
+        size = min(len(values), start + GEAR_BLOCK) - low
+        block = fingerprints[:size]
+        np.take(gear, values[low:low + size], out=block)
+        width = 1
+        while width < min(64, size):
+            # 窗口从width扩展到2*width: F[i] += F[i-width] << width（uint64自然按2^64取模）
+            np.left_shift(block[:-width], np.uint64(width), out=shifted[:size - width])
+            block[width:] += shifted[:size - width]
+            width *= 2
+        found = np.flatnonzero(block[start - low:] < limit)
+        if len(found):
+            hits.append(found + start)
+    return np.concatenate(hits) if hits else np.empty(0, dtype=np.intp)
+
+
+def next_chunk_end(data, start, end, hits=None):
+    """查找从start开始的块的结束位置（不超过end）"""
+    pos = start + CHUNK_MIN_SIZE
+    if pos >= end:
+        return end
+
+    # 指纹从最小块长度处开始累计，前63个字节的指纹还不完整，逐字节计算
+    gear = GEAR_TABLE
+    mask = CHUNK_MASK
+    partial_end = min(pos + 63, end) if hits is not None else end
+    fingerprint = 0
+    for byte in data[pos:partial_end]:
+        fingerprint = ((fingerprint << 1) + gear[byte]) & 0xFFFFFFFFFFFFFFFF
+        pos += 1
+        if not fingerprint & mask:
+            return pos
+    if pos >= end:
+        return end
+
+    index = hits.searchsorted(pos)
+    if index < len(hits) and hits[index] < end:
+        return int(hits[index]) + 1
+    return end
+
+
+def iter_chunk_bounds(data, final=True):
+    """按Gear滚动哈希切分数据，返回每个块的(起始, 结束)位置
+
+    块边界由内容决定，文件中间插入或删除内容时只影响附近的块，
+    其余块的摘要保持不变，可以跨文件、跨巡检去重。
+
+    Args:
+        data: 数据
+        final: 是否为最后一段数据；否则不足最大块长度的剩余部分不切分，留给下一段
+    """
+    hits = gear_hits(data)
+    length = len(data)
+    start = 0
+    while start < length and (final or length - start >= CHUNK_MAX_SIZE):
+        end = next_chunk_end(data, start, min(start + CHUNK_MAX_SIZE, length), hits)
+        yield start, end
+        start = end
+
+
+def iter_chunks(stream, window=CHUNK_WINDOW):
+    """从文件对象中按窗口读取并切块，内存占用与文件大小无关"""
+    pending = b''
+    while True:
+        block = stream.read(window)
+        data = pending + block if pending else block
+        offset = 0
+        for start, end in iter_chunk_bounds(data, final=not block):
+            yield data[start:end]
+            offset = end
+        if not block:
+            return
+        pending = data[offset:]
+
+
+def remove_file(path):
+    """删除文件；Windows不能删除只读文件，先去掉只读属性"""
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+
+def remove_tree(path):
+    """删除目录，目录中可以有指向只读对象的硬链接"""
+    try:
+        shutil.rmtree(path)
+    except OSError:
+        for root, _, files in os.walk(path):
+            for file in files:
+                try:
+                    os.chmod(os.path.join(root, file), stat.S_IREAD | stat.S_IWRITE)
+                except OSError:
+                    pass
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def parse_run_dir(name):
+    """解析巡检目录名，返回(设备IP, 巡检时间)，不匹配返回None"""
+    match = RUN_DIR_PATTERN.match(name)
+    if not match:
+        return None
+    return match.group('ip'), match.group('logtime')
+
+
+class LogStore:
+    """内容寻址的日志存储
+
+    LOG/.store/objects/<前两位>/<sha256> 保存去重后的完整内容，
+    LOG/.store/index.json 记录每台设备每个输出项最近一次的摘要。
+    巡检目录中的文件以硬链接方式指向对象，相同内容不重复占用空间；
+    对象文件是只读的，以只读方式打开巡检文件不受影响，原地写入会失败，
+    需要修改时先复制一份。
+
+    最近几次巡检保持普通文件，更早的巡检目录被打包：文件切分为
+    LOG/.store/chunks 下的压缩数据块，目录中只保留 .manifest.json，
+    需要时可通过 restore_run() 还原。
+    """
+
+    def __init__(self, log_dir="LOG", config=None):
+        if config is None:
+            config = get_log_store_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.store_dir = os.path.join(log_dir, ".store")
+        self.objects_dir = os.path.join(self.store_dir, "objects")
+        self.chunks_dir = os.path.join(self.store_dir, "chunks")
+        self.manifests_dir = os.path.join(self.store_dir, "manifests")
+        self.log_dir = log_dir
+        self.index_file = os.path.join(self.store_dir, "index.json")
+        self.lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.previous = self._load_index()
+        self.current = {}
+        self.unchanged_paths = set()
+
+    def _load_index(self):
+        """加载上一次巡检的摘要索引"""
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取内容索引失败，将视为首次运行: {e}")
+            return {}
+
+    def object_path(self, digest):
+        """根据摘要获取对象文件路径"""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _write_object(self, digest, data=None, src_path=None):
+        """写入只读的对象文件（已存在则跳过）"""
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            self._protect(path)
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if data is not None:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        else:
+            with open(src_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for block in iter(lambda: src.read(1024 * 1024), b''):
+                    dst.write(block)
+        os.chmod(tmp_path, OBJECT_MODE)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _protect(path):
+        """确保对象文件只读
+
+        较早版本写入的对象是可写的；Windows上删除只读硬链接时
+        需要先去掉共用的只读属性，这里重新设置。
+        """
+        try:
+            if os.stat(path).st_mode & 0o222:
+                os.chmod(path, OBJECT_MODE)
+        except OSError:
+            pass
+
+    def _link_to_object(self, object_path, file_path):
+        """用指向对象的硬链接替换巡检目录中的文件"""
+        tmp_path = f"{file_path}.link.tmp"
+        try:
+            os.link(object_path, tmp_path)
+            os.replace(tmp_path, file_path)
+        except OSError:
+            # 文件系统不支持硬链接时保留原文件
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _record(self, device_ip, key, digest):
+        """记录本次摘要，返回内容是否发生变化"""
+        device_ip = str(device_ip)
+        with self.lock:
+            self.current.setdefault(device_ip, {})[key] = digest
+            previous = self.previous.get(device_ip, {}).get(key)
+        return previous != digest
+
+    def previous_digest(self, device_ip, key):
+        """获取上一次巡检的摘要"""
+        return self.previous.get(str(device_ip), {}).get(key)
+
+    def read_previous(self, device_ip, key):
+        """读取上一次巡检的内容"""
+        digest = self.previous_digest(device_ip, key)
+        if not digest:
+            return None
+        return self.read_object(digest)
+
+    def read_object(self, digest):
+        """读取对象内容，完整对象已清理时由数据块还原"""
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+        manifest = self._load_manifest(digest)
+        if manifest is None:
+            return None
+        return b''.join(self._read_chunk(chunk) for chunk in manifest['chunks'])
+
+    def chunk_path(self, digest):
+        """根据摘要获取数据块路径"""
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def manifest_path(self, digest):
+        """根据文件摘要获取分块清单路径"""
+        return os.path.join(self.manifests_dir, digest[:2], f"{digest}.json")
+
+    def _read_chunk(self, digest):
+        """读取并解压数据块"""
+        with open(self.chunk_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _load_manifest(self, digest):
+        """读取分块清单"""
+        path = self.manifest_path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _atomic_write(self, path, data):
+        """先写临时文件再替换，避免中断时留下残缺文件"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put_chunked(self, data, digest=None):
+        """将内容切分为数据块保存，返回文件摘要"""
+        digest = digest or hashlib.sha256(data).hexdigest()
+        if os.path.exists(self.manifest_path(digest)):
+            return digest
+        return self._put_chunks(io.BytesIO(data), digest)
+
+    def put_chunked_file(self, file_path, digest=None):
+        """将文件按窗口读取并切分为数据块保存，返回文件摘要"""
+        digest = digest or file_digest(file_path)
+        if os.path.exists(self.manifest_path(digest)):
+            return digest
+        with open(file_path, 'rb') as f:
+            return self._put_chunks(f, digest)
+
+    def _put_chunks(self, stream, digest):
+        """切块保存并写入分块清单"""
+        chunks = []
+        size = 0
+        for chunk in iter_chunks(stream):
+            chunk_digest = hashlib.sha256(chunk).hexdigest()
+            chunk_path = self.chunk_path(chunk_digest)
+            if not os.path.exists(chunk_path):
+                self._atomic_write(chunk_path, zlib.compress(chunk, 6))
+            chunks.append(chunk_digest)
+            size += len(chunk)
+
+        manifest = {'size': size, 'chunks': chunks}
+        self._atomic_write(self.manifest_path(digest), json.dumps(manifest).encode('utf-8'))
+        return digest
+
+    def add_file(self, device_ip, file_path):
+        """将巡检文件加入存储
+
+        Args:
+            device_ip (str): 设备IP
+            file_path (str): 巡检目录中的文件路径
+
+        Returns:
+            bool: 内容与上次相比是否发生变化
+        """
+        key = os.path.basename(file_path)
+        digest = file_digest(file_path)
+        object_path = self._write_object(digest, src_path=file_path)
+        self._link_to_object(object_path, file_path)
+
+        changed = self._record(device_ip, key, digest)
+        if changed:
+            self.write_diff(device_ip, key, file_path)
+        else:
+            with self.lock:
+                self.unchanged_paths.add(os.path.abspath(file_path))
+        return changed
+
+    def add_text(self, device_ip, key, text):
+        """将单条命令输出加入存储，返回内容是否发生变化"""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        self._write_object(digest, data=data)
+        return self._record(device_ip, key, digest)
+
+    def diff_text(self, device_ip, key, text, label=None):
+        """生成文本与上一次内容的统一差异格式"""
+        previous = self.read_previous(device_ip, key)
+        old_lines = previous.decode('utf-8', errors='replace').splitlines(keepends=True) if previous else []
+        new_lines = text.splitlines(keepends=True)
+        label = label or key
+        return ''.join(difflib.unified_diff(old_lines, new_lines, f"previous/{label}", f"current/{label}"))
+
+    def write_diff(self, device_ip, key, file_path):
+        """在文件旁生成与上一次内容的差异文件"""
+        if not self.config['diff_enabled'] or not self.previous_digest(device_ip, key):
+            return None
+
+        max_size = self.config['diff_max_size'] * 1024 * 1024
+        if os.path.getsize(file_path) > max_size:
+            logger.debug(f"文件过大，跳过差异比较: {file_path}")
+            return None
+
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                diff = self.diff_text(device_ip, key, f.read())
+            diff_path = f"{file_path}.diff"
+            with open(diff_path, 'w', encoding='utf-8') as f:
+                f.write(diff)
+            return diff_path
+        except Exception as e:
+            logger.error(f"生成差异文件失败 {file_path}: {e}")
+            return None
+
+    def mark_unchanged(self, file_path):
+        """标记文件内容与上次相同"""
+        with self.lock:
+            self.unchanged_paths.add(os.path.abspath(file_path))
+
+    def is_unchanged(self, file_path):
+        """判断文件内容是否与上次相同"""
+        return os.path.abspath(file_path) in self.unchanged_paths
+
+    def save(self, logtime=None):
+        """保存本次巡检的摘要索引，作为下一次比较的基准"""
+        with self.lock:
+            index = dict(self.previous)
+            for device_ip, entries in self.current.items():
+                merged = dict(index.get(device_ip, {}))
+                merged.update(entries)
+                index[device_ip] = merged
+            index.setdefault('_meta', {})['logtime'] = logtime or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+        tmp_path = f"{self.index_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_file)
+
+    def list_runs(self):
+        """列出LOG目录下的巡检目录，按设备分组并按时间排序"""
+        runs = {}
+        if not os.path.isdir(self.log_dir):
+            return runs
+        for name in os.listdir(self.log_dir):
+            parsed = parse_run_dir(name)
+            if not parsed or not os.path.isdir(os.path.join(self.log_dir, name)):
+                continue
+            device_ip, logtime = parsed
+            runs.setdefault(device_ip, []).append((logtime, os.path.join(self.log_dir, name)))
+        for device_runs in runs.values():
+            device_runs.sort()
+        return runs
+
+    def is_packed(self, run_dir):
+        """判断巡检目录是否已打包"""
+        return os.path.exists(os.path.join(run_dir, RUN_MANIFEST))
+
+    def pack_run(self, run_dir):
+        """打包巡检目录：文件切块保存后删除，只保留清单
+
+        Returns:
+            int: 释放的字节数
+        """
+        manifest_file = os.path.join(run_dir, RUN_MANIFEST)
+        entries = {}
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+
+        freed = 0
+        packed_paths = []
+        for root, _, files in os.walk(run_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                if file_path == manifest_file or file.endswith('.tmp'):
+                    continue
+                entries[os.path.relpath(file_path, run_dir)] = self.put_chunked_file(file_path)
+                packed_paths.append(file_path)
+
+        if not packed_paths:
+            return 0
+
+        # 清单写入成功后才删除原文件
+        self._atomic_write(manifest_file, json.dumps(entries, ensure_ascii=False, indent=2).encode('utf-8'))
+        for file_path in packed_paths:
+            file_stat = os.stat(file_path)
+            if file_stat.st_nlink <= 1:
+                freed += file_stat.st_size
+            remove_file(file_path)
+        return freed
+
+    def restore_run(self, run_dir, target_dir=None):
+        """还原已打包的巡检目录"""
+        target_dir = target_dir or run_dir
+        manifest_file = os.path.join(run_dir, RUN_MANIFEST)
+        if not os.path.exists(manifest_file):
+            logger.warning(f"巡检目录未打包: {run_dir}")
+            return False
+
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+
+        for rel_path, digest in entries.items():
+            if not self._restore_object(digest, os.path.join(target_dir, rel_path)):
+                logger.error(f"缺少数据块，无法还原: {rel_path}")
+                return False
+
+        if target_dir == run_dir:
+            os.remove(manifest_file)
+        logger.info(f"还原完成: {target_dir}")
+        return True
+
+    def _restore_object(self, digest, path):
+        """逐块写出对象内容，返回是否成功"""
+        object_path = self.object_path(digest)
+        chunks = None
+        if not os.path.exists(object_path):
+            manifest = self._load_manifest(digest)
+            if manifest is None or not all(os.path.exists(self.chunk_path(chunk)) for chunk in manifest['chunks']):
+                return False
+            chunks = manifest['chunks']
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            if chunks is None:
+                with open(object_path, 'rb') as src:
+                    shutil.copyfileobj(src, f, 1024 * 1024)
+            else:
+                for chunk in chunks:
+                    f.write(self._read_chunk(chunk))
+        os.replace(tmp_path, path)
+        return True
+
+    def prune(self, retention_days=None):
+        """删除超过保留天数的已打包巡检目录"""
+        if retention_days is None:
+            retention_days = self.config['retention_days']
+        if not retention_days:
+            return 0
+
+        cutoff = (datetime.now() - timedelta(days=retention_days)).strftime("%Y-%m-%d_%H-%M-%S")
+        removed = 0
+        for device_runs in self.list_runs().values():
+            for logtime, run_dir in device_runs:
+                if logtime < cutoff and self.is_packed(run_dir):
+                    remove_tree(run_dir)
+                    removed += 1
+        return removed
+
+    def gc(self):
+        """清理不再被引用的对象、清单和数据块
+
+        Returns:
+            int: 释放的字节数
+        """
+        referenced = set()
+        for entries in self._load_index_for_gc().values():
+            referenced.update(entries.values())
+        with self.lock:
+            for entries in self.current.values():
+                referenced.update(entries.values())
+        for device_runs in self.list_runs().values():
+            for _, run_dir in device_runs:
+                manifest_file = os.path.join(run_dir, RUN_MANIFEST)
+                if os.path.exists(manifest_file):
+                    with open(manifest_file, 'r', encoding='utf-8') as f:
+                        referenced.update(json.load(f).values())
+
+        freed = 0
+        live_chunks = set()
+        for path in self._iter_store_files(self.manifests_dir):
+            digest = os.path.basename(path)[:-len('.json')]
+            if digest not in referenced:
+                freed += os.path.getsize(path)
+                os.remove(path)
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                live_chunks.update(json.load(f)['chunks'])
+
+        for path in self._iter_store_files(self.chunks_dir):
+            if os.path.basename(path) not in live_chunks:
+                freed += os.path.getsize(path)
+                os.remove(path)
+
+        # 完整对象已不被巡检目录链接时，仍被索引引用的内容转为数据块保存
+        for path in self._iter_store_files(self.objects_dir):
+            digest = os.path.basename(path)
+            if os.stat(path).st_nlink > 1:
+                self._protect(path)
+                continue
+            if digest in referenced and not os.path.exists(self.manifest_path(digest)):
+                self.put_chunked_file(path, digest)
+            freed += os.path.getsize(path)
+            remove_file(path)
+        return freed
+
+    def _load_index_for_gc(self):
+        """读取磁盘上的索引（不含元数据）"""
+        index = self._load_index()
+        index.pop('_meta', None)
+        return index
+
+    def _iter_store_files(self, base_dir):
+        """遍历存储目录中的文件"""
+        if not os.path.isdir(base_dir):
+            return
+        for root, _, files in os.walk(base_dir):
+            for file in files:
+                if not file.endswith('.tmp'):
+                    yield os.path.join(root, file)
+
+    def compact(self, plain_runs=None):
+        """打包较早的巡检目录，删除过期历史并回收空间"""
+        if plain_runs is None:
+            plain_runs = self.config['plain_runs']
+        # 至少保留最近一次巡检为普通文件，供压缩和邮件使用
+        plain_runs = max(1, plain_runs)
+
+        packed = 0
+        freed = 0
+        for device_runs in self.list_runs().values():
+            for _, run_dir in device_runs[:-plain_runs]:
+                if self.is_packed(run_dir) and not self._has_plain_files(run_dir):
+                    continue
+                freed += self.pack_run(run_dir)
+                packed += 1
+
+        removed = self.prune()
+        freed += self.gc()
+        logger.info(f"日志存储整理完成: 打包 {packed} 个目录, 删除 {removed} 个过期目录, 释放 {freed / (1024 * 1024):.2f}MB")
+        return packed, removed, freed
+
+    def _has_plain_files(self, run_dir):
+        """判断已打包目录中是否还有未打包的文件"""
+        for _, _, files in os.walk(run_dir):
+            if any(file != RUN_MANIFEST for file in files):
+                return True
+        return False
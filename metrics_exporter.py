@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - Prometheus指标导出模块
+以Prometheus文本格式输出巡检指标，支持node_exporter的textfile collector
+文件输出，或在巡检期间提供本地HTTP /metrics 接口
+"""
+
+import os
+import time
+import threading
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_metrics_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+METRIC_PREFIX = "ale_inspection"
+DURATION_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+DOWNLOAD_PHASES = ('ftp', 'tftp', 'sftp', 'scp')
+
+
+def get_default_config():
+    """获取默认指标配置"""
+    return {
+        'textfile': '',
+        'http_port': 0,
+        'http_addr': '127.0.0.1',
+    }
+
+
+def format_labels(labels):
+    """格式化指标标签"""
+    if not labels:
+        return ''
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class MetricsExporter:
+    """巡检指标收集和导出
+
+    通过 RunReport.add_listener(exporter.observe) 接收阶段耗时，
+    巡检期间设备并发数由 device_started()/device_finished() 维护。
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = get_metrics_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.lock = threading.Lock()
+        self.server = None
+
+        self.in_flight = 0
+        self.devices = {}
+        self.histograms = {}
+        self.download_bytes = {}
+        self.compress_bytes = 0
+        self.compress_seconds = 0.0
+        self.failures = {}
+        self.run_started = time.time()
+        self.run_duration = 0.0
+
+    @property
+    def enabled(self):
+        """是否配置了任何输出方式"""
+        return bool(self.config['textfile'] or self.config['http_port'])
+
+    def device_started(self):
+        """设备开始巡检"""
+        with self.lock:
+            self.in_flight += 1
+
+    def device_finished(self, ok):
+        """设备巡检结束"""
+        status = 'success' if ok else 'failed'
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.devices[status] = self.devices.get(status, 0) + 1
+
+    def observe(self, span):
+        """接收一条阶段耗时记录"""
+        phase = span['phase']
+        duration = span['duration']
+        with self.lock:
+            histogram = self.histograms.setdefault(phase, {
+                'buckets': [0] * len(DURATION_BUCKETS), 'count': 0, 'sum': 0.0
+            })
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['count'] += 1
+            histogram['sum'] += duration
+
+            if phase in DOWNLOAD_PHASES and span.get('bytes'):
+                self.download_bytes[phase] = self.download_bytes.get(phase, 0) + span['bytes']
+            elif phase == 'compress' and span['ok']:
+                self.compress_bytes += span.get('bytes', 0)
+                self.compress_seconds += duration
+
+            if not span['ok']:
+                key = (phase, span.get('error') or 'failed')
+                self.failures[key] = self.failures.get(key, 0) + 1
+
+    def finish_run(self):
+        """记录本次巡检结束"""
+        with self.lock:
+            self.run_duration = time.time() - self.run_started
+
+    def render(self):
+        """生成Prometheus文本格式的指标"""
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{full_name}{suffix}{format_labels(labels)} {value}")
+
+        with self.lock:
+            metric('devices_in_flight', 'gauge', 'Devices currently being inspected',
+                   [('', None, self.in_flight)])
+            metric('devices_total', 'counter', 'Inspected devices by result',
+                   [('', {'status': status}, count) for status, count in sorted(self.devices.items())])
+
+            samples = []
+            for phase, histogram in sorted(self.histograms.items()):
+                for bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+                    samples.append(('_bucket', {'phase': phase, 'le': bound}, count))
+                samples.append(('_bucket', {'phase': phase, 'le': '+Inf'}, histogram['count']))
+                samples.append(('_sum', {'phase': phase}, round(histogram['sum'], 3)))
+                samples.append(('_count', {'phase': phase}, histogram['count']))
+            metric('phase_duration_seconds', 'histogram', 'Duration of inspection phases', samples)
+
+            metric('download_bytes_total', 'counter', 'Bytes downloaded by protocol',
+                   [('', {'protocol': protocol}, count) for protocol, count in sorted(self.download_bytes.items())])
+            metric('compress_bytes_total', 'counter', 'Input bytes compressed into device packages',
+                   [('', None, self.compress_bytes)])
+            throughput = self.compress_bytes / self.compress_seconds if self.compress_seconds else 0
+            metric('compress_throughput_bytes_per_second', 'gauge', 'Compression throughput of the run',
+                   [('', None, round(throughput, 1))])
+            metric('failures_total', 'counter', 'Failed phases by reason',
+                   [('', {'phase': phase, 'reason': reason}, count)
+                    for (phase, reason), count in sorted(self.failures.items())])
+            metric('run_start_timestamp_seconds', 'gauge', 'Start time of the run',
+                   [('', None, round(self.run_started, 3))])
+            metric('run_duration_seconds', 'gauge', 'Duration of the last finished run',
+                   [('', None, round(self.run_duration, 3))])
+
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self):
+        """写入textfile collector文件（原子替换，避免被读到一半）"""
+        path = self.config['textfile']
+        if not path:
+            return None
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+            return path
+        except Exception as e:
+            logger.error(f"写入指标文件失败: {e}")
+            return None
+
+    def start_http(self):
+        """启动本地HTTP指标接口"""
+        port = self.config['http_port']
+        if not port:
+            return None
+        # 只有开启HTTP接口时才导入 http.server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.config['http_addr'], port), MetricsHandler)
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"指标接口已启动: http://{self.config['http_addr']}:{port}/metrics")
+            return self.server
+        except Exception as e:
+            logger.error(f"指标接口启动失败: {e}")
+            self.server = None
+            return None
+
+    def stop_http(self):
+        """停止HTTP指标接口"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 断点续传模块
+下载时先写入 .part 临时文件，并在 .part.json 中记录远端文件大小、
+已接收字节数和已接收部分的SHA-256；传输中断后从断点继续，
+校验不一致时从头下载
+"""
+
+import os
+import json
+import hashlib
+import calendar
+from datetime import datetime
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+# 每接收这么多字节保存一次断点（进程被终止时最多重新下载这么多）
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+
+# 校验已有部分时每次读取的字节数
+HASH_BLOCK = 1024 * 1024
+
+
+def normalize_mtime(mtime):
+    """将远端修改时间统一为整数秒的UTC时间戳
+
+    SFTP返回时间戳，FTP的MDTM返回 YYYYMMDDHHMMSS[.sss] 格式的UTC时间，
+    统一后FTP中断留下的临时文件也能由SFTP续传，反之亦然。
+    无法解析的值原样保留，只与同样格式的值比较。
+    """
+    if mtime is None:
+        return None
+    if isinstance(mtime, (int, float)):
+        return int(mtime)
+    text = str(mtime).strip()
+    try:
+        return calendar.timegm(datetime.strptime(text[:14], "%Y%m%d%H%M%S").timetuple())
+    except ValueError:
+        return text
+
+
+def partial_size(path):
+    """已下载部分的字节数，没有临时文件时返回0"""
+    try:
+        return os.path.getsize(path + PART_SUFFIX)
+    except OSError:
+        return 0
+
+
+def discard_partial(path):
+    """删除临时文件和断点记录"""
+    for suffix in (PART_SUFFIX, STATE_SUFFIX):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+class PartialFile:
+    """可续传的下载文件
+
+    用法:
+        with PartialFile(local_path, remote_size, remote_mtime) as part:
+            remote.seek(part.offset)
+            for data in remote:
+                part.write(data)
+            part.commit()
+
+    远端文件大小未知时不续传，每次从头下载。
+    远端修改时间可以是时间戳或MDTM字符串，保存前统一格式。
+    """
+
+    def __init__(self, path, remote_size=None, remote_mtime=None):
+        self.path = path
+        self.part_path = path + PART_SUFFIX
+        self.state_path = path + STATE_SUFFIX
+        self.remote_size = remote_size
+        self.remote_mtime = normalize_mtime(remote_mtime)
+        self.digest = hashlib.sha256()
+        self.offset = 0
+        self.start = 0
+        self.saved = 0
+        self.file = None
+        self.committed = False
+
+    def _load_state(self):
+        """读取断点记录，不存在或无法读取时返回None"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _resume_offset(self):
+        """校验已有的临时文件，返回可以续传的位置"""
+        if self.remote_size is None:
+            return 0
+        state = self._load_state()
+        if not state or not state.get('offset'):
+            return 0
+        if state.get('size') != self.remote_size or state.get('mtime') != self.remote_mtime:
+            logger.info(f"! 远端文件已变化，重新下载: {os.path.basename(self.path)}")
+            return 0
+        offset = state['offset']
+        if offset > self.remote_size or partial_size(self.path) < offset:
+            return 0
+
+        if state.get('sha256') is None:
+            # 零拷贝接收的数据没有摘要，只能按大小续传
+            self.digest = None
+            return offset
+
+        # 重新计算已有部分的摘要，与记录不一致说明本地文件已损坏
+        digest = hashlib.sha256()
+        remaining = offset
+        with open(self.part_path, 'rb') as f:
+            while remaining:
+                data = f.read(min(HASH_BLOCK, remaining))
+                if not data:
+                    break
+                digest.update(data)
+                remaining -= len(data)
+        if remaining or digest.hexdigest() != state.get('sha256'):
+            logger.warning(f"! 临时文件校验失败，重新下载: {os.path.basename(self.path)}")
+            return 0
+        self.digest = digest
+        return offset
+
+    def open(self):
+        """打开临时文件，定位到续传位置"""
+        self.offset = self._resume_offset()
+        if self.offset:
+            self.file = open(self.part_path, 'r+b')
+            self.file.seek(self.offset)
+            # 丢弃最后一次保存断点之后写入的数据
+            self.file.truncate()
+        else:
+            self.digest = hashlib.sha256()
+            self.file = open(self.part_path, 'wb')
+        self.start = self.saved = self.offset
+        return self
+
+    def restart(self):
+        """放弃已下载部分，从头下载（例如服务器不支持续传）"""
+        self.file.seek(0)
+        self.file.truncate()
+        self.digest = hashlib.sha256()
+        self.offset = self.start = self.saved = 0
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    @property
+    def received(self):
+        """本次接收的字节数"""
+        return self.offset - self.start
+
+    def write(self, data):
+        """写入一块数据"""
+        self.file.write(data)
+        if self.digest is not None:
+            self.digest.update(data)
+        self.offset += len(data)
+        if self.offset - self.saved >= CHECKPOINT_BYTES:
+            self.checkpoint()
+
+    def advance(self, count):
+        """登记已由其他方式（如 os.splice）直接写入文件的数据
+
+        这部分数据不经过Python，无法计算摘要，之后续传时只按大小校验。
+        """
+        self.digest = None
+        self.offset += count
+        # 同步文件对象的位置
+        self.file.seek(self.offset)
+        if self.offset - self.saved >= CHECKPOINT_BYTES:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """保存断点"""
+        if self.remote_size is None:
+            return
+        self.file.flush()
+        state = {
+            'size': self.remote_size,
+            'mtime': self.remote_mtime,
+            'offset': self.offset,
+            'sha256': self.digest.hexdigest() if self.digest is not None else None,
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        self.saved = self.offset
+
+    def close(self):
+        """关闭临时文件并保存断点，下次可从这里续传"""
+        if self.file is None:
+            return
+        try:
+            if not self.committed:
+                self.checkpoint()
+        finally:
+            self.file.close()
+            self.file = None
+
+    def commit(self):
+        """下载完成: 校验大小后改为正式文件名
+
+        Returns:
+            str: 文件的SHA-256，有数据未经过Python时返回None
+
+        Raises:
+            IOError: 接收的字节数与远端文件大小不一致
+        """
+        if self.remote_size is not None and self.offset != self.remote_size:
+            raise IOError(f"下载不完整: {self.offset}/{self.remote_size} 字节")
+        self.committed = True
+        self.file.close()
+        self.file = None
+        os.replace(self.part_path, self.path)
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+        return self.digest.hexdigest() if self.digest is not None else None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
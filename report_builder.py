@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - HTML巡检报告模块
+作为 RunReport 的监听函数，设备完成时即渲染该设备的表格行，
+巡检结束后只需拼接已渲染的片段即可得到邮件正文和HTML报告文件
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+from html import escape
+
+from device_registry import get_profile
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+# 下载阶段，按传输方式分别记录
+DOWNLOAD_PHASES = ('sftp', 'scp', 'ftp', 'tftp')
+# 执行阶段: ALE的tech-support及等待，其他厂商的命令
+EXECUTE_PHASES = ('tech_support', 'wait', 'command')
+
+STATUS_TEXT = {
+    'success': ('✓ 成功', 'success'),
+    'failed': ('✗ 失败', 'failed'),
+    'running': ('… 进行中', ''),
+    'pending': ('… 未开始', ''),
+}
+
+STYLE = """
+<style>
+    body { font-family: Arial, sans-serif; margin: 20px; }
+    .header { background-color: #f0f0f0; padding: 15px; border-radius: 5px; }
+    .summary { margin: 20px 0; }
+    .success { color: #28a745; }
+    .failed { color: #dc3545; }
+    .device-list { margin: 10px 0; }
+    .device-item { margin: 5px 0; padding: 5px; background-color: #f8f9fa; border-radius: 3px; }
+    table { border-collapse: collapse; margin: 10px 0; font-size: 13px; }
+    th, td { border: 1px solid #dee2e6; padding: 4px 8px; text-align: left; }
+    th { background-color: #e9ecef; cursor: pointer; white-space: nowrap; }
+    td.num { text-align: right; }
+    .footer { margin-top: 30px; padding: 15px; background-color: #e9ecef; border-radius: 5px; font-size: 12px; }
+</style>
+"""
+
+# 点击表头排序（邮件客户端不执行脚本，表格已按失败优先、耗时从长到短排好）
+SORT_SCRIPT = """
+<script>
+document.querySelectorAll('table.sortable th').forEach(function (th, index) {
+    th.addEventListener('click', function () {
+        var body = th.closest('table').tBodies[0];
+        var desc = th.dataset.order !== 'desc';
+        th.dataset.order = desc ? 'desc' : 'asc';
+        var key = function (row) {
+            var cell = row.cells[index];
+            var value = cell.dataset.v !== undefined ? cell.dataset.v : cell.textContent;
+            return isNaN(parseFloat(value)) ? value : parseFloat(value);
+        };
+        Array.from(body.rows).sort(function (a, b) {
+            var x = key(a), y = key(b);
+            return (x < y ? -1 : x > y ? 1 : 0) * (desc ? -1 : 1);
+        }).forEach(function (row) { body.appendChild(row); });
+    });
+});
+</script>
+"""
+
+DEVICE_COLUMNS = ['设备', '厂商', '状态', '失败阶段', '错误', '连接(秒)', '执行(秒)', '下载(秒)', '压缩(秒)',
+                  '总耗时(秒)', '下载大小(MB)', '压缩包(MB)']
+
+
+def format_mb(size):
+    """字节数转换为MB文本"""
+    return f"{size / (1024 * 1024):.2f}"
+
+
+def number_cell(value, text=None):
+    """数值单元格，data-v 供排序使用"""
+    if value is None:
+        return '<td class="num" data-v="-1">-</td>'
+    return f'<td class="num" data-v="{value}">{text if text is not None else f"{value:.1f}"}</td>'
+
+
+def attachment_items(files, sizes=None):
+    """附件列表的HTML片段，已知大小的附件不再读取文件大小"""
+    sizes = sizes or {}
+    parts = []
+    for path in files:
+        size = sizes.get(path)
+        if size is None:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+        parts.append(f'<div class="device-item">📄 {escape(os.path.basename(path))} ({format_mb(size)} MB)</div>\n')
+    return parts
+
+
+def page(title, current_time, body_parts, scripts=False):
+    """拼接完整的HTML页面"""
+    parts = ['<html>\n<head>\n<meta charset="utf-8">\n', STYLE, '</head>\n<body>\n',
+             f'<div class="header">\n<h2>🔍 {escape(title)}</h2>\n',
+             f'<p><strong>巡检时间:</strong> {current_time}</p>\n</div>\n']
+    parts.extend(body_parts)
+    parts.append('<div class="footer">\n<p>此邮件由ALE网络运维工具包自动发送</p>\n'
+                 f'<p>如有问题，请联系系统管理员</p>\n<p>发送时间: {current_time}</p>\n</div>\n')
+    if scripts:
+        parts.append(SORT_SCRIPT)
+    parts.append('</body>\n</html>\n')
+    return ''.join(parts)
+
+
+class ReportBuilder:
+    """按设备增量生成的HTML巡检报告
+
+    用法:
+        builder = ReportBuilder(logtime, results)
+        report.add_listener(builder.observe)
+        ...
+        html = builder.render()
+    """
+
+    def __init__(self, logtime, results):
+        self.logtime = logtime
+        self.results = results
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.devices = {}
+        self.rows = {}
+        self.attachments = {}
+
+    def _entry(self, device_ip):
+        """获取设备的累计数据"""
+        entry = self.devices.get(device_ip)
+        if entry is None:
+            entry = self.devices[device_ip] = {
+                'phases': {}, 'bytes': 0, 'zip_bytes': None, 'total': None, 'done': False,
+            }
+        return entry
+
+    def observe(self, span):
+        """RunReport 监听函数: 累计阶段耗时，设备完成后渲染（或更新）该设备的表格行"""
+        device_ip = span['device']
+        if not device_ip:
+            return
+        with self.lock:
+            entry = self._entry(device_ip)
+            phase = span['phase']
+            entry['phases'][phase] = entry['phases'].get(phase, 0.0) + span['duration']
+            if phase in DOWNLOAD_PHASES and span.get('bytes'):
+                entry['bytes'] += span['bytes']
+            if span.get('zip_bytes') is not None:
+                entry['zip_bytes'] = span['zip_bytes']
+            if phase == 'device':
+                entry['total'] = span['duration']
+                entry['done'] = True
+            if entry['done']:
+                self.rows[device_ip] = self.render_row(device_ip, entry)
+
+    def add_attachment(self, path, size):
+        """记录附件大小，生成报告时不再读取文件"""
+        with self.lock:
+            self.attachments[path] = size
+
+    def attachment_size(self, path):
+        """附件大小，未记录的读取文件大小"""
+        with self.lock:
+            size = self.attachments.get(path)
+        if size is None:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+        return size
+
+    def render_row(self, device_ip, entry):
+        """渲染一台设备的表格行
+
+        Returns:
+            tuple: (排序键, HTML片段)
+        """
+        result = self.results.get(device_ip) or {}
+        status = result.get('status', 'pending')
+        status_text, status_class = STATUS_TEXT.get(status, (status, ''))
+        device_type = result.get('device_type', '')
+        phases = entry['phases']
+
+        def total(names):
+            values = [phases[name] for name in names if name in phases]
+            return sum(values) if values else None
+
+        failed = status == 'failed'
+        error = result.get('error') or ''
+        elapsed = entry['total']
+        if elapsed is None and result.get('started') and result.get('finished'):
+            # 看门狗放弃的设备没有 device 阶段记录，按登记的开始和结束时间计算
+            elapsed = result['finished'] - result['started']
+        cells = [
+            f'<td>{escape(device_ip)}</td>',
+            f'<td>{escape(get_profile(device_type).label) if device_type else ""}</td>',
+            f'<td class="{status_class}" data-v="{0 if failed else 1}">{status_text}</td>',
+            f'<td>{escape(result.get("phase") or "") if failed else ""}</td>',
+            f'<td title="{escape(error)}">{escape(error[:120])}</td>',
+            number_cell(phases.get('connect')),
+            number_cell(total(EXECUTE_PHASES)),
+            number_cell(total(DOWNLOAD_PHASES)),
+            number_cell(phases.get('compress')),
+            number_cell(elapsed),
+            number_cell(entry['bytes'], format_mb(entry['bytes'])) if entry['bytes'] else number_cell(None),
+            number_cell(entry['zip_bytes'], format_mb(entry['zip_bytes'])) if entry['zip_bytes'] is not None
+            else number_cell(None),
+        ]
+        # 失败设备在前，其次按总耗时从长到短
+        key = (not failed, -(elapsed or 0.0))
+        return key, f'<tr>{"".join(cells)}</tr>\n'
+
+    def failure_section(self):
+        """失败原因统计"""
+        reasons = self.results.failure_reasons()
+        if not reasons:
+            return []
+        parts = ['<div class="device-list">\n<h3 class="failed">❌ 失败原因统计</h3>\n<table class="sortable">\n',
+                 '<thead><tr><th>原因</th><th>设备数</th></tr></thead>\n<tbody>\n']
+        for reason, count in sorted(reasons.items(), key=lambda item: item[1], reverse=True):
+            parts.append(f'<tr><td>{escape(reason)}</td>{number_cell(count, str(count))}</tr>\n')
+        parts.append('</tbody>\n</table>\n</div>\n')
+        return parts
+
+    def render(self, attachment_files=None, scripts=False):
+        """拼接报告
+
+        Args:
+            attachment_files: 附件路径列表，None表示不列出附件
+            scripts: 是否包含表头排序脚本（邮件正文中不需要）
+
+        Returns:
+            str: HTML文本
+        """
+        success = self.results.successful()
+        failed = self.results.failed()
+        with self.lock:
+            # 超时后被看门狗放弃的设备不会完成，按登记的失败原因补上表格行
+            for device_ip in failed:
+                if device_ip not in self.rows:
+                    self.rows[device_ip] = self.render_row(device_ip, self._entry(device_ip))
+            rows = sorted(self.rows.values())
+            sizes = dict(self.attachments)
+        elapsed = time.time() - self.started
+
+        parts = ['<div class="summary">\n<h3>📊 运维汇总</h3>\n<ul>\n',
+                 f'<li><strong>设备总数:</strong> {len(success) + len(failed)}</li>\n',
+                 f'<li class="success"><strong>成功设备:</strong> {len(success)}</li>\n',
+                 f'<li class="failed"><strong>失败设备:</strong> {len(failed)}</li>\n',
+                 f'<li><strong>总耗时:</strong> {elapsed / 60:.1f} 分钟</li>\n</ul>\n</div>\n']
+        parts.extend(self.failure_section())
+        parts.append('<div class="device-list">\n<h3>📋 设备明细</h3>\n<table class="sortable">\n<thead><tr>')
+        parts.extend(f'<th>{column}</th>' for column in DEVICE_COLUMNS)
+        parts.append('</tr></thead>\n<tbody>\n')
+        parts.extend(html for _, html in rows)
+        parts.append('</tbody>\n</table>\n</div>\n')
+        if attachment_files:
+            parts.append('<div class="device-list">\n<h3>📎 附件文件</h3>\n')
+            parts.extend(attachment_items(attachment_files, sizes))
+            parts.append('</div>\n')
+
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return page('ALE设备运维报告', current_time, parts, scripts=scripts)
+
+    def write(self, log_dir="LOG", attachment_files=None):
+        """保存可排序的HTML报告
+
+        Returns:
+            str: 文件路径
+        """
+        report_dir = os.path.join(log_dir, "reports")
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"run_report_{self.logtime}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render(attachment_files, scripts=True))
+        logger.info(f"HTML巡检报告: {path}")
+        return path
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 巡检结果登记模块
+以设备IP为键记录每台设备的状态、当前阶段、各阶段耗时和失败原因，
+多线程安全，按IP查询为O(1)
+"""
+
+import time
+import threading
+
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_SUCCESS = 'success'
+STATUS_FAILED = 'failed'
+
+
+def copy_entry(entry):
+    """复制设备记录，避免调用方修改内部数据"""
+    result = dict(entry)
+    result['timings'] = dict(entry['timings'])
+    return result
+
+
+class ResultRegistry:
+    """巡检结果登记
+
+    每台设备只有一条记录，最终状态只会是成功或失败之一，
+    重复登记失败不会重复计数。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = {}
+
+    def _entry(self, device_ip):
+        """获取设备记录，不存在时创建（调用方需持有锁）"""
+        device_ip = str(device_ip)
+        entry = self.results.get(device_ip)
+        if entry is None:
+            entry = {
+                'ip': device_ip,
+                'device_type': '',
+                'status': STATUS_PENDING,
+                'phase': '',
+                'error': None,
+                'error_class': None,
+                'timings': {},
+                'started': None,
+                'finished': None,
+            }
+            self.results[device_ip] = entry
+        return entry
+
+    def register(self, device_ip, device_type=''):
+        """登记待巡检设备"""
+        with self.lock:
+            entry = self._entry(device_ip)
+            entry['device_type'] = device_type or entry['device_type']
+            return entry
+
+    def start(self, device_ip):
+        """设备开始巡检"""
+        with self.lock:
+            entry = self._entry(device_ip)
+            entry['status'] = STATUS_RUNNING
+            entry['started'] = time.time()
+
+    def set_phase(self, device_ip, phase):
+        """更新设备当前阶段"""
+        with self.lock:
+            self._entry(device_ip)['phase'] = phase
+
+    def succeed(self, device_ip):
+        """登记设备巡检成功（已失败的设备保持失败）"""
+        with self.lock:
+            entry = self._entry(device_ip)
+            if entry['status'] != STATUS_FAILED:
+                entry['status'] = STATUS_SUCCESS
+                entry['finished'] = time.time()
+
+    def fail(self, device_ip, error=None, phase=None):
+        """登记设备巡检失败，只保留第一次的失败原因"""
+        with self.lock:
+            entry = self._entry(device_ip)
+            if entry['status'] == STATUS_FAILED:
+                return
+            entry['status'] = STATUS_FAILED
+            entry['finished'] = time.time()
+            if phase:
+                entry['phase'] = phase
+            if error is not None:
+                # netmiko的异常信息有多行排查提示，只保留第一行
+                message = str(error).strip()
+                entry['error'] = message.splitlines()[0] if message else type(error).__name__
+                entry['error_class'] = type(error).__name__ if isinstance(error, BaseException) else None
+
+    def observe(self, span):
+        """累计阶段耗时，可作为 RunReport 的监听函数"""
+        if not span['device']:
+            return
+        with self.lock:
+            timings = self._entry(span['device'])['timings']
+            timings[span['phase']] = round(timings.get(span['phase'], 0.0) + span['duration'], 3)
+
+    def get(self, device_ip):
+        """按IP获取设备记录"""
+        with self.lock:
+            entry = self.results.get(str(device_ip))
+            return copy_entry(entry) if entry else None
+
+    def device_type(self, device_ip):
+        """按IP获取设备类型"""
+        with self.lock:
+            entry = self.results.get(str(device_ip))
+            return entry['device_type'] if entry else ''
+
+    def with_status(self, status):
+        """获取指定状态的设备IP列表（按登记顺序）"""
+        with self.lock:
+            return [ip for ip, entry in self.results.items() if entry['status'] == status]
+
+    def successful(self):
+        """成功设备IP列表"""
+        return self.with_status(STATUS_SUCCESS)
+
+    def failed(self):
+        """失败设备IP列表"""
+        return self.with_status(STATUS_FAILED)
+
+    def failure_reasons(self):
+        """按失败原因统计设备数"""
+        reasons = {}
+        with self.lock:
+            for entry in self.results.values():
+                if entry['status'] == STATUS_FAILED:
+                    reason = entry['error_class'] or entry['phase'] or 'unknown'
+                    reasons[reason] = reasons.get(reason, 0) + 1
+        return reasons
+
+    def snapshot(self):
+        """获取所有设备记录的副本"""
+        with self.lock:
+            return [copy_entry(entry) for entry in self.results.values()]
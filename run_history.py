@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 巡检历史模块
+每次巡检结束后把各设备的结果、阶段耗时和解析出的指标追加到带索引的SQLite文件，
+提供趋势查询（例如最近30天变慢的设备），不需要重新读取历史报告
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+from log_setup import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_history_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+def get_default_config():
+    """获取默认巡检历史配置"""
+    return {
+        'enabled': True,
+        'db_path': os.path.join('LOG', 'history.sqlite'),
+        'retention_days': 180,
+    }
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started REAL NOT NULL,
+    elapsed REAL,
+    devices INTEGER,
+    success INTEGER,
+    failed INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started);
+
+CREATE TABLE IF NOT EXISTS device_results (
+    run_id TEXT NOT NULL,
+    device TEXT NOT NULL,
+    device_type TEXT,
+    status TEXT,
+    phase TEXT,
+    error TEXT,
+    error_class TEXT,
+    total REAL,
+    PRIMARY KEY (run_id, device)
+);
+CREATE INDEX IF NOT EXISTS idx_results_device ON device_results (device, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_status ON device_results (status, run_id);
+
+CREATE TABLE IF NOT EXISTS phase_timings (
+    run_id TEXT NOT NULL,
+    device TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    duration REAL NOT NULL,
+    PRIMARY KEY (run_id, device, phase)
+);
+CREATE INDEX IF NOT EXISTS idx_timings_phase ON phase_timings (phase, run_id, device, duration);
+CREATE INDEX IF NOT EXISTS idx_timings_device ON phase_timings (device, phase, run_id);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL,
+    device TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, device, name)
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_name ON metrics (name, run_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_device ON metrics (device, name, run_id);
+"""
+
+# 健康状态转换为数值，便于比较趋势
+HEALTH_LEVELS = {'ok': 0, 'warning': 1, 'critical': 2}
+
+
+def logtime_to_epoch(logtime):
+    """巡检时间字符串(2025-07-16_14-30-15)转换为时间戳"""
+    try:
+        return datetime.strptime(logtime, "%Y-%m-%d_%H-%M-%S").timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def health_metrics(health):
+    """从tech-support健康摘要中提取数值指标
+
+    Returns:
+        list: [(设备IP, 指标名, 值)]
+    """
+    rows = []
+    for device_ip, summary in (health or {}).items():
+        for name in ('cpu', 'memory', 'temperature', 'stp_changes'):
+            if summary.get(name) is not None:
+                rows.append((device_ip, name, summary[name]))
+        rows.append((device_ip, 'port_error_ports', len(summary.get('port_errors') or {})))
+        for name in ('fan_faults', 'psu_faults', 'chassis_faults', 'temperature_alarms'):
+            rows.append((device_ip, name, len(summary.get(name) or [])))
+        if summary.get('status') in HEALTH_LEVELS:
+            rows.append((device_ip, 'health_level', HEALTH_LEVELS[summary['status']]))
+    return rows
+
+
+class RunHistory:
+    """巡检历史数据库
+
+    用法:
+        history = RunHistory()
+        history.record_run(report.to_dict(), results.snapshot(), metrics)
+        history.slowing_devices(days=30)
+    """
+
+    def __init__(self, db_path=None, config=None):
+        if config is None:
+            config = get_history_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.db_path = db_path or config['db_path']
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def connect(self):
+        """打开数据库，不存在时创建"""
+        if self.conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def close(self):
+        """关闭数据库"""
+        if self.conn is not None:
+            # 更新索引统计信息，查询计划才能选对索引
+            self.conn.execute("PRAGMA optimize")
+            self.conn.close()
+            self.conn = None
+
+    def has_run(self, run_id):
+        """该次巡检是否已记录"""
+        with self.lock:
+            row = self.connect().execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row is not None
+
+    def record_run(self, report, results=None, metrics=None):
+        """追加一次巡检，同一次巡检重复记录时覆盖
+
+        Args:
+            report: RunReport.to_dict() 的结果（或读取的报告JSON）
+            results: ResultRegistry.snapshot()，没有时从报告的设备耗时记录推断状态
+            metrics: 额外的数值指标 [(设备IP, 指标名, 值)]
+
+        Returns:
+            int: 记录的设备数
+        """
+        run_id = report['logtime']
+        devices = report.get('devices', {})
+
+        result_rows = []
+        if results is not None:
+            for entry in results:
+                total = devices.get(entry['ip'], {}).get('total')
+                result_rows.append((run_id, entry['ip'], entry['device_type'], entry['status'], entry['phase'],
+                                    entry['error'], entry['error_class'], total))
+        else:
+            for span in report.get('spans', []):
+                if span['phase'] == 'device' and span['device']:
+                    result_rows.append((run_id, span['device'], None, 'success' if span['ok'] else 'failed', None,
+                                        span.get('error'), span.get('error'), span['duration']))
+
+        timing_rows = [(run_id, device_ip, phase, duration)
+                       for device_ip, device in devices.items()
+                       for phase, duration in device.get('phases', {}).items()]
+
+        metric_rows = [(run_id, device_ip, name, float(value))
+                       for device_ip, name, value in health_metrics(report.get('health'))]
+        metric_rows.extend((run_id, device_ip, name, float(value))
+                           for device_ip, name, value in (metrics or ()) if value is not None)
+
+        success = sum(1 for row in result_rows if row[3] == 'success')
+        failed = sum(1 for row in result_rows if row[3] == 'failed')
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                for table in ('runs', 'device_results', 'phase_timings', 'metrics'):
+                    conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+                conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                             (run_id, logtime_to_epoch(run_id), report.get('elapsed'),
+                              len(result_rows), success, failed))
+                conn.executemany("INSERT OR REPLACE INTO device_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", result_rows)
+                conn.executemany("INSERT OR REPLACE INTO phase_timings VALUES (?, ?, ?, ?)", timing_rows)
+                conn.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?)", metric_rows)
+        return len(result_rows)
+
+    def import_reports(self, log_dir="LOG"):
+        """导入尚未记录的历史巡检报告JSON
+
+        Returns:
+            int: 导入的巡检次数
+        """
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(log_dir, "reports", "run_report_*.json"))):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    report = json.load(f)
+                if self.has_run(report['logtime']):
+                    continue
+                self.record_run(report)
+                imported += 1
+            except Exception as e:
+                logger.warning(f"! 导入巡检报告失败 {os.path.basename(path)}: {e}")
+        return imported
+
+    def prune(self, retention_days=None):
+        """删除超过保留天数的巡检记录
+
+        Returns:
+            int: 删除的巡检次数
+        """
+        days = self.config['retention_days'] if retention_days is None else retention_days
+        if not days:
+            return 0
+        cutoff = time.time() - days * 86400
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                run_ids = [row[0] for row in conn.execute("SELECT run_id FROM runs WHERE started < ?", (cutoff,))]
+                for table in ('device_results', 'phase_timings', 'metrics', 'runs'):
+                    conn.executemany(f"DELETE FROM {table} WHERE run_id = ?", [(run_id,) for run_id in run_ids])
+        return len(run_ids)
+
+    def _query(self, sql, params=()):
+        """执行查询，返回字典列表"""
+        with self.lock:
+            cursor = self.connect().execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def runs(self, days=30):
+        """最近几天的巡检"""
+        return self._query(
+            "SELECT run_id, started, elapsed, devices, success, failed FROM runs "
+            "WHERE started >= ? ORDER BY started", (time.time() - days * 86400,))
+
+    def device_trend(self, device_ip, phase='device', days=30):
+        """设备某阶段耗时的变化"""
+        return self._query(
+            "SELECT r.run_id, t.duration FROM phase_timings t JOIN runs r ON r.run_id = t.run_id "
+            "WHERE t.device = ? AND t.phase = ? AND r.started >= ? ORDER BY r.started",
+            (device_ip, phase, time.time() - days * 86400))
+
+    def metric_trend(self, device_ip, name, days=30):
+        """设备某个指标的变化"""
+        return self._query(
+            "SELECT r.run_id, m.value FROM metrics m JOIN runs r ON r.run_id = m.run_id "
+            "WHERE m.device = ? AND m.name = ? AND r.started >= ? ORDER BY r.started",
+            (device_ip, name, time.time() - days * 86400))
+
+    def slowing_devices(self, days=30, phase='device', min_runs=3, min_change=0.2, limit=20):
+        """最近几天耗时持续变长的设备
+
+        在数据库中按设备对(巡检时间, 耗时)做最小二乘拟合，
+        斜率乘以天数相对平均耗时的比例超过 min_change 的设备视为变慢。
+
+        Returns:
+            list: [{'device', 'runs', 'average', 'slope', 'change'}]，按变化比例从大到小
+        """
+        # 由 runs 按时间范围驱动连接（CROSS JOIN 固定连接顺序），每次巡检只读覆盖索引中的一段；
+        # 不指定索引时查询计划可能选择临时自动索引，慢几十倍
+        since = time.time() - days * 86400
+        rows = self._query(
+            "SELECT device, COUNT(*) AS runs, AVG(y) AS average, "
+            "(COUNT(*) * SUM(x * y) - SUM(x) * SUM(y)) / (COUNT(*) * SUM(x * x) - SUM(x) * SUM(x)) AS slope "
+            "FROM (SELECT t.device AS device, t.duration AS y, (r.started - ?) / 86400.0 AS x "
+            "      FROM runs r CROSS JOIN phase_timings t INDEXED BY idx_timings_phase ON t.run_id = r.run_id "
+            "      WHERE t.phase = ? AND r.started >= ? AND t.duration > 0) "
+            "GROUP BY device "
+            "HAVING COUNT(*) >= ? AND COUNT(*) * SUM(x * x) - SUM(x) * SUM(x) > 0",
+            (since, phase, since, min_runs))
+        slowing = []
+        for row in rows:
+            row['change'] = row['slope'] * days / row['average'] if row['average'] else 0.0
+            if row['change'] >= min_change:
+                slowing.append(row)
+        slowing.sort(key=lambda row: row['change'], reverse=True)
+        return slowing[:limit]
+
+    def failure_counts(self, days=30, limit=20):
+        """最近几天失败次数最多的设备"""
+        return self._query(
+            "SELECT d.device, COUNT(*) AS failures, MAX(r.run_id) AS last_run, "
+            "(SELECT error FROM device_results e JOIN runs er ON er.run_id = e.run_id "
+            " WHERE e.device = d.device AND e.status = 'failed' ORDER BY er.started DESC LIMIT 1) AS last_error "
+            "FROM runs r CROSS JOIN device_results d INDEXED BY idx_results_status ON d.run_id = r.run_id "
+            "WHERE d.status = 'failed' AND r.started >= ? "
+            "GROUP BY d.device ORDER BY failures DESC LIMIT ?",
+            (time.time() - days * 86400, limit))
+
+
+def main():
+    """命令行入口"""
+    setup_logging()
+    parser = argparse.ArgumentParser(description="ALE网络运维工具包 - 巡检历史查询")
+    parser.add_argument('command', choices=['import', 'runs', 'slow', 'failures', 'device'],
+                        help="import: 导入历史报告, runs: 巡检列表, slow: 变慢的设备, "
+                             "failures: 失败最多的设备, device: 单台设备耗时趋势")
+    parser.add_argument('device', nargs='?', help="设备IP（device命令）")
+    parser.add_argument('--db', default=None, help="数据库路径")
+    parser.add_argument('--log-dir', default="LOG", help="LOG目录路径（import命令）")
+    parser.add_argument('--days', type=int, default=30, help="查询最近几天")
+    parser.add_argument('--phase', default='device', help="阶段，如 device/connect/ftp/sftp")
+    parser.add_argument('--metric', default=None, help="指标名，如 cpu/memory/temperature（device命令）")
+    args = parser.parse_args()
+
+    history = RunHistory(args.db)
+    if args.command == 'import':
+        print(f"导入 {history.import_reports(args.log_dir)} 次巡检")
+    elif args.command == 'runs':
+        for run in history.runs(args.days):
+            print(f"{run['run_id']}  设备 {run['devices']}  成功 {run['success']}  失败 {run['failed']}  "
+                  f"耗时 {run['elapsed'] or 0:.0f}秒")
+    elif args.command == 'slow':
+        for row in history.slowing_devices(args.days, args.phase):
+            print(f"{row['device']:<18} {row['runs']:>4} 次  平均 {row['average']:.1f}秒  "
+                  f"每天 {row['slope']:+.2f}秒  {args.days}天变化 {row['change']:+.0%}")
+    elif args.command == 'failures':
+        for row in history.failure_counts(args.days):
+            print(f"{row['device']:<18} {row['failures']:>4} 次  最近: {row['last_run']}  {row['last_error'] or ''}")
+    elif args.command == 'device':
+        if not args.device:
+            print("请指定设备IP")
+            sys.exit(1)
+        if args.metric:
+            trend = history.metric_trend(args.device, args.metric, args.days)
+            for row in trend:
+                print(f"{row['run_id']}  {row['value']}")
+        else:
+            for row in history.device_trend(args.device, args.phase, args.days):
+                print(f"{row['run_id']}  {row['duration']:.2f}秒")
+    history.close()
+
+
+if __name__ == '__main__':
+    main()
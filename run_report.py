@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 巡检耗时统计模块
+记录每台设备各阶段（登录、命令、等待、下载、压缩、邮件）的耗时，
+生成JSON/CSV格式的巡检报告，包含分位数统计和最慢设备
+"""
+
+import os
+import csv
+import glob
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+
+# 阶段名称，用于报告显示
+PHASE_NAMES = {
+    'device': '设备总耗时',
+    'connect': 'SSH登录',
+    'tech_support': 'tech-support命令',
+    'wait': '等待日志生成',
+    'command': '常规命令',
+    'ftp': 'FTP下载',
+    'tftp': 'TFTP下载',
+    'sftp': 'SFTP下载',
+    'scp': 'SCP下载',
+    'analyze': '日志分析',
+    'fleet': '全网统计',
+    'compress': '压缩',
+    'email': '发送邮件',
+    'retention': 'LOG清理',
+}
+
+
+def percentile(values, pct):
+    """计算分位数（线性插值）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def load_history(log_dir="LOG", runs=3):
+    """读取最近几次巡检报告中每台设备的总耗时
+
+    Returns:
+        dict: {设备IP: 平均总耗时(秒)}
+    """
+    if runs <= 0:
+        return {}
+    paths = sorted(glob.glob(os.path.join(log_dir, "reports", "run_report_*.json")))[-runs:]
+    totals = {}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                devices = json.load(f).get('devices', {})
+        except Exception as e:
+            logger.warning(f"! 读取历史耗时报告失败 {os.path.basename(path)}: {e}")
+            continue
+        for device_ip, device in devices.items():
+            if device.get('total'):
+                totals.setdefault(device_ip, []).append(device['total'])
+    return {device_ip: sum(values) / len(values) for device_ip, values in totals.items()}
+
+
+class RunReport:
+    """巡检耗时记录
+
+    各线程通过 span() 记录阶段耗时，巡检结束后调用 write() 生成报告:
+      LOG/reports/run_report_<巡检时间>.json
+      LOG/reports/run_report_<巡检时间>.csv
+    """
+
+    def __init__(self, logtime=None):
+        self.logtime = logtime or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.started = time.time()
+        self.spans = []
+        self.sections = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """注册耗时记录的监听函数，例如指标导出"""
+        self.listeners.append(listener)
+
+    def add_section(self, name, data):
+        """在报告中附加其他数据，例如设备健康摘要"""
+        with self.lock:
+            self.sections[name] = data
+
+    def record(self, device_ip, phase, duration, ok=True, error=None, start=None, **attrs):
+        """记录一个阶段的耗时"""
+        span = {
+            'device': str(device_ip) if device_ip else '',
+            'phase': phase,
+            'start': round((start if start is not None else time.time() - duration) - self.started, 3),
+            'duration': round(duration, 3),
+            'ok': ok,
+            'error': error,
+        }
+        span.update(attrs)
+        with self.lock:
+            self.spans.append(span)
+        for listener in self.listeners:
+            try:
+                listener(span)
+            except Exception as e:
+                logger.error(f"耗时记录监听失败: {e}")
+        return span
+
+    @contextmanager
+    def span(self, device_ip, phase, **attrs):
+        """记录代码块耗时，异常时记录错误类型后继续抛出
+
+        代码块内可以修改 yield 出的字典补充字段，例如下载字节数
+        """
+        start = time.time()
+        begin = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            self.record(device_ip, phase, time.perf_counter() - begin, ok=False,
+                        error=type(e).__name__, start=start, **attrs)
+            raise
+        else:
+            ok = attrs.pop('ok', True)
+            self.record(device_ip, phase, time.perf_counter() - begin, ok=ok, start=start, **attrs)
+
+    def phase_summary(self):
+        """按阶段统计次数、总耗时和分位数"""
+        with self.lock:
+            spans = list(self.spans)
+
+        durations = {}
+        failures = {}
+        for span in spans:
+            durations.setdefault(span['phase'], []).append(span['duration'])
+            if not span['ok']:
+                failures[span['phase']] = failures.get(span['phase'], 0) + 1
+
+        summary = {}
+        for phase, values in durations.items():
+            summary[phase] = {
+                'count': len(values),
+                'failed': failures.get(phase, 0),
+                'total': round(sum(values), 3),
+                'p50': round(percentile(values, 50), 3),
+                'p90': round(percentile(values, 90), 3),
+                'p99': round(percentile(values, 99), 3),
+                'max': round(max(values), 3),
+            }
+        return summary
+
+    def device_summary(self):
+        """按设备汇总各阶段耗时"""
+        with self.lock:
+            spans = list(self.spans)
+
+        devices = {}
+        for span in spans:
+            if not span['device']:
+                continue
+            device = devices.setdefault(span['device'], {'device': span['device'], 'total': 0.0, 'phases': {}})
+            phases = device['phases']
+            phases[span['phase']] = round(phases.get(span['phase'], 0.0) + span['duration'], 3)
+            if span['phase'] == 'device':
+                device['total'] = span['duration']
+        return devices
+
+    def slowest_devices(self, limit=5):
+        """获取总耗时最长的设备"""
+        devices = sorted(self.device_summary().values(), key=lambda item: item['total'], reverse=True)
+        return devices[:limit]
+
+    def to_dict(self):
+        """生成完整报告数据"""
+        with self.lock:
+            spans = list(self.spans)
+            sections = dict(self.sections)
+        data = {
+            'logtime': self.logtime,
+            'elapsed': round(time.time() - self.started, 3),
+            'phases': self.phase_summary(),
+            'slowest_devices': self.slowest_devices(),
+            'devices': self.device_summary(),
+            'spans': spans,
+        }
+        data.update(sections)
+        return data
+
+    def write(self, log_dir="LOG"):
+        """写入JSON和CSV报告
+
+        Returns:
+            tuple: (JSON文件路径, CSV文件路径)
+        """
+        report_dir = os.path.join(log_dir, "reports")
+        os.makedirs(report_dir, exist_ok=True)
+        json_path = os.path.join(report_dir, f"run_report_{self.logtime}.json")
+        csv_path = os.path.join(report_dir, f"run_report_{self.logtime}.csv")
+
+        data = self.to_dict()
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        fields = ['device', 'phase', 'start', 'duration', 'ok', 'error']
+        extra = sorted({key for span in data['spans'] for key in span} - set(fields))
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields + extra)
+            writer.writeheader()
+            writer.writerows(data['spans'])
+
+        logger.info(f"巡检耗时报告: {json_path}")
+        return json_path, csv_path
+
+    def print_summary(self):
+        """打印各阶段耗时统计和最慢设备"""
+        summary = self.phase_summary()
+        if not summary:
+            return
+
+        logger.info("\n阶段耗时统计 (秒):")
+        logger.info(f"  {'阶段':<16}{'次数':>6}{'失败':>6}{'P50':>9}{'P90':>9}{'P99':>9}{'最大':>9}")
+        for phase, stats in sorted(summary.items(), key=lambda item: item[1]['total'], reverse=True):
+            name = PHASE_NAMES.get(phase, phase)
+            logger.info(f"  {name:<16}{stats['count']:>6}{stats['failed']:>6}"
+                        f"{stats['p50']:>9.2f}{stats['p90']:>9.2f}{stats['p99']:>9.2f}{stats['max']:>9.2f}")
+
+        slowest = self.slowest_devices()
+        if slowest:
+            logger.info("\n最慢设备:")
+            for device in slowest:
+                top_phase = max(
+                    (item for item in device['phases'].items() if item[0] != 'device'),
+                    key=lambda item: item[1], default=(None, 0)
+                )
+                detail = f", 主要耗时: {PHASE_NAMES.get(top_phase[0], top_phase[0])} {top_phase[1]:.2f}秒" if top_phase[0] else ""
+                logger.info(f"  ! {device['device']}: {device['total']:.2f}秒{detail}")
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 巡检调度模块
+按站点（或网段、设备类型）限制同时巡检的设备数，各站点轮流分配工作线程，
+FTP/TFTP下载共用一个全局带宽预算，避免小站点的广域网链路被打满
+"""
+
+import time
+import ipaddress
+import threading
+from collections import deque
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_scheduler_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+def get_default_config():
+    """获取默认调度配置"""
+    return {
+        'workers': 10,
+        'group_by': 'subnet',
+        'subnet_prefix': 24,
+        'group_limit': 0,
+        'limits': [],
+        'bandwidth': 0,
+        'history_runs': 3,
+        'deadline': 0,
+    }
+
+
+class TokenBucket:
+    """令牌桶限速
+
+    允许预支令牌，预支的部分由调用方在锁外等待偿还，
+    多个线程同时下载时按消耗的字节数公平分摊带宽。
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst else rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        """消耗令牌，超出预算时阻塞到令牌补足
+
+        Returns:
+            float: 等待的秒数
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class LimitRule:
+    """并发限制规则
+
+    规则格式为 <匹配条件>=<并发数>，匹配条件可以是网段(10.20.0.0/16)、
+    站点名或设备类型，匹配同一条规则的设备共用这一个并发数。
+    """
+
+    def __init__(self, text):
+        match, _, limit = text.partition('=')
+        self.text = text.strip()
+        self.match = match.strip().lower()
+        self.limit = int(limit)
+        self.network = None
+        if '/' in self.match:
+            self.network = ipaddress.ip_network(self.match, strict=False)
+
+    def matches(self, device, site):
+        """设备是否匹配该规则"""
+        if self.network is not None:
+            try:
+                return ipaddress.ip_address(device.ip) in self.network
+            except ValueError:
+                return False
+        return self.match in (site.lower(), device.device_type.lower())
+
+
+def parse_limits(items):
+    """解析并发限制规则列表，忽略格式错误的规则"""
+    rules = []
+    for item in items:
+        try:
+            rule = LimitRule(item)
+            if rule.limit > 0:
+                rules.append(rule)
+        except ValueError as e:
+            logger.warning(f"! 忽略无效的并发限制规则 '{item}': {e}")
+    return rules
+
+
+class DeviceScheduler:
+    """按站点公平调度的设备巡检线程池
+
+    用法:
+        scheduler = DeviceScheduler()
+        for device in devices:
+            scheduler.submit(device)
+        scheduler.run(inspect_device)
+
+    设备清单的“站点”列不为空时按站点分组，否则按 SCHED_GROUP_BY
+    指定的网段或设备类型分组。工作线程在各组之间轮流取设备，
+    每组同时巡检的设备数不超过 SCHED_GROUP_LIMIT 和匹配的限制规则。
+
+    提供历史耗时(set_estimates)后，组内按耗时从长到短巡检，总耗时长的
+    分组先开始；设置了 RUN_DEADLINE 时，超时后未开始的设备交给 on_skip。
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = get_scheduler_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.workers = max(1, config['workers'])
+        self.rules = parse_limits(config['limits'])
+        self.bandwidth = TokenBucket(config['bandwidth'] * 1024) if config['bandwidth'] else None
+
+        # 工作线程在 cond 上等待并发名额，run() 在 exited 上等待工作线程退出
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.exited = threading.Condition(self.lock)
+        # 待巡检设备 {分组: {并发名额: deque([(序号, 任务)])}}，序号小的先巡检
+        self.queues = {}
+        self.order = deque()
+        self.active = {}
+        self.pending = 0
+        self.submitted = 0
+        self.estimates = {}
+        self.default_estimate = 0.0
+        self.deadline = None
+
+        # 正在巡检的设备 {设备IP: (任务, 线程)}，以及被放弃的线程
+        self.running = {}
+        self.abandoned = set()
+        self.live = 0
+        self.spawned = 0
+        self.target = None
+
+    def group_of(self, device):
+        """获取设备所属的分组"""
+        site = getattr(device, 'site', '')
+        if site:
+            return site
+        if self.config['group_by'] == 'device_type':
+            return device.device_type
+        if self.config['group_by'] == 'subnet':
+            try:
+                network = ipaddress.ip_network(f"{device.ip}/{self.config['subnet_prefix']}", strict=False)
+                return str(network)
+            except ValueError:
+                return device.ip
+        return ''
+
+    def limits_of(self, device, group):
+        """获取设备需要占用的并发名额"""
+        limits = []
+        if self.config['group_limit']:
+            limits.append((('group', group), self.config['group_limit']))
+        site = getattr(device, 'site', '')
+        for rule in self.rules:
+            if rule.matches(device, site):
+                limits.append((('rule', rule.text), rule.limit))
+        return tuple(limits)
+
+    def submit(self, device):
+        """加入待巡检队列"""
+        group = self.group_of(device)
+        task = (device, self.limits_of(device, group))
+        with self.cond:
+            if group not in self.queues:
+                self.queues[group] = {}
+                self.order.append(group)
+            self.queues[group].setdefault(task[1], deque()).append((self.submitted, task))
+            self.submitted += 1
+            self.pending += 1
+
+    def set_estimates(self, estimates):
+        """设置各设备的预计耗时 {设备IP: 秒}，用于排定巡检顺序"""
+        self.estimates = estimates
+        values = sorted(estimates.values())
+        self.default_estimate = values[len(values) // 2] if values else 0.0
+
+    def estimate(self, device):
+        """设备预计耗时，没有历史记录的设备按已知设备的中位数估计"""
+        return self.estimates.get(device.ip, self.default_estimate)
+
+    def _order_longest_first(self):
+        """组内按预计耗时从长到短排序，预计总耗时长的分组排在前面（调用方需持有锁）"""
+        if not self.estimates:
+            return
+        workloads = {}
+        for group, buckets in self.queues.items():
+            entries = sorted(entry for queue in buckets.values() for entry in queue)
+            ordered = sorted((task for _, task in entries), key=lambda task: self.estimate(task[0]), reverse=True)
+            self.queues[group] = {}
+            for seq, task in enumerate(ordered):
+                self.queues[group].setdefault(task[1], deque()).append((seq, task))
+            workloads[group] = sum(self.estimate(task[0]) for task in ordered)
+        self.order = deque(sorted(self.order, key=lambda group: workloads[group], reverse=True))
+
+    def past_deadline(self):
+        """是否已超过本次巡检的截止时间"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def time_left(self):
+        """距截止时间的秒数，未设置截止时间时返回None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _runnable(self, limits):
+        """并发名额是否都有空余（调用方需持有锁）"""
+        return all(self.active.get(key, 0) < limit for key, limit in limits)
+
+    def _pick(self):
+        """从下一个有可运行设备的分组中取出设备（调用方需持有锁）
+
+        组内设备按占用的并发名额分桶，每个分组只需检查各桶的第一台设备，
+        分组自身已达上限时直接跳过。
+        """
+        group_limit = self.config['group_limit']
+        for _ in range(len(self.order)):
+            group = self.order[0]
+            self.order.rotate(-1)
+            if group_limit and self.active.get(('group', group), 0) >= group_limit:
+                continue
+            buckets = self.queues[group]
+            best = None
+            for limits, queue in buckets.items():
+                if (best is None or queue[0][0] < buckets[best][0][0]) and self._runnable(limits):
+                    best = limits
+            if best is None:
+                continue
+            _, task = buckets[best].popleft()
+            if not buckets[best]:
+                del buckets[best]
+                if not buckets:
+                    del self.queues[group]
+                    self.order.remove(group)
+            return task
+        return None
+
+    def _acquire(self):
+        """取出下一台可巡检的设备，全部分配完毕时返回None"""
+        with self.cond:
+            while self.pending:
+                task = self._pick()
+                if task:
+                    self.pending -= 1
+                    if not self.pending:
+                        # 设备已分配完毕，等待中的线程可以退出
+                        self.cond.notify_all()
+                    for key, _ in task[1]:
+                        self.active[key] = self.active.get(key, 0) + 1
+                    self.running[task[0].ip] = (task, threading.current_thread())
+                    return task
+                self.cond.wait()
+            return None
+
+    def _release(self, task):
+        """归还设备占用的并发名额（调用方需持有锁）
+
+        每个名额最多让一台等待的设备可以运行，只唤醒相应数量的线程。
+        """
+        for key, _ in task[1]:
+            self.active[key] -= 1
+        self.cond.notify(len(task[1]))
+
+    def _finish(self, task):
+        """设备巡检结束
+
+        Returns:
+            bool: 本线程是否已被放弃（已有替代线程，应直接退出）
+        """
+        with self.cond:
+            if threading.current_thread() in self.abandoned:
+                self.abandoned.discard(threading.current_thread())
+                return True
+            self.running.pop(task[0].ip, None)
+            self._release(task)
+            return False
+
+    def _worker(self):
+        """工作线程: 反复取设备执行，直到队列为空"""
+        func, on_skip = self.target
+        try:
+            while True:
+                task = self._acquire()
+                if task is None:
+                    break
+                try:
+                    if on_skip and self.past_deadline():
+                        on_skip(task[0])
+                    else:
+                        func(task[0])
+                except Exception as e:
+                    logger.error(f"设备巡检线程异常: {task[0].ip} - {e}")
+                finally:
+                    if self._finish(task):
+                        return
+        except Exception as e:
+            logger.error(f"调度线程异常: {e}")
+        with self.cond:
+            self.live -= 1
+            self.exited.notify_all()
+
+    def _start_worker(self):
+        """启动一个工作线程（调用方需持有锁）"""
+        self.live += 1
+        self.spawned += 1
+        thread = threading.Thread(target=self._worker, name=f"inspect-{self.spawned}", daemon=True)
+        thread.start()
+        return thread
+
+    def abandon(self, device_ip):
+        """放弃卡死的设备: 归还它占用的并发名额，并启动新的工作线程代替
+
+        卡住的线程之后即使返回也不再取新设备。
+
+        Returns:
+            bool: 设备是否正在巡检
+        """
+        with self.cond:
+            entry = self.running.pop(str(device_ip), None)
+            if entry is None:
+                return False
+            task, thread = entry
+            self.abandoned.add(thread)
+            self._release(task)
+            self.live -= 1
+            self._start_worker()
+            return True
+
+    def run(self, func, on_skip=None):
+        """启动工作线程巡检所有已提交的设备，全部完成后返回
+
+        Args:
+            func: 巡检单台设备的函数
+            on_skip: 超过截止时间后，未开始的设备改为调用该函数
+        """
+        if self.config['deadline']:
+            self.deadline = time.monotonic() + self.config['deadline'] * 60
+        with self.cond:
+            self._order_longest_first()
+            count = min(self.workers, self.pending)
+            groups = len(self.queues)
+        if not count:
+            return
+        logger.debug(f"调度: {count} 个工作线程, {groups} 个分组")
+
+        self.target = (func, on_skip)
+        with self.cond:
+            for _ in range(count):
+                self._start_worker()
+            # 等待所有工作线程退出，被放弃的线程不再等待
+            while self.live:
+                self.exited.wait()
+
+    def throttle(self, nbytes):
+        """下载数据计入全局带宽预算，超出时阻塞"""
+        if self.bandwidth:
+            self.bandwidth.consume(nbytes)
@@ -9,18 +9,23 @@ import os
 import smtplib
 import time
 from datetime import datetime
+from html import escape
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 from email.utils import formataddr
 
+from log_setup import get_logger, setup_logging
+from report_builder import attachment_items, page
+
+logger = get_logger(__name__)
+
 # 导入环境配置
 try:
     from env_loader import get_email_config, validate_email_config
     ENV_AVAILABLE = True
 except ImportError:
     ENV_AVAILABLE = False
-    print("警告: env_loader.py不可用，使用默认配置")
 
 
 def get_default_config():
@@ -47,81 +52,88 @@ def get_default_config():
     }
 
 
-def create_email_body(success_devices, failed_devices, total_time=None, attachment_files=None):
-    """创建邮件正文"""
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def create_email_body(success_devices, failed_devices, total_time=None, attachment_files=None, attachment_sizes=None):
+    """创建邮件正文
 
-    html_body = f"""
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; }}
-            .header {{ background-color: #f0f0f0; padding: 15px; border-radius: 5px; }}
-            .summary {{ margin: 20px 0; }}
-            .success {{ color: #28a745; }}
-            .failed {{ color: #dc3545; }}
-            .device-list {{ margin: 10px 0; }}
-            .device-item {{ margin: 5px 0; padding: 5px; background-color: #f8f9fa; border-radius: 3px; }}
-            .footer {{ margin-top: 30px; padding: 15px; background-color: #e9ecef; border-radius: 5px; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h2>🔍 ALE设备运维报告</h2>
-            <p><strong>巡检时间:</strong> {current_time}</p>
-        </div>
-
-        <div class="summary">
-            <h3>📊 运维汇总</h3>
-            <ul>
-                <li><strong>设备总数:</strong> {len(success_devices) + len(failed_devices)}</li>
-                <li class="success"><strong>成功设备:</strong> {len(success_devices)}</li>
-                <li class="failed"><strong>失败设备:</strong> {len(failed_devices)}</li>
-                {f'<li><strong>总耗时:</strong> {total_time}</li>' if total_time else ''}
-            </ul>
-        </div>
+    Args:
+        attachment_sizes: {附件路径: 字节数}，已知大小的附件不再读取文件
     """
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    parts = ['<div class="summary">\n<h3>📊 运维汇总</h3>\n<ul>\n',
+             f'<li><strong>设备总数:</strong> {len(success_devices) + len(failed_devices)}</li>\n',
+             f'<li class="success"><strong>成功设备:</strong> {len(success_devices)}</li>\n',
+             f'<li class="failed"><strong>失败设备:</strong> {len(failed_devices)}</li>\n']
+    if total_time:
+        parts.append(f'<li><strong>总耗时:</strong> {escape(str(total_time))}</li>\n')
+    parts.append('</ul>\n</div>\n')
 
     if success_devices:
-        html_body += """
-        <div class="device-list">
-            <h3 class="success">✅ 成功设备列表</h3>
-        """
-        for device in success_devices:
-            html_body += f'<div class="device-item">✓ {device}</div>'
-        html_body += "</div>"
+        parts.append('<div class="device-list">\n<h3 class="success">✅ 成功设备列表</h3>\n')
+        parts.extend(f'<div class="device-item">✓ {escape(str(device))}</div>\n' for device in success_devices)
+        parts.append('</div>\n')
 
     if failed_devices:
-        html_body += """
-        <div class="device-list">
-            <h3 class="failed">❌ 失败设备列表</h3>
-        """
-        for device in failed_devices:
-            html_body += f'<div class="device-item">✗ {device}</div>'
-        html_body += "</div>"
+        parts.append('<div class="device-list">\n<h3 class="failed">❌ 失败设备列表</h3>\n')
+        parts.extend(f'<div class="device-item">✗ {escape(str(device))}</div>\n' for device in failed_devices)
+        parts.append('</div>\n')
 
     if attachment_files:
-        html_body += """
-        <div class="device-list">
-            <h3>📎 附件文件</h3>
-        """
-        for file in attachment_files:
-            file_size = os.path.getsize(file) / (1024 * 1024) if os.path.exists(file) else 0
-            html_body += f'<div class="device-item">📄 {os.path.basename(file)} ({file_size:.2f} MB)</div>'
-        html_body += "</div>"
-
-    html_body += f"""
-        <div class="footer">
-            <p>此邮件由ALE网络运维工具包自动发送</p>
-            <p>如有问题，请联系系统管理员</p>
-            <p>发送时间: {current_time}</p>
-        </div>
-    </body>
-    </html>
+        parts.append('<div class="device-list">\n<h3>📎 附件文件</h3>\n')
+        parts.extend(attachment_items(attachment_files, attachment_sizes))
+        parts.append('</div>\n')
+
+    return page('ALE设备运维报告', current_time, parts)
+
+
+def build_message(config, subject, body, attachment_files=None):
+    """创建邮件对象（正文和附件），不发送
+
+    Returns:
+        MIMEMultipart
     """
+    message = MIMEMultipart()
+    message['From'] = formataddr((config['sender_name'], config['sender_email']))
+    message['To'] = formataddr((config['receiver_name'], config['receiver_email']))
+    message['Subject'] = subject
+
+    # 添加抄送
+    if config['cc_emails']:
+        message['Cc'] = ', '.join(config['cc_emails'])
+
+    # 添加正文
+    if config['email_template'] == 'html':
+        body_part = MIMEText(body, 'html', 'utf-8')
+    else:
+        body_part = MIMEText(body, 'plain', 'utf-8')
+    message.attach(body_part)
 
-    return html_body
+    # 添加附件
+    if attachment_files:
+        for file_path in attachment_files:
+            if os.path.exists(file_path):
+                file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+
+                if file_size_mb > config['max_attachment_size']:
+                    logger.warning(f"附件 {file_path} 大小 {file_size_mb:.2f}MB 超过限制 {config['max_attachment_size']}MB")
+                    continue
+
+                try:
+                    with open(file_path, 'rb') as f:
+                        attachment_part = MIMEApplication(f.read())
+                        attachment_part.add_header(
+                            'Content-Disposition',
+                            'attachment',
+                            filename=os.path.basename(file_path)
+                        )
+                        message.attach(attachment_part)
+                    logger.debug(f"添加附件: {file_path} ({file_size_mb:.2f}MB)")
+                except Exception as e:
+                    logger.error(f"添加附件失败 {file_path}: {e}")
+            else:
+                logger.warning(f"附件文件不存在: {file_path}")
+
+    return message
 
 
 def send_email(subject=None, body=None, attachment_files=None, success_devices=None, failed_devices=None, total_time=None):
@@ -132,23 +144,23 @@ def send_email(subject=None, body=None, attachment_files=None, success_devices=N
             config = get_email_config()
             is_valid, errors = validate_email_config()
             if not is_valid:
-                print("邮件配置验证失败:")
+                logger.error("邮件配置验证失败:")
                 for error in errors:
-                    print(f"  - {error}")
+                    logger.error(f"  - {error}")
                 return False
         else:
             config = get_default_config()
-            print("使用默认配置，请在.env文件中配置邮件参数")
+            logger.warning("env_loader.py不可用，使用默认配置，请在.env文件中配置邮件参数")
 
         # 检查必需参数
         if not config['sender_email'] or not config['sender_password']:
-            print("错误: 缺少发送者邮箱或密码配置")
-            print("请在.env文件中配置 SENDER_EMAIL 和 SENDER_PASSWORD")
+            logger.error("错误: 缺少发送者邮箱或密码配置")
+            logger.error("请在.env文件中配置 SENDER_EMAIL 和 SENDER_PASSWORD")
             return False
 
         if not config['receiver_email']:
-            print("错误: 缺少接收者邮箱配置")
-            print("请在.env文件中配置 RECEIVER_EMAIL")
+            logger.error("错误: 缺少接收者邮箱配置")
+            logger.error("请在.env文件中配置 RECEIVER_EMAIL")
             return False
 
         # 生成邮件主题
@@ -176,52 +188,12 @@ def send_email(subject=None, body=None, attachment_files=None, success_devices=N
                 </html>
                 """
 
-        print(f"准备发送邮件...")
-        print(f"发送者: {config['sender_email']}")
-        print(f"接收者: {config['receiver_email']}")
-        print(f"主题: {subject}")
-
-        # 创建邮件对象
-        message = MIMEMultipart()
-        message['From'] = formataddr((config['sender_name'], config['sender_email']))
-        message['To'] = formataddr((config['receiver_name'], config['receiver_email']))
-        message['Subject'] = subject
+        logger.info(f"准备发送邮件...")
+        logger.debug(f"发送者: {config['sender_email']}")
+        logger.debug(f"接收者: {config['receiver_email']}")
+        logger.info(f"主题: {subject}")
 
-        # 添加抄送
-        if config['cc_emails']:
-            message['Cc'] = ', '.join(config['cc_emails'])
-
-        # 添加正文
-        if config['email_template'] == 'html':
-            body_part = MIMEText(body, 'html', 'utf-8')
-        else:
-            body_part = MIMEText(body, 'plain', 'utf-8')
-        message.attach(body_part)
-
-        # 添加附件
-        if attachment_files:
-            for file_path in attachment_files:
-                if os.path.exists(file_path):
-                    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-
-                    if file_size_mb > config['max_attachment_size']:
-                        print(f"警告: 附件 {file_path} 大小 {file_size_mb:.2f}MB 超过限制 {config['max_attachment_size']}MB")
-                        continue
-
-                    try:
-                        with open(file_path, 'rb') as f:
-                            attachment_part = MIMEApplication(f.read())
-                            attachment_part.add_header(
-                                'Content-Disposition',
-                                'attachment',
-                                filename=os.path.basename(file_path)
-                            )
-                            message.attach(attachment_part)
-                        print(f"添加附件: {file_path} ({file_size_mb:.2f}MB)")
-                    except Exception as e:
-                        print(f"添加附件失败 {file_path}: {e}")
-                else:
-                    print(f"附件文件不存在: {file_path}")
+        message = build_message(config, subject, body, attachment_files)
 
         # 发送邮件
         recipients = [config['receiver_email']]
@@ -232,7 +204,7 @@ def send_email(subject=None, body=None, attachment_files=None, success_devices=N
 
         for attempt in range(config['retry_count']):
             try:
-                print(f"尝试发送邮件 (第{attempt + 1}次)...")
+                logger.debug(f"尝试发送邮件 (第{attempt + 1}次)...")
 
                 if config['smtp_use_tls']:
                     # 使用TLS
@@ -246,20 +218,20 @@ def send_email(subject=None, body=None, attachment_files=None, success_devices=N
                         server.login(config['sender_email'], config['sender_password'])
                         server.sendmail(config['sender_email'], recipients, message.as_string())
 
-                print("✓ 邮件发送成功!")
+                logger.info("✓ 邮件发送成功!")
                 return True
 
             except Exception as e:
-                print(f"✗ 邮件发送失败 (第{attempt + 1}次): {e}")
+                logger.warning(f"✗ 邮件发送失败 (第{attempt + 1}次): {e}")
                 if attempt < config['retry_count'] - 1:
-                    print(f"等待 {config['retry_delay']} 秒后重试...")
+                    logger.info(f"等待 {config['retry_delay']} 秒后重试...")
                     time.sleep(config['retry_delay'])
 
-        print(f"✗ 邮件发送最终失败，已重试 {config['retry_count']} 次")
+        logger.error(f"✗ 邮件发送最终失败，已重试 {config['retry_count']} 次")
         return False
 
     except Exception as e:
-        print(f"邮件发送异常: {e}")
+        logger.error(f"邮件发送异常: {e}")
         return False
 
 
@@ -298,6 +270,7 @@ def test_email_config():
 
 def main():
     """测试邮件发送功能"""
+    setup_logging()
     print("邮件发送功能测试")
     print("=" * 40)
 
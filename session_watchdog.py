@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 超时看门狗模块
+为每台设备和每个阶段设置硬超时，超时后关闭会话和套接字使阻塞的调用返回，
+线程仍无法退出时通知调度器释放该工作线程的名额
+"""
+
+import time
+import socket
+import threading
+from contextlib import contextmanager
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_watchdog_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+def get_default_config():
+    """获取默认超时配置（秒，0表示不限制）"""
+    return {
+        'device': 3600,
+        'tech_support': 900,
+        'command': 300,
+        'download': 1800,
+        'io': 60,
+        'grace': 30,
+    }
+
+
+class WatchdogTimeout(TimeoutError):
+    """阶段执行超时"""
+
+
+def close_connection(connection):
+    """强制关闭netmiko会话的通道和底层连接，不等待设备回应"""
+    for name in ('remote_conn', 'remote_conn_pre'):
+        conn = getattr(connection, name, None)
+        if conn is None:
+            continue
+        try:
+            if hasattr(conn, 'get_transport'):
+                transport = conn.get_transport()
+                if transport:
+                    transport.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def shutdown_socket(sock):
+    """关闭套接字，使其他线程中阻塞的recv立即返回"""
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    try:
+        sock.close()
+    except OSError:
+        pass
+
+
+class Guard:
+    """一个受监控的代码块"""
+
+    def __init__(self, device_ip, phase, timeout, on_abandon=None):
+        self.device_ip = device_ip
+        self.phase = phase
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.on_abandon = on_abandon
+        self.callbacks = []
+        self.expired = False
+        self.abandon_at = None
+        self.abandoned = False
+
+    def add_cancel(self, callback):
+        """注册超时时执行的取消操作，例如关闭连接"""
+        self.callbacks.append(callback)
+
+    def cancel(self):
+        """执行所有取消操作"""
+        for callback in self.callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"取消操作失败 {self.device_ip}/{self.phase}: {e}")
+
+    def error(self):
+        """生成超时异常"""
+        return WatchdogTimeout(f"{self.phase} 超过 {self.timeout} 秒未完成")
+
+
+class Watchdog:
+    """超时看门狗
+
+    用法:
+        with watchdog.guard(device_ip, 'tech_support') as guard:
+            guard.add_cancel(lambda: close_connection(connection))
+            connection.send_command(...)
+
+    超时后由监控线程执行取消操作，代码块结束时抛出 WatchdogTimeout。
+    设备级(device)超时后经过 WATCHDOG_GRACE 秒线程仍未退出，调用 on_abandon。
+    """
+
+    def __init__(self, config=None, on_expire=None, on_abandon=None):
+        if config is None:
+            config = get_watchdog_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.on_expire = on_expire
+        self.on_abandon = on_abandon
+        self.guards = set()
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def timeout_for(self, phase):
+        """获取阶段的超时秒数"""
+        if phase in ('ftp', 'tftp', 'sftp', 'scp'):
+            phase = 'download'
+        return self.config.get(phase, 0)
+
+    @contextmanager
+    def guard(self, device_ip, phase, timeout=None):
+        """监控代码块的执行时间"""
+        if timeout is None:
+            timeout = self.timeout_for(phase)
+        on_abandon = self.on_abandon if phase == 'device' else None
+        guard = Guard(device_ip, phase, timeout, on_abandon)
+        if timeout:
+            with self.cond:
+                self.guards.add(guard)
+                self._ensure_thread()
+                self.cond.notify()
+        try:
+            yield guard
+        except Exception:
+            if guard.expired:
+                raise guard.error()
+            raise
+        finally:
+            if timeout:
+                with self.cond:
+                    self.guards.discard(guard)
+        if guard.expired:
+            raise guard.error()
+
+    def _ensure_thread(self):
+        """启动监控线程（调用方需持有锁）"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._monitor, name="watchdog", daemon=True)
+            self.thread.start()
+
+    def _monitor(self):
+        """监控线程: 等到最近的超时时间，处理超时和需要放弃的代码块"""
+        while True:
+            expired = []
+            abandoned = []
+            with self.cond:
+                if not self.guards:
+                    self.cond.wait(60)
+                    if not self.guards:
+                        self.thread = None
+                        return
+                now = time.monotonic()
+                wake = None
+                for guard in self.guards:
+                    if not guard.expired:
+                        if now >= guard.deadline:
+                            guard.expired = True
+                            guard.abandon_at = now + self.config['grace']
+                            expired.append(guard)
+                        else:
+                            wake = guard.deadline if wake is None else min(wake, guard.deadline)
+                    elif guard.on_abandon and not guard.abandoned:
+                        if now >= guard.abandon_at:
+                            guard.abandoned = True
+                            abandoned.append(guard)
+                        else:
+                            wake = guard.abandon_at if wake is None else min(wake, guard.abandon_at)
+                if not expired and not abandoned:
+                    self.cond.wait(max(0.05, wake - now) if wake else 60)
+                    continue
+
+            for guard in expired:
+                logger.error(f"✗ 超时: {guard.device_ip} {guard.phase} 超过 {guard.timeout} 秒，关闭会话")
+                guard.cancel()
+                if self.on_expire:
+                    try:
+                        self.on_expire(guard)
+                    except Exception as e:
+                        logger.error(f"超时处理失败: {e}")
+
+            for guard in abandoned:
+                logger.error(f"✗ {guard.device_ip} 关闭会话后 {self.config['grace']} 秒仍未退出，释放工作线程名额")
+                try:
+                    guard.on_abandon(guard)
+                except Exception as e:
+                    logger.error(f"释放工作线程失败: {e}")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - SSH文件传输模块
+复用netmiko已建立的SSH连接，通过SFTP（不可用时SCP）下载设备文件，
+不需要重新握手和认证，也不依赖设备开启FTP/TFTP服务
+"""
+
+import errno
+
+from partial_file import PartialFile
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+# paramiko/scp 在第一次传输时才导入，只发邮件或只用TFTP的工具不需要加载
+
+
+def get_transport(connection):
+    """获取netmiko会话的SSH transport，telnet连接返回None"""
+    channel = getattr(connection, 'remote_conn', None)
+    if channel is None or not hasattr(channel, 'get_transport'):
+        return None
+    transport = channel.get_transport()
+    if transport is None or not transport.is_active():
+        return None
+    return transport
+
+
+def is_missing_error(error):
+    """判断是否为远端文件不存在"""
+    if isinstance(error, FileNotFoundError):
+        return True
+    if isinstance(error, IOError) and getattr(error, 'errno', None) == errno.ENOENT:
+        return True
+    return 'no such file' in str(error).lower()
+
+
+def sftp_download(transport, remote_path, local_path, config, on_data=None, on_open=None):
+    """通过SFTP下载文件
+
+    使用较大的窗口并预取（多个读请求同时在途），高延迟链路上也能保持吞吐；
+    上次中断留下的临时文件校验通过时，从断点处继续读取。
+
+    Args:
+        transport: paramiko Transport
+        remote_path: 远端文件路径
+        local_path: 本地保存路径
+        config: 包含 sftp_window(MB)、sftp_requests、block_size(KB) 的配置
+        on_data: 每收到一块数据时调用，参数为字节数（用于限速）
+        on_open: SFTP会话建立后调用，参数为SFTPClient（用于注册取消操作）
+
+    Returns:
+        int: 本次下载的字节数
+    """
+    import paramiko
+
+    sftp = paramiko.SFTPClient.from_transport(
+        transport,
+        window_size=config['sftp_window'] * 1024 * 1024,
+        max_packet_size=32768,
+    )
+    try:
+        if on_open:
+            on_open(sftp)
+        block_size = config['block_size'] * 1024
+        with sftp.open(remote_path, 'rb') as remote_file:
+            stat = remote_file.stat()
+            with PartialFile(local_path, stat.st_size, stat.st_mtime) as part:
+                if part.offset:
+                    logger.info(f"SFTP续传 {remote_path}: 从 {part.offset} 字节开始")
+                    remote_file.seek(part.offset)
+                try:
+                    remote_file.prefetch(stat.st_size, max_concurrent_requests=config['sftp_requests'])
+                except TypeError:
+                    # paramiko 3.3 之前的 prefetch 没有 max_concurrent_requests 参数，不限制在途请求数
+                    remote_file.prefetch(stat.st_size)
+                while True:
+                    data = remote_file.read(block_size)
+                    if not data:
+                        break
+                    part.write(data)
+                    if on_data:
+                        on_data(len(data))
+                part.commit()
+                return part.received
+    finally:
+        sftp.close()
+
+
+def scp_download(transport, remote_path, local_path, config, on_data=None, on_open=None, socket_timeout=None):
+    """通过SCP下载文件（设备未开启SFTP子系统时使用）"""
+    try:
+        from scp import SCPClient, SCPException
+    except ImportError:
+        raise ImportError("scp 模块不可用")
+
+    progress_state = {'sent': 0}
+
+    def progress(filename, size, sent):
+        if on_data and sent > progress_state['sent']:
+            on_data(sent - progress_state['sent'])
+        progress_state['sent'] = sent
+
+    client = SCPClient(transport, buff_size=config['block_size'] * 1024,
+                       socket_timeout=socket_timeout, progress=progress)
+    try:
+        if on_open:
+            on_open(client)
+        client.get(remote_path, local_path)
+        return progress_state['sent']
+    except SCPException as e:
+        if is_missing_error(e):
+            raise FileNotFoundError(errno.ENOENT, str(e))
+        raise
+    finally:
+        client.close()
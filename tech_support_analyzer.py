@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - tech-support日志分析模块
+下载完成后以内存映射方式扫描tech-support日志，不把文件读入内存，
+用预编译的正则提取CPU/内存、温度、风扇/电源、端口错误、生成树变化和
+机框/板卡故障等健康指标，多台设备在进程池中并行分析
+"""
+
+import os
+import re
+import mmap
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from log_setup import get_logger
+
+logger = get_logger(__name__)
+
+# 导入环境配置
+try:
+    from env_loader import get_analyzer_config
+    ENV_AVAILABLE = True
+except ImportError:
+    ENV_AVAILABLE = False
+
+
+def get_default_config():
+    """获取默认日志分析配置"""
+    return {
+        'enabled': True,
+        'workers': 0,
+        'cpu_threshold': 80,
+        'memory_threshold': 85,
+        'stp_threshold': 50,
+        'max_samples': 20,
+    }
+
+
+STATUS_OK = 'ok'
+STATUS_WARNING = 'warning'
+STATUS_CRITICAL = 'critical'
+
+# 表格类命令输出最多解析的行数
+SECTION_LINES = 100
+
+# 预筛选: 在整个文件上一次扫描，只有命中的行（或命令输出段）才进一步解析。
+# 关键字按设备输出的大小写区分，不用 IGNORECASE，正则可以走字面量快速查找
+PREFILTER_KEYWORDS = (
+    b'show fan', b'show temperature', b'show health', b'show powersupply', b'show power-supply',
+    b'Slot/Port',
+    b'IfInErrors', b'IfOutErrors', b'Bad Frames', b'CRC Error', b'Alignment', b'Runt Frames', b'Giant Frames',
+    b'Topology Change', b'topology change',
+    b'ERR', b'CRIT', b'ALRT', b'EMER',
+)
+PREFILTER = re.compile(b'|'.join(re.escape(keyword) for keyword in PREFILTER_KEYWORDS))
+
+# 命令输出段的开始
+SECTION_HEADER = re.compile(r'\bshow\s+(fan|power-?supply|temperature|health)\b', re.IGNORECASE)
+NEXT_COMMAND = re.compile(rb'^[^\n]{0,40}?\bshow[ \t]+[a-z]', re.IGNORECASE)
+
+# show health: CPU / Memory 行的第一个数字为当前值
+HEALTH_LINE = re.compile(r'^\s*(cpu|memory)\s+(\d+)\b', re.IGNORECASE)
+# show temperature: 1/CMMA  46  15 to 85  88  85  UNDER THRESHOLD
+TEMPERATURE_LINE = re.compile(r'^\s*(\S+)\s+(\d+)\s+\d+\s+to\s+\d+\s+(\d+)\s+(\d+)\s+(.*\S)')
+OVER_THRESHOLD = re.compile(r'\bOVER\s+THRESHOLD\b', re.IGNORECASE)
+# show fan: 1/--  1  NO  ... / 1  2  Not Running
+FAN_FAULT = re.compile(r'^\s*\d[\d/-]*\s+\d+\s+.*\b(NO|Not\s+Running|Fail(?:ed|ure)?|Down)\b', re.IGNORECASE)
+# show powersupply: 1/2  600  AC  DOWN  Internal（NOT PRESENT为空槽位，不算故障）
+PSU_FAULT = re.compile(r'^\s*\d[\d/-]*\s+.*\b(DOWN|FAIL(?:ED|URE)?|OFF)\b', re.IGNORECASE)
+
+PORT_LINE = re.compile(r'\bslot/port\s*:\s*([\d/]+)', re.IGNORECASE)
+ERROR_COUNTER = re.compile(
+    r'\b(IfInErrors|IfOutErrors|Bad Frames|CRC Error Frames|CRC Errors|Alignments? Err\w*|Runt Frames|Giant Frames)'
+    r'\s*[:=]\s*(\d+)',
+    re.IGNORECASE,
+)
+STP_LINE = re.compile(r'\btopology changes?\s*:?\s*(\d+)', re.IGNORECASE)
+FAULT_SEVERITY = re.compile(r'\b(ERR|CRIT|ALRT|EMER)\b')
+FAULT_SOURCE = re.compile(r'chassis|\bcmm\b|\bni\d*\b|nisup|ni_sup|\bslot\b|hwcmm|fan|power|temp', re.IGNORECASE)
+
+
+def new_findings():
+    """空的分析结果"""
+    return {
+        'cpu': None,
+        'memory': None,
+        'temperature': None,
+        'temperature_alarms': [],
+        'fan_faults': [],
+        'psu_faults': [],
+        'port_errors': {},
+        'stp_changes': 0,
+        'chassis_faults': [],
+    }
+
+
+def add_sample(samples, line, limit):
+    """记录一条问题行，去重并限制数量"""
+    if len(samples) < limit and line not in samples:
+        samples.append(line)
+
+
+def set_max(findings, key, value):
+    """保留最大值"""
+    if findings[key] is None or value > findings[key]:
+        findings[key] = value
+
+
+class FileScanner:
+    """扫描一个tech-support文件"""
+
+    def __init__(self, config):
+        self.config = config
+        self.limit = config['max_samples']
+        self.findings = new_findings()
+        self.port = None
+
+    def scan(self, path):
+        """内存映射扫描文件
+
+        Returns:
+            int: 文件字节数
+        """
+        size = os.path.getsize(path)
+        if not size:
+            return 0
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            while True:
+                match = PREFILTER.search(data, position)
+                if not match:
+                    break
+                start = data.rfind(b'\n', 0, match.start()) + 1
+                end = data.find(b'\n', match.end())
+                if end < 0:
+                    end = size
+                # 命令名出现在行首附近才是命令输出段的开始
+                if match.group().startswith(b'show') and match.start() - start <= 40:
+                    end = self._scan_section(data, start, end, size)
+                else:
+                    self._scan_line(data[start:end].decode('utf-8', errors='replace'))
+                # 同一行的其他关键字已在 _scan_line 中处理
+                position = end + 1
+        return size
+
+    def _scan_section(self, data, start, end, size):
+        """解析表格类命令的输出段，返回段结束位置"""
+        header = SECTION_HEADER.search(data[start:end].decode('utf-8', errors='replace'))
+        kind = header.group(1).lower().replace('-', '') if header else ''
+        position = end + 1
+        for _ in range(SECTION_LINES):
+            if position >= size:
+                break
+            line_end = data.find(b'\n', position)
+            if line_end < 0:
+                line_end = size
+            raw = data[position:line_end]
+            if NEXT_COMMAND.match(raw):
+                break
+            line = raw.decode('utf-8', errors='replace')
+            self._scan_table_line(kind, line)
+            # 表格中也可能有端口或告警信息
+            self._scan_line(line)
+            end = line_end
+            position = line_end + 1
+        return end
+
+    def _scan_table_line(self, kind, line):
+        """解析命令输出段中的一行"""
+        findings = self.findings
+        if kind == 'health':
+            match = HEALTH_LINE.match(line)
+            if match:
+                set_max(findings, match.group(1).lower(), int(match.group(2)))
+        elif kind == 'temperature':
+            match = TEMPERATURE_LINE.match(line)
+            if match:
+                current, threshold = int(match.group(2)), int(match.group(4))
+                set_max(findings, 'temperature', current)
+                if current >= threshold or OVER_THRESHOLD.search(match.group(5)):
+                    add_sample(findings['temperature_alarms'], line.strip(), self.limit)
+            elif OVER_THRESHOLD.search(line):
+                add_sample(findings['temperature_alarms'], line.strip(), self.limit)
+        elif kind == 'fan':
+            if FAN_FAULT.match(line):
+                add_sample(findings['fan_faults'], line.strip(), self.limit)
+        elif kind == 'powersupply':
+            if PSU_FAULT.match(line) and 'NOT PRESENT' not in line.upper():
+                add_sample(findings['psu_faults'], line.strip(), self.limit)
+
+    def _scan_line(self, line):
+        """解析命中关键字的单行"""
+        findings = self.findings
+        match = PORT_LINE.search(line)
+        if match:
+            self.port = match.group(1)
+
+        for counter, value in ERROR_COUNTER.findall(line):
+            value = int(value)
+            if value:
+                counters = findings['port_errors'].setdefault(self.port or '?', {})
+                counters[counter] = max(counters.get(counter, 0), value)
+
+        match = STP_LINE.search(line)
+        if match:
+            findings['stp_changes'] += int(match.group(1))
+
+        if FAULT_SEVERITY.search(line) and FAULT_SOURCE.search(line):
+            add_sample(findings['chassis_faults'], line.strip(), self.limit)
+
+
+def merge_findings(total, findings, limit):
+    """合并同一设备多个文件的分析结果"""
+    for key in ('cpu', 'memory', 'temperature'):
+        if findings[key] is not None:
+            set_max(total, key, findings[key])
+    for key in ('temperature_alarms', 'fan_faults', 'psu_faults', 'chassis_faults'):
+        for line in findings[key]:
+            add_sample(total[key], line, limit)
+    for port, counters in findings['port_errors'].items():
+        merged = total['port_errors'].setdefault(port, {})
+        for counter, value in counters.items():
+            merged[counter] = max(merged.get(counter, 0), value)
+    # 多个文件可能包含相同的生成树输出，取最大值而不是累加
+    total['stp_changes'] = max(total['stp_changes'], findings['stp_changes'])
+
+
+def evaluate(findings, config):
+    """根据阈值生成问题列表和健康状态
+
+    Returns:
+        tuple: (状态, 问题列表)
+    """
+    critical = []
+    warnings = []
+    if findings['temperature_alarms']:
+        critical.append(f"温度超过阈值: {len(findings['temperature_alarms'])} 处")
+    if findings['fan_faults']:
+        critical.append(f"风扇故障: {len(findings['fan_faults'])} 个")
+    if findings['psu_faults']:
+        critical.append(f"电源故障: {len(findings['psu_faults'])} 个")
+    if findings['cpu'] is not None and findings['cpu'] >= config['cpu_threshold']:
+        warnings.append(f"CPU利用率 {findings['cpu']}%")
+    if findings['memory'] is not None and findings['memory'] >= config['memory_threshold']:
+        warnings.append(f"内存利用率 {findings['memory']}%")
+    if findings['chassis_faults']:
+        warnings.append(f"机框/板卡告警日志: {len(findings['chassis_faults'])} 条")
+    if findings['port_errors']:
+        warnings.append(f"端口错误计数: {len(findings['port_errors'])} 个端口")
+    if findings['stp_changes'] >= config['stp_threshold']:
+        warnings.append(f"生成树拓扑变化 {findings['stp_changes']} 次")
+
+    if critical:
+        status = STATUS_CRITICAL
+    elif warnings:
+        status = STATUS_WARNING
+    else:
+        status = STATUS_OK
+    return status, critical + warnings
+
+
+def analyze_device(device_ip, paths, config):
+    """分析一台设备的所有tech-support文件（可在子进程中执行）
+
+    Returns:
+        dict: 健康摘要
+    """
+    begin = time.perf_counter()
+    summary = new_findings()
+    summary.update({'device': device_ip, 'files': [], 'bytes': 0, 'error': None})
+    for path in paths:
+        scanner = FileScanner(config)
+        try:
+            summary['bytes'] += scanner.scan(path)
+        except (OSError, ValueError) as e:
+            summary['error'] = f"{os.path.basename(path)}: {e}"
+            continue
+        summary['files'].append(os.path.basename(path))
+        merge_findings(summary, scanner.findings, config['max_samples'])
+    summary['status'], summary['issues'] = evaluate(summary, config)
+    summary['duration'] = round(time.perf_counter() - begin, 3)
+    return summary
+
+
+def format_summary(summary):
+    """生成设备健康摘要文本"""
+    lines = [
+        f"设备健康摘要: {summary['device']}",
+        f"状态: {summary['status']}",
+        f"分析文件: {', '.join(summary['files']) or '无'}",
+        "=" * 60,
+    ]
+    for label, key, unit in (('CPU利用率', 'cpu', '%'), ('内存利用率', 'memory', '%'), ('最高温度', 'temperature', '°C')):
+        value = summary[key]
+        lines.append(f"{label}: {value}{unit}" if value is not None else f"{label}: 未找到")
+    lines.append(f"生成树拓扑变化: {summary['stp_changes']}")
+
+    if summary['issues']:
+        lines.append("")
+        lines.append("问题:")
+        lines.extend(f"  ! {issue}" for issue in summary['issues'])
+
+    for title, key in (('温度告警', 'temperature_alarms'), ('风扇故障', 'fan_faults'),
+                       ('电源故障', 'psu_faults'), ('机框/板卡告警日志', 'chassis_faults')):
+        if summary[key]:
+            lines.append("")
+            lines.append(f"{title}:")
+            lines.extend(f"  {line}" for line in summary[key])
+
+    if summary['port_errors']:
+        lines.append("")
+        lines.append("端口错误计数:")
+        for port, counters in sorted(summary['port_errors'].items()):
+            detail = ', '.join(f"{name}={value}" for name, value in sorted(counters.items()))
+            lines.append(f"  {port}: {detail}")
+
+    if summary['error']:
+        lines.append("")
+        lines.append(f"分析错误: {summary['error']}")
+    return '\n'.join(lines) + '\n'
+
+
+class TechSupportAnalyzer:
+    """在后台并行分析各设备的tech-support日志
+
+    用法:
+        analyzer = TechSupportAnalyzer()
+        analyzer.submit(device_ip, [path1, path2])   # 下载完成后立即提交
+        summaries = analyzer.collect()               # 巡检结束后收集结果
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = get_analyzer_config() if ENV_AVAILABLE else get_default_config()
+        self.config = config
+        self.enabled = config['enabled']
+        self.executor = None
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def _executor(self):
+        """按需创建进程池，只分配一个工作进程时使用后台线程（调用方需持有锁）"""
+        if self.executor is None:
+            workers = self.config['workers'] or min(4, os.cpu_count() or 1)
+            if workers > 1:
+                # 巡检时有多个线程在运行，使用spawn避免fork继承锁状态
+                self.executor = ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analyzer")
+        return self.executor
+
+    def submit(self, device_ip, paths):
+        """提交一台设备的日志文件进行分析"""
+        if not self.enabled or not paths:
+            return
+        with self.lock:
+            try:
+                future = self._executor().submit(analyze_device, device_ip, paths, self.config)
+            except Exception as e:
+                logger.warning(f"! 提交日志分析失败 {device_ip}: {e}")
+                future = None
+            self.pending[device_ip] = (paths, future)
+
+    def collect(self):
+        """等待所有分析完成
+
+        Returns:
+            dict: {设备IP: 健康摘要}
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        summaries = {}
+        for device_ip, (paths, future) in pending.items():
+            try:
+                summaries[device_ip] = future.result() if future else analyze_device(device_ip, paths, self.config)
+            except Exception as e:
+                # 进程池不可用时在当前进程中分析
+                logger.warning(f"! 后台日志分析失败 {device_ip}: {e}，改为直接分析")
+                summaries[device_ip] = analyze_device(device_ip, paths, self.config)
+        self.close()
+        return summaries
+
+    def close(self):
+        """关闭进程池"""
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
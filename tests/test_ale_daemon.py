@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 常驻服务测试
+"""
+
+import threading
+import http.client
+
+import pytest
+
+ale_daemon = pytest.importorskip('ale_daemon')
+
+from ale_daemon import InspectionDaemon, request, JOB_QUEUED  # noqa: E402
+from device_record import DeviceRecord  # noqa: E402
+
+
+class FakeInventory:
+    """内存中的设备清单"""
+
+    def __init__(self, ips):
+        self.devices = {ip: DeviceRecord(ip, 'ssh', 22, 'admin', 'pw', '', 'alcatel_aos') for ip in ips}
+
+    def current(self):
+        return dict(self.devices)
+
+    def reload(self):
+        return len(self.devices)
+
+    def select(self, ips=None):
+        if not ips:
+            return list(self.devices.values()), []
+        return [self.devices[ip] for ip in ips if ip in self.devices], [ip for ip in ips if ip not in self.devices]
+
+
+def start_daemon(token=''):
+    config = ale_daemon.get_default_config()
+    config.update({'port': 0, 'token': token})
+    daemon = InspectionDaemon(config)
+    daemon.inventory = FakeInventory(['10.0.0.1', '10.0.0.2'])
+    daemon.server = daemon.make_server()
+    config['port'] = daemon.server.server_address[1]
+    threading.Thread(target=daemon.server.serve_forever, daemon=True).start()
+    return daemon
+
+
+@pytest.fixture
+def daemon():
+    daemon = start_daemon()
+    yield daemon
+    daemon.server.shutdown()
+    daemon.server.server_close()
+
+
+def post_raw(config, path, body):
+    """发送原始请求体"""
+    conn = http.client.HTTPConnection(config['host'], config['port'], timeout=5)
+    try:
+        conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, response.read().decode('utf-8')
+    finally:
+        conn.close()
+
+
+def test_jobs_are_queued_and_listed(daemon):
+    status, job = request(daemon.config, 'POST', '/jobs', {'devices': ['10.0.0.2']})
+    assert status == 202
+    assert (job['status'], job['devices']) == (JOB_QUEUED, ['10.0.0.2'])
+    assert daemon.queue.get_nowait().devices[0].ip == '10.0.0.2'
+
+    # 不指定设备时巡检全部设备
+    status, job = request(daemon.config, 'POST', '/jobs', {})
+    assert status == 202 and job['devices'] == ['10.0.0.1', '10.0.0.2']
+
+    assert request(daemon.config, 'GET', f"/jobs/{job['id']}")[1]['id'] == job['id']
+    assert [item['id'] for item in request(daemon.config, 'GET', '/jobs')[1]] == [2, 1]
+    assert request(daemon.config, 'GET', '/health')[1]['queued'] == 2
+    assert request(daemon.config, 'GET', '/devices')[1][0]['ip'] == '10.0.0.1'
+
+
+def test_invalid_requests_are_rejected(daemon):
+    assert post_raw(daemon.config, '/jobs', b'{not json')[0] == 400
+    assert post_raw(daemon.config, '/jobs', b'["10.0.0.1"]')[0] == 400
+    for devices in ('10.0.0.1', [1, 2], {'ip': '10.0.0.1'}):
+        status, data = request(daemon.config, 'POST', '/jobs', {'devices': devices})
+        assert status == 400, devices
+    status, data = request(daemon.config, 'POST', '/jobs', {'devices': ['10.0.0.1', '10.9.9.9']})
+    assert (status, data['unknown']) == (400, ['10.9.9.9'])
+
+    assert request(daemon.config, 'GET', '/jobs/99')[0] == 404
+    assert request(daemon.config, 'GET', '/jobs/abc')[0] == 404
+    assert request(daemon.config, 'POST', '/unknown', {})[0] == 404
+    # 被拒绝的请求不会产生任务
+    assert daemon.queue.empty()
+
+
+@pytest.mark.parametrize('token', ['secret', '0'])
+def test_token_is_required_when_configured(token):
+    daemon = start_daemon(token)
+    try:
+        config = dict(daemon.config)
+        assert request(config, 'GET', '/health')[0] == 200
+        assert request(config, 'POST', '/jobs', {'devices': ['10.0.0.1']})[0] == 202
+
+        for supplied in ('', 'wrong'):
+            config['token'] = supplied
+            assert request(config, 'GET', '/health')[0] == 401
+            status, data = request(config, 'POST', '/jobs', {'devices': ['10.0.0.1']})
+            assert (status, data['error']) == (401, '令牌无效')
+        assert daemon.queue.qsize() == 1
+    finally:
+        daemon.server.shutdown()
+        daemon.server.server_close()
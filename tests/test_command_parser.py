@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 命令输出解析测试
+"""
+
+from command_parser import ColumnStore, parse_output, parse_uptime
+
+CISCO_VERSION = """\
+Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(7)E8, RELEASE SOFTWARE (fc1)
+switch uptime is 1 year, 2 weeks, 3 days, 4 hours, 5 minutes
+cisco WS-C2960X-48TS-L (APM86XXX) processor (revision B0) with 524288K bytes of memory.
+Processor board ID FOC1234X0AB
+"""
+
+CISCO_INTERFACES = """\
+GigabitEthernet1/0/1 is up, line protocol is up (connected)
+     1000 packets input, 64000 bytes, 0 no buffer
+     5 input errors, 2 CRC, 0 frame, 0 overrun, 0 ignored
+     2000 packets output, 128000 bytes, 0 underruns
+     0 output errors, 0 collisions, 1 interface resets
+GigabitEthernet1/0/2 is administratively down, line protocol is down (disabled)
+     0 packets input, 0 bytes, 0 no buffer
+"""
+
+HUAWEI_BRIEF = """\
+Interface                   PHY   Protocol  InUti OutUti   inErrors  outErrors
+GigabitEthernet0/0/1        up    up           0%     0%          0          0
+GigabitEthernet0/0/2        *down down         0%     0%         12          3
+"""
+
+
+def test_uptime_is_converted_to_seconds():
+    assert parse_uptime("1 year, 2 weeks, 3 days, 4 hours, 5 minutes") == \
+        365 * 86400 + 14 * 86400 + 3 * 86400 + 4 * 3600 + 5 * 60
+    assert parse_uptime("unknown") is None
+
+
+def test_cisco_version_fields():
+    table, records = parse_output('Cisco', 'SH   VER', CISCO_VERSION)
+    assert table == 'version'
+    assert records == [{
+        'version': '15.2(7)E8',
+        'model': 'WS-C2960X-48TS-L',
+        'serial': 'FOC1234X0AB',
+        'uptime': parse_uptime("1 year, 2 weeks, 3 days, 4 hours, 5 minutes"),
+    }]
+
+
+def test_interface_blocks_and_rows():
+    table, records = parse_output('Cisco', 'show interfaces', CISCO_INTERFACES)
+    assert table == 'interface'
+    assert [(record['interface'], record['status'], record['in_errors'], record['crc']) for record in records] == \
+        [('GigabitEthernet1/0/1', 'up', 5, 2), ('GigabitEthernet1/0/2', 'down', None, None)]
+
+    table, records = parse_output('华为', 'display interface brief', HUAWEI_BRIEF)
+    assert table == 'interface'
+    assert records[1] == {'interface': 'GigabitEthernet0/0/2', 'status': '*down', 'in_errors': 12, 'out_errors': 3}
+
+
+def test_unknown_vendor_or_command_is_ignored():
+    assert parse_output('Juniper', 'show version', CISCO_VERSION) == (None, [])
+    assert parse_output('Cisco', 'show clock', '10:00:00') == (None, [])
+    assert parse_output('Cisco', 'show version', 'no match here') == ('version', [])
+
+
+def test_column_store_keeps_rows_aligned():
+    store = ColumnStore()
+    assert store.parse('10.0.0.1', 'Cisco', 'cisco_ios', 'show interfaces', CISCO_INTERFACES) == 2
+    assert store.parse('10.0.0.2', '华为', 'huawei', 'display interface brief', HUAWEI_BRIEF) == 2
+    assert store.parse('10.0.0.3', 'Cisco', 'cisco_ios', 'show clock', '') == 0
+
+    columns = store.columns()
+    assert list(columns) == ['interface']
+    interface = columns['interface']
+    assert all(len(values) == 4 for values in interface.values())
+    assert interface['device'] == ['10.0.0.1', '10.0.0.1', '10.0.0.2', '10.0.0.2']
+    assert interface['in_packets'] == [1000, 0, None, None]
+    assert store.row_count('interface') == 4
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 连接池测试
+"""
+
+import time
+
+from connection_pool import ConnectionPool
+from device_record import DeviceRecord
+
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.disconnected = False
+
+    def is_alive(self):
+        return self.alive
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+def make_host(ip='10.0.0.1', username='admin'):
+    return DeviceRecord(ip, 'ssh', 22, username, 'pw', '', 'alcatel_aos')
+
+
+def test_released_sessions_are_reused_by_the_same_device():
+    pool = ConnectionPool()
+    created = []
+
+    def connect():
+        created.append(FakeConnection())
+        return created[-1]
+
+    first, reused = pool.acquire(make_host(), connect)
+    assert not reused
+    pool.release(make_host(), first)
+
+    assert pool.acquire(make_host(), connect) == (first, True)
+    # 用户名不同的会话不能复用
+    other, reused = pool.acquire(make_host(username='operator'), connect)
+    assert other is not first and not reused
+    assert pool.stats == {'created': 2, 'reused': 1, 'stale': 0, 'expired': 0}
+
+
+def test_dead_and_unusable_sessions_are_closed():
+    pool = ConnectionPool()
+    dead = FakeConnection(alive=False)
+    pool.release(make_host(), dead)
+    fresh = FakeConnection()
+
+    assert pool.acquire(make_host(), lambda: fresh) == (fresh, False)
+    assert dead.disconnected
+    assert pool.stats['stale'] == 1
+
+    pool.release(make_host(), fresh, reusable=False)
+    assert fresh.disconnected
+    assert pool.idle_count() == 0
+
+
+def test_pool_size_and_idle_timeout():
+    pool = ConnectionPool(max_idle=1, idle_timeout=0.05)
+    kept, extra = FakeConnection(), FakeConnection()
+    pool.release(make_host('10.0.0.1'), kept)
+    pool.release(make_host('10.0.0.2'), extra)
+    assert extra.disconnected and pool.idle_count() == 1
+
+    assert pool.reap() == 0
+    time.sleep(0.1)
+    assert pool.reap() == 1
+    assert kept.disconnected
+    assert pool.stats['expired'] == 1
+
+
+def test_close_disconnects_idle_sessions_and_stops_pooling():
+    pool = ConnectionPool().start()
+    idle = FakeConnection()
+    pool.release(make_host(), idle)
+    pool.close()
+    assert idle.disconnected
+
+    late = FakeConnection()
+    pool.release(make_host(), late)
+    assert late.disconnected
+    pool.reaper.join(1)
+    assert not pool.reaper.is_alive()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 设备记录测试
+"""
+
+import pytest
+
+from device_record import DeviceRecord, CommandListCache
+
+
+class Cell:
+    def __init__(self, value):
+        self.value = value
+
+
+class Workbook:
+    """只提供 sheetnames 和按名称取表的工作簿替身"""
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.sheetnames = list(sheets)
+
+    def __getitem__(self, name):
+        return self.sheets[name]
+
+
+def make_row(*values):
+    return tuple(Cell(value) for value in values)
+
+
+def test_from_row_normalises_text_and_reads_optional_site():
+    row = make_row(1, 'on', ' 10.0.0.1 ', ' SSH ', None, 'admin', 'pw', '', ' alcatel_aos ', 'hq')
+    record = DeviceRecord.from_row(row)
+    assert (record.ip, record.protocol, record.device_type, record.site) == ('10.0.0.1', 'ssh', 'alcatel_aos', 'hq')
+    assert record.connect_port == 22
+    assert not hasattr(record, '__dict__')
+
+    # 旧版设备清单没有站点列
+    record = DeviceRecord.from_row(row[:9])
+    assert record.site == ''
+
+
+def test_telnet_params_do_not_modify_the_record():
+    record = DeviceRecord('10.0.0.1', 'telnet', None, 'admin', 'pw', 'enable', 'alcatel_aos')
+    params = record.connection_params(timeout=30)
+    assert params['device_type'] == 'alcatel_aos_telnet'
+    assert (params['port'], params['secret'], params['timeout']) == (23, 'enable', 30)
+    assert record.device_type == 'alcatel_aos'
+    assert record.port is None
+    assert 'pw' not in repr(record)
+
+
+def test_unsupported_protocol_is_rejected():
+    record = DeviceRecord('10.0.0.1', 'http', 80, 'admin', 'pw', '', 'alcatel_aos')
+    with pytest.raises(ValueError, match='10.0.0.1_Not_Support_Protocol'):
+        record.connection_params()
+
+
+def test_command_lists_are_read_once_and_shared():
+    reads = []
+
+    def reader(sheet):
+        reads.append(sheet)
+        return ['show system', 'show vlan']
+
+    cache = CommandListCache(Workbook({'alcatel_aos': 'sheet'}), reader)
+    first = cache.get('ALCATEL_AOS ')
+    assert first == ('show system', 'show vlan')
+    assert cache.get('alcatel_aos') is first
+    assert reads == ['sheet']
+    assert cache.get('cisco_ios') is None
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 设备类型注册表测试
+"""
+
+from device_record import DeviceRecord
+from device_registry import DeviceRegistry, normalize_type, WORKFLOW_COMMANDS, WORKFLOW_TECH_SUPPORT
+
+
+def test_transport_suffix_and_case_are_ignored():
+    assert normalize_type(' Cisco_IOS_telnet ') == 'cisco_ios'
+    assert normalize_type(None) == ''
+    registry = DeviceRegistry()
+    assert registry.lookup('HUAWEI_telnet') is registry.lookup('huawei')
+    assert registry.lookup('huawei').label == '华为'
+
+
+def test_ale_aliases_match_whole_names_only():
+    registry = DeviceRegistry()
+    for device_type in ('alcatel_aos', 'OmniSwitch', 'ale_os6860', 'aos'):
+        profile = registry.lookup(device_type)
+        assert profile.is_ale and profile.label == 'ALE', device_type
+    # 名称中包含 ale 的其他厂商不按ALE流程处理
+    profile = registry.lookup('allied_telesis_awplus')
+    assert profile.workflow == WORKFLOW_COMMANDS
+    assert profile.label == 'ALLIED_TELESIS_AWPLUS'
+
+
+def test_lookups_are_cached_by_raw_name():
+    registry = DeviceRegistry()
+    first = registry.lookup('MyVendor_ssh')
+    assert registry.lookup('MyVendor_ssh') is first
+    assert first.workflow != WORKFLOW_TECH_SUPPORT
+    assert list(registry.cache) == ['MyVendor_ssh']
+
+
+def test_profile_params_are_applied_on_connect():
+    record = DeviceRecord('10.0.0.1', 'telnet', None, 'admin', 'pw', '', 'huawei')
+    params = record.connection_params()
+    assert params['device_type'] == 'huawei_telnet'
+    assert params['conn_timeout'] == 15
+    assert params['fast_cli'] is False
+
+    params = DeviceRecord('10.0.0.2', 'ssh', 2222, 'admin', 'pw', '', 'cisco_ios').connection_params(conn_timeout=5)
+    assert params['port'] == 2222
+    assert params['conn_timeout'] == 5
+    assert 'fast_cli' not in params
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 下载方式选择测试
+"""
+
+import os
+import time
+import threading
+
+import pytest
+
+import download_strategy
+from download_strategy import DownloadStrategy, FileMissing, DownloadCancelled
+
+DEVICE = '10.0.0.1'
+
+
+@pytest.fixture
+def strategy(tmp_path):
+    config = download_strategy.get_default_config()
+    config.update({'methods': ['sftp', 'ftp', 'tftp'], 'race_wait': 1})
+    return DownloadStrategy(str(tmp_path), config)
+
+
+def writer(data, delay=0.0, calls=None):
+    """按时写完文件的下载方法"""
+    def fetch(path, token):
+        if calls is not None:
+            calls.append(os.path.basename(path))
+        time.sleep(delay)
+        with open(path, 'wb') as f:
+            f.write(data)
+    return fetch
+
+
+def failer(error, calls=None):
+    """总是失败的下载方法"""
+    def fetch(path, token):
+        if calls is not None:
+            calls.append(os.path.basename(path))
+        raise error
+    return fetch
+
+
+def blocker():
+    """阻塞到被取消的下载方法"""
+    def fetch(path, token):
+        cancelled = threading.Event()
+        token.add(cancelled.set)
+        cancelled.wait(5)
+        raise DownloadCancelled(os.path.basename(path))
+    return fetch
+
+
+def listing(directory):
+    return sorted(name for name in os.listdir(directory) if name != download_strategy.STATE_FILE)
+
+
+def test_falls_back_and_remembers_the_working_method(strategy, tmp_path):
+    target = str(tmp_path / "tech_support.log")
+    calls = []
+    fetchers = {
+        'sftp': failer(ConnectionRefusedError("refused"), calls),
+        'ftp': writer(b'ftp data', calls=calls),
+        'tftp': writer(b'tftp data', calls=calls),
+    }
+
+    assert strategy.download(DEVICE, target, fetchers) == 'ftp'
+    with open(target, 'rb') as f:
+        assert f.read() == b'ftp data'
+    strategy.save()
+
+    # 新一次巡检先使用上次成功的方式
+    reloaded = DownloadStrategy(str(tmp_path), strategy.config)
+    assert reloaded.candidates(DEVICE, ['sftp', 'ftp', 'tftp']) == ['ftp', 'sftp', 'tftp']
+    assert reloaded.healthy(DEVICE, 'ftp')
+
+
+def test_dead_methods_are_skipped_for_the_rest_of_the_run(strategy, tmp_path):
+    calls = []
+    fetchers = {
+        'sftp': failer(ConnectionRefusedError("refused"), calls),
+        'ftp': writer(b'data', calls=calls),
+    }
+    strategy.download(DEVICE, str(tmp_path / "first.log"), fetchers)
+    strategy.download(DEVICE, str(tmp_path / "second.log"), fetchers)
+
+    assert calls == ['first.log', 'first.log', 'second.log']
+    assert strategy.dead == {DEVICE: {'sftp'}}
+
+
+def test_missing_file_does_not_try_other_methods(strategy, tmp_path):
+    calls = []
+    fetchers = {
+        'sftp': failer(FileMissing("no such file"), calls),
+        'ftp': writer(b'data', calls=calls),
+    }
+    assert strategy.download(DEVICE, str(tmp_path / "swlog.log"), fetchers) is None
+    assert calls == ['swlog.log']
+    # 文件不存在与方式是否可用无关
+    assert DEVICE not in strategy.dead
+
+
+def test_limit_only_tries_the_preferred_method(strategy, tmp_path):
+    strategy.record(DEVICE, 'tftp', True)
+    calls = []
+    fetchers = {
+        'sftp': writer(b'data', calls=calls),
+        'tftp': failer(TimeoutError("timed out"), calls),
+    }
+    assert strategy.download(DEVICE, str(tmp_path / "a.log"), fetchers, limit=1) is None
+    assert calls == ['a.log']
+
+
+def test_race_keeps_the_winner_and_cancels_the_rest(strategy, tmp_path):
+    strategy.state[DEVICE] = {'preferred': 'sftp', 'failures': 1}
+    target = str(tmp_path / "tech_support.log")
+    fetchers = {
+        'sftp': blocker(),
+        'ftp': writer(b'ftp data', delay=0.05),
+        'tftp': blocker(),
+    }
+
+    started = time.monotonic()
+    assert strategy.download(DEVICE, target, fetchers) == 'ftp'
+    assert time.monotonic() - started < 1
+
+    with open(target, 'rb') as f:
+        assert f.read() == b'ftp data'
+    assert listing(str(tmp_path)) == ['tech_support.log']
+    assert strategy.state[DEVICE]['preferred'] == 'ftp'
+    assert strategy.state[DEVICE]['failures'] == 0
+    # 被取消不代表方式不可用
+    assert DEVICE not in strategy.dead
+
+
+def test_race_loser_finishing_after_cancel_is_discarded(strategy, tmp_path):
+    strategy.state[DEVICE] = {'preferred': 'sftp', 'failures': 1}
+    strategy.config['race_wait'] = 0.05
+    target = str(tmp_path / "tech_support.log")
+    # sftp 忽略取消，在竞速结束后才完成
+    fetchers = {
+        'sftp': writer(b'late sftp data', delay=0.3),
+        'ftp': writer(b'ftp data', delay=0.05),
+    }
+
+    assert strategy.download(DEVICE, target, fetchers) == 'ftp'
+    time.sleep(0.5)
+
+    with open(target, 'rb') as f:
+        assert f.read() == b'ftp data'
+    assert listing(str(tmp_path)) == ['tech_support.log']
+    assert strategy.state[DEVICE]['preferred'] == 'ftp'
+
+
+def test_race_with_no_winner_cleans_up(strategy, tmp_path):
+    strategy.state[DEVICE] = {'preferred': 'ftp', 'failures': 2}
+    target = str(tmp_path / "tech_support.log")
+    fetchers = {
+        'sftp': failer(ConnectionResetError("reset")),
+        'ftp': failer(TimeoutError("timed out")),
+    }
+    assert strategy.download(DEVICE, target, fetchers) is None
+    assert listing(str(tmp_path)) == []
+    assert strategy.state[DEVICE]['failures'] == 3
+    assert strategy.dead[DEVICE] == {'sftp', 'ftp'}
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 全网统计分析测试
+"""
+
+import os
+
+import pytest
+
+import fleet_analytics
+from command_parser import ColumnStore
+from fleet_analytics import FleetAnalytics, parse_targets, robust_outliers
+
+pd = pytest.importorskip('pandas')
+
+
+def make_analytics(**overrides):
+    config = fleet_analytics.get_default_config()
+    config.update(overrides)
+    return FleetAnalytics(config)
+
+
+def interface_store(error_counts, packets=10 ** 6):
+    """每台设备一个接口，错误数取自 error_counts"""
+    store = ColumnStore()
+    for index, errors in enumerate(error_counts):
+        store.add('interface', f"10.0.0.{index + 1}", 'Cisco', 'cisco_ios', [{
+            'interface': 'Gi1/0/1', 'status': 'up',
+            'in_packets': packets, 'out_packets': packets, 'in_errors': errors, 'out_errors': 0,
+        }])
+    return store
+
+
+def test_mad_flags_only_values_far_from_the_median():
+    values = pd.Series([10.0, 11, 9, 10, 12, 10, 500, float('nan')])
+    outliers, threshold = robust_outliers(values, 3.5, 0)
+    # 中位数10，MAD=1*1.4826，阈值约15.2
+    assert threshold == pytest.approx(10 + 3.5 * 1.4826)
+    assert list(values[outliers]) == [500]
+
+    # 低于下限的不算异常
+    outliers, threshold = robust_outliers(values, 3.5, 1000)
+    assert threshold == 1000 and not outliers.any()
+    outliers, threshold = robust_outliers(pd.Series([float('nan')]), 3.5, 7)
+    assert threshold == 7 and not outliers.any()
+
+
+def test_interface_error_rate_outliers():
+    analytics = make_analytics(min_error_rate=0.0001)
+    results = analytics.run(interface_store([10, 12, 8, 11, 9, 10, 5000]))
+    errors = results['interface_errors']
+    assert (errors['interfaces'], errors['devices'], errors['outlier_count']) == (7, 7, 1)
+    assert errors['outliers'][0]['device'] == '10.0.0.7'
+    assert errors['outliers'][0]['error_rate'] == pytest.approx(5000 / (2 * 10 ** 6))
+
+
+def test_error_counts_are_used_without_packet_counters():
+    store = ColumnStore()
+    for index, errors in enumerate([0, 1, 0, 2, 50000]):
+        store.add('interface', f"10.0.1.{index + 1}", '华为', 'huawei',
+                  [{'interface': 'GE0/0/1', 'in_errors': errors, 'out_errors': 0}])
+    errors = make_analytics().run(store)['interface_errors']
+    assert errors['count_threshold'] == 1000
+    assert [row['device'] for row in errors['outliers']] == ['10.0.1.5']
+
+
+def test_version_compliance_uses_targets_then_majority():
+    store = ColumnStore()
+    versions = [('10.0.0.1', 'C2960X', '15.2(7)E8'), ('10.0.0.2', 'C2960X', '15.2(7)E8'),
+                ('10.0.0.3', 'C2960X', '15.2(4)E1'), ('10.0.0.4', 'C9300', '17.3.4')]
+    for device_ip, model, version in versions:
+        store.add('version', device_ip, 'Cisco', 'cisco_ios', [{'model': model, 'version': version, 'uptime': 86400 * 30}])
+
+    compliance = make_analytics().run(store)['version_compliance']
+    assert [row['device'] for row in compliance['noncompliant']] == ['10.0.0.3']
+
+    compliance = make_analytics(target_versions=['c9300=17.9.4']).run(store)['version_compliance']
+    assert [(row['device'], row['expected']) for row in compliance['noncompliant']] == \
+        [('10.0.0.3', '15.2(7)E8'), ('10.0.0.4', '17.9.4')]
+    assert parse_targets(['Cisco = 15.2', 'bad', '=1']) == {'cisco': '15.2'}
+
+
+def test_uptime_distribution_and_metrics(tmp_path):
+    store = ColumnStore()
+    for index, days in enumerate([0.5, 30, 60, 2000]):
+        store.add('version', f"10.0.0.{index + 1}", 'Cisco', 'cisco_ios', [{'version': '1', 'uptime': days * 86400}])
+    analytics = make_analytics()
+    uptime = analytics.run(store)['uptime']
+    assert uptime['devices'] == 4
+    assert [row['device'] for row in uptime['recently_rebooted']] == ['10.0.0.1']
+    assert [row['device'] for row in uptime['long_uptime']] == ['10.0.0.4']
+    assert ('10.0.0.2', 'uptime_days', 30.0) in analytics.device_metrics()
+
+    paths = analytics.write_tables(str(tmp_path), '2026-01-01_00-00-00')
+    assert [os.path.basename(path) for path in paths] == ['fleet_version_2026-01-01_00-00-00.csv']
+
+
+def test_empty_store_returns_none():
+    assert make_analytics().run(ColumnStore()) is None
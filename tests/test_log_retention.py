@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - LOG目录保留策略测试
+"""
+
+import os
+import logging
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+import log_retention
+from log_store import LogStore
+from log_retention import RetentionManager, LOGTIME_FORMAT, ARCHIVE_DIR
+
+MB = 1024 * 1024
+
+
+def ago(days, seconds=0):
+    """days 天之前的巡检时间"""
+    return (datetime.now() - timedelta(days=days, seconds=seconds)).strftime(LOGTIME_FORMAT)
+
+
+def make_config(**overrides):
+    """所有策略默认关闭的配置"""
+    config = {
+        'enabled': True,
+        'background': False,
+        'max_age_days': 0,
+        'max_runs': 0,
+        'max_size': 0,
+        'archive_after_days': 0,
+    }
+    config.update(overrides)
+    return config
+
+
+def make_run(log_dir, device_ip, logtime, size=1024):
+    """创建巡检目录，返回路径"""
+    path = os.path.join(log_dir, f"{device_ip}_{logtime}")
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, f"{device_ip}_tech_support.log"), 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def make_zip(log_dir, group, logtime, size=1024):
+    """创建设备压缩包或汇总压缩包，返回路径"""
+    path = os.path.join(log_dir, f"{group}_{logtime}.zip")
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('tech_support.log', b'x' * size)
+    return path
+
+
+def snapshot(log_dir):
+    """LOG目录下所有文件的相对路径和大小"""
+    files = {}
+    for root, _, names in os.walk(log_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, log_dir)] = os.path.getsize(path)
+    return files
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    path = tmp_path / "LOG"
+    path.mkdir()
+    return str(path)
+
+
+def test_age_policy_removes_old_runs_and_zips(log_dir):
+    old_run = make_run(log_dir, '10.0.0.1', ago(100))
+    old_zip = make_zip(log_dir, '10.0.0.1', ago(100))
+    recent_run = make_run(log_dir, '10.0.0.1', ago(10))
+    recent_zip = make_zip(log_dir, 'all_devices', ago(10))
+
+    manager = RetentionManager(log_dir, config=make_config(max_age_days=90))
+    assert manager.apply_policies() == 2
+
+    assert not os.path.exists(old_run)
+    assert not os.path.exists(old_zip)
+    assert os.path.isdir(recent_run)
+    assert os.path.exists(recent_zip)
+
+
+def test_count_policy_keeps_latest_runs_per_device(log_dir):
+    device_a = [make_run(log_dir, '10.0.0.1', ago(days)) for days in (5, 4, 3, 2, 1)]
+    device_b = [make_run(log_dir, '10.0.0.2', ago(days)) for days in (2, 1)]
+    summaries = [make_zip(log_dir, 'all_devices', ago(days)) for days in (5, 4, 3, 2)]
+
+    manager = RetentionManager(log_dir, config=make_config(max_runs=3))
+    manager.apply_policies()
+
+    assert [os.path.exists(path) for path in device_a] == [False, False, True, True, True]
+    assert all(os.path.exists(path) for path in device_b)
+    # 汇总压缩包单独计数
+    assert [os.path.exists(path) for path in summaries] == [False, True, True, True]
+
+
+def test_size_policy_removes_oldest_until_under_limit(log_dir):
+    runs = [make_run(log_dir, '10.0.0.1', ago(days), size=MB) for days in (5, 4, 3, 2, 1)]
+
+    manager = RetentionManager(log_dir, config=make_config(max_size=3))
+    assert manager.apply_policies() == 2
+
+    assert [os.path.exists(path) for path in runs] == [False, False, True, True, True]
+    assert sum(snapshot(log_dir).values()) <= 3 * MB
+
+
+
+def add_to_store(store, run_dir):
+    """把巡检目录中的文件加入内容存储（文件变为指向对象的硬链接）"""
+    for name in os.listdir(run_dir):
+        store.add_file('10.0.0.1', os.path.join(run_dir, name))
+
+
+def test_size_policy_ignores_store_and_counts_hardlinks_once(log_dir):
+    store = LogStore(log_dir)
+    # 5次巡检的内容相同，只占用1MB
+    runs = [make_run(log_dir, '10.0.0.1', ago(days), size=MB) for days in (5, 4, 3, 2, 1)]
+    for run_dir in runs:
+        add_to_store(store, run_dir)
+
+    manager = RetentionManager(log_dir, store, config=make_config(max_size=1))
+    assert manager.apply_policies() == 0
+    assert all(os.path.isdir(path) for path in runs)
+
+
+def test_size_policy_stops_once_runs_fit(log_dir):
+    store = LogStore(log_dir)
+    runs = []
+    for index, days in enumerate((5, 4, 3, 2, 1)):
+        run_dir = os.path.join(log_dir, f"10.0.0.1_{ago(days)}")
+        os.makedirs(run_dir)
+        with open(os.path.join(run_dir, "tech_support.log"), 'wb') as f:
+            f.write(bytes([index]) * MB)
+        add_to_store(store, run_dir)
+        runs.append(run_dir)
+
+    # .store 中的对象不计入，最近两次巡检正好2MB
+    manager = RetentionManager(log_dir, store, config=make_config(max_size=2))
+    assert manager.apply_policies() == 3
+    assert [os.path.exists(path) for path in runs] == [False, False, False, True, True]
+
+def test_current_run_is_never_removed(log_dir):
+    current = ago(200)
+    current_run = make_run(log_dir, '10.0.0.1', current, size=MB)
+    current_zip = make_zip(log_dir, 'all_devices', current)
+    other_run = make_run(log_dir, '10.0.0.1', ago(150), size=MB)
+
+    manager = RetentionManager(log_dir, config=make_config(max_age_days=90, max_runs=1, max_size=1),
+                               current_logtime=current)
+    assert all(item['logtime'] != current for item in manager.scan())
+    manager.apply_policies()
+
+    assert os.path.isdir(current_run)
+    assert os.path.exists(current_zip)
+    assert not os.path.exists(other_run)
+
+
+def test_dry_run_deletes_nothing(log_dir):
+    for days in (400, 100, 30, 20, 10, 1):
+        make_run(log_dir, '10.0.0.1', ago(days), size=MB)
+        make_zip(log_dir, '10.0.0.1', ago(days))
+    os.makedirs(os.path.join(log_dir, ARCHIVE_DIR))
+    old_month = (datetime.now() - timedelta(days=400)).strftime("%Y-%m")
+    with zipfile.ZipFile(os.path.join(log_dir, ARCHIVE_DIR, f"{old_month}.zip"), 'w') as archive:
+        archive.writestr('old.zip', b'x')
+    before = snapshot(log_dir)
+
+    manager = RetentionManager(log_dir, config=make_config(max_age_days=90, max_runs=3, max_size=2,
+                                                           archive_after_days=7))
+    result = manager.run(dry_run=True)
+
+    assert result['removed'] > 0
+    assert result['archived'] > 0
+    assert snapshot(log_dir) == before
+
+
+def test_archive_old_zips_by_month(log_dir):
+    old_zips = [make_zip(log_dir, '10.0.0.1', ago(30)), make_zip(log_dir, 'all_devices', ago(30, seconds=5))]
+    recent_zip = make_zip(log_dir, '10.0.0.1', ago(1))
+    old_run = make_run(log_dir, '10.0.0.1', ago(30))
+
+    manager = RetentionManager(log_dir, config=make_config(archive_after_days=7))
+    assert manager.archive_old_zips() == 2
+
+    assert not any(os.path.exists(path) for path in old_zips)
+    assert os.path.exists(recent_zip)
+    assert os.path.isdir(old_run)
+    archives = os.listdir(os.path.join(log_dir, ARCHIVE_DIR))
+    names = set()
+    for name in archives:
+        with zipfile.ZipFile(os.path.join(log_dir, ARCHIVE_DIR, name)) as archive:
+            names.update(archive.namelist())
+    assert names == {os.path.basename(path) for path in old_zips}
+
+
+def test_retention_is_off_by_default():
+    assert not log_retention.get_default_config()['enabled']
+
+
+def test_first_run_announces_what_it_removes(log_dir, caplog):
+    old_run = make_run(log_dir, '10.0.0.1', ago(100))
+    recent_run = make_run(log_dir, '10.0.0.1', ago(1))
+    manager = RetentionManager(log_dir, config=make_config(max_age_days=90))
+
+    with caplog.at_level(logging.INFO):
+        manager.run()
+    warnings = [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+    assert any('首次执行' in message for message in warnings)
+    assert any('将删除 1 个' in message for message in warnings)
+    assert f"删除: {old_run}" in caplog.messages
+    assert not os.path.exists(old_run)
+    assert os.path.isdir(recent_run)
+
+    # 之后的执行不再提示
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        manager.run()
+    assert not any('首次执行' in message for message in caplog.messages)
+
+
+def test_dry_run_does_not_count_as_first_run(log_dir):
+    make_run(log_dir, '10.0.0.1', ago(100))
+    manager = RetentionManager(log_dir, config=make_config(max_age_days=90))
+    manager.run(dry_run=True)
+    assert not os.path.exists(manager.state_path)
+
+
+def test_store_and_history_ages_follow_log_retention_days(monkeypatch):
+    env_loader = pytest.importorskip('env_loader')
+    monkeypatch.setenv('LOG_RETENTION_DAYS', '45')
+    monkeypatch.setenv('LOG_STORE_RETENTION_DAYS', '')
+    monkeypatch.setenv('HISTORY_RETENTION_DAYS', '400')
+    assert env_loader.get_log_store_config()['retention_days'] == 45
+    assert env_loader.get_history_config()['retention_days'] == 400
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 日志内容存储测试
+"""
+
+import io
+import os
+import stat
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import log_store
+from log_store import LogStore, RUN_MANIFEST
+
+
+def make_log(seed, size):
+    """生成类似设备日志的文本"""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    while total < size:
+        line = (f"{rng.randrange(10 ** 6)} port 1/1/{rng.randrange(1, 49)} rx {rng.randrange(10 ** 9)} "
+                f"errors {rng.randrange(100)}\n")
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines).encode('ascii')[:size]
+
+
+def write_run(log_dir, device_ip, logtime, files):
+    """创建巡检目录，files 为 {相对路径: 内容}"""
+    run_dir = os.path.join(log_dir, f"{device_ip}_{logtime}")
+    for rel_path, data in files.items():
+        path = os.path.join(run_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    return run_dir
+
+
+def read_tree(run_dir):
+    """读取目录下除清单外的所有文件"""
+    files = {}
+    for root, _, names in os.walk(run_dir):
+        for name in names:
+            if name == RUN_MANIFEST:
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, run_dir)] = f.read()
+    return files
+
+
+def store_files(base_dir):
+    """存储目录下的所有文件"""
+    if not os.path.isdir(base_dir):
+        return set()
+    return {os.path.join(root, name) for root, _, names in os.walk(base_dir) for name in names}
+
+
+@pytest.fixture
+def store(tmp_path):
+    config = log_store.get_default_config()
+    config.update({'plain_runs': 1, 'retention_days': 0})
+    return LogStore(str(tmp_path / "LOG"), config)
+
+
+@pytest.fixture
+def files():
+    return {
+        '10.0.0.1_tech_support.log': make_log(1, 600 * 1024),
+        '10.0.0.1_swlog.log': make_log(2, 40 * 1024),
+        'flash/empty.txt': b'',
+        'flash/binary.bin': bytes(range(256)) * 64,
+    }
+
+
+def test_identical_files_share_one_object(store):
+    data = b'show system\nSystem: OS6860\n' * 100
+    first = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', {'show_system.txt': data})
+    second = write_run(store.log_dir, '10.0.0.2', '2026-01-01_00-00-00', {'show_system.txt': data})
+
+    assert store.add_file('10.0.0.1', os.path.join(first, 'show_system.txt'))
+    assert store.add_file('10.0.0.2', os.path.join(second, 'show_system.txt'))
+
+    first_stat = os.stat(os.path.join(first, 'show_system.txt'))
+    second_stat = os.stat(os.path.join(second, 'show_system.txt'))
+    assert first_stat.st_ino == second_stat.st_ino
+    assert first_stat.st_nlink == 3
+    with open(os.path.join(second, 'show_system.txt'), 'rb') as f:
+        assert f.read() == data
+
+
+def test_stored_objects_are_read_only(store):
+    run_dir = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', {'show_system.txt': b'OS6860\n'})
+    file_path = os.path.join(run_dir, 'show_system.txt')
+    store.add_file('10.0.0.1', file_path)
+
+    # 巡检文件与对象是同一个文件，原地写入会改变存储的内容
+    assert os.stat(file_path).st_mode & 0o222 == 0
+    if hasattr(os, 'geteuid') and os.geteuid() != 0:
+        with pytest.raises(PermissionError):
+            open(file_path, 'r+b')
+
+    # 只读的硬链接不影响删除巡检目录
+    log_store.remove_tree(run_dir)
+    assert not os.path.exists(run_dir)
+
+
+def test_gc_protects_writable_objects(store):
+    run_dir = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', {'show_system.txt': b'OS6860\n'})
+    file_path = os.path.join(run_dir, 'show_system.txt')
+    store.add_file('10.0.0.1', file_path)
+    store.save()
+    # 较早版本写入的对象是可写的
+    os.chmod(file_path, stat.S_IREAD | stat.S_IWRITE)
+
+    store.gc()
+    assert os.stat(file_path).st_mode & 0o222 == 0
+
+
+def test_changes_are_detected_against_previous_run(store):
+    old = b'port 1/1/1 up\nport 1/1/2 up\n'
+    new = b'port 1/1/1 up\nport 1/1/2 down\n'
+    first = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', {'ports.txt': old, 'vlan.txt': b'vlan 1\n'})
+    store.add_file('10.0.0.1', os.path.join(first, 'ports.txt'))
+    store.add_file('10.0.0.1', os.path.join(first, 'vlan.txt'))
+    store.save('2026-01-01_00-00-00')
+
+    reopened = LogStore(store.log_dir, store.config)
+    second = write_run(store.log_dir, '10.0.0.1', '2026-01-02_00-00-00', {'ports.txt': new, 'vlan.txt': b'vlan 1\n'})
+    assert reopened.add_file('10.0.0.1', os.path.join(second, 'ports.txt'))
+    assert not reopened.add_file('10.0.0.1', os.path.join(second, 'vlan.txt'))
+
+    assert reopened.is_unchanged(os.path.join(second, 'vlan.txt'))
+    assert not reopened.is_unchanged(os.path.join(second, 'ports.txt'))
+    with open(os.path.join(second, 'ports.txt.diff'), 'r', encoding='utf-8') as f:
+        diff = f.read()
+    assert '-port 1/1/2 up' in diff and '+port 1/1/2 down' in diff
+    assert not os.path.exists(os.path.join(second, 'vlan.txt.diff'))
+    assert reopened.read_previous('10.0.0.1', 'ports.txt') == old
+
+
+def test_command_outputs_are_diffed_per_device(store):
+    assert store.add_text('10.0.0.1', 'show vlan', 'vlan 1\n')
+    store.save()
+
+    reopened = LogStore(store.log_dir, store.config)
+    assert not reopened.add_text('10.0.0.1', 'show vlan', 'vlan 1\n')
+    assert reopened.add_text('10.0.0.2', 'show vlan', 'vlan 1\n')
+    diff = reopened.diff_text('10.0.0.1', 'show vlan', 'vlan 1\nvlan 20\n')
+    assert '+vlan 20' in diff
+
+
+def test_large_files_are_not_diffed(store):
+    store.config['diff_max_size'] = 0
+    first = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', {'big.log': b'a\n'})
+    store.add_file('10.0.0.1', os.path.join(first, 'big.log'))
+    store.save()
+
+    reopened = LogStore(store.log_dir, store.config)
+    second = write_run(store.log_dir, '10.0.0.1', '2026-01-02_00-00-00', {'big.log': b'b\n'})
+    assert reopened.add_file('10.0.0.1', os.path.join(second, 'big.log'))
+    assert not os.path.exists(os.path.join(second, 'big.log.diff'))
+
+
+def test_pack_and_restore_round_trip(store, files):
+    run_dir = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', files)
+
+    freed = store.pack_run(run_dir)
+
+    assert freed == sum(len(data) for data in files.values())
+    assert store.is_packed(run_dir)
+    assert read_tree(run_dir) == {}
+    assert store.restore_run(run_dir)
+    assert read_tree(run_dir) == files
+    assert not store.is_packed(run_dir)
+
+
+def test_gc_keeps_referenced_chunks_and_removes_orphans(store, files):
+    old_run = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', files)
+    other_run = write_run(store.log_dir, '10.0.0.2', '2026-01-01_00-00-00', {'other.log': make_log(3, 300 * 1024)})
+    store.pack_run(old_run)
+    store.pack_run(other_run)
+
+    # 还有清单引用时数据块不会被清理
+    store.gc()
+    assert store.restore_run(old_run, str(os.path.join(store.log_dir, 'restored')))
+    assert read_tree(os.path.join(store.log_dir, 'restored')) == files
+
+    # 删除巡检目录后（与 prune 相同），只被它引用的数据块被回收
+    chunks_before = store_files(store.chunks_dir)
+    os.remove(os.path.join(other_run, RUN_MANIFEST))
+    os.rmdir(other_run)
+    assert store.gc() > 0
+    chunks_after = store_files(store.chunks_dir)
+    assert chunks_after < chunks_before
+    assert store.restore_run(old_run)
+    assert read_tree(old_run) == files
+
+
+def test_gc_moves_indexed_objects_into_chunks(store):
+    data = make_log(4, 200 * 1024)
+    run_dir = write_run(store.log_dir, '10.0.0.1', '2026-01-01_00-00-00', {'show_version.txt': data})
+    store.add_file('10.0.0.1', os.path.join(run_dir, 'show_version.txt'))
+    store.save('2026-01-01_00-00-00')
+    store.pack_run(run_dir)
+
+    # 巡检目录已打包，完整对象不再被硬链接，gc 后由数据块提供
+    store.gc()
+    assert store_files(store.objects_dir) == set()
+    reopened = LogStore(store.log_dir, store.config)
+    assert reopened.read_previous('10.0.0.1', 'show_version.txt') == data
+
+
+def test_compact_packs_older_runs_and_prunes_expired(store, files):
+    logtimes = [(datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d_%H-%M-%S") for days in (400, 2, 1)]
+    runs = [write_run(store.log_dir, '10.0.0.1', logtime, files) for logtime in logtimes]
+    store.config['retention_days'] = 180
+
+    packed, removed, _ = store.compact()
+
+    assert (packed, removed) == (2, 1)
+    assert not os.path.exists(runs[0])
+    assert store.is_packed(runs[1])
+    assert read_tree(runs[2]) == files
+
+
+def test_chunk_bounds_are_content_defined():
+    data = make_log(5, 2 * 1024 * 1024)
+    bounds = list(log_store.iter_chunk_bounds(data))
+    sizes = [end - start for start, end in bounds]
+
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(data)
+    assert all(start == previous_end for (start, _), (_, previous_end) in zip(bounds[1:], bounds))
+    assert all(log_store.CHUNK_MIN_SIZE <= size <= log_store.CHUNK_MAX_SIZE for size in sizes[:-1])
+
+    # 按窗口读取的结果与整体切分一致
+    chunks = list(log_store.iter_chunks(io.BytesIO(data), window=300 * 1024))
+    assert [len(chunk) for chunk in chunks] == sizes
+    assert b''.join(chunks) == data
+
+    # 插入内容只影响附近的块
+    edited = data[:1000] + b'inserted line\n' + data[1000:]
+    unchanged = {data[start:end] for start, end in bounds}
+    edited_chunks = [edited[start:end] for start, end in log_store.iter_chunk_bounds(edited)]
+    assert sum(chunk in unchanged for chunk in edited_chunks) >= len(edited_chunks) - 2
+
+
+def test_numpy_and_python_boundaries_match(monkeypatch):
+    pytest.importorskip('numpy')
+    data = os.urandom(700 * 1024) + make_log(6, 900 * 1024)
+    vectorised = list(log_store.iter_chunk_bounds(data))
+    monkeypatch.setattr(log_store, 'gear_hits', lambda data: None)
+    assert list(log_store.iter_chunk_bounds(data)) == vectorised
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 指标导出测试
+"""
+
+import os
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics_exporter import MetricsExporter, format_labels
+
+
+def make_exporter(**overrides):
+    config = {'textfile': '', 'http_port': 0, 'http_addr': '127.0.0.1'}
+    config.update(overrides)
+    return MetricsExporter(config)
+
+
+def span(phase, duration, ok=True, **extra):
+    return dict(phase=phase, duration=duration, ok=ok, **extra)
+
+
+def samples(text):
+    """解析指标文本为 {名称和标签: 值}"""
+    return {line.rsplit(' ', 1)[0]: line.rsplit(' ', 1)[1]
+            for line in text.splitlines() if line and not line.startswith('#')}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_spans_are_rendered_as_prometheus_metrics():
+    exporter = make_exporter()
+    exporter.device_started()
+    exporter.device_started()
+    exporter.device_finished(True)
+    exporter.observe(span('ftp', 1.5, bytes=1000))
+    exporter.observe(span('ftp', 40, ok=False, error='timeout'))
+    exporter.observe(span('compress', 2, bytes=4096))
+
+    metrics = samples(exporter.render())
+    assert metrics['ale_inspection_devices_in_flight'] == '1'
+    assert metrics['ale_inspection_devices_total{status="success"}'] == '1'
+    assert metrics['ale_inspection_phase_duration_seconds_bucket{le="1",phase="ftp"}'] == '0'
+    assert metrics['ale_inspection_phase_duration_seconds_bucket{le="2",phase="ftp"}'] == '1'
+    assert metrics['ale_inspection_phase_duration_seconds_bucket{le="60",phase="ftp"}'] == '2'
+    assert metrics['ale_inspection_phase_duration_seconds_bucket{le="+Inf",phase="ftp"}'] == '2'
+    assert metrics['ale_inspection_phase_duration_seconds_sum{phase="ftp"}'] == '41.5'
+    assert metrics['ale_inspection_download_bytes_total{protocol="ftp"}'] == '1000'
+    assert metrics['ale_inspection_compress_throughput_bytes_per_second'] == '2048.0'
+    assert metrics['ale_inspection_failures_total{phase="ftp",reason="timeout"}'] == '1'
+
+
+def test_label_values_are_escaped():
+    assert format_labels(None) == ''
+    assert format_labels({'b': 'x"y', 'a': 'c:\\flash\n'}) == '{a="c:\\\\flash\\n",b="x\\"y"}'
+
+
+def test_textfile_is_replaced_atomically(tmp_path):
+    path = str(tmp_path / "textfile" / "ale.prom")
+    exporter = make_exporter(textfile=path)
+    assert exporter.enabled
+
+    assert exporter.write_textfile() == path
+    exporter.device_finished(False)
+    exporter.write_textfile()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert 'ale_inspection_devices_total{status="failed"} 1' in f.read()
+    assert os.listdir(os.path.dirname(path)) == ['ale.prom']
+
+
+def test_http_endpoint_serves_metrics():
+    exporter = make_exporter(http_port=free_port())
+    assert exporter.start_http()
+    try:
+        url = f"http://127.0.0.1:{exporter.config['http_port']}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert b'ale_inspection_devices_in_flight 0' in response.read()
+        with pytest.raises(urllib.error.HTTPError) as info:
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+        assert info.value.code == 404
+    finally:
+        exporter.stop_http()
+    assert not make_exporter().enabled
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 断点续传测试
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+import pytest
+
+import partial_file
+import download_strategy
+from download_strategy import DownloadStrategy
+from partial_file import PartialFile, partial_size, discard_partial, normalize_mtime, PART_SUFFIX, STATE_SUFFIX
+
+DATA = os.urandom(300 * 1024)
+MTIME = 1700000000
+# 与 MTIME 相同时刻的FTP MDTM应答
+MDTM = "20231114221320"
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    # 每64KB保存一次断点
+    monkeypatch.setattr(partial_file, 'CHECKPOINT_BYTES', 64 * 1024)
+    return str(tmp_path / "tech_support.log")
+
+
+def write_blocks(part, data, block=16 * 1024):
+    for start in range(0, len(data), block):
+        part.write(data[start:start + block])
+
+
+def interrupt(path, received, remote_size=len(DATA), mtime=MTIME):
+    """下载 received 字节后中断（关闭时保存断点）"""
+    with PartialFile(path, remote_size, mtime) as part:
+        write_blocks(part, DATA[:received])
+
+
+def test_resume_continues_from_checkpoint(path):
+    interrupt(path, 100 * 1024)
+    assert partial_size(path) == 100 * 1024
+
+    with PartialFile(path, len(DATA), MTIME) as part:
+        assert part.offset == 100 * 1024
+        write_blocks(part, DATA[part.offset:])
+        assert part.received == len(DATA) - 100 * 1024
+        digest = part.commit()
+
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert digest == hashlib.sha256(DATA).hexdigest()
+    assert not os.path.exists(path + PART_SUFFIX)
+    assert not os.path.exists(path + STATE_SUFFIX)
+
+
+def test_checksum_mismatch_restarts_download(path):
+    interrupt(path, 100 * 1024)
+    with open(path + PART_SUFFIX, 'r+b') as f:
+        f.seek(10)
+        f.write(b'corrupted')
+
+    with PartialFile(path, len(DATA), MTIME) as part:
+        assert part.offset == 0
+        assert partial_size(path) == 0
+        write_blocks(part, DATA)
+        digest = part.commit()
+    assert digest == hashlib.sha256(DATA).hexdigest()
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_remote_change_restarts_download(path):
+    interrupt(path, 100 * 1024)
+    with PartialFile(path, len(DATA), MTIME + 60) as part:
+        assert part.offset == 0
+    interrupt(path, 100 * 1024)
+    with PartialFile(path, len(DATA) + 1, MTIME) as part:
+        assert part.offset == 0
+
+
+def test_data_after_last_checkpoint_is_discarded(path):
+    with PartialFile(path, len(DATA), MTIME) as part:
+        write_blocks(part, DATA[:80 * 1024])
+        # 进程被终止: 没有关闭，只有64KB处的断点
+        part.file.flush()
+        part.file.close()
+        part.file = None
+    with open(path + STATE_SUFFIX, 'r', encoding='utf-8') as f:
+        assert json.load(f)['offset'] == 64 * 1024
+
+    with PartialFile(path, len(DATA), MTIME) as part:
+        assert part.offset == 64 * 1024
+        assert partial_size(path) == 64 * 1024
+        write_blocks(part, DATA[part.offset:])
+        part.commit()
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_incomplete_commit_raises_and_keeps_partial(path):
+    with pytest.raises(IOError):
+        with PartialFile(path, len(DATA), MTIME) as part:
+            write_blocks(part, DATA[:50 * 1024])
+            part.commit()
+    assert not os.path.exists(path)
+    assert partial_size(path) == 50 * 1024
+
+
+def test_unknown_remote_size_never_resumes(path):
+    with PartialFile(path) as part:
+        write_blocks(part, DATA[:100 * 1024])
+    assert not os.path.exists(path + STATE_SUFFIX)
+    with PartialFile(path) as part:
+        assert part.offset == 0
+        write_blocks(part, DATA)
+        part.commit()
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_zero_copy_data_resumes_by_size(path):
+    with PartialFile(path, len(DATA), MTIME) as part:
+        part.file.write(DATA[:100 * 1024])
+        part.file.flush()
+        part.advance(100 * 1024)
+
+    with PartialFile(path, len(DATA), MTIME) as part:
+        assert part.offset == 100 * 1024
+        write_blocks(part, DATA[part.offset:])
+        assert part.commit() is None
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_restart_and_discard(path):
+    interrupt(path, 100 * 1024)
+    with PartialFile(path, len(DATA), MTIME) as part:
+        assert part.offset == 100 * 1024
+        part.restart()
+        assert part.offset == 0
+        assert not os.path.exists(path + STATE_SUFFIX)
+        write_blocks(part, DATA[:10 * 1024])
+    discard_partial(path)
+    assert not os.path.exists(path + PART_SUFFIX)
+    assert not os.path.exists(path + STATE_SUFFIX)
+
+
+def test_mtime_formats_are_normalised():
+    assert normalize_mtime(MDTM) == MTIME
+    assert normalize_mtime(MDTM + ".250") == MTIME
+    assert normalize_mtime(float(MTIME) + 0.5) == MTIME
+    assert normalize_mtime(None) is None
+    assert normalize_mtime(" unknown ") == "unknown"
+
+
+def test_ftp_partial_is_resumed_by_sftp(path):
+    # FTP中断留下的临时文件记录的是MDTM时间
+    interrupt(path, 100 * 1024, mtime=MDTM)
+    with PartialFile(path, len(DATA), float(MTIME)) as part:
+        assert part.offset == 100 * 1024
+
+
+def test_next_method_continues_from_partial(path):
+    config = download_strategy.get_default_config()
+    config.update({'methods': ['ftp', 'sftp'], 'resume_retries': 0})
+    strategy = DownloadStrategy(os.path.dirname(path), config)
+    offsets = []
+
+    def ftp(local_path, token):
+        with PartialFile(local_path, len(DATA), MDTM) as part:
+            write_blocks(part, DATA[:100 * 1024])
+        raise ConnectionResetError("connection reset")
+
+    def sftp(local_path, token):
+        with PartialFile(local_path, len(DATA), float(MTIME)) as part:
+            offsets.append(part.offset)
+            write_blocks(part, DATA[part.offset:])
+            part.commit()
+
+    assert strategy.download('10.0.0.1', path, {'ftp': ftp, 'sftp': sftp}) == 'sftp'
+    assert offsets == [100 * 1024]
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert partial_size(path) == 0
+
+
+def test_partials_are_removed_when_every_method_fails(path):
+    config = download_strategy.get_default_config()
+    config.update({'methods': ['ftp', 'sftp'], 'resume_retries': 0})
+    strategy = DownloadStrategy(os.path.dirname(path), config)
+
+    def broken(local_path, token):
+        with PartialFile(local_path, len(DATA), MTIME) as part:
+            write_blocks(part, DATA[:100 * 1024])
+        raise ConnectionResetError("connection reset")
+
+    assert strategy.download('10.0.0.1', path, {'ftp': broken, 'sftp': broken}) is None
+    assert not os.path.exists(path + PART_SUFFIX)
+    assert not os.path.exists(path + STATE_SUFFIX)
+
+
+def test_cancelled_race_loser_leaves_no_partial(path):
+    config = download_strategy.get_default_config()
+    config.update({'methods': ['ftp', 'sftp'], 'race_wait': 0.05})
+    strategy = DownloadStrategy(os.path.dirname(path), config)
+    strategy.state['10.0.0.1'] = {'preferred': 'ftp', 'failures': 1}
+    finished = threading.Event()
+
+    def ftp(local_path, token):
+        # 取消后仍需一段时间才退出，退出时保存断点
+        cancelled = threading.Event()
+        token.add(cancelled.set)
+        try:
+            with PartialFile(local_path, len(DATA), MDTM) as part:
+                write_blocks(part, DATA[:100 * 1024])
+                cancelled.wait(5)
+                time.sleep(0.2)
+                raise ConnectionAbortedError("data connection closed")
+        finally:
+            finished.set()
+
+    def sftp(local_path, token):
+        time.sleep(0.05)
+        with PartialFile(local_path, len(DATA), MTIME) as part:
+            write_blocks(part, DATA)
+            part.commit()
+
+    assert strategy.download('10.0.0.1', path, {'ftp': ftp, 'sftp': sftp}) == 'sftp'
+    assert finished.wait(5)
+    time.sleep(0.1)
+    assert sorted(os.listdir(os.path.dirname(path))) == ['tech_support.log']
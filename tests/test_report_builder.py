@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - HTML巡检报告测试
+"""
+
+import os
+import re
+
+from result_registry import ResultRegistry
+from report_builder import ReportBuilder
+
+
+def span(device, phase, duration, ok=True, **extra):
+    return dict(device=device, phase=phase, duration=duration, ok=ok, **extra)
+
+
+def table_rows(html):
+    """设备明细表中各行的第一列（设备IP）"""
+    body = html.split('📋 设备明细', 1)[1]
+    return re.findall(r'<tr><td>([\d.]+)</td>', body)
+
+
+def make_builder():
+    results = ResultRegistry()
+    builder = ReportBuilder('2026-01-01_00-00-00', results)
+    return results, builder
+
+
+def finish(results, builder, device_ip, seconds, ok=True):
+    results.register(device_ip, 'alcatel_aos')
+    results.start(device_ip)
+    if ok:
+        results.succeed(device_ip)
+    else:
+        results.fail(device_ip, ConnectionRefusedError("refused"), phase='connect')
+    builder.observe(span(device_ip, 'connect', 1.0))
+    builder.observe(span(device_ip, 'ftp', seconds - 1, bytes=2 * 1024 * 1024))
+    builder.observe(span(device_ip, 'device', seconds, ok=ok))
+
+
+def test_rows_are_rendered_when_devices_finish():
+    results, builder = make_builder()
+    finish(results, builder, '10.0.0.1', 30)
+    assert list(builder.rows) == ['10.0.0.1']
+    # 未完成的设备没有表格行
+    builder.observe(span('10.0.0.2', 'connect', 1.0))
+    assert '10.0.0.2' not in builder.rows
+    # 没有设备的阶段（如汇总压缩）不影响表格
+    builder.observe(span(None, 'compress', 5))
+
+    _, html = builder.rows['10.0.0.1']
+    assert '<td>ALE</td>' in html
+    assert '✓ 成功' in html
+    assert 'data-v="2097152">2.00</td>' in html
+
+
+def test_failed_devices_come_first_then_slowest():
+    results, builder = make_builder()
+    finish(results, builder, '10.0.0.1', 30)
+    finish(results, builder, '10.0.0.2', 90)
+    finish(results, builder, '10.0.0.3', 10, ok=False)
+
+    html = builder.render()
+    assert table_rows(html) == ['10.0.0.3', '10.0.0.2', '10.0.0.1']
+    assert '<strong>失败设备:</strong> 1' in html
+    assert '<tr><td>ConnectionRefusedError</td>' in html
+    assert '<script>' not in html
+
+
+def test_abandoned_device_gets_a_row():
+    results, builder = make_builder()
+    finish(results, builder, '10.0.0.1', 30)
+    # 看门狗放弃的设备只有开始的阶段记录，没有 device 阶段
+    results.register('10.0.0.9', 'cisco_ios')
+    results.start('10.0.0.9')
+    builder.observe(span('10.0.0.9', 'connect', 2.0))
+    results.fail('10.0.0.9', TimeoutError("巡检超时，已放弃"), phase='ftp')
+
+    html = builder.render()
+    assert table_rows(html) == ['10.0.0.9', '10.0.0.1']
+    _, row = builder.rows['10.0.0.9']
+    assert '<td>Cisco</td>' in row
+    assert '<td>ftp</td>' in row
+    assert '巡检超时，已放弃' in row
+
+
+def test_written_report_lists_attachments(tmp_path):
+    results, builder = make_builder()
+    finish(results, builder, '10.0.0.1', 30)
+    builder.add_attachment('/nonexistent/10.0.0.1.zip', 3 * 1024 * 1024)
+    other = tmp_path / "summary.zip"
+    other.write_bytes(b'x' * 1024)
+
+    path = builder.write(str(tmp_path / "LOG"), ['/nonexistent/10.0.0.1.zip', str(other)])
+    assert os.path.basename(path) == 'run_report_2026-01-01_00-00-00.html'
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    assert '10.0.0.1.zip (3.00 MB)' in html
+    assert 'summary.zip (0.00 MB)' in html
+    assert '<script>' in html
+    assert builder.attachment_size(str(other)) == 1024
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 巡检结果登记测试
+"""
+
+import threading
+
+from result_registry import ResultRegistry, STATUS_FAILED, STATUS_PENDING, STATUS_SUCCESS
+
+
+def test_each_device_ends_in_one_state():
+    registry = ResultRegistry()
+    for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+        registry.register(ip, 'OS6860')
+        registry.start(ip)
+    registry.succeed('10.0.0.1')
+    registry.fail('10.0.0.2', TimeoutError("timed out\nCommon causes: ..."), phase='connect')
+    # 已失败的设备不会再变为成功，第二次失败不覆盖原因
+    registry.succeed('10.0.0.2')
+    registry.fail('10.0.0.2', ValueError("later"), phase='ftp')
+
+    assert registry.successful() == ['10.0.0.1']
+    assert registry.failed() == ['10.0.0.2']
+    assert registry.with_status('running') == ['10.0.0.3']
+    entry = registry.get('10.0.0.2')
+    assert (entry['status'], entry['phase'], entry['error'], entry['error_class']) == \
+        (STATUS_FAILED, 'connect', 'timed out', 'TimeoutError')
+    assert registry.failure_reasons() == {'TimeoutError': 1}
+
+
+def test_failure_without_exception_is_counted_by_phase():
+    registry = ResultRegistry()
+    registry.fail('10.0.0.1', "FTP下载失败", phase='ftp')
+    registry.fail('10.0.0.2')
+    assert registry.get('10.0.0.1')['error'] == "FTP下载失败"
+    assert registry.get('10.0.0.1')['error_class'] is None
+    assert registry.failure_reasons() == {'ftp': 1, 'unknown': 1}
+
+
+def test_spans_accumulate_per_phase_and_copies_are_isolated():
+    registry = ResultRegistry()
+    registry.register('10.0.0.1')
+    registry.observe({'device': '10.0.0.1', 'phase': 'ftp', 'duration': 1.25})
+    registry.observe({'device': '10.0.0.1', 'phase': 'ftp', 'duration': 0.5})
+    registry.observe({'device': None, 'phase': 'compress', 'duration': 3})
+
+    entry = registry.get('10.0.0.1')
+    assert entry['timings'] == {'ftp': 1.75}
+    assert entry['status'] == STATUS_PENDING
+    entry['timings']['ftp'] = 0
+    assert registry.snapshot()[0]['timings'] == {'ftp': 1.75}
+    assert registry.get('10.0.0.9') is None
+    assert registry.device_type('10.0.0.9') == ''
+
+
+def test_concurrent_updates_are_not_lost():
+    registry = ResultRegistry()
+
+    def worker(start):
+        for index in range(start, start + 250):
+            ip = f"10.0.{index // 250}.{index % 250}"
+            registry.register(ip)
+            registry.observe({'device': '10.9.9.9', 'phase': 'ftp', 'duration': 1})
+            if index % 2:
+                registry.succeed(ip)
+            else:
+                registry.fail(ip, phase='ssh')
+
+    threads = [threading.Thread(target=worker, args=(start,)) for start in range(0, 1000, 250)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(registry.with_status(STATUS_SUCCESS)) == 500
+    assert registry.failure_reasons() == {'ssh': 500}
+    assert registry.get('10.9.9.9')['timings'] == {'ftp': 1000}
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 巡检历史测试
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from run_history import RunHistory, health_metrics
+
+CONFIG = {'enabled': True, 'db_path': '', 'retention_days': 180}
+
+
+def logtime(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d_%H-%M-%S")
+
+
+def make_report(days_ago, durations, health=None):
+    """durations 为 {设备IP: device阶段耗时}"""
+    return {
+        'logtime': logtime(days_ago),
+        'elapsed': sum(durations.values()),
+        'devices': {ip: {'total': duration, 'phases': {'device': duration, 'ftp': duration / 2}}
+                    for ip, duration in durations.items()},
+        'spans': [{'phase': 'device', 'device': ip, 'ok': ip != '10.0.0.3', 'duration': duration,
+                   'error': None if ip != '10.0.0.3' else 'timeout'}
+                  for ip, duration in durations.items()],
+        'health': health or {},
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = RunHistory(str(tmp_path / "history.sqlite"), CONFIG)
+    yield history
+    history.close()
+
+
+def test_slowing_devices_are_found_by_trend(history):
+    # 10.0.0.1 每天变慢，10.0.0.2 保持不变
+    for day in range(10):
+        history.record_run(make_report(10 - day, {'10.0.0.1': 60 + day * 10, '10.0.0.2': 60}))
+
+    slowing = history.slowing_devices(days=30)
+    assert [row['device'] for row in slowing] == ['10.0.0.1']
+    assert slowing[0]['runs'] == 10
+    assert slowing[0]['slope'] == pytest.approx(10, rel=0.01)
+    assert [row['duration'] for row in history.device_trend('10.0.0.2', phase='ftp')] == [30] * 10
+    assert history.slowing_devices(days=30, phase='ftp')[0]['device'] == '10.0.0.1'
+
+
+def test_results_and_failures(history):
+    results = [
+        {'ip': '10.0.0.1', 'device_type': 'alcatel_aos', 'status': 'success', 'phase': 'done',
+         'error': None, 'error_class': None},
+        {'ip': '10.0.0.2', 'device_type': 'cisco_ios', 'status': 'failed', 'phase': 'connect',
+         'error': 'timed out', 'error_class': 'TimeoutError'},
+    ]
+    report = make_report(2, {'10.0.0.1': 30, '10.0.0.2': 5})
+    assert history.record_run(report, results, metrics=[('10.0.0.1', 'interfaces', 48), ('10.0.0.2', 'x', None)])
+    # 同一次巡检重复记录时覆盖
+    assert history.record_run(report, results) == 2
+    history.record_run(make_report(1, {'10.0.0.3': 10}))
+
+    runs = history.runs()
+    assert [(run['devices'], run['success'], run['failed']) for run in runs] == [(2, 1, 1), (1, 0, 1)]
+    failures = history.failure_counts()
+    assert sorted((row['device'], row['failures'], row['last_error']) for row in failures) == \
+        [('10.0.0.2', 1, 'timed out'), ('10.0.0.3', 1, 'timeout')]
+    # 覆盖记录时不再保留第一次记录的指标
+    assert history.metric_trend('10.0.0.1', 'interfaces') == []
+
+
+def test_health_summaries_become_metrics(history):
+    health = {'10.0.0.1': {'cpu': 91, 'memory': None, 'port_errors': {'1/1/2': {}}, 'fan_faults': ['1/-- 2 NO'],
+                           'status': 'critical'}}
+    rows = health_metrics(health)
+    assert ('10.0.0.1', 'cpu', 91) in rows
+    assert ('10.0.0.1', 'health_level', 2) in rows
+    assert ('10.0.0.1', 'fan_faults', 1) in rows
+    assert not any(name == 'memory' for _, name, _ in rows)
+
+    history.record_run(make_report(1, {'10.0.0.1': 30}, health))
+    assert [row['value'] for row in history.metric_trend('10.0.0.1', 'cpu')] == [91.0]
+
+
+def test_prune_and_import(history, tmp_path):
+    history.record_run(make_report(400, {'10.0.0.1': 30}))
+    history.record_run(make_report(1, {'10.0.0.1': 30}))
+    assert history.prune() == 1
+    assert len(history.runs(days=1000)) == 1
+    assert history.prune(retention_days=0) == 0
+
+    reports_dir = tmp_path / "LOG" / "reports"
+    reports_dir.mkdir(parents=True)
+    for days_ago in (3, 2):
+        report = make_report(days_ago, {'10.0.0.1': 30})
+        with open(reports_dir / f"run_report_{report['logtime']}.json", 'w', encoding='utf-8') as f:
+            json.dump(report, f)
+    (reports_dir / "run_report_broken.json").write_text("{", encoding='utf-8')
+
+    assert history.import_reports(str(tmp_path / "LOG")) == 2
+    assert history.import_reports(str(tmp_path / "LOG")) == 0
+    assert len(history.runs()) == 3
+    assert os.path.exists(history.db_path)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 巡检调度测试
+"""
+
+import time
+import threading
+
+import pytest
+
+from device_record import DeviceRecord
+from scheduler import DeviceScheduler, TokenBucket, parse_limits
+
+
+def make_config(**overrides):
+    """不限速、无截止时间的调度配置"""
+    config = {
+        'workers': 1,
+        'group_by': 'subnet',
+        'subnet_prefix': 24,
+        'group_limit': 0,
+        'limits': [],
+        'bandwidth': 0,
+        'history_runs': 3,
+        'deadline': 0,
+    }
+    config.update(overrides)
+    return config
+
+
+def make_device(ip, site=None):
+    return DeviceRecord(ip, 'ssh', 22, 'admin', 'switch', '', 'alcatel_aos', site=site)
+
+
+class ConcurrencyProbe:
+    """记录每台设备开始时同一键下正在巡检的设备数"""
+
+    def __init__(self, key=lambda device: '', duration=0.02):
+        self.key = key
+        self.duration = duration
+        self.active = {}
+        self.peaks = {}
+        self.order = []
+        self.lock = threading.Lock()
+
+    def __call__(self, device):
+        key = self.key(device)
+        with self.lock:
+            self.order.append(device.ip)
+            self.active[key] = self.active.get(key, 0) + 1
+            self.peaks[key] = max(self.peaks.get(key, 0), self.active[key])
+        time.sleep(self.duration)
+        with self.lock:
+            self.active[key] -= 1
+
+
+def test_all_devices_run_once():
+    scheduler = DeviceScheduler(make_config(workers=4))
+    devices = [make_device(f"10.0.{index % 3}.{index}") for index in range(20)]
+    for device in devices:
+        scheduler.submit(device)
+    probe = ConcurrencyProbe(duration=0)
+
+    scheduler.run(probe)
+    assert sorted(probe.order) == sorted(device.ip for device in devices)
+
+
+def test_group_limit_caps_concurrency():
+    scheduler = DeviceScheduler(make_config(workers=4, group_limit=1))
+    for index in range(6):
+        scheduler.submit(make_device(f"10.0.0.{index + 1}"))
+    probe = ConcurrencyProbe()
+
+    scheduler.run(probe)
+    assert len(probe.order) == 6
+    assert probe.peaks[''] == 1
+
+
+def test_groups_take_turns():
+    scheduler = DeviceScheduler(make_config(workers=1))
+    for index in range(3):
+        scheduler.submit(make_device(f"10.0.1.{index + 1}", site='hq'))
+    for index in range(3):
+        scheduler.submit(make_device(f"10.0.2.{index + 1}", site='branch'))
+    probe = ConcurrencyProbe(duration=0)
+
+    scheduler.run(probe)
+    assert probe.order == ['10.0.1.1', '10.0.2.1', '10.0.1.2', '10.0.2.2', '10.0.1.3', '10.0.2.3']
+
+
+def test_limit_rules_are_shared_by_matching_devices():
+    config = make_config(workers=6, limits=['10.0.0.0/16=2', 'branch=1'])
+    scheduler = DeviceScheduler(config)
+    for index in range(4):
+        scheduler.submit(make_device(f"10.0.{index}.1"))
+    for index in range(3):
+        scheduler.submit(make_device(f"10.9.{index}.1", site='branch'))
+    probe = ConcurrencyProbe(key=lambda device: device.site or '10.0/16', duration=0.05)
+
+    scheduler.run(probe)
+    assert len(probe.order) == 7
+    assert probe.peaks == {'10.0/16': 2, 'branch': 1}
+
+
+def test_invalid_limit_rules_are_ignored():
+    rules = parse_limits(['10.0.0.0/8=3', 'bad', 'site=0', '10.0.0.300/24=1', 'OS6860=2'])
+    assert [(rule.match, rule.limit) for rule in rules] == [('10.0.0.0/8', 3), ('os6860', 2)]
+
+
+def test_token_bucket_blocks_when_budget_is_spent():
+    bucket = TokenBucket(100000)
+    assert bucket.consume(50000) == 0
+    started = time.monotonic()
+    wait = bucket.consume(60000)
+    assert wait == pytest.approx(0.1, abs=0.02)
+    assert time.monotonic() - started >= 0.09
+
+
+def test_slowest_devices_and_groups_start_first():
+    scheduler = DeviceScheduler(make_config(workers=1))
+    for ip in ('10.0.1.1', '10.0.1.2', '10.0.2.1', '10.0.2.2', '10.0.2.3'):
+        scheduler.submit(make_device(ip))
+    # 10.0.2.3 没有历史记录，按中位数(20秒)估计
+    scheduler.set_estimates({'10.0.1.1': 5, '10.0.1.2': 90, '10.0.2.1': 20, '10.0.2.2': 60, '10.0.9.9': 10})
+    probe = ConcurrencyProbe(duration=0)
+
+    scheduler.run(probe)
+    assert probe.order == ['10.0.2.2', '10.0.1.2', '10.0.2.1', '10.0.1.1', '10.0.2.3']
+    assert scheduler.estimate(make_device('10.9.9.9')) == 20
+
+
+def test_devices_after_deadline_are_skipped():
+    # 截止时间0.1秒，第一台设备耗时0.3秒
+    scheduler = DeviceScheduler(make_config(deadline=0.1 / 60))
+    for index in range(4):
+        scheduler.submit(make_device(f"10.0.0.{index + 1}"))
+    inspected = []
+    skipped = []
+
+    def inspect(device):
+        inspected.append(device.ip)
+        time.sleep(0.3)
+
+    scheduler.run(inspect, on_skip=lambda device: skipped.append(device.ip))
+    assert inspected == ['10.0.0.1']
+    assert skipped == ['10.0.0.2', '10.0.0.3', '10.0.0.4']
+    assert scheduler.past_deadline()
+    assert scheduler.time_left() == 0
+
+
+def test_deadline_without_skip_handler_runs_everything():
+    scheduler = DeviceScheduler(make_config(deadline=0.01 / 60))
+    for index in range(3):
+        scheduler.submit(make_device(f"10.0.0.{index + 1}"))
+    inspected = []
+
+    def inspect(device):
+        inspected.append(device.ip)
+        time.sleep(0.02)
+
+    scheduler.run(inspect)
+    assert len(inspected) == 3
+
+
+def test_abandon_replaces_stuck_worker():
+    scheduler = DeviceScheduler(make_config(workers=1))
+    for index in range(3):
+        scheduler.submit(make_device(f"10.0.0.{index + 1}"))
+    started = threading.Event()
+    release = threading.Event()
+    inspected = []
+    lock = threading.Lock()
+
+    def inspect(device):
+        with lock:
+            inspected.append(device.ip)
+        if device.ip == '10.0.0.1':
+            started.set()
+            release.wait(5)
+
+    runner = threading.Thread(target=scheduler.run, args=(inspect,), daemon=True)
+    runner.start()
+    assert started.wait(5)
+    assert not scheduler.abandon('10.0.0.9')
+    assert scheduler.abandon('10.0.0.1')
+
+    # 替代线程巡检剩余设备，run() 不等待卡住的线程
+    runner.join(5)
+    assert not runner.is_alive()
+    assert sorted(inspected) == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+
+    # 卡住的线程返回后不再取设备
+    release.set()
+    time.sleep(0.1)
+    assert len(inspected) == 3
+    assert scheduler.running == {}
+    assert not scheduler.abandoned
+
+
+def test_abandon_frees_group_slot():
+    scheduler = DeviceScheduler(make_config(workers=1, group_limit=1))
+    scheduler.submit(make_device('10.0.0.1'))
+    scheduler.submit(make_device('10.0.0.2'))
+    started = threading.Event()
+    release = threading.Event()
+    inspected = []
+
+    def inspect(device):
+        inspected.append(device.ip)
+        if device.ip == '10.0.0.1':
+            started.set()
+            release.wait(5)
+
+    runner = threading.Thread(target=scheduler.run, args=(inspect,), daemon=True)
+    runner.start()
+    assert started.wait(5)
+    scheduler.abandon('10.0.0.1')
+    runner.join(5)
+    release.set()
+    assert not runner.is_alive()
+    assert inspected == ['10.0.0.1', '10.0.0.2']
+    assert all(count == 0 for count in scheduler.active.values())
+
+
+def test_blocked_devices_do_not_hold_up_their_group():
+    scheduler = DeviceScheduler(make_config(workers=2, limits=['10.0.0.0/24=1']))
+    for ip in ('10.0.0.1', '10.0.0.2', '10.0.1.1', '10.0.1.2'):
+        scheduler.submit(make_device(ip, site='hq'))
+    probe = ConcurrencyProbe(key=lambda device: device.ip.rsplit('.', 1)[0], duration=0.05)
+
+    scheduler.run(probe)
+    # 10.0.0.2 等待网段名额时，同组的 10.0.1.1 先开始
+    assert probe.order[:2] == ['10.0.0.1', '10.0.1.1']
+    assert sorted(probe.order) == ['10.0.0.1', '10.0.0.2', '10.0.1.1', '10.0.1.2']
+    assert probe.peaks['10.0.0'] == 1
+    assert scheduler.queues == {}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 超时看门狗测试
+"""
+
+import time
+import socket
+import threading
+
+import pytest
+
+from session_watchdog import Watchdog, WatchdogTimeout, close_connection, shutdown_socket
+
+
+def make_config(**overrides):
+    """不限制任何阶段的超时配置"""
+    config = {
+        'device': 0,
+        'tech_support': 0,
+        'command': 0,
+        'download': 0,
+        'io': 0,
+        'grace': 0,
+    }
+    config.update(overrides)
+    return config
+
+
+def test_expiry_runs_cancel_callbacks_and_raises():
+    expired = []
+    notified = threading.Event()
+    watchdog = Watchdog(make_config(download=0.1),
+                        on_expire=lambda guard: (expired.append(guard), notified.set()))
+    reader, writer = socket.socketpair()
+    cancelled = []
+
+    started = time.monotonic()
+    with pytest.raises(WatchdogTimeout):
+        with watchdog.guard('10.0.0.1', 'ftp') as guard:
+            guard.add_cancel(lambda: cancelled.append('first'))
+            guard.add_cancel(lambda: 1 / 0)
+            guard.add_cancel(lambda: shutdown_socket(reader))
+            # 阻塞的recv在套接字关闭后返回
+            try:
+                reader.recv(1024)
+            except OSError:
+                pass
+    writer.close()
+
+    assert time.monotonic() - started < 5
+    assert cancelled == ['first']
+    # on_expire 在取消操作之后调用，可能晚于代码块返回
+    assert notified.wait(5)
+    assert [(item.device_ip, item.phase) for item in expired] == [('10.0.0.1', 'ftp')]
+    assert guard.expired
+
+
+def test_exception_from_cancelled_call_becomes_timeout():
+    watchdog = Watchdog(make_config(command=0.05))
+    with pytest.raises(WatchdogTimeout, match='command'):
+        with watchdog.guard('10.0.0.1', 'command'):
+            time.sleep(0.3)
+            raise EOFError("connection closed")
+
+
+def test_finished_blocks_are_not_cancelled():
+    watchdog = Watchdog(make_config(command=5))
+    cancelled = []
+    with watchdog.guard('10.0.0.1', 'command') as guard:
+        guard.add_cancel(lambda: cancelled.append(True))
+    time.sleep(0.1)
+    assert not cancelled
+    assert not guard.expired
+    assert not watchdog.guards
+
+
+def test_unlimited_phase_is_not_monitored():
+    watchdog = Watchdog(make_config(download=1))
+    assert watchdog.timeout_for('sftp') == 1
+    assert watchdog.timeout_for('tech_support') == 0
+    with watchdog.guard('10.0.0.1', 'tech_support'):
+        assert not watchdog.guards
+    assert watchdog.thread is None
+
+
+def test_device_guard_is_abandoned_after_grace():
+    abandoned = threading.Event()
+    watchdog = Watchdog(make_config(device=0.05, command=0.05, grace=0.1),
+                        on_abandon=lambda guard: abandoned.set())
+    release = threading.Event()
+
+    def stuck(phase):
+        try:
+            with watchdog.guard('10.0.0.1', phase):
+                release.wait(5)
+        except WatchdogTimeout:
+            pass
+
+    # 非设备级的阶段超时不放弃线程
+    command = threading.Thread(target=stuck, args=('command',))
+    command.start()
+    time.sleep(0.4)
+    assert not abandoned.is_set()
+
+    device = threading.Thread(target=stuck, args=('device',))
+    started = time.monotonic()
+    device.start()
+    assert abandoned.wait(5)
+    assert time.monotonic() - started >= 0.15
+    release.set()
+    command.join(5)
+    device.join(5)
+
+
+def test_close_connection_closes_transport_and_channel():
+    closed = []
+
+    class Transport:
+        def close(self):
+            closed.append('transport')
+
+    class Client:
+        def get_transport(self):
+            return Transport()
+
+        def close(self):
+            closed.append('client')
+
+    class Channel:
+        def close(self):
+            raise OSError("already closed")
+
+    class Connection:
+        remote_conn = Channel()
+        remote_conn_pre = Client()
+
+    close_connection(Connection())
+    assert closed == ['transport', 'client']
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - SSH文件传输测试
+"""
+
+import os
+import io
+import errno
+
+import pytest
+
+import ssh_transfer
+from partial_file import PartialFile, PART_SUFFIX
+
+paramiko = pytest.importorskip('paramiko')
+
+DATA = os.urandom(200 * 1024)
+CONFIG = {'sftp_window': 1, 'sftp_requests': 4, 'block_size': 32}
+
+
+class FakeStat:
+    st_size = len(DATA)
+    st_mtime = 1700000000
+
+
+class FakeRemoteFile(io.BytesIO):
+    """远端文件，prefetch 的参数与 paramiko 3.3 之前的版本相同"""
+
+    def __init__(self, data, log):
+        super().__init__(data)
+        self.log = log
+
+    def stat(self):
+        return FakeStat()
+
+    def seek(self, offset, whence=0):
+        self.log.append(('seek', offset))
+        return super().seek(offset, whence)
+
+    def prefetch(self, file_size=None):
+        self.log.append(('prefetch', file_size))
+
+
+class FakeSFTP:
+    def __init__(self, data, log):
+        self.data = data
+        self.log = log
+
+    def open(self, path, mode):
+        if path != 'tech_support.log':
+            raise IOError(errno.ENOENT, "No such file")
+        return FakeRemoteFile(self.data, self.log)
+
+    def close(self):
+        self.log.append(('close',))
+
+
+@pytest.fixture
+def sftp_log(monkeypatch):
+    log = []
+    monkeypatch.setattr(paramiko.SFTPClient, 'from_transport',
+                        classmethod(lambda cls, transport, **kwargs: FakeSFTP(DATA, log)))
+    return log
+
+
+def test_sftp_download_with_old_prefetch_signature(tmp_path, sftp_log):
+    local_path = str(tmp_path / "tech_support.log")
+    received = []
+
+    count = ssh_transfer.sftp_download(object(), 'tech_support.log', local_path, CONFIG, on_data=received.append)
+
+    assert count == len(DATA)
+    assert sum(received) == len(DATA)
+    with open(local_path, 'rb') as f:
+        assert f.read() == DATA
+    assert ('prefetch', len(DATA)) in sftp_log
+    assert sftp_log[-1] == ('close',)
+
+
+def test_sftp_download_resumes_from_partial(tmp_path, sftp_log):
+    local_path = str(tmp_path / "tech_support.log")
+    with PartialFile(local_path, FakeStat.st_size, FakeStat.st_mtime) as part:
+        part.write(DATA[:50 * 1024])
+
+    count = ssh_transfer.sftp_download(object(), 'tech_support.log', local_path, CONFIG)
+
+    assert count == len(DATA) - 50 * 1024
+    assert ('seek', 50 * 1024) in sftp_log
+    with open(local_path, 'rb') as f:
+        assert f.read() == DATA
+    assert not os.path.exists(local_path + PART_SUFFIX)
+
+
+def test_sftp_missing_file_is_reported(tmp_path, sftp_log):
+    with pytest.raises(IOError) as info:
+        ssh_transfer.sftp_download(object(), 'missing.log', str(tmp_path / "missing.log"), CONFIG)
+    assert ssh_transfer.is_missing_error(info.value)
+    assert sftp_log == [('close',)]
+
+
+def test_get_transport_requires_an_active_ssh_session():
+    class Transport:
+        def __init__(self, active):
+            self.active = active
+
+        def is_active(self):
+            return self.active
+
+    class Channel:
+        def __init__(self, transport):
+            self.transport = transport
+
+        def get_transport(self):
+            return self.transport
+
+    class Connection:
+        def __init__(self, channel):
+            self.remote_conn = channel
+
+    active = Transport(True)
+    assert ssh_transfer.get_transport(Connection(Channel(active))) is active
+    assert ssh_transfer.get_transport(Connection(Channel(Transport(False)))) is None
+    # telnet 会话的 remote_conn 是 telnetlib 对象，没有 transport
+    assert ssh_transfer.get_transport(Connection(object())) is None
+
+
+def test_missing_errors_are_recognised():
+    assert ssh_transfer.is_missing_error(FileNotFoundError("gone"))
+    assert ssh_transfer.is_missing_error(IOError(errno.ENOENT, "No such file"))
+    assert ssh_transfer.is_missing_error(Exception("scp: /flash/x: No such file or directory"))
+    assert not ssh_transfer.is_missing_error(IOError(errno.EACCES, "Permission denied"))
+
+
+def test_scp_reports_progress_and_missing_files(tmp_path, monkeypatch):
+    scp = pytest.importorskip('scp')
+
+    class FakeSCPClient:
+        def __init__(self, transport, buff_size, socket_timeout, progress):
+            self.progress = progress
+
+        def get(self, remote_path, local_path):
+            if remote_path != 'tech_support.log':
+                raise scp.SCPException(f"scp: {remote_path}: No such file or directory")
+            for sent in (0, 4096, 8192, 10000):
+                self.progress(remote_path, 10000, sent)
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(scp, 'SCPClient', FakeSCPClient)
+    received = []
+    count = ssh_transfer.scp_download(object(), 'tech_support.log', str(tmp_path / "a.log"), CONFIG,
+                                      on_data=received.append)
+    assert count == 10000
+    assert received == [4096, 4096, 1808]
+    with pytest.raises(FileNotFoundError):
+        ssh_transfer.scp_download(object(), 'missing.log', str(tmp_path / "b.log"), CONFIG)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - 数据连接接收测试
+"""
+
+import os
+import socket
+import threading
+
+import pytest
+
+import stream_receiver
+from partial_file import PartialFile
+from stream_receiver import StreamReceiver
+
+DATA = os.urandom(1024 * 1024 + 123)
+
+
+def serve(data, close=True):
+    """返回数据连接的接收端，另一端在后台发送 data"""
+    server, client = socket.socketpair()
+
+    def send():
+        server.sendall(data)
+        if close:
+            server.close()
+
+    threading.Thread(target=send, daemon=True).start()
+    return client, server
+
+
+@pytest.mark.parametrize('zero_copy', [False, True])
+def test_receives_until_peer_closes(tmp_path, zero_copy):
+    if zero_copy and not stream_receiver.SPLICE_AVAILABLE:
+        pytest.skip("os.splice 不可用")
+    path = str(tmp_path / "tech_support.log")
+    sock, _ = serve(DATA)
+    sock.settimeout(5)
+    received = []
+
+    with sock, PartialFile(path, len(DATA), 1700000000) as part:
+        count = StreamReceiver(block_size=64 * 1024, zero_copy=zero_copy).receive(sock, part, received.append)
+        assert count == len(DATA)
+        part.commit()
+
+    assert sum(received) == len(DATA)
+    assert max(received) <= 64 * 1024
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_splice_times_out_when_no_data_arrives(tmp_path):
+    if not stream_receiver.SPLICE_AVAILABLE:
+        pytest.skip("os.splice 不可用")
+    sock, peer = serve(b'partial', close=False)
+    sock.settimeout(0.2)
+    with sock, peer, PartialFile(str(tmp_path / "a.log")) as part:
+        with pytest.raises(socket.timeout):
+            StreamReceiver(zero_copy=True).receive(sock, part)
+        assert part.offset == len(b'partial')
+
+
+def test_buffer_is_reused_per_thread():
+    first = stream_receiver.get_buffer(4096)
+    assert stream_receiver.get_buffer(4096) is first
+    assert len(stream_receiver.get_buffer(8192)) == 8192
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(stream_receiver.get_buffer(8192)))
+    thread.start()
+    thread.join()
+    assert other[0] is not stream_receiver.get_buffer(8192)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - tech-support日志分析测试
+"""
+
+import tech_support_analyzer
+from tech_support_analyzer import (TechSupportAnalyzer, analyze_device, format_summary,
+                                   STATUS_CRITICAL, STATUS_OK, STATUS_WARNING)
+
+LAYER3_LOG = """\
+show system
+System: OmniSwitch 6860
+show health
+                   1 Min  1 Hr
+Resources  Current  Avg   Avg
+CPU             91    40    30
+Memory          60    58    57
+show temperature
+Chassis/Device | Current | Range | Danger | Thresh | Status
+1/CMMA           46        15 to 85  88      85       UNDER THRESHOLD
+2/CMMA           86        15 to 85  88      85       OVER THRESHOLD
+show fan
+Chassis/Tray | Fan | Functional
+1/--           1     YES
+1/--           2     NO
+show powersupply
+Slot  PS  Wattage  Type  Status
+1/1   600  AC  UP
+1/2   --  --  NOT PRESENT
+show interfaces counters errors
+Slot/Port : 1/1/1
+  IfInErrors = 0, IfOutErrors = 0
+Slot/Port : 1/1/2
+  IfInErrors = 12, CRC Error Frames = 3
+Topology Change: 7
+Thu Oct 16 10:00:00 2026 swlogd chassisSupervisor CRIT: NI 2 power failure
+Thu Oct 16 10:00:01 2026 swlogd ipv4 ERR: route lookup failed
+"""
+
+LAYER2_LOG = """\
+Slot/Port : 1/1/2
+  IfInErrors = 40
+Topology Change: 5
+"""
+
+
+def make_config(**overrides):
+    config = tech_support_analyzer.get_default_config()
+    config.update(overrides)
+    return config
+
+
+def write_logs(tmp_path):
+    layer3 = tmp_path / "tech_support_layer3.log"
+    layer2 = tmp_path / "tech_support_layer2.log"
+    layer3.write_text(LAYER3_LOG, encoding='utf-8')
+    layer2.write_text(LAYER2_LOG, encoding='utf-8')
+    return [str(layer3), str(layer2)]
+
+
+def test_health_indicators_are_extracted(tmp_path):
+    summary = analyze_device('10.0.0.1', write_logs(tmp_path), make_config())
+
+    assert (summary['cpu'], summary['memory'], summary['temperature']) == (91, 60, 86)
+    assert summary['temperature_alarms'] == ['2/CMMA           86        15 to 85  88      85       OVER THRESHOLD']
+    assert summary['fan_faults'] == ['1/--           2     NO']
+    # 空槽位不算电源故障
+    assert summary['psu_faults'] == []
+    # 两个文件的端口计数取最大值，生成树变化取最大值而不累加
+    assert summary['port_errors'] == {'1/1/2': {'IfInErrors': 40, 'CRC Error Frames': 3}}
+    assert summary['stp_changes'] == 7
+    assert len(summary['chassis_faults']) == 1 and 'NI 2 power failure' in summary['chassis_faults'][0]
+    assert summary['files'] == ['tech_support_layer3.log', 'tech_support_layer2.log']
+    assert summary['status'] == STATUS_CRITICAL
+    assert any(issue.startswith('CPU利用率 91%') for issue in summary['issues'])
+
+
+def test_thresholds_decide_the_status(tmp_path):
+    path = tmp_path / "tech_support.log"
+    path.write_text("show health\nCPU 50 40 30\nMemory 90 80 70\n", encoding='utf-8')
+    summary = analyze_device('10.0.0.1', [str(path)], make_config())
+    assert summary['status'] == STATUS_WARNING
+    assert summary['issues'] == ['内存利用率 90%']
+
+    summary = analyze_device('10.0.0.1', [str(path)], make_config(memory_threshold=95))
+    assert summary['status'] == STATUS_OK
+
+
+def test_missing_and_empty_files_are_reported(tmp_path):
+    empty = tmp_path / "empty.log"
+    empty.write_bytes(b'')
+    summary = analyze_device('10.0.0.1', [str(empty), str(tmp_path / "missing.log")], make_config())
+    assert summary['files'] == ['empty.log']
+    assert summary['error'].startswith('missing.log')
+    text = format_summary(summary)
+    assert 'CPU利用率: 未找到' in text and '分析错误: missing.log' in text
+
+
+def test_background_analysis_collects_every_device(tmp_path):
+    paths = write_logs(tmp_path)
+    analyzer = TechSupportAnalyzer(make_config(workers=1))
+    analyzer.submit('10.0.0.1', paths)
+    analyzer.submit('10.0.0.2', paths[1:])
+    analyzer.submit('10.0.0.3', [])
+
+    summaries = analyzer.collect()
+    assert sorted(summaries) == ['10.0.0.1', '10.0.0.2']
+    assert summaries['10.0.0.2']['port_errors'] == {'1/1/2': {'IfInErrors': 40}}
+    assert analyzer.executor is None
+
+    disabled = TechSupportAnalyzer(make_config(enabled=False))
+    disabled.submit('10.0.0.1', paths)
+    assert disabled.collect() == {}
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+ALE网络运维工具包 - TFTP下载测试
+"""
+
+import os
+import sys
+
+import pytest
+
+from tftp_downloader import TFTPClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from tftp_server import TFTPStandIn, BLOCK_SIZE  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    files = {
+        'tech_support.log': os.urandom(300 * 1024 + 17),
+        'exact.log': os.urandom(4 * BLOCK_SIZE),
+    }
+    standin = TFTPStandIn(files).start()
+    yield standin
+    standin.stop()
+
+
+def test_download_writes_the_whole_file(server, tmp_path):
+    for name in ('tech_support.log', 'exact.log'):
+        path = str(tmp_path / name)
+        assert TFTPClient('127.0.0.1', server.port).download_file(name, path)
+        with open(path, 'rb') as f:
+            assert f.read() == server.files[name]
+
+
+def test_missing_file_sets_error_code(server, tmp_path):
+    client = TFTPClient('127.0.0.1', server.port)
+    assert not client.download_file('missing.log', str(tmp_path / "missing.log"))
+    assert client.error_code == 1
+    assert not os.path.exists(tmp_path / "missing.log")
+
+
+def test_block_numbers_wrap_after_65535(server, tmp_path):
+    # 超过65535个块（约32MB）时块号回绕到0
+    server.files['large.log'] = os.urandom(65536 * BLOCK_SIZE + 100)
+    path = str(tmp_path / "large.log")
+    received = []
+    assert TFTPClient('127.0.0.1', server.port, throttle=received.append).download_file('large.log', path)
+    assert sum(received) == len(server.files['large.log'])
+    with open(path, 'rb') as f:
+        assert f.read() == server.files['large.log']
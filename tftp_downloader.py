@@ -11,14 +11,22 @@ import struct
 import time
 from datetime import datetime
 
+from log_setup import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
 
 class TFTPClient:
     """简单的TFTP客户端实现"""
     
-    def __init__(self, server_ip, server_port=69):
+    def __init__(self, server_ip, server_port=69, throttle=None):
         self.server_ip = server_ip
         self.server_port = server_port
         self.socket = None
+        # 限速回调，参数为收到的字节数
+        self.throttle = throttle
+        # 最近一次服务器返回的TFTP错误码，1表示文件不存在
+        self.error_code = None
         
     def download_file(self, remote_filename, local_filename):
         """下载文件"""
@@ -33,8 +41,8 @@ class TFTPClient:
             # 发送读请求
             self.socket.sendto(rrq_packet, (self.server_ip, self.server_port))
             
-            # 接收文件数据
-            file_data = b''
+            # 接收文件数据（bytearray 追加为均摊O(1)，bytes 拼接会使下载耗时随文件大小平方增长）
+            file_data = bytearray()
             block_number = 1
             server_addr = None
             
@@ -53,12 +61,15 @@ class TFTPClient:
                         
                         if recv_block == block_number:
                             file_data += data[4:]
+                            if self.throttle:
+                                self.throttle(len(data) - 4)
                             
                             # 发送ACK
                             ack_packet = self._build_ack_packet(block_number)
                             self.socket.sendto(ack_packet, server_addr)
                             
-                            block_number += 1
+                            # 块号超过65535后回绕到0，大于32MB的文件才会出现
+                            block_number = (block_number + 1) & 0xFFFF
                             
                             # 如果数据包小于512字节，说明传输完成
                             if len(data) < 516:
@@ -66,6 +77,7 @@ class TFTPClient:
                                 
                     elif opcode == 5:  # ERROR包
                         error_code = struct.unpack('!H', data[2:4])[0]
+                        self.error_code = error_code
                         error_msg = data[4:].decode('ascii', errors='ignore').rstrip('\x00')
                         raise Exception(f"TFTP错误 {error_code}: {error_msg}")
                         
@@ -76,11 +88,11 @@ class TFTPClient:
             with open(local_filename, 'wb') as f:
                 f.write(file_data)
             
-            print(f"TFTP下载成功: {remote_filename} -> {local_filename}")
+            logger.debug(f"TFTP下载成功: {remote_filename} -> {local_filename}")
             return True
             
         except Exception as e:
-            print(f"TFTP下载失败: {e}")
+            logger.warning(f"TFTP下载失败: {e}")
             return False
             
         finally:
@@ -118,7 +130,7 @@ def download_ale_tech_support_logs(device_ip, log_dir="LOG"):
     device_log_dir = os.path.join(log_dir, f"{device_ip}_{timestamp}")
     if not os.path.exists(device_log_dir):
         os.makedirs(device_log_dir)
-        print(f"创建目录: {device_log_dir}")
+        logger.debug(f"创建目录: {device_log_dir}")
     
     # 创建TFTP客户端
     tftp_client = TFTPClient(device_ip)
@@ -127,7 +139,7 @@ def download_ale_tech_support_logs(device_ip, log_dir="LOG"):
     failed_files = []
     
     for log_file in log_files:
-        print(f"尝试下载: {device_ip}:{log_file}")
+        logger.debug(f"尝试下载: {device_ip}:{log_file}")
         
         # 本地文件名包含设备IP
         local_filename = f"{device_ip}_{log_file}"
@@ -153,26 +165,26 @@ def download_ale_tech_support_logs(device_ip, log_dir="LOG"):
                 f.write("4. 权限问题\n")
     
     # 打印结果
-    print(f"\n设备 {device_ip} 日志下载结果:")
-    print(f"成功: {len(downloaded_files)} 个文件")
-    print(f"失败: {len(failed_files)} 个文件")
+    logger.info(f"\n设备 {device_ip} 日志下载结果:")
+    logger.info(f"成功: {len(downloaded_files)} 个文件")
+    logger.info(f"失败: {len(failed_files)} 个文件")
     
     if downloaded_files:
-        print("成功下载的文件:")
+        logger.info("成功下载的文件:")
         for file in downloaded_files:
-            print(f"  ✓ {file}")
+            logger.info(f"  ✓ {file}")
     
     if failed_files:
-        print("下载失败的文件:")
+        logger.info("下载失败的文件:")
         for file in failed_files:
-            print(f"  ✗ {file}")
+            logger.warning(f"  ✗ {file}")
     
     return len(downloaded_files) > 0
 
 
 def test_tftp_connection(device_ip):
     """测试TFTP连接"""
-    print(f"测试TFTP连接: {device_ip}")
+    logger.info(f"测试TFTP连接: {device_ip}")
     
     try:
         # 尝试连接TFTP端口
@@ -186,14 +198,14 @@ def test_tftp_connection(device_ip):
         # 等待响应
         try:
             data, addr = sock.recvfrom(516)
-            print(f"✓ TFTP服务响应: {device_ip}")
+            logger.info(f"✓ TFTP服务响应: {device_ip}")
             return True
         except socket.timeout:
-            print(f"✗ TFTP服务无响应: {device_ip}")
+            logger.warning(f"✗ TFTP服务无响应: {device_ip}")
             return False
             
     except Exception as e:
-        print(f"✗ TFTP连接测试失败: {device_ip} - {e}")
+        logger.warning(f"✗ TFTP连接测试失败: {device_ip} - {e}")
         return False
         
     finally:
@@ -202,6 +214,7 @@ def test_tftp_connection(device_ip):
 
 def main():
     """主函数 - 用于测试"""
+    setup_logging()
     print("TFTP下载工具测试")
     print("=" * 40)
     